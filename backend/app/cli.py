@@ -0,0 +1,233 @@
+"""
+Command-line tools for the Care Plan Generator backend.
+
+Usage:
+    python -m app.cli import-roster roster.csv [--generate] [--output-dir plans/]
+    python -m app.cli replay capture.jsonl [--speed 2] [--upstream-speed 0]
+    python -m app.cli soak [--duration 3600] [--concurrency 4] [--trace]
+    python -m app.cli export plans|usage [--format parquet] [--facility F] [--since D] [--output F]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from collections.abc import Callable, Coroutine
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.models import RosterImportSummary
+from app.services.analytics_export import (
+    DATASETS,
+    EXPORT_FORMATS,
+    ExportFilter,
+    ExportUnavailableError,
+    export_chunks,
+)
+from app.services.roster_import import (
+    SUPPORTED_FORMATS,
+    aiter_file_lines,
+    import_roster,
+    to_ndjson_line,
+)
+from app.services.soak_test import SoakOptions, load_patients, soak
+from app.services.traffic_replay import load_capture, replay
+
+BYTES_PER_MB = 1024 * 1024
+# Patients used by the soak test when no --patients file is given
+DEFAULT_SOAK_PATIENTS = Path(__file__).resolve().parent.parent / "test_data.json"
+
+
+async def _import_roster(args: argparse.Namespace) -> int:
+    """Run the import-roster command."""
+    path = Path(args.roster)
+    fmt = args.format or ("ndjson" if path.suffix.lower() in (".ndjson", ".jsonl") else "csv")
+    output_dir = Path(args.output_dir) if args.output_dir else None
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    summary = RosterImportSummary()
+    async for item in import_roster(
+        aiter_file_lines(path.open("rb")),
+        fmt,
+        generate=args.generate,
+        concurrency=args.concurrency,
+    ):
+        if isinstance(item, RosterImportSummary):
+            summary = item
+        elif output_dir and item.care_plan is not None:
+            plan_path = output_dir / f"row-{item.row:05d}.html"
+            plan_path.write_text(item.care_plan.care_plan_html, encoding="utf-8")
+            sys.stdout.write(to_ndjson_line(item.model_copy(update={"care_plan": None})))
+            continue
+        sys.stdout.write(to_ndjson_line(item))
+
+    return 1 if summary.invalid_rows else 0
+
+
+async def _replay(args: argparse.Namespace) -> int:
+    """Run the replay command."""
+    # Imported here so the app (and its settings) only load for this command
+    from app.main import app
+
+    records = load_capture(Path(args.capture))
+    report = await replay(app, records, speed=args.speed, upstream_speed=args.upstream_speed)
+    sys.stdout.write(json.dumps(asdict(report), indent=2) + "\n")
+    return 1 if report.server_errors else 0
+
+
+async def _soak(args: argparse.Namespace) -> int:
+    """Run the soak command."""
+    # Imported here so the app (and its settings) only load for this command
+    from app.main import app
+
+    options = SoakOptions(
+        duration_s=args.duration,
+        concurrency=args.concurrency,
+        sample_interval_s=args.sample_interval,
+        upstream_latency_s=args.upstream_latency,
+        trace=args.trace,
+        keep_plans=args.keep_plans,
+    )
+    report = await soak(app, load_patients(Path(args.patients)), options)
+    sys.stdout.write(json.dumps(asdict(report), indent=2) + "\n")
+    growth = report.growth_bytes_per_hour
+    too_much_growth = (
+        args.max_growth_mb_per_hour is not None
+        and growth is not None
+        and growth > args.max_growth_mb_per_hour * BYTES_PER_MB
+    )
+    return 1 if report.errors or too_much_growth else 0
+
+
+async def _export(args: argparse.Namespace) -> int:
+    """Run the export command."""
+    try:
+        filters = ExportFilter(facility=args.facility, since=args.since, until=args.until)
+        chunks = export_chunks(args.dataset, args.format, filters, chunk_size=args.chunk_rows)
+    except (ValueError, ExportUnavailableError) as e:
+        sys.stderr.write(f"{e}\n")
+        return 2
+    if args.format == "parquet" and not args.output:
+        # Logs share stdout, so binary output needs a file
+        sys.stderr.write("Parquet export needs --output\n")
+        return 2
+    if args.output:
+        with Path(args.output).open("wb") as output_file:
+            output_file.writelines(chunks)
+    else:
+        sys.stdout.buffer.writelines(chunks)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the CLI argument parser."""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subcommands.add_parser(
+        "import-roster", help="Validate a CSV/NDJSON roster and optionally generate plans"
+    )
+    import_parser.add_argument("roster", help="Path to the roster file")
+    import_parser.add_argument(
+        "--format", choices=SUPPORTED_FORMATS, help="Roster format (default: from extension)"
+    )
+    import_parser.add_argument(
+        "--generate", action="store_true", help="Generate care plans for valid rows"
+    )
+    import_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.roster_generation_concurrency,
+        help="Maximum concurrent generations",
+    )
+    import_parser.add_argument(
+        "--output-dir", help="Write generated plans as HTML files instead of inline JSON"
+    )
+    import_parser.set_defaults(handler=_import_roster)
+
+    replay_parser = subcommands.add_parser(
+        "replay", help="Re-drive the app with captured traffic and recorded model outputs"
+    )
+    replay_parser.add_argument("capture", help="Path to a TRAFFIC_CAPTURE_PATH capture")
+    replay_parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Arrival time scale: 1 = original timing, 2 = twice as fast, 0 = all at once",
+    )
+    replay_parser.add_argument(
+        "--upstream-speed",
+        type=float,
+        default=1.0,
+        help="Model output time scale: 1 = recorded latency, 0 = instant",
+    )
+    replay_parser.set_defaults(handler=_replay)
+
+    soak_parser = subcommands.add_parser(
+        "soak", help="Generate plans against a stubbed upstream and report memory growth"
+    )
+    soak_parser.add_argument(
+        "--duration", type=float, default=3600.0, help="Seconds to run (default: 1 hour)"
+    )
+    soak_parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients")
+    soak_parser.add_argument(
+        "--sample-interval", type=float, default=60.0, help="Seconds between RSS samples"
+    )
+    soak_parser.add_argument(
+        "--upstream-latency",
+        type=float,
+        default=0.05,
+        help="Seconds the stubbed model takes to stream each plan",
+    )
+    soak_parser.add_argument(
+        "--patients",
+        default=str(DEFAULT_SOAK_PATIENTS),
+        help="JSON list of patients or mock_patients file (default: test_data.json)",
+    )
+    soak_parser.add_argument(
+        "--trace", action="store_true", help="Report the source lines that grew (tracemalloc)"
+    )
+    soak_parser.add_argument(
+        "--keep-plans", action="store_true", help="Keep generated plans in the plan store"
+    )
+    soak_parser.add_argument(
+        "--max-growth-mb-per-hour",
+        type=float,
+        help="Exit with status 1 if RSS grows faster than this after warm-up",
+    )
+    soak_parser.set_defaults(handler=_soak)
+
+    export_parser = subcommands.add_parser(
+        "export", help="Export stored plan metadata or daily token usage as CSV or Parquet"
+    )
+    export_parser.add_argument("dataset", choices=DATASETS, help="What to export")
+    export_parser.add_argument(
+        "--format", choices=EXPORT_FORMATS, default="csv", help="Parquet needs pyarrow"
+    )
+    export_parser.add_argument("--facility", help="Only this facility")
+    export_parser.add_argument("--since", help="First UTC date included (YYYY-MM-DD)")
+    export_parser.add_argument("--until", help="Last UTC date included (YYYY-MM-DD)")
+    export_parser.add_argument("--output", help="Output file (default: stdout, CSV only)")
+    export_parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=settings.export_chunk_rows,
+        help="Rows read and encoded at a time",
+    )
+    export_parser.set_defaults(handler=_export)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    handler: Callable[[argparse.Namespace], Coroutine[Any, Any, int]] = args.handler
+    return asyncio.run(handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,75 @@ class Settings(BaseSettings):
     app_name: str = "Care Plan Generator"
     app_version: str = "1.0.0"
 
+    # Generation Configuration
+    generation_max_tokens: int = 4000
+    generation_retries: int = 1  # Extra attempts after an aborted generation
+    generation_output_format: str = "html"  # "html", or "markup" rendered to HTML locally
+
+    # Load / Readiness Configuration
+    max_concurrent_generations: int = 4  # Generations per worker (interactive and batch)
+    facility_scheduling_weights: dict[str, float] = {}  # Share of slots (default 1.0)
+    ready_max_in_flight: int = 4
+    ready_max_queue_depth: int = 8
+    ready_window_seconds: float = 60.0  # Rolling window for upstream stats
+    ready_min_upstream_samples: int = 5  # Calls needed before error rate/latency count
+    ready_max_upstream_error_rate: float = 0.5
+    ready_max_upstream_p95_ms: float = 90000.0
+
+    # Profiling Configuration
+    profiling_token: str | None = None  # Admin token for X-Profile-Token profiling
+    slow_request_threshold_ms: float = 0.0  # Sample requests slower than this (0 = off)
+    profile_sample_interval_ms: float = 5.0
+    profile_history_size: int = 20  # Recent profiles kept for /admin/profiles
+    profile_dir: str | None = None  # Also write profiles here as JSON
+    memory_debug: bool = False  # Trace allocations from startup; per-request peaks
+    memory_trace_frames: int = 1  # Traceback depth kept by tracemalloc
+
+    # Traffic Capture Configuration
+    traffic_capture_path: str | None = None  # JSONL capture of anonymized traffic (unset = off)
+    traffic_capture_sample_rate: float = 1.0  # Fraction of requests recorded
+    traffic_capture_max_body_bytes: int = 256 * 1024
+
+    # Deadline Configuration
+    care_plan_deadline_seconds: float = 90.0  # Default when no deadline header is sent
+    max_deadline_seconds: float = 300.0
+
+    # Fallback / Circuit Breaker Configuration
+    circuit_failure_threshold: int = 5  # Consecutive upstream outage errors; 0 = never open
+    circuit_reset_seconds: float = 30.0  # Open time before a probe call is allowed
+    fallback_enabled: bool = True  # Serve a template plan on outage or deadline exhaustion
+    fallback_only: bool = False  # Never call the model (zero-cost load testing)
+
+    # Upstream Pool Configuration
+    upstream_pool: list[dict[str, str]] = []  # JSON members; empty = ANTHROPIC_API_KEY only
+    upstream_eject_failures: int = 3  # Consecutive outage errors that eject a member; 0 = never
+    upstream_eject_seconds: float = 30.0  # First ejection, doubled after each failed probe
+
+    # Plan Store / Pre-generation Configuration
+    plan_store_path: str = ":memory:"  # SQLite file to keep plans across restarts
+    plan_cache_ttl_seconds: int = 24 * 3600
+    plan_url_public_cache: bool = False  # Let shared caches (CDN) keep /care-plans/{hash}
+    plan_history_snapshot_interval: int = 10  # Plan versions per full snapshot; rest are deltas
+    pregeneration_idle_seconds: float = 5.0  # Quiet period after interactive traffic
+    pregeneration_min_rate_limit_tokens: int = 8000  # Budget left for interactive calls
+
+    # Similar-Patient Draft Configuration
+    similar_plan_min_similarity: float = 0.5  # Estimated Jaccard similarity of features
+    similar_plan_same_facility: bool = True  # Only draft from the same facility's plans
+    similar_plan_prompt_reference: bool = False  # Give the closest plan to the model
+
+    # Usage Accounting Configuration
+    usage_ledger_path: str | None = None  # JSONL file; usage stays in memory if unset
+    usage_flush_interval_seconds: float = 30.0
+    facility_daily_token_quota: int = 0  # 0 = unlimited
+    facility_token_quotas: dict[str, int] = {}  # JSON, e.g. {"Sunrise": 500000}
+
+    # Analytics Export Configuration
+    export_chunk_rows: int = 500  # Rows read and encoded at a time (Parquet row group size)
+
+    # Roster Import Configuration
+    roster_generation_concurrency: int = 2
+
     # Sentry Configuration (Optional)
     sentry_dsn: str | None = None
 
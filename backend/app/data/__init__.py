@@ -0,0 +1 @@
+"""Bundled reference data (vocabularies and lookup tables)."""
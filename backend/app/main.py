@@ -3,21 +3,111 @@ FastAPI application entry point for Care Plan Generator.
 Simple, clean implementation with health check and care plan generation endpoints.
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from functools import partial
 
-from fastapi import FastAPI, HTTPException, Request
+from anthropic import APIError
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 
 from app.config import settings
-from app.models import CarePlanOutput, HealthCheckResponse, PatientInput
-from app.services.care_plan_service import generate_care_plan
-from app.utils.logger import log_api_request, log_api_response, log_error, setup_logger
+from app.models import (
+    AutocompleteMatch,
+    AutocompleteResponse,
+    CarePlanDraft,
+    CarePlanOutput,
+    CarePlanVariant,
+    HandoffReport,
+    HealthCheckResponse,
+    MedicationCheck,
+    MedicationCheckRequest,
+    MemoryReport,
+    PatientInput,
+    PlanDiff,
+    PlanHistoryReport,
+    PregenerationResponse,
+    PregenerationStatus,
+    ReadinessResponse,
+    RequestProfile,
+    RiskAssessment,
+    UpstreamPoolReport,
+    UsageReport,
+)
+from app.services.analytics_export import (
+    DATASETS,
+    MEDIA_TYPES,
+    ExportFilter,
+    ExportUnavailableError,
+    export_chunks,
+)
+from app.services.care_plan_service import (
+    GenerationAbortedError,
+    fallback_care_plan,
+    generate_care_plan,
+    plan_cache_key,
+)
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.claude_client import claude_client, is_upstream_outage
+from app.services.generation_scheduler import generation_scheduler, priority_for
+from app.services.handoff_report import handoff_report_builder
+from app.services.load_monitor import load_monitor
+from app.services.medication_safety import medication_index
+from app.services.memory_monitor import DEFAULT_TOP_STATS, memory_monitor
+from app.services.plan_store import plan_store
+from app.services.plan_variants import VARIANTS, plan_variant_builder, render_print_html
+from app.services.pregeneration import SOURCE_INTERACTIVE, pregeneration_scheduler
+from app.services.request_profiler import (
+    PROFILE_ID_HEADER,
+    PROFILE_TOKEN_HEADER,
+    request_profiler,
+)
+from app.services.risk_scoring import acuity_level, assess_patient
+from app.services.roster_import import aiter_stream_lines, import_roster, to_ndjson_line
+from app.services.similarity_index import closest_plan_draft, similar_patient_index
+from app.services.traffic_recorder import traffic_recorder
+from app.services.usage_ledger import (
+    QuotaExceededError,
+    seconds_until_quota_reset,
+    usage_ledger,
+)
+from app.services.vocabulary import vocabulary_index
+from app.utils.deadline import (
+    DEADLINE_HEADER,
+    ClientDisconnectedError,
+    DeadlineExceededError,
+    UploadStreamingResponse,
+    deadline_seconds,
+    reset_deadline,
+    run_until_disconnect,
+    set_deadline,
+)
+from app.utils.hashing import plan_content_hash
+from app.utils.http_cache import IMMUTABLE_MAX_AGE, immutable_response
+from app.utils.logger import (
+    log_api_request,
+    log_api_response,
+    log_error,
+    log_slow_request,
+    setup_logger,
+)
+from app.utils.serialization import (
+    REQUEST_PROFILE_LIST_ADAPTER,
+    RISK_ASSESSMENT_LIST_ADAPTER,
+    ModelResponse,
+)
 
 # Setup logger first
 logger = setup_logger(__name__, settings.log_level)
 
+# Non-standard status logged when the client went away before the response
+CLIENT_CLOSED_REQUEST = 499
+# Response header with a request's peak traced allocation (memory debug mode)
+ALLOC_PEAK_HEADER = "X-Alloc-Peak-Bytes"
+
 # Initialize Sentry for error tracking
 if settings.sentry_dsn:
     import sentry_sdk
@@ -41,9 +131,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"CORS Origins: {settings.cors_origins_list}")
+    if settings.memory_debug:
+        memory_monitor.start()
+    await asyncio.to_thread(similar_patient_index.load, plan_store)
+    pregeneration_scheduler.start()
+    usage_ledger.start(settings.usage_flush_interval_seconds)
     yield
     # Shutdown
     logger.info("Shutting down application")
+    await pregeneration_scheduler.stop()
+    await usage_ledger.stop()
 
 
 # Create FastAPI application
@@ -54,6 +151,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS middleware
@@ -68,7 +166,7 @@ app.add_middleware(
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Middleware to log all HTTP requests and responses."""
+    """Middleware to log all HTTP requests and responses, profiling them when asked."""
     # Log request
     log_api_request(
         logger,
@@ -76,17 +174,51 @@ async def log_requests(request: Request, call_next):
         request.url.path,
         client=request.client.host if request.client else "unknown",
     )
+    # None unless profiling is configured (admin token or slow-request threshold)
+    capture = request_profiler.begin(
+        request.method, request.url.path, request.headers.get(PROFILE_TOKEN_HEADER)
+    )
+    # None unless traffic capture is enabled and this request is sampled
+    recording = await traffic_recorder.begin(request) if traffic_recorder.enabled else None
+    # None unless allocations are traced in memory debug mode
+    alloc_start = memory_monitor.begin_request() if settings.memory_debug else None
 
     # Process request
     try:
         response = await call_next(request)
-        # Log response
-        log_api_response(logger, request.method, request.url.path, response.status_code)
-        return response
     except Exception as e:
         log_error(logger, e, context=f"{request.method} {request.url.path}")
+        if capture is not None:
+            await request_profiler.finish(capture, status_code=500)
+        if recording is not None:
+            await traffic_recorder.finish(recording, status_code=500)
         raise
 
+    if recording is not None:
+        await traffic_recorder.finish(recording, response.status_code)
+
+    if capture is not None:
+        profile = await request_profiler.finish(capture, response.status_code)
+        if profile is not None and capture.requested:
+            response.headers[PROFILE_ID_HEADER] = profile.profile_id
+        elif profile is not None:
+            log_slow_request(
+                logger,
+                request.method,
+                request.url.path,
+                profile.duration_ms,
+                ProfileId=profile.profile_id,
+                LoopLagMaxMs=profile.loop_lag_max_ms,
+                TopStack=profile.stacks[0] if profile.stacks else None,
+            )
+    if alloc_start is not None:
+        alloc_peak = memory_monitor.request_peak(alloc_start)
+        response.headers[ALLOC_PEAK_HEADER] = str(alloc_peak)
+        logger.debug(f"Request allocation | Path={request.url.path} | PeakBytes={alloc_peak}")
+    # Log response
+    log_api_response(logger, request.method, request.url.path, response.status_code)
+    return response
+
 
 @app.get("/", tags=["Root"])
 async def root() -> dict[str, str]:
@@ -100,7 +232,7 @@ async def root() -> dict[str, str]:
 
 
 @app.get("/health", response_model=HealthCheckResponse, tags=["Health"])
-async def health_check() -> HealthCheckResponse:
+async def health_check() -> ModelResponse:
     """
     Health check endpoint to verify service is running.
 
@@ -108,8 +240,189 @@ async def health_check() -> HealthCheckResponse:
         HealthCheckResponse with status, environment, and version
     """
     logger.debug("Health check requested")
-    return HealthCheckResponse(
-        status="healthy", environment=settings.environment, version=settings.app_version
+    return ModelResponse(
+        HealthCheckResponse(
+            status="healthy", environment=settings.environment, version=settings.app_version
+        )
+    )
+
+
+@app.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    tags=["Health"],
+    responses={503: {"model": ReadinessResponse, "description": "Worker is saturated"}},
+)
+async def readiness_check() -> ModelResponse:
+    """
+    Load-aware readiness for load balancers.
+
+    Unlike /health (liveness), this reports 503 while the worker has too many
+    generations in flight or queued, or while the upstream model API is
+    failing or slow, so traffic is routed to other workers.
+
+    Returns:
+        ReadinessResponse with load figures and any thresholds crossed
+    """
+    report = load_monitor.readiness()
+    if not report.ready:
+        logger.warning(f"Not ready | Reasons={'; '.join(report.reasons)}")
+    return ModelResponse(report, status_code=200 if report.ready else 503)
+
+
+def _require_profiling_token(request: Request) -> None:
+    """Reject admin profiling requests without a valid X-Profile-Token."""
+    if not request_profiler.authorized(request.headers.get(PROFILE_TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Valid X-Profile-Token required")
+
+
+@app.get("/admin/profiles", response_model=list[RequestProfile], tags=["Admin"])
+async def list_profiles(request: Request) -> ModelResponse:
+    """
+    Recent request profiles, newest first.
+
+    Requires the X-Profile-Token admin header.
+
+    Returns:
+        List of RequestProfile (on-demand and slow-request captures)
+    """
+    _require_profiling_token(request)
+    return ModelResponse(
+        list(reversed(request_profiler.history)), adapter=REQUEST_PROFILE_LIST_ADAPTER
+    )
+
+
+@app.get("/admin/profiles/{profile_id}", response_model=RequestProfile, tags=["Admin"])
+async def get_profile(profile_id: str, request: Request) -> ModelResponse:
+    """
+    One recent request profile, e.g. from a response's X-Profile-Id header.
+
+    Requires the X-Profile-Token admin header. The folded stacks can be fed
+    straight into flame graph tools.
+
+    Returns:
+        RequestProfile with stack samples and event-loop lag
+
+    Raises:
+        HTTPException: 403 without a valid token, 404 if the profile has expired
+    """
+    _require_profiling_token(request)
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return ModelResponse(profile)
+
+
+@app.get("/admin/memory", response_model=MemoryReport, tags=["Admin"])
+async def memory_report(
+    request: Request,
+    limit: int = Query(default=DEFAULT_TOP_STATS, ge=1, le=100),
+    trace: bool = Query(default=False, description="Start tracing allocations if not already"),
+) -> ModelResponse:
+    """
+    RSS gauges and tracemalloc growth since the previous call.
+
+    Requires the X-Profile-Token admin header. Call once with trace=true to
+    take a baseline, then again later to see which source lines grew.
+
+    Returns:
+        MemoryReport
+    """
+    _require_profiling_token(request)
+    if trace:
+        memory_monitor.start()
+    return ModelResponse(await asyncio.to_thread(memory_monitor.report, limit))
+
+
+@app.get("/admin/upstreams", response_model=UpstreamPoolReport, tags=["Admin"])
+async def upstream_report(request: Request) -> ModelResponse:
+    """
+    Health, load and latency of each upstream pool member.
+
+    Requires the X-Profile-Token admin header.
+
+    Returns:
+        UpstreamPoolReport
+    """
+    _require_profiling_token(request)
+    return ModelResponse(claude_client.pool.report())
+
+
+@app.get(
+    "/admin/export/{dataset}",
+    response_class=StreamingResponse,
+    tags=["Admin"],
+    summary="Export stored plans or token usage",
+    description=(
+        "Stream stored plan metadata (plans) or daily per-facility token usage (usage) as CSV "
+        "or Parquet, filtered by facility and an inclusive UTC date range"
+    ),
+)
+async def export_analytics(  # noqa: PLR0913
+    dataset: str,
+    request: Request,
+    fmt: str = Query(
+        "csv", alias="format", pattern="^(csv|parquet)$", description="csv or parquet"
+    ),
+    facility: str | None = Query(None, description="Only this facility"),
+    since: str | None = Query(
+        None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="First UTC date included"
+    ),
+    until: str | None = Query(
+        None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Last UTC date included"
+    ),
+) -> StreamingResponse:
+    """
+    Stream an analytics export.
+
+    Requires the X-Profile-Token admin header. Rows are read and encoded a
+    page at a time in a worker thread, so exports neither hold the whole
+    dataset in memory nor block the event loop.
+
+    Args:
+        dataset: "plans" or "usage"
+        request: Incoming request, for the admin token
+        fmt: Output format (csv or parquet)
+        facility: Only this facility
+        since: First UTC date included, YYYY-MM-DD
+        until: Last UTC date included, YYYY-MM-DD
+
+    Returns:
+        StreamingResponse of the encoded export
+
+    Raises:
+        HTTPException: If the dataset or a date is invalid, or Parquet is unavailable
+    """
+    _require_profiling_token(request)
+    if dataset not in DATASETS:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown dataset. Supported: {', '.join(DATASETS)}"
+        )
+    try:
+        filters = ExportFilter(facility=facility, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Write pending usage so the ledger file is complete
+    await usage_ledger.flush()
+    try:
+        chunks = export_chunks(dataset, fmt, filters, chunk_size=settings.export_chunk_rows)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{fmt}"'},
+    )
+
+
+async def _generate_in_slot(patient: PatientInput) -> CarePlanOutput:
+    """Generate a care plan once the scheduler grants a slot (acute patients first)."""
+    acuity = acuity_level(patient)
+    return await generation_scheduler.run(
+        partial(generate_care_plan, patient),
+        facility=patient.facility,
+        priority=priority_for(acuity),
+        acuity=acuity,
     )
 
 
@@ -120,27 +433,84 @@ async def health_check() -> HealthCheckResponse:
     summary="Generate AI-powered care plan",
     description="Submit patient data and receive a comprehensive AI-generated nursing care plan",
 )
-async def create_care_plan(patient: PatientInput) -> CarePlanOutput:
+async def create_care_plan(patient: PatientInput, request: Request) -> Response:
     """
     Generate a comprehensive care plan for a patient using AI.
 
+    The request runs under a deadline (X-Request-Deadline-Ms header or the
+    route default) that also bounds the upstream call. If the client
+    disconnects or the deadline passes, the in-flight model stream is
+    cancelled so no more tokens are spent on it. When the deadline passes
+    or the upstream is down (circuit open, outage errors), a standard
+    template plan is served instead, marked is_fallback.
+
     Args:
         patient: Patient information including demographics, vitals, medications, etc.
+        request: Incoming request, watched for client disconnects
 
     Returns:
         CarePlanOutput with generated HTML care plan
 
     Raises:
-        HTTPException: If care plan generation fails
+        HTTPException: If the facility is over quota, the deadline passes or
+            care plan generation fails
     """
+    timeout = deadline_seconds(
+        request.headers.get(DEADLINE_HEADER),
+        default=settings.care_plan_deadline_seconds,
+        maximum=settings.max_deadline_seconds,
+    )
+    deadline_token = set_deadline(timeout)
     try:
         logger.info(f"Care plan generation requested for: {patient.name}")
 
-        # Generate care plan
-        care_plan = await generate_care_plan(patient)
+        # Serve a stored (e.g. pre-generated) plan for identical input
+        cache_key = plan_cache_key(patient)
+        stored_plan = plan_store.get(cache_key)
+        if stored_plan is not None:
+            logger.info(f"Serving stored care plan for: {patient.name}")
+            return ModelResponse(stored_plan, headers={"X-Plan-Cache": "hit"})
+
+        # Generate care plan, pausing background pre-generation meanwhile
+        try:
+            async with pregeneration_scheduler.interactive():
+                care_plan = await run_until_disconnect(
+                    request, _generate_in_slot(patient), timeout
+                )
+        except (CircuitOpenError, DeadlineExceededError, APIError) as e:
+            if not settings.fallback_enabled or (
+                isinstance(e, APIError) and not is_upstream_outage(e)
+            ):
+                raise
+            reason = (
+                "generation timed out"
+                if isinstance(e, DeadlineExceededError)
+                else "AI service unavailable"
+            )
+            care_plan = fallback_care_plan(patient, reason=reason)
+        if not care_plan.validation_warnings and not care_plan.is_fallback:
+            # Only stored plans get a content hash, since only they are served by URL
+            care_plan.content_hash = plan_content_hash(care_plan)
+            plan_store.put(cache_key, patient, care_plan, source=SOURCE_INTERACTIVE)
 
         logger.info(f"Care plan generated successfully for: {patient.name}")
-        return care_plan
+        return ModelResponse(care_plan, headers={"X-Plan-Cache": "miss"})
+
+    except ClientDisconnectedError:
+        logger.info(f"Client disconnected, generation cancelled for: {patient.name}")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    except DeadlineExceededError as e:
+        logger.warning(f"Deadline exceeded for patient {patient.name}: {e!s}")
+        raise HTTPException(status_code=504, detail="Care plan generation timed out")
+
+    except QuotaExceededError as e:
+        logger.warning(f"Quota exceeded | Facility={e.facility} | Used={e.used_tokens}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(seconds_until_quota_reset())},
+        )
 
     except ValueError as e:
         # Validation errors
@@ -155,6 +525,561 @@ async def create_care_plan(patient: PatientInput) -> CarePlanOutput:
             detail="An error occurred while generating the care plan. Please try again.",
         )
 
+    finally:
+        reset_deadline(deadline_token)
+
+
+@app.post(
+    "/care-plan-draft",
+    response_model=CarePlanDraft,
+    tags=["Care Plan"],
+    summary="Instant draft from the most similar previous patient",
+    description=(
+        "Return the stored plan of the most similar previous patient, clearly labelled as "
+        "a draft, to show while /generate-care-plan runs"
+    ),
+)
+async def create_care_plan_draft(patient: PatientInput) -> ModelResponse:
+    """
+    Find a draft care plan from a similar previous patient.
+
+    Args:
+        patient: Patient the plan is being generated for
+
+    Returns:
+        CarePlanDraft with the similarity and the relabelled plan
+
+    Raises:
+        HTTPException: If no stored plan is similar enough
+    """
+    draft = closest_plan_draft(patient, exclude=plan_cache_key(patient))
+    if draft is None:
+        raise HTTPException(status_code=404, detail="No similar care plan available")
+    logger.info(f"Draft served | Similarity={draft.similarity:.2f} | Patient={patient.name}")
+    return ModelResponse(draft)
+
+
+@app.get(
+    "/care-plans/{content_hash}",
+    response_model=CarePlanOutput,
+    tags=["Care Plan"],
+    summary="Stored care plan by content hash",
+    description=(
+        "Immutable URL of a stored plan (the content_hash returned by /generate-care-plan), "
+        "with strong ETags and byte-range support so browsers and proxies can cache it. "
+        "format=html returns the standalone print version"
+    ),
+)
+async def get_care_plan(
+    content_hash: str,
+    request: Request,
+    output_format: str = Query(
+        "json", alias="format", pattern="^(json|html)$", description="json or html"
+    ),
+) -> Response:
+    """
+    Serve a stored care plan at its content-addressed URL.
+
+    Args:
+        content_hash: Content hash of the plan
+        request: Incoming request, for conditional and range headers
+        output_format: "json" for the CarePlanOutput, "html" for the print document
+
+    Returns:
+        200, 206 or 304 response cached as immutable
+
+    Raises:
+        HTTPException: If no fresh plan has this hash
+    """
+    plan = await asyncio.to_thread(plan_store.get_by_content_hash, content_hash)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Care plan not found or expired")
+    if output_format == "html":
+        body, media_type = render_print_html(plan).encode(), "text/html; charset=utf-8"
+    else:
+        body, media_type = plan.model_dump_json().encode(), "application/json"
+    # Plans hold patient data; only shared caches the operator controls should keep them
+    scope = "public" if settings.plan_url_public_cache else "private"
+    cache_control = f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return immutable_response(request, body, media_type, cache_control)
+
+
+@app.get(
+    "/plan-history",
+    response_model=PlanHistoryReport,
+    tags=["Care Plan"],
+    summary="Version history of a resident's care plan",
+    description=(
+        "Every plan stored for a resident, oldest first, with its compressed storage size. "
+        "Versions are kept as deltas against the previous one with periodic full snapshots"
+    ),
+)
+async def plan_history(
+    facility: str = Query(..., min_length=1, description="Facility name"),
+    patient_name: str = Query(..., min_length=1, description="Patient name"),
+) -> ModelResponse:
+    """
+    List the stored versions of a resident's plan.
+
+    Args:
+        facility: Facility of the resident
+        patient_name: Resident name
+
+    Returns:
+        PlanHistoryReport with one entry per version
+
+    Raises:
+        HTTPException: If the resident has no stored plans
+    """
+    report = await asyncio.to_thread(plan_store.history.report, facility, patient_name)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No plan history for this patient")
+    return ModelResponse(report)
+
+
+@app.get(
+    "/plan-history/versions/{version}",
+    response_model=CarePlanOutput,
+    tags=["Care Plan"],
+    summary="One version of a resident's care plan",
+)
+async def plan_history_version(
+    version: int,
+    facility: str = Query(..., min_length=1, description="Facility name"),
+    patient_name: str = Query(..., min_length=1, description="Patient name"),
+) -> ModelResponse:
+    """
+    Rebuild a stored version of a resident's plan.
+
+    Args:
+        version: Version number, from 1
+        facility: Facility of the resident
+        patient_name: Resident name
+
+    Returns:
+        The plan as it was stored
+
+    Raises:
+        HTTPException: If the version does not exist
+    """
+    plan = await asyncio.to_thread(plan_store.history.get, facility, patient_name, version)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan version not found")
+    return ModelResponse(plan)
+
+
+@app.get(
+    "/plan-history/diff",
+    response_model=PlanDiff,
+    tags=["Care Plan"],
+    summary="Changes between two versions of a resident's care plan",
+    description=(
+        "Unified diff of the plan text and the sections that changed. Defaults to the latest "
+        "version against the one before it"
+    ),
+)
+async def plan_history_diff(
+    facility: str = Query(..., min_length=1, description="Facility name"),
+    patient_name: str = Query(..., min_length=1, description="Patient name"),
+    from_version: int | None = Query(None, ge=1, description="Older version"),
+    to_version: int | None = Query(None, ge=1, description="Newer version (default latest)"),
+) -> ModelResponse:
+    """
+    Compare two versions of a resident's plan.
+
+    Args:
+        facility: Facility of the resident
+        patient_name: Resident name
+        from_version: Older version (default the one before to_version)
+        to_version: Newer version (default the latest)
+
+    Returns:
+        PlanDiff with the changed sections and a unified diff
+
+    Raises:
+        HTTPException: If either version does not exist
+    """
+    if to_version is None:
+        to_version = await asyncio.to_thread(
+            plan_store.history.latest_version, facility, patient_name
+        )
+    if to_version is None:
+        raise HTTPException(status_code=404, detail="No plan history for this patient")
+    if from_version is None:
+        from_version = max(to_version - 1, 1)
+    diff = await asyncio.to_thread(
+        plan_store.history.diff, facility, patient_name, from_version, to_version
+    )
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Plan version not found")
+    return ModelResponse(diff)
+
+
+@app.post(
+    "/care-plan-variants/{variant}",
+    response_model=CarePlanVariant,
+    tags=["Care Plan"],
+    summary="Family handout, translation or print version of a stored plan",
+    description=(
+        "Derive a variant from the stored plan for this patient input with a short prompt over "
+        "only the sections it needs (print versions are rendered locally). Variants are cached "
+        "per plan content, so repeated requests are instant"
+    ),
+)
+async def create_care_plan_variant(
+    variant: str,
+    patient: PatientInput,
+    request: Request,
+    language: str | None = Query(None, description="Language code, e.g. 'es'"),
+) -> Response:
+    """
+    Derive a variant of a patient's stored care plan.
+
+    Like /generate-care-plan, the derivation runs under the request deadline
+    and the wait is abandoned if the client disconnects (the shared
+    derivation itself carries on for other requests and the cache).
+
+    Args:
+        variant: family-handout, translation or print
+        patient: Patient input the plan was generated from
+        request: Incoming request, watched for client disconnects
+        language: Target language (required for translation, optional for handouts)
+
+    Returns:
+        CarePlanVariant, with X-Plan-Cache: hit when served from the cache
+
+    Raises:
+        HTTPException: If the variant or language is unsupported, no plan is
+            stored for the input, the facility is over quota, the deadline
+            passes, the model output is unusable or the AI service is unavailable
+    """
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=404, detail=f"Unknown variant; choose from {VARIANTS}")
+    plan = plan_store.get(plan_cache_key(patient))
+    if plan is None:
+        raise HTTPException(
+            status_code=404, detail="No stored care plan for this input; generate it first"
+        )
+    timeout = deadline_seconds(
+        request.headers.get(DEADLINE_HEADER),
+        default=settings.care_plan_deadline_seconds,
+        maximum=settings.max_deadline_seconds,
+    )
+    deadline_token = set_deadline(timeout)
+    try:
+        derived, cached = await run_until_disconnect(
+            request,
+            plan_variant_builder.get(plan, patient.facility, variant, language=language),
+            timeout,
+        )
+    except ClientDisconnectedError:
+        logger.info(f"Client disconnected, stopped waiting for {variant} of: {patient.name}")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except DeadlineExceededError as e:
+        logger.warning(f"Deadline exceeded for {variant} of {patient.name}: {e!s}")
+        raise HTTPException(status_code=504, detail="Care plan variant timed out")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except QuotaExceededError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(seconds_until_quota_reset())},
+        )
+    except GenerationAbortedError as e:
+        logger.warning(f"Variant generation aborted | Variant={variant} | Reason={e!s}")
+        raise HTTPException(
+            status_code=502, detail="The AI service returned an unusable variant; try again"
+        )
+    except (CircuitOpenError, APIError) as e:
+        if isinstance(e, APIError) and not is_upstream_outage(e):
+            raise
+        raise HTTPException(status_code=503, detail="AI service unavailable; try again shortly")
+    finally:
+        reset_deadline(deadline_token)
+    return ModelResponse(derived, headers={"X-Plan-Cache": "hit" if cached else "miss"})
+
+
+@app.get(
+    "/handoff-report",
+    response_model=HandoffReport,
+    tags=["Care Plan"],
+    summary="Unit-level shift handoff report",
+    description=(
+        "Summarize priorities across a facility's stored care plans. Patient groups are "
+        "summarized in parallel and cached, so only groups whose patients changed are redone"
+    ),
+)
+async def handoff_report(
+    facility: str = Query(..., min_length=1, description="Facility name"),
+    summarize: bool = Query(True, description="Summarize with the model (false lists key items)"),
+) -> ModelResponse:
+    """
+    Build the shift handoff report for a facility.
+
+    Args:
+        facility: Facility whose stored plans are summarized
+        summarize: Whether patient groups are summarized by the model
+
+    Returns:
+        HandoffReport with the report HTML and chunk cache statistics
+
+    Raises:
+        HTTPException: If the facility has no stored plans
+    """
+    report = await handoff_report_builder.build(facility, summarize=summarize)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No stored care plans for this facility")
+    return ModelResponse(report)
+
+
+@app.post(
+    "/pregenerate",
+    response_model=PregenerationResponse,
+    status_code=202,
+    tags=["Care Plan"],
+    summary="Queue upcoming admissions for pre-generation",
+    description=(
+        "Queue patients whose plans should be generated in the background during idle "
+        "capacity. Identical input to /generate-care-plan is then served instantly."
+    ),
+)
+async def pregenerate_care_plans(patients: list[PatientInput]) -> ModelResponse:
+    """
+    Queue patients for speculative pre-generation.
+
+    Args:
+        patients: Upcoming admissions
+
+    Returns:
+        PregenerationResponse with per-outcome counts and the queue state
+    """
+    outcomes = [pregeneration_scheduler.enqueue(patient) for patient in patients]
+    logger.info(f"Pre-generation requested for {len(patients)} patients")
+    return ModelResponse(
+        PregenerationResponse(
+            queued=outcomes.count("queued"),
+            cached=outcomes.count("cached"),
+            duplicates=outcomes.count("duplicate"),
+            status=pregeneration_scheduler.status(),
+        ),
+        status_code=202,
+    )
+
+
+@app.get(
+    "/pregenerate/status",
+    response_model=PregenerationStatus,
+    tags=["Care Plan"],
+    summary="Pre-generation queue status",
+)
+async def pregeneration_status() -> ModelResponse:
+    """Report the pre-generation queue depth and outcome counters."""
+    return ModelResponse(pregeneration_scheduler.status())
+
+
+@app.get(
+    "/usage",
+    response_model=UsageReport,
+    tags=["Usage"],
+    summary="Per-facility token usage",
+    description="Model calls, tokens and latency per facility for one UTC day, with quota headroom",
+)
+async def usage_report(
+    date: str | None = Query(
+        None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="UTC date (default: today)"
+    ),
+) -> ModelResponse:
+    """
+    Report model usage per facility.
+
+    Args:
+        date: UTC date in YYYY-MM-DD format
+
+    Returns:
+        UsageReport for the requested day
+    """
+    return ModelResponse(usage_ledger.report(date))
+
+
+@app.post(
+    "/risk-assessment",
+    response_model=RiskAssessment,
+    tags=["Risk Assessment"],
+    summary="Calculate clinical risk scores",
+    description="Calculate fall risk, pressure injury risk and vital sign flags locally, without an AI call",
+)
+async def create_risk_assessment(patient: PatientInput) -> ModelResponse:
+    """
+    Calculate deterministic risk scores for a single patient.
+
+    Args:
+        patient: Patient information
+
+    Returns:
+        RiskAssessment with Morse fall score, Braden score and vital sign flags
+    """
+    return ModelResponse(assess_patient(patient))
+
+
+@app.post(
+    "/risk-assessments/batch",
+    response_model=list[RiskAssessment],
+    tags=["Risk Assessment"],
+    summary="Screen a roster of patients",
+    description="Calculate risk scores for many patients at once, without any AI calls",
+)
+async def create_risk_assessments_batch(patients: list[PatientInput]) -> ModelResponse:
+    """
+    Calculate deterministic risk scores for a roster of patients.
+
+    Args:
+        patients: List of patient information
+
+    Returns:
+        List of RiskAssessment in the same order as the input
+    """
+    logger.info(f"Batch risk screening requested for {len(patients)} patients")
+    return ModelResponse(
+        [assess_patient(patient) for patient in patients], adapter=RISK_ASSESSMENT_LIST_ADAPTER
+    )
+
+
+@app.post(
+    "/medication-check",
+    response_model=MedicationCheck,
+    tags=["Risk Assessment"],
+    summary="Cross-check medications and allergies",
+    description="Flag drug interactions and allergy conflicts from the local index, without an AI call",
+)
+async def check_medications(request: MedicationCheckRequest) -> ModelResponse:
+    """
+    Cross-check a medication list against itself and the allergies.
+
+    Args:
+        request: Current medications and allergies
+
+    Returns:
+        MedicationCheck with interaction and allergy issues, most severe first
+    """
+    return ModelResponse(medication_index.check(request.current_medications, request.allergies))
+
+
+@app.post(
+    "/import-roster",
+    response_class=StreamingResponse,
+    tags=["Roster Import"],
+    summary="Import a facility roster",
+    description=(
+        "Stream a CSV or NDJSON roster in the request body. Each row is validated as it "
+        "arrives and a result line is streamed back as NDJSON, followed by a summary line."
+    ),
+)
+async def import_roster_endpoint(
+    request: Request,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", description="Roster format"),
+    generate: bool = Query(False, description="Generate care plans for valid rows"),
+    pregenerate: bool = Query(False, description="Queue valid rows for background pre-generation"),
+) -> StreamingResponse:
+    """
+    Validate (and optionally generate plans for) a roster.
+
+    Lines are parsed from the request body as it arrives, so the first
+    results stream back while the rest of the roster is still uploading and
+    only the current line is buffered.
+
+    CSV rosters use PatientInput field names as headers; list columns are
+    semicolon-separated and medications are written as name|dosage|frequency.
+
+    Args:
+        request: Incoming request whose body is the roster
+        fmt: Roster format (csv or ndjson)
+        generate: Generate care plans for valid rows
+        pregenerate: Queue valid rows for background pre-generation
+
+    Returns:
+        StreamingResponse of NDJSON row results and a final summary
+    """
+    logger.info(
+        f"Roster import requested | Format={fmt} | Generate={generate} | "
+        f"Pregenerate={pregenerate}"
+    )
+
+    body_read = asyncio.Event()
+
+    async def roster_lines() -> AsyncGenerator[str, None]:
+        async for line in aiter_stream_lines(request.stream()):
+            yield line
+        body_read.set()
+
+    async def result_lines() -> AsyncGenerator[str, None]:
+        try:
+            async for item in import_roster(
+                roster_lines(),
+                fmt,
+                generate=generate,
+                concurrency=settings.roster_generation_concurrency,
+                on_valid=pregeneration_scheduler.enqueue if pregenerate else None,
+            ):
+                yield to_ndjson_line(item)
+        except ClientDisconnect:
+            logger.warning("Roster import cancelled | Client disconnected during upload")
+
+    return UploadStreamingResponse(result_lines(), body_read, media_type="application/x-ndjson")
+
+
+@app.get(
+    "/autocomplete/{category}",
+    response_model=AutocompleteResponse,
+    tags=["Autocomplete"],
+    summary="Autocomplete clinical terms",
+    description="Ranked suggestions for diagnoses, medications or allergies from the shared vocabulary",
+)
+async def autocomplete(
+    category: str,
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Search text"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of matches"),
+) -> Response:
+    """
+    Search the bundled clinical vocabulary.
+
+    Args:
+        category: Vocabulary category (diagnoses, medications, allergies)
+        q: Search text
+        limit: Maximum number of matches
+
+    Returns:
+        AutocompleteResponse with ranked matches, or 304 if the client copy is current
+
+    Raises:
+        HTTPException: If the category does not exist
+    """
+    if category not in vocabulary_index.categories:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown category. Use one of: {', '.join(vocabulary_index.categories)}",
+        )
+
+    etag = vocabulary_index.etag(category, q, limit)
+    cache_headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=cache_headers)
+
+    matches = vocabulary_index.search(category, q, limit)
+    return ModelResponse(
+        AutocompleteResponse(
+            category=category,
+            query=q,
+            matches=[
+                AutocompleteMatch(term=match.term, matched=match.matched, score=match.score)
+                for match in matches
+            ],
+        ),
+        headers=cache_headers,
+    )
+
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception) -> JSONResponse:
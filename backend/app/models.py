@@ -6,6 +6,12 @@ from datetime import date
 
 from pydantic import BaseModel, Field, field_validator
 
+# Allowed values are built once at import time rather than on every validation
+VALID_GENDERS = frozenset({"male", "female", "other", "m", "f"})
+VALID_MOBILITY_LEVELS = ("ambulatory", "wheelchair", "bedbound", "walker")
+_VALID_MOBILITY_LEVEL_SET = frozenset(VALID_MOBILITY_LEVELS)
+_MOBILITY_LEVEL_ERROR = f"Mobility level must be one of: {', '.join(VALID_MOBILITY_LEVELS)}"
+
 
 class Medication(BaseModel):
     """Medication information."""
@@ -73,8 +79,7 @@ class PatientInput(BaseModel):
     @classmethod
     def validate_gender(cls, v: str) -> str:
         """Validate gender field."""
-        valid_genders = ["male", "female", "other", "m", "f"]
-        if v.lower() not in valid_genders:
+        if v.lower() not in VALID_GENDERS:
             raise ValueError("Gender must be Male, Female, or Other")
         return v.title()
 
@@ -82,12 +87,10 @@ class PatientInput(BaseModel):
     @classmethod
     def validate_mobility(cls, v: str) -> str:
         """Validate mobility level."""
-        valid_levels = ["ambulatory", "wheelchair", "bedbound", "walker"]
-        if v.lower() not in valid_levels:
-            raise ValueError(
-                f"Mobility level must be one of: {', '.join(valid_levels)}"
-            )
-        return v.lower()
+        level = v.lower()
+        if level not in _VALID_MOBILITY_LEVEL_SET:
+            raise ValueError(_MOBILITY_LEVEL_ERROR)
+        return level
 
     class Config:
         """Pydantic model configuration."""
@@ -137,6 +140,25 @@ class CarePlanOutput(BaseModel):
     patient_name: str = Field(..., description="Patient name")
     care_plan_html: str = Field(..., description="Generated care plan in HTML format")
     generated_at: str = Field(..., description="Timestamp of generation")
+    validation_warnings: list[str] = Field(
+        default_factory=list,
+        description="Structural problems found in the generated HTML (e.g. truncation)",
+    )
+    is_fallback: bool = Field(
+        default=False,
+        description="Standard template plan rendered locally because the model was unavailable",
+    )
+    content_hash: str | None = Field(
+        default=None,
+        description="Hash of the stored plan's content; it is served at /care-plans/{content_hash}",
+    )
+    model: str | None = Field(default=None, description="Model that generated the plan")
+    input_tokens: int | None = Field(
+        default=None, description="Prompt tokens of the generation (none for template plans)"
+    )
+    output_tokens: int | None = Field(
+        default=None, description="Generated tokens (none for template plans)"
+    )
 
     class Config:
         """Pydantic model configuration."""
@@ -146,10 +168,384 @@ class CarePlanOutput(BaseModel):
                 "patient_name": "John Doe",
                 "care_plan_html": "<div><h1>Care Plan</h1>...</div>",
                 "generated_at": "2024-01-15T10:30:00Z",
+                "validation_warnings": [],
+                "is_fallback": False,
+                "content_hash": "9f2c4e...",
+                "model": "claude-sonnet-4-20250514",
+                "input_tokens": 2150,
+                "output_tokens": 3120,
             }
         }
 
 
+class CarePlanDraft(BaseModel):
+    """Plan of the most similar previous patient, shown while generation runs."""
+
+    is_draft: bool = Field(default=True, description="Always true; never the patient's own plan")
+    similarity: float = Field(..., description="Estimated feature similarity (0-1)")
+    source_plan_hash: str = Field(..., description="Input hash of the plan the draft came from")
+    notice: str = Field(..., description="Label to display with the draft")
+    care_plan: CarePlanOutput = Field(..., description="Draft plan, source names replaced")
+
+
+class CarePlanVariant(BaseModel):
+    """Output derived from a stored care plan (family handout, translation, print)."""
+
+    variant: str = Field(..., description="Variant type (family-handout, translation, print)")
+    language: str | None = Field(default=None, description="Language code, if translated")
+    plan_hash: str = Field(..., description="Content hash of the plan it was derived from")
+    patient_name: str = Field(..., description="Patient name")
+    content_html: str = Field(..., description="Variant in HTML format")
+    generated_at: str = Field(..., description="Timestamp of derivation")
+
+
+class PlanVersionInfo(BaseModel):
+    """One stored version of a resident's care plan."""
+
+    version: int = Field(..., description="Version number, from 1")
+    generated_at: str = Field(..., description="Timestamp of generation")
+    content_hash: str = Field(..., description="Content hash of the plan")
+    snapshot: bool = Field(..., description="Stored in full rather than as a delta")
+    stored_bytes: int = Field(..., description="Compressed size in the history")
+    plan_bytes: int = Field(..., description="Size of the plan HTML")
+
+
+class PlanHistoryReport(BaseModel):
+    """Version history of a resident's care plan."""
+
+    facility: str = Field(..., description="Facility name")
+    patient_name: str = Field(..., description="Patient name")
+    versions: list[PlanVersionInfo] = Field(default_factory=list, description="Oldest first")
+    stored_bytes: int = Field(..., description="Total compressed size of the history")
+    plan_bytes: int = Field(..., description="Total size of every version in full")
+
+
+class PlanDiff(BaseModel):
+    """Changes between two versions of a resident's care plan."""
+
+    facility: str = Field(..., description="Facility name")
+    patient_name: str = Field(..., description="Patient name")
+    from_version: int = Field(..., description="Older version")
+    to_version: int = Field(..., description="Newer version")
+    changed_sections: list[str] = Field(
+        default_factory=list, description="Headings of sections that differ"
+    )
+    diff: list[str] = Field(default_factory=list, description="Unified diff of the plan text")
+
+
+class HandoffReport(BaseModel):
+    """Unit-level shift handoff report assembled from stored care plans."""
+
+    facility: str = Field(..., description="Facility the report covers")
+    generated_at: str = Field(..., description="Timestamp of the report")
+    patient_count: int = Field(..., description="Patients with a stored plan")
+    chunk_count: int = Field(..., description="Patient groups summarized")
+    cached_chunks: int = Field(..., description="Group summaries reused from the cache")
+    local_chunks: int = Field(
+        default=0, description="Groups listed from extracted items without a model summary"
+    )
+    report_html: str = Field(..., description="Report in HTML format")
+
+
+class RiskScore(BaseModel):
+    """Locally calculated clinical risk score."""
+
+    scale: str = Field(..., description="Scoring scale used (e.g., 'Morse Fall Scale')")
+    score: int = Field(..., description="Calculated score")
+    level: str = Field(..., description="Risk level derived from the score")
+    contributing_factors: list[str] = Field(
+        default_factory=list, description="Items that contributed to the score"
+    )
+
+
+class VitalSignFlag(BaseModel):
+    """Abnormal vital sign detected during local screening."""
+
+    vital: str = Field(..., description="Vital sign name")
+    value: str = Field(..., description="Recorded value")
+    severity: str = Field(..., description="Flag severity (warning/critical)")
+    message: str = Field(..., description="Human-readable description")
+
+
+class RiskAssessment(BaseModel):
+    """Deterministic risk assessment computed without a model call."""
+
+    patient_name: str = Field(..., description="Patient name")
+    fall_risk: RiskScore = Field(..., description="Morse-style fall risk score")
+    pressure_injury_risk: RiskScore = Field(
+        ..., description="Braden-style pressure injury risk score"
+    )
+    vital_sign_flags: list[VitalSignFlag] = Field(
+        default_factory=list, description="Abnormal vital signs"
+    )
+
+    class Config:
+        """Pydantic model configuration."""
+
+        json_schema_extra = {
+            "example": {
+                "patient_name": "John Doe",
+                "fall_risk": {
+                    "scale": "Morse Fall Scale",
+                    "score": 55,
+                    "level": "High",
+                    "contributing_factors": ["History of falling (+25)"],
+                },
+                "pressure_injury_risk": {
+                    "scale": "Braden Scale",
+                    "score": 14,
+                    "level": "Moderate",
+                    "contributing_factors": ["Activity: chairfast (2)"],
+                },
+                "vital_sign_flags": [
+                    {
+                        "vital": "Blood Pressure",
+                        "value": "145/88",
+                        "severity": "warning",
+                        "message": "Elevated blood pressure",
+                    }
+                ],
+            }
+        }
+
+
+class MedicationCheckRequest(BaseModel):
+    """Medications and allergies to cross-check, e.g. while the form is being filled in."""
+
+    current_medications: list[Medication] = Field(
+        default_factory=list, description="List of current medications"
+    )
+    allergies: list[str] = Field(default_factory=list, description="Known allergies")
+
+
+class MedicationIssue(BaseModel):
+    """Interaction or allergy conflict found by the local medication index."""
+
+    kind: str = Field(..., description="Issue type (interaction/allergy)")
+    severity: str = Field(..., description="Issue severity (major/moderate)")
+    medications: list[str] = Field(..., description="Medications involved, as entered")
+    allergy: str | None = Field(default=None, description="Conflicting allergy, if any")
+    message: str = Field(..., description="Human-readable description")
+    action: str = Field(..., description="Suggested nursing action")
+
+
+class MedicationCheck(BaseModel):
+    """Result of a local medication interaction and allergy cross-check."""
+
+    medications_checked: int = Field(..., description="Number of medications checked")
+    issues: list[MedicationIssue] = Field(
+        default_factory=list, description="Issues found, most severe first"
+    )
+
+    class Config:
+        """Pydantic model configuration."""
+
+        json_schema_extra = {
+            "example": {
+                "medications_checked": 2,
+                "issues": [
+                    {
+                        "kind": "interaction",
+                        "severity": "major",
+                        "medications": ["Warfarin", "Aspirin"],
+                        "allergy": None,
+                        "message": "Additive bleeding risk",
+                        "action": "Confirm dual therapy is intended; bleeding precautions",
+                    }
+                ],
+            }
+        }
+
+
+class AutocompleteMatch(BaseModel):
+    """Single autocomplete suggestion."""
+
+    term: str = Field(..., description="Canonical vocabulary term")
+    matched: str = Field(..., description="Term or synonym that matched the query")
+    score: float = Field(..., description="Ranking score (higher is better)")
+
+
+class AutocompleteResponse(BaseModel):
+    """Autocomplete endpoint response."""
+
+    category: str = Field(..., description="Vocabulary category searched")
+    query: str = Field(..., description="Query string")
+    matches: list[AutocompleteMatch] = Field(
+        default_factory=list, description="Ranked matches"
+    )
+
+    class Config:
+        """Pydantic model configuration."""
+
+        json_schema_extra = {
+            "example": {
+                "category": "medications",
+                "query": "lasi",
+                "matches": [{"term": "Furosemide", "matched": "Lasix", "score": 2.5}],
+            }
+        }
+
+
+class RosterRowResult(BaseModel):
+    """Validation (and optional generation) result for one roster row."""
+
+    row: int = Field(..., description="1-based data row number")
+    valid: bool = Field(..., description="Whether the row passed validation")
+    patient_name: str | None = Field(default=None, description="Patient name, if present")
+    errors: list[str] = Field(default_factory=list, description="Validation errors")
+    care_plan: CarePlanOutput | None = Field(
+        default=None, description="Generated care plan (only when generation was requested)"
+    )
+    generation_error: str | None = Field(default=None, description="Generation failure, if any")
+
+
+class RosterImportSummary(BaseModel):
+    """Totals reported at the end of a roster import."""
+
+    total_rows: int = Field(default=0, description="Rows processed")
+    valid_rows: int = Field(default=0, description="Rows that passed validation")
+    invalid_rows: int = Field(default=0, description="Rows that failed validation")
+    generated_rows: int = Field(default=0, description="Rows with a generated care plan")
+
+
+class PregenerationStatus(BaseModel):
+    """State of the speculative pre-generation queue."""
+
+    queue_depth: int = Field(..., description="Patients waiting for pre-generation")
+    running: bool = Field(..., description="Whether a background generation is in progress")
+    completed: int = Field(..., description="Plans pre-generated since startup")
+    preempted: int = Field(..., description="Background generations yielded to interactive traffic")
+    failed: int = Field(..., description="Background generations that failed")
+
+
+class PregenerationResponse(BaseModel):
+    """Result of queueing patients for pre-generation."""
+
+    queued: int = Field(..., description="Patients added to the queue")
+    cached: int = Field(..., description="Patients whose plan is already stored")
+    duplicates: int = Field(..., description="Patients already waiting in the queue")
+    status: PregenerationStatus = Field(..., description="Queue state after queueing")
+
+
+class FacilityUsage(BaseModel):
+    """Model usage attributed to one facility."""
+
+    facility: str = Field(..., description="Facility name")
+    calls: int = Field(..., description="Upstream model calls")
+    input_tokens: int = Field(..., description="Prompt tokens")
+    output_tokens: int = Field(..., description="Generated tokens")
+    total_tokens: int = Field(..., description="Input plus output tokens")
+    average_latency_ms: float = Field(..., description="Mean upstream call latency")
+    quota_tokens: int | None = Field(
+        default=None, description="Daily token quota (None for unlimited)"
+    )
+    remaining_tokens: int | None = Field(
+        default=None, description="Tokens left in today's quota (None for unlimited)"
+    )
+
+
+class UsageReport(BaseModel):
+    """Per-facility usage for one day."""
+
+    date: str = Field(..., description="UTC date of the quota period")
+    facilities: list[FacilityUsage] = Field(
+        default_factory=list, description="Usage per facility, highest first"
+    )
+
+
+class ReadinessResponse(BaseModel):
+    """Load-aware readiness of this worker."""
+
+    ready: bool = Field(..., description="Whether the worker should receive traffic")
+    in_flight: int = Field(..., description="Interactive generations running")
+    queue_depth: int = Field(..., description="Requests waiting for a generation slot")
+    upstream_calls: int = Field(..., description="Upstream calls in the rolling window")
+    upstream_error_rate: float = Field(..., description="Failed fraction of upstream calls")
+    upstream_p50_latency_ms: float | None = Field(
+        default=None, description="Median successful upstream latency"
+    )
+    upstream_p95_latency_ms: float | None = Field(
+        default=None, description="95th percentile successful upstream latency"
+    )
+    reasons: list[str] = Field(
+        default_factory=list, description="Thresholds crossed (empty when ready)"
+    )
+
+
+class RequestProfile(BaseModel):
+    """Stack samples and event-loop lag captured for one request."""
+
+    profile_id: str = Field(..., description="Profile identifier")
+    method: str = Field(..., description="HTTP method")
+    path: str = Field(..., description="Request path")
+    trigger: str = Field(..., description="'requested' (admin header) or 'slow' (threshold)")
+    status_code: int = Field(..., description="Response status")
+    duration_ms: float = Field(..., description="Request duration")
+    samples: int = Field(..., description="Stack samples taken")
+    loop_lag_max_ms: float | None = Field(
+        default=None, description="Longest event-loop lag observed while sampling"
+    )
+    loop_lag_mean_ms: float | None = Field(
+        default=None, description="Mean event-loop lag observed while sampling"
+    )
+    stacks: list[str] = Field(
+        default_factory=list,
+        description="Folded stacks ('outer;...;inner count'), most frequent first",
+    )
+
+
+class MemoryStat(BaseModel):
+    """Traced allocations at one source line, with growth since the last snapshot."""
+
+    location: str = Field(..., description="Allocating source line ('file:line')")
+    size_bytes: int = Field(..., description="Bytes currently allocated there")
+    size_diff_bytes: int = Field(..., description="Change since the previous snapshot")
+    count: int = Field(..., description="Live allocated blocks")
+    count_diff: int = Field(..., description="Change in blocks since the previous snapshot")
+
+
+class MemoryReport(BaseModel):
+    """Process memory gauges and tracemalloc growth."""
+
+    rss_bytes: int | None = Field(default=None, description="Current resident set size")
+    peak_rss_bytes: int | None = Field(default=None, description="Peak resident set size")
+    tracing: bool = Field(..., description="Whether tracemalloc is tracing allocations")
+    traced_bytes: int | None = Field(default=None, description="Bytes currently traced")
+    traced_peak_bytes: int | None = Field(default=None, description="Peak traced bytes")
+    top_growth: list[MemoryStat] = Field(
+        default_factory=list,
+        description="Source lines with the most growth since the previous snapshot",
+    )
+
+
+class UpstreamMemberStatus(BaseModel):
+    """Health and load of one upstream pool member."""
+
+    name: str = Field(..., description="Member name")
+    base_url: str = Field(..., description="API endpoint")
+    state: str = Field(..., description="healthy, probation or ejected")
+    outstanding: int = Field(..., description="Requests in flight")
+    requests: int = Field(..., description="Requests sent since startup")
+    failures: int = Field(..., description="Outage errors since startup")
+    ejections: int = Field(..., description="Times ejected since startup")
+    ejected_for_seconds: float | None = Field(
+        default=None, description="Time left until reinstatement, while ejected"
+    )
+    average_latency_ms: float | None = Field(
+        default=None, description="Smoothed latency of successful calls"
+    )
+    rate_limit_remaining: int | None = Field(
+        default=None, description="Token budget at the last response, if recent"
+    )
+
+
+class UpstreamPoolReport(BaseModel):
+    """Upstream pool metrics."""
+
+    available: int = Field(..., description="Members not currently ejected")
+    members: list[UpstreamMemberStatus] = Field(default_factory=list, description="Pool members")
+
+
 class HealthCheckResponse(BaseModel):
     """Health check endpoint response."""
 
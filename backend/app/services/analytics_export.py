@@ -0,0 +1,269 @@
+"""
+Analytics export - Stored plans and token usage as CSV or Parquet.
+Rows are read in bounded pages and encoded one page at a time, so exports of
+any size stream with flat memory. Parquet needs the optional pyarrow package.
+"""
+
+import csv
+import io
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from typing import Any
+
+from app.config import settings
+from app.services.plan_store import PlanStore, plan_store
+from app.services.usage_ledger import UsageLedger, usage_ledger
+from app.utils.logger import setup_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for Parquet output
+    pa = None
+    pq = None
+
+logger = setup_logger(__name__, settings.log_level)
+
+DATASETS = ("plans", "usage")
+EXPORT_FORMATS = ("csv", "parquet")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+
+Columns = tuple[tuple[str, str], ...]
+Row = tuple[Any, ...]
+
+# (column, type) of each dataset; types are "str", "int", "float" and "bool"
+PLAN_COLUMNS: Columns = (
+    ("stored_at", "str"),
+    ("facility", "str"),
+    ("patient_name", "str"),
+    ("input_hash", "str"),
+    ("content_hash", "str"),
+    ("source", "str"),
+    ("generated_at", "str"),
+    ("model", "str"),
+    ("input_tokens", "int"),
+    ("output_tokens", "int"),
+    ("total_tokens", "int"),
+    ("is_fallback", "bool"),
+    ("warning_count", "int"),
+    ("plan_bytes", "int"),
+)
+USAGE_COLUMNS: Columns = (
+    ("date", "str"),
+    ("facility", "str"),
+    ("calls", "int"),
+    ("input_tokens", "int"),
+    ("output_tokens", "int"),
+    ("total_tokens", "int"),
+    ("average_latency_ms", "float"),
+)
+
+
+class ExportUnavailableError(Exception):
+    """Raised when Parquet is requested but pyarrow is not installed."""
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    """Rows to export: one facility and/or an inclusive range of UTC dates."""
+
+    facility: str | None = None
+    since: str | None = None  # ISO date
+    until: str | None = None  # ISO date
+
+    def __post_init__(self) -> None:
+        """
+        Validate the dates.
+
+        Raises:
+            ValueError: If a date is not a valid ISO date
+        """
+        for value in (self.since, self.until):
+            if value is not None:
+                date.fromisoformat(value)
+
+
+def _day_start(day: str, days_after: int = 0) -> float:
+    """Unix time of midnight UTC at the start of an ISO date, or a later day."""
+    start = datetime.combine(date.fromisoformat(day), time(), tzinfo=UTC)
+    return (start + timedelta(days=days_after)).timestamp()
+
+
+def plan_rows(
+    store: PlanStore, filters: ExportFilter, chunk_size: int = 500
+) -> Iterator[list[Row]]:
+    """
+    Pages of PLAN_COLUMNS rows, one per stored plan, oldest first.
+
+    Args:
+        store: Plan store to read
+        filters: Facility and date range (by the time the plan was stored)
+        chunk_size: Rows per page
+
+    Yields:
+        Pages of rows
+    """
+    pages = store.iter_plan_records(
+        facility=filters.facility,
+        since=_day_start(filters.since) if filters.since else None,
+        until=_day_start(filters.until, days_after=1) if filters.until else None,
+        chunk_size=chunk_size,
+    )
+    for page in pages:
+        yield [
+            (
+                datetime.fromtimestamp(stored_at, UTC).isoformat(),
+                facility,
+                plan.patient_name,
+                input_hash,
+                plan.content_hash,
+                source,
+                plan.generated_at,
+                plan.model,
+                plan.input_tokens,
+                plan.output_tokens,
+                None
+                if plan.input_tokens is None
+                else plan.input_tokens + (plan.output_tokens or 0),
+                plan.is_fallback,
+                len(plan.validation_warnings),
+                len(plan.care_plan_html.encode()),
+            )
+            for input_hash, facility, source, stored_at, plan in page
+        ]
+
+
+def usage_rows(
+    ledger: UsageLedger, filters: ExportFilter, chunk_size: int = 500
+) -> Iterator[list[Row]]:
+    """
+    Pages of USAGE_COLUMNS rows, one per facility per UTC day.
+
+    Args:
+        ledger: Usage ledger to read (flushed, if it has a file)
+        filters: Facility and date range
+        chunk_size: Rows per page
+
+    Yields:
+        Pages of rows
+    """
+    daily = ledger.daily_usage(filters.facility, filters.since, filters.until)
+    for start in range(0, len(daily), chunk_size):
+        yield [
+            (
+                day,
+                facility,
+                counters.calls,
+                counters.input_tokens,
+                counters.output_tokens,
+                counters.total_tokens,
+                round(counters.latency_ms / max(counters.calls, 1), 1),
+            )
+            for day, facility, counters in daily[start : start + chunk_size]
+        ]
+
+
+def csv_chunks(columns: Columns, pages: Iterable[list[Row]]) -> Iterator[bytes]:
+    """Encode pages of rows as CSV, the header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream collecting bytes until drained, for streaming Parquet."""
+
+    def __init__(self) -> None:
+        """Start empty."""
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        """Always writable."""
+        return True
+
+    def write(self, data: Any) -> int:
+        """Collect written bytes."""
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        """Bytes written so far (Parquet footers record offsets)."""
+        return self._position
+
+    def drain(self) -> bytes:
+        """Bytes written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_chunks(columns: Columns, pages: Iterable[list[Row]]) -> Iterator[bytes]:
+    """
+    Encode pages of rows as Parquet, one row group per page.
+
+    Raises:
+        ExportUnavailableError: If pyarrow is not installed
+    """
+    if pa is None or pq is None:
+        raise ExportUnavailableError("Parquet export needs the pyarrow package")
+    types = {"str": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for page in pages:
+            table = pa.Table.from_pydict(
+                {name: [row[index] for row in page] for index, name in enumerate(schema.names)},
+                schema,
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_chunks(
+    dataset: str,
+    fmt: str,
+    filters: ExportFilter,
+    chunk_size: int = 500,
+) -> Iterator[bytes]:
+    """
+    Encoded export of a dataset, streamed page by page.
+
+    Reads are synchronous (SQLite and the ledger file), so a server runs
+    this iterator in a worker thread rather than on the event loop.
+
+    Args:
+        dataset: "plans" or "usage"
+        fmt: "csv" or "parquet"
+        filters: Facility and date range
+        chunk_size: Rows per page (and Parquet row group)
+
+    Returns:
+        Iterator of encoded bytes
+
+    Raises:
+        ExportUnavailableError: If Parquet is requested without pyarrow
+    """
+    if fmt == "parquet" and pa is None:
+        raise ExportUnavailableError("Parquet export needs the pyarrow package")
+    if dataset == "plans":
+        columns, pages = PLAN_COLUMNS, plan_rows(plan_store, filters, chunk_size)
+    else:
+        columns, pages = USAGE_COLUMNS, usage_rows(usage_ledger, filters, chunk_size)
+    logger.info(
+        f"Analytics export | Dataset={dataset} | Format={fmt} | Facility={filters.facility} | "
+        f"Since={filters.since} | Until={filters.until}"
+    )
+    return parquet_chunks(columns, pages) if fmt == "parquet" else csv_chunks(columns, pages)
@@ -3,17 +3,31 @@ Care plan generation service - Business logic for creating care plans.
 Constructs prompts, calls Claude API, and formats output.
 """
 
+import hashlib
+from dataclasses import dataclass
 from datetime import datetime
 
 from app.config import settings
-from app.models import CarePlanOutput, PatientInput
-from app.services.claude_client import claude_client
+from app.models import CarePlanOutput, PatientInput, RiskAssessment
+from app.services.claude_client import CompletionResult, claude_client
+from app.services.fallback_plan import render_fallback_plan_html
+from app.services.html_sanitizer import StreamingHtmlSanitizer
+from app.services.medication_safety import format_medication_facts, medication_index
+from app.services.plan_markup import MARKUP_SYNTAX, StreamingMarkupRenderer
+from app.services.risk_scoring import (
+    assess_patient,
+    format_risk_facts,
+    render_risk_assessment_html,
+)
+from app.services.similarity_index import closest_plan_draft, plan_text
+from app.services.vocabulary import vocabulary_index
+from app.utils.hashing import patient_input_hash
 from app.utils.logger import setup_logger
 
 logger = setup_logger(__name__, settings.log_level)
 
 # System prompt for Claude - defines the role and output format
-SYSTEM_PROMPT = """You are an expert nursing care plan generator for skilled nursing facilities.
+SYSTEM_PROMPT_TEMPLATE = """You are an expert nursing care plan generator for skilled nursing facilities.
 You have extensive experience with NANDA nursing diagnoses, evidence-based interventions, and comprehensive care planning.
 
 Your task is to generate a complete, professional care plan based on patient data provided.
@@ -23,10 +37,13 @@ Output Requirements:
 - Include NANDA nursing diagnoses where applicable
 - Provide specific, actionable interventions with frequencies
 - Consider all patient risk factors
-- Format output as clean, professional HTML suitable for display and printing
+- {format_requirement}
 - Be comprehensive but concise
 - Ensure all recommendations are evidence-based and realistic for skilled nursing facility settings"""
 
+# Marker the model emits where the locally rendered risk scores are inserted
+RISK_SCORES_PLACEHOLDER = "<!-- RISK_SCORES -->"
+
 # User prompt template
 USER_PROMPT_TEMPLATE = """Generate a comprehensive nursing care plan for the following patient:
 
@@ -65,7 +82,16 @@ SPECIAL CONSIDERATIONS:
 - Isolation Precautions: {isolation_precautions}
 - Diet Restrictions: {diet_restrictions}
 
-Generate a structured care plan with the following sections in HTML format:
+STANDARDIZED TERMS (canonical names for values written above; the original text is authoritative):
+{standardized_terms}
+
+CALCULATED RISK SCORES (computed locally - treat as established facts):
+{risk_facts}
+
+MEDICATION SAFETY CHECK (local interaction and allergy index - treat as established facts and address each issue in the interventions and precautions):
+{medication_facts}
+
+Generate a structured care plan with the following sections {format_name}:
 
 1. **Patient Summary** - Brief overview of patient status
 2. **Nursing Diagnoses** - 3-5 priority nursing diagnoses (use NANDA format when appropriate)
@@ -79,25 +105,87 @@ Generate a structured care plan with the following sections in HTML format:
    - Wound care (if applicable)
    - Nutrition/hydration
    - Safety measures
-5. **Risk Assessments**:
-   - Fall risk score and precautions
-   - Pressure injury risk
-   - Infection risk
+5. **Risk Assessments** - Output the section heading, then the exact marker {risk_placeholder} on its own line (the calculated fall risk, pressure injury and vital sign results are inserted there automatically; do NOT write your own fall or pressure injury scoring), then an Infection Risk subsection. Use the calculated scores to drive interventions and precautions in the other sections
 6. **Monitoring Schedule** - What to check and how often
 7. **Discharge Planning** - Considerations for discharge readiness
 8. **Special Precautions** - Any specific safety or care precautions
 9. **Family Education** - Key points to educate family/caregivers
 
-Format the output as clean, professional HTML with appropriate headings (<h2>, <h3>), lists (<ul>, <ol>), and styling that works well for both screen display and printing. Use a medical-professional aesthetic."""
+{format_instructions}"""
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """Prompt wording for one generation output format."""
+
+    requirement: str
+    name: str
+    instructions: str
+    # Output is compact markup rendered locally rather than model-written HTML
+    markup: bool = False
+
+
+# GENERATION_OUTPUT_FORMAT values. "markup" spends far fewer output tokens on
+# tags and styling; the markup is rendered to the same HTML locally.
+OUTPUT_FORMATS = {
+    "html": OutputFormat(
+        requirement="Format output as clean, professional HTML suitable for display and printing",
+        name="in HTML format",
+        instructions="Format the output as clean, professional HTML with appropriate headings (<h2>, <h3>), lists (<ul>, <ol>), and styling that works well for both screen display and printing. Use a medical-professional aesthetic.",
+    ),
+    "markup": OutputFormat(
+        requirement="Format output in the compact plan markup described in the request",
+        name="in compact plan markup",
+        instructions=MARKUP_SYNTAX,
+        markup=True,
+    ),
+}
+
+# Appended when similar_plan_prompt_reference is enabled and a similar plan exists
+REFERENCE_PLAN_TEMPLATE = """
+
+REFERENCE PLAN (written for a different patient with a similar profile, {similarity:.0%} feature overlap; use only as a structural and clinical reference, never copy patient-specific details):
+{reference}"""
+
+
+# Stored plans are only reused while the prompts, model and reference data are unchanged
+PROMPT_FINGERPRINT = hashlib.sha256(
+    "\0".join(
+        (
+            claude_client.model,
+            str(settings.generation_max_tokens),
+            vocabulary_index.version,
+            medication_index.version,
+            SYSTEM_PROMPT_TEMPLATE,
+            USER_PROMPT_TEMPLATE,
+            str(OUTPUT_FORMATS[settings.generation_output_format]),
+            REFERENCE_PLAN_TEMPLATE if settings.similar_plan_prompt_reference else "",
+        )
+    ).encode()
+).hexdigest()[:16]
+
+
+class GenerationAbortedError(RuntimeError):
+    """Raised when model output is clearly broken and generation was stopped early."""
+
+
+def output_format() -> OutputFormat:
+    """The configured generation output format."""
+    return OUTPUT_FORMATS[settings.generation_output_format]
 
 
 def format_medications(medications: list) -> str:
     """Format medication list for prompt."""
     if not medications:
         return "None documented"
-    return "\n".join(
-        f"  - {med.name}: {med.dosage} {med.frequency}" for med in medications
-    )
+    return "\n".join(f"  - {med.name}: {med.dosage} {med.frequency}" for med in medications)
+
+
+def format_standardized_terms(pairs: list[tuple[str, str]]) -> str:
+    """Format (original, canonical) term pairs for prompt."""
+    if not pairs:
+        return "None"
+    return "\n".join(f"  - {original} = {canonical}" for original, canonical in pairs)
 
 
 def format_list(items: list) -> str:
@@ -107,6 +195,155 @@ def format_list(items: list) -> str:
     return ", ".join(items)
 
 
+def plan_cache_key(patient: PatientInput) -> str:
+    """Key under which a patient's generated plan is stored."""
+    return patient_input_hash(patient, salt=PROMPT_FINGERPRINT)
+
+
+def insert_risk_assessment(care_plan_html: str, risk_assessment: RiskAssessment) -> str:
+    """
+    Insert the locally rendered risk scores into the model's HTML.
+
+    The scores replace the placeholder inside the model's Risk Assessments
+    section; if the model omitted the placeholder they are appended as a
+    standalone section instead.
+    """
+    if RISK_SCORES_PLACEHOLDER in care_plan_html:
+        return care_plan_html.replace(
+            RISK_SCORES_PLACEHOLDER,
+            render_risk_assessment_html(risk_assessment, include_heading=False),
+            1,
+        )
+    logger.warning("Risk score placeholder missing from model output, appending section")
+    return care_plan_html + render_risk_assessment_html(risk_assessment)
+
+
+def wrap_care_plan_html(care_plan_html: str) -> str:
+    """Wrap care plan HTML in a container div with print-friendly styling."""
+    return f"""
+    <div class="care-plan-container" style="font-family: 'Segoe UI', system-ui, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; color: #1a1a1a;">
+        <style>
+            @media print {{
+                .care-plan-container {{
+                    max-width: 100%;
+                    padding: 10px;
+                }}
+                button {{
+                    display: none !important;
+                }}
+            }}
+            .care-plan-container h1 {{
+                color: #2563eb;
+                border-bottom: 3px solid #2563eb;
+                padding-bottom: 10px;
+                margin-bottom: 20px;
+            }}
+            .care-plan-container h2 {{
+                color: #1e40af;
+                margin-top: 25px;
+                margin-bottom: 15px;
+            }}
+            .care-plan-container h3 {{
+                color: #1e3a8a;
+                margin-top: 20px;
+                margin-bottom: 10px;
+            }}
+            .care-plan-container ul, .care-plan-container ol {{
+                line-height: 1.8;
+                margin: 10px 0;
+            }}
+            .care-plan-container li {{
+                margin-bottom: 8px;
+            }}
+            .care-plan-container strong {{
+                color: #1e40af;
+            }}
+        </style>
+        {care_plan_html}
+    </div>
+    """
+
+
+def unwrap_care_plan_html(care_plan_html: str) -> str:
+    """Plan HTML without the container div and styles added by wrap_care_plan_html."""
+    if "</style>" not in care_plan_html:
+        return care_plan_html.strip()
+    body = care_plan_html.split("</style>", 1)[1].rstrip()
+    return body.removesuffix("</div>").strip()
+
+
+def fallback_care_plan(patient: PatientInput, reason: str) -> CarePlanOutput:
+    """
+    Build a standard template care plan locally, without a model call.
+
+    Args:
+        patient: Patient input data
+        reason: Why the model was not used, shown in the plan's notice
+
+    Returns:
+        CarePlanOutput marked is_fallback
+    """
+    logger.warning(f"Serving template care plan | Reason={reason} | Patient={patient.name}")
+    care_plan_html = render_fallback_plan_html(patient, assess_patient(patient), reason)
+    return CarePlanOutput(
+        patient_name=patient.name,
+        care_plan_html=wrap_care_plan_html(care_plan_html),
+        generated_at=datetime.utcnow().isoformat() + "Z",
+        is_fallback=True,
+    )
+
+
+async def stream_sanitized_completion(
+    user_prompt: str, facility: str | None = None
+) -> tuple[str, list[str], CompletionResult | None]:
+    """
+    Stream one generation through the HTML sanitizer or markup renderer.
+
+    The sanitizer (or, for compact markup output, the renderer) runs on
+    each delta as it arrives, so a clearly broken generation is stopped as
+    soon as it is detected instead of after the full token budget has been
+    spent.
+
+    Args:
+        user_prompt: Formatted user prompt
+        facility: Facility the generation is billed to
+
+    Returns:
+        Tuple of the sanitized HTML, any structural warnings and the
+        completion's model and token usage (None if never reported)
+
+    Raises:
+        GenerationAbortedError: If the output was abandoned mid-stream
+    """
+    fmt = output_format()
+    preserved = frozenset({RISK_SCORES_PLACEHOLDER})
+    sanitizer: StreamingHtmlSanitizer | StreamingMarkupRenderer
+    if fmt.markup:
+        sanitizer = StreamingMarkupRenderer(preserved_lines=preserved)
+    else:
+        sanitizer = StreamingHtmlSanitizer(preserved_comments=preserved)
+    parts: list[str] = []
+    result: CompletionResult | None = None
+    stream = claude_client.stream_completion(
+        system_prompt=SYSTEM_PROMPT_TEMPLATE.format(format_requirement=fmt.requirement),
+        user_prompt=user_prompt,
+        max_tokens=settings.generation_max_tokens,
+        facility=facility,
+    )
+    try:
+        async for item in stream:
+            if isinstance(item, CompletionResult):
+                result = item
+                continue
+            parts.append(sanitizer.feed(item))
+            if sanitizer.abort_reason:
+                raise GenerationAbortedError(sanitizer.abort_reason)
+    finally:
+        await stream.aclose()
+    parts.append(sanitizer.close())
+    return "".join(parts), sanitizer.warnings(result.stop_reason if result else None), result
+
+
 async def generate_care_plan(patient: PatientInput) -> CarePlanOutput:
     """
     Generate a comprehensive care plan for a patient using Claude AI.
@@ -120,10 +357,16 @@ async def generate_care_plan(patient: PatientInput) -> CarePlanOutput:
     Raises:
         Exception: If care plan generation fails
     """
+    if settings.fallback_only:
+        return fallback_care_plan(patient, reason="model calls disabled")
     try:
         logger.info(f"Generating care plan for patient: {patient.name}")
 
+        # Score risks locally so the model does not spend tokens deriving them
+        risk_assessment = assess_patient(patient)
+
         # Format the user prompt with patient data
+        fmt = output_format()
         user_prompt = USER_PROMPT_TEMPLATE.format(
             name=patient.name,
             age=patient.age,
@@ -146,65 +389,52 @@ async def generate_care_plan(patient: PatientInput) -> CarePlanOutput:
             cognitive_status=patient.cognitive_status,
             isolation_precautions=patient.isolation_precautions or "None",
             diet_restrictions=patient.diet_restrictions or "None",
+            standardized_terms=format_standardized_terms(
+                vocabulary_index.standardized_terms(patient)
+            ),
+            risk_facts=format_risk_facts(risk_assessment),
+            medication_facts=format_medication_facts(
+                medication_index.check(patient.current_medications, patient.allergies)
+            ),
+            risk_placeholder=RISK_SCORES_PLACEHOLDER,
+            format_name=fmt.name,
+            format_instructions=fmt.instructions,
         )
-
-        # Generate care plan using Claude API
-        care_plan_html = await claude_client.generate_completion(
-            system_prompt=SYSTEM_PROMPT,
-            user_prompt=user_prompt,
-            max_tokens=4000,
-        )
-
+        if settings.similar_plan_prompt_reference:
+            draft = closest_plan_draft(patient, exclude=plan_cache_key(patient))
+            if draft is not None:
+                user_prompt += REFERENCE_PLAN_TEMPLATE.format(
+                    similarity=draft.similarity,
+                    reference=plan_text(draft.care_plan.care_plan_html),
+                )
+
+        # Generate care plan using Claude API, retrying clearly broken output
+        attempts = settings.generation_retries + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                care_plan_html, warnings, result = await stream_sanitized_completion(
+                    user_prompt, facility=patient.facility
+                )
+                break
+            except GenerationAbortedError as e:
+                logger.warning(f"Generation aborted | Attempt={attempt}/{attempts} | Reason={e}")
+                if attempt == attempts:
+                    raise
+
+        if warnings:
+            logger.warning(f"Care plan validation warnings for {patient.name}: {warnings}")
         logger.info(f"Care plan generated successfully for: {patient.name}")
 
-        # Wrap in a container div with print-friendly styling
-        styled_html = f"""
-        <div class="care-plan-container" style="font-family: 'Segoe UI', system-ui, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; color: #1a1a1a;">
-            <style>
-                @media print {{
-                    .care-plan-container {{
-                        max-width: 100%;
-                        padding: 10px;
-                    }}
-                    button {{
-                        display: none !important;
-                    }}
-                }}
-                .care-plan-container h1 {{
-                    color: #2563eb;
-                    border-bottom: 3px solid #2563eb;
-                    padding-bottom: 10px;
-                    margin-bottom: 20px;
-                }}
-                .care-plan-container h2 {{
-                    color: #1e40af;
-                    margin-top: 25px;
-                    margin-bottom: 15px;
-                }}
-                .care-plan-container h3 {{
-                    color: #1e3a8a;
-                    margin-top: 20px;
-                    margin-bottom: 10px;
-                }}
-                .care-plan-container ul, .care-plan-container ol {{
-                    line-height: 1.8;
-                    margin: 10px 0;
-                }}
-                .care-plan-container li {{
-                    margin-bottom: 8px;
-                }}
-                .care-plan-container strong {{
-                    color: #1e40af;
-                }}
-            </style>
-            {care_plan_html}
-        </div>
-        """
+        care_plan_html = insert_risk_assessment(care_plan_html, risk_assessment)
 
         return CarePlanOutput(
             patient_name=patient.name,
-            care_plan_html=styled_html,
+            care_plan_html=wrap_care_plan_html(care_plan_html),
             generated_at=datetime.utcnow().isoformat() + "Z",
+            validation_warnings=warnings,
+            model=result.model if result else None,
+            input_tokens=result.input_tokens if result else None,
+            output_tokens=result.output_tokens if result else None,
         )
 
     except Exception as e:
@@ -0,0 +1,91 @@
+"""
+Circuit breaker for the upstream model API.
+After repeated outage errors the circuit opens and calls fail fast (so callers
+can fall back to local plans) until a single probe call succeeds again.
+"""
+
+import time
+
+from app.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with timed half-open probes."""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        """
+        Initialize a closed circuit.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit (0 = never)
+            reset_seconds: Time the circuit stays open before a probe call is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened = 0
+        self._retry_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        """STATE_CLOSED, STATE_OPEN, or STATE_HALF_OPEN once a probe is due."""
+        if self._retry_at is None:
+            return STATE_CLOSED
+        return STATE_HALF_OPEN if time.monotonic() >= self._retry_at else STATE_OPEN
+
+    def check(self) -> None:
+        """
+        Allow a call, or fail fast while the circuit is open.
+
+        Once the reset time has passed one call is let through as a probe;
+        further calls wait for another reset period unless the probe succeeds.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if self._retry_at is None:
+            return
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise CircuitOpenError(
+                f"Upstream circuit open, retrying in {self._retry_at - now:.0f}s"
+            )
+        self._retry_at = now + self.reset_seconds
+        logger.info("Upstream circuit half-open | Probing")
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        if self._retry_at is not None:
+            logger.info("Upstream circuit closed")
+        self.failures = 0
+        self._retry_at = None
+
+    def record_failure(self) -> None:
+        """Count an outage error, opening the circuit at the threshold."""
+        self.failures += 1
+        if self.failure_threshold and self.failures >= self.failure_threshold:
+            if self._retry_at is None:
+                self.opened += 1
+                logger.warning(
+                    f"Upstream circuit opened | Failures={self.failures} | "
+                    f"ResetSeconds={self.reset_seconds}"
+                )
+            self._retry_at = time.monotonic() + self.reset_seconds
+
+
+# Global upstream circuit instance
+upstream_circuit = CircuitBreaker(
+    failure_threshold=settings.circuit_failure_threshold,
+    reset_seconds=settings.circuit_reset_seconds,
+)
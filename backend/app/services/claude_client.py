@@ -1,76 +1,276 @@
 """
 Anthropic Claude API client for generating care plans.
-Simple, modular wrapper around the Anthropic SDK.
+Simple, modular wrapper around the Anthropic SDK, spreading calls over the
+upstream pool's API keys and endpoints.
 """
 
-import httpx
-from anthropic import Anthropic, APIError
+import time
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+
+from anthropic import (
+    APIConnectionError,
+    APIError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncStream,
+    RateLimitError,
+)
+from anthropic.types import MessageStreamEvent
 
 from app.config import settings
+from app.services.circuit_breaker import upstream_circuit
+from app.services.load_monitor import load_monitor
+from app.services.traffic_recorder import traffic_recorder
+from app.services.upstream_pool import UpstreamMember, UpstreamPool
+from app.services.usage_ledger import usage_ledger
+from app.utils.deadline import DeadlineExceededError, remaining_seconds
 from app.utils.logger import setup_logger
 
 logger = setup_logger(__name__, settings.log_level)
 
+# Rough English text density, used when a stream is closed before usage is reported
+CHARS_PER_TOKEN = 4
+# Status codes at or above this are upstream faults (500, 503, 529 overloaded)
+SERVER_ERROR = 500
+
+
+def is_upstream_outage(error: Exception) -> bool:
+    """Whether an API error means the upstream is down or throttling, not a bad request."""
+    if isinstance(error, RateLimitError | APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= SERVER_ERROR
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Seconds a rate-limited response asked us to wait, if it said."""
+    if not isinstance(error, RateLimitError):
+        return None
+    value = error.response.headers.get("retry-after", "")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+@dataclass
+class CompletionResult:
+    """Outcome of a streamed completion, yielded after the last text delta."""
+
+    model: str
+    stop_reason: str | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+
 
 class ClaudeClient:
     """Client for interacting with Anthropic Claude API."""
 
     def __init__(self) -> None:
         """Initialize the Claude API client."""
-        # Create custom httpx client with SSL verification disabled for local dev
-        # This fixes SSL certificate errors with corporate firewalls/antivirus
-        http_client = httpx.Client(verify=False)
-
-        self.client = Anthropic(
-            api_key=settings.anthropic_api_key, http_client=http_client
-        )
+        self.pool = UpstreamPool.from_settings()
+        # Client of the primary pool member
+        self.client = self.pool.members[0].client
         self.model = "claude-sonnet-4-20250514"
         logger.info(f"Claude API client initialized with model: {self.model}")
         logger.warning("SSL verification disabled for local development")
 
-    async def generate_completion(
-        self, system_prompt: str, user_prompt: str, max_tokens: int = 4000
-    ) -> str:
+    def rate_limit_headroom(self) -> int | None:
         """
-        Generate a completion from Claude API.
+        Token budget remaining at the last API responses.
+
+        Returns:
+            Remaining tokens across the pool members that are not ejected, or
+            None if unknown or older than the rate limit window
+        """
+        return self.pool.headroom()
+
+    def _record_error(
+        self, member: UpstreamMember, error: APIError, timeout: float | None, started: float
+    ) -> bool:
+        """
+        Record a failed call against the load monitor and the pool member.
+
+        Returns:
+            True if the error was an outage that counts against upstream health
+        """
+        load_monitor.record_upstream(False, (time.monotonic() - started) * 1000)
+        # Timeouts cut short by a request deadline say nothing about upstream health
+        deadline_bound = isinstance(error, APITimeoutError) and timeout is not None
+        if not is_upstream_outage(error) or deadline_bound:
+            return False
+        self.pool.record_failure(member, retry_after=retry_after_seconds(error))
+        return True
+
+    async def _open_stream(
+        self, system_prompt: str, user_prompt: str, max_tokens: int
+    ) -> tuple[UpstreamMember, AsyncStream[MessageStreamEvent], float | None]:
+        """
+        Start a streaming request on the least-loaded pool member.
+
+        Outage errors before any output fail over to the next available
+        member, so one throttled key or unreachable endpoint does not fail
+        the request.
+
+        Returns:
+            Tuple of the member (released by the caller), the event stream
+            and the timeout the request was sent with
+
+        Raises:
+            APIError: If the request fails on every member tried
+        """
+        tried: list[UpstreamMember] = []
+        while True:
+            member = self.pool.acquire(exclude=tried)
+            tried.append(member)
+            timeout = remaining_seconds()
+            started = time.monotonic()
+            try:
+                stream = await member.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    system=system_prompt,
+                    messages=[{"role": "user", "content": user_prompt}],
+                    stream=True,
+                    timeout=timeout if timeout is not None else member.client.timeout,
+                )
+            except APIError as e:
+                self.pool.release(member)
+                outage = self._record_error(member, e, timeout, started)
+                if outage and self.pool.can_fail_over(exclude=tried):
+                    logger.warning(f"Upstream {member.name} failed, failing over | Error={e}")
+                    continue
+                if outage:
+                    upstream_circuit.record_failure()
+                logger.error(f"Claude API error: {e}")
+                raise
+            member.record_rate_limit(stream.response.headers)
+            return member, stream, timeout
+
+    async def stream_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 4000,
+        facility: str | None = None,
+    ) -> AsyncGenerator[str | CompletionResult, None]:
+        """
+        Stream a completion from Claude API.
+
+        Text deltas are yielded as they arrive, followed by a single
+        CompletionResult with the stop reason and token usage. Closing the
+        iterator early closes the connection and stops generation. Usage is
+        recorded against the facility even when the stream is closed early.
+        The request timeout is bounded by the current request deadline.
 
         Args:
             system_prompt: System prompt to set context
             user_prompt: User prompt with the actual request
             max_tokens: Maximum tokens to generate
+            facility: Facility the call is billed to
 
-        Returns:
-            Generated text from Claude
+        Yields:
+            Text deltas, then a CompletionResult
 
         Raises:
+            QuotaExceededError: If the facility has used its daily quota
+            DeadlineExceededError: If the request deadline has already passed
+            CircuitOpenError: If recent outage errors opened the upstream circuit
             APIError: If the API request fails
         """
-        try:
-            logger.info("Sending request to Claude API")
-            logger.debug(f"System prompt length: {len(system_prompt)} chars")
-            logger.debug(f"User prompt length: {len(user_prompt)} chars")
-
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_prompt}],
-            )
+        usage_ledger.check_quota(facility)
+        timeout = remaining_seconds()
+        if timeout is not None and timeout <= 0:
+            raise DeadlineExceededError("Request deadline passed before the model call")
+        upstream_circuit.check()
+        started = time.monotonic()
+        logger.info("Sending streaming request to Claude API")
+        logger.debug(f"System prompt length: {len(system_prompt)} chars")
+        logger.debug(f"User prompt length: {len(user_prompt)} chars")
 
-            # Extract text from response
-            content = response.content[0].text if response.content else ""
+        member, stream, timeout = await self._open_stream(system_prompt, user_prompt, max_tokens)
+        try:
+            result = CompletionResult(model=self.model)
+            streamed_chars = 0
+            # Cassette for the traffic capture, when this request is being recorded
+            recording = traffic_recorder.upstream_capture()
+            try:
+                async for event in stream:
+                    if event.type == "message_start":
+                        result.model = event.message.model
+                        result.input_tokens = event.message.usage.input_tokens
+                    elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        streamed_chars += len(event.delta.text)
+                        if recording is not None:
+                            recording.add(event.delta.text)
+                        yield event.delta.text
+                    elif event.type == "message_delta":
+                        result.stop_reason = event.delta.stop_reason
+                        result.output_tokens = event.usage.output_tokens
+            finally:
+                await stream.close()
+                # Closed early: usage was never reported, so estimate output tokens
+                output_tokens = result.output_tokens or streamed_chars // CHARS_PER_TOKEN
+                if result.stop_reason is None:
+                    logger.info(
+                        f"Claude API stream closed early | Facility={facility} | "
+                        f"OutputTokens~{output_tokens} | "
+                        f"TokensSaved<={max(max_tokens - output_tokens, 0)}"
+                    )
+                usage_ledger.record(
+                    facility,
+                    result.input_tokens,
+                    output_tokens,
+                    (time.monotonic() - started) * 1000,
+                )
+                if recording is not None:
+                    recording.finish(
+                        result.model, result.stop_reason, result.input_tokens, output_tokens
+                    )
 
+            latency_ms = (time.monotonic() - started) * 1000
             logger.info(
-                f"Claude API response received | "
-                f"Model={response.model} | "
-                f"Tokens={response.usage.input_tokens + response.usage.output_tokens}"
+                f"Claude API stream complete | "
+                f"Model={result.model} | "
+                f"Upstream={member.name} | "
+                f"StopReason={result.stop_reason} | "
+                f"Tokens={result.input_tokens + result.output_tokens}"
             )
-
-            return content
+            load_monitor.record_upstream(True, latency_ms)
+            upstream_circuit.record_success()
+            self.pool.record_success(member, latency_ms)
+            yield result
 
         except APIError as e:
+            if self._record_error(member, e, timeout, started):
+                upstream_circuit.record_failure()
             logger.error(f"Claude API error: {e}")
             raise
+        finally:
+            self.pool.release(member)
+
+    async def generate_completion(
+        self, system_prompt: str, user_prompt: str, max_tokens: int = 4000
+    ) -> str:
+        """
+        Generate a completion from Claude API.
+
+        Args:
+            system_prompt: System prompt to set context
+            user_prompt: User prompt with the actual request
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated text from Claude
+
+        Raises:
+            APIError: If the API request fails
+        """
+        parts = []
+        async for item in self.stream_completion(system_prompt, user_prompt, max_tokens):
+            if isinstance(item, str):
+                parts.append(item)
+        return "".join(parts)
 
 
 # Global client instance
@@ -0,0 +1,385 @@
+"""
+Template care plan generator - Deterministic, standards-based plans built locally.
+Used when the upstream model is unavailable (and for zero-cost load testing):
+diagnosis-keyed intervention libraries, medication and precaution blocks and a
+vitals-driven monitoring schedule, rendered from PatientInput in milliseconds.
+"""
+
+import html
+from dataclasses import dataclass
+
+from app.models import PatientInput, RiskAssessment
+from app.services.medication_safety import medication_index
+from app.services.risk_scoring import (
+    ACUITY_ELEVATED,
+    ACUITY_HIGH,
+    acuity_level,
+    render_risk_assessment_html,
+)
+from app.services.vocabulary import normalize_term, vocabulary_index
+
+
+@dataclass(frozen=True)
+class ConditionTemplate:
+    """Standard nursing content for one diagnosis group."""
+
+    keywords: tuple[str, ...]
+    nursing_diagnosis: str
+    short_term_goal: str
+    long_term_goal: str
+    interventions: tuple[str, ...]
+    monitoring: tuple[str, ...] = ()
+    education: tuple[str, ...] = ()
+
+
+# Matched on word boundaries against normalized, canonicalized diagnoses
+CONDITION_LIBRARY = (
+    ConditionTemplate(
+        keywords=("heart failure", "chf"),
+        nursing_diagnosis="Decreased cardiac output and excess fluid volume",
+        short_term_goal="Stable weight (no gain over 2 lb/day) and no increase in edema",
+        long_term_goal="Tolerates daily activities without dyspnea at discharge",
+        interventions=(
+            "Daily weight before breakfast, same scale; report gain over 2 lb/day or 5 lb/week",
+            "Strict intake and output; maintain prescribed fluid restriction",
+            "Elevate head of bed for dyspnea; elevate legs when seated",
+            "Assess lung sounds and peripheral edema every shift",
+        ),
+        monitoring=("Daily weight", "Intake and output every shift"),
+        education=("Low-sodium diet and fluid restriction", "Daily weights and when to report"),
+    ),
+    ConditionTemplate(
+        keywords=("diabetes", "dm"),
+        nursing_diagnosis="Risk for unstable blood glucose level",
+        short_term_goal="Blood glucose within prescribed target range",
+        long_term_goal="No hypoglycemic episodes; stable glycemic control at discharge",
+        interventions=(
+            "Blood glucose checks before meals and at bedtime",
+            "Follow hypoglycemia protocol for glucose under 70 mg/dL",
+            "Daily foot inspection and skin care",
+            "Coordinate insulin or oral agents with meal times",
+        ),
+        monitoring=("Blood glucose before meals and at bedtime",),
+        education=("Signs of hypo- and hyperglycemia", "Foot care"),
+    ),
+    ConditionTemplate(
+        keywords=("kidney", "renal", "ckd"),
+        nursing_diagnosis="Risk for electrolyte imbalance",
+        short_term_goal="Electrolytes and fluid balance within prescribed limits",
+        long_term_goal="Renal function stable without acute decline",
+        interventions=(
+            "Monitor intake and output; report output under 30 mL/hour",
+            "Review renal dosing of medications with pharmacy",
+            "Avoid nephrotoxic agents (e.g. NSAIDs) unless ordered",
+        ),
+        monitoring=("Renal panel per provider order",),
+        education=("Renal diet and fluid guidance",),
+    ),
+    ConditionTemplate(
+        keywords=("copd", "pulmonary", "emphysema", "asthma", "pneumonia"),
+        nursing_diagnosis="Ineffective airway clearance and impaired gas exchange",
+        short_term_goal="Oxygen saturation at or above prescribed target at rest",
+        long_term_goal="Clear breath sounds and baseline activity tolerance at discharge",
+        interventions=(
+            "Assess respiratory rate, effort and lung sounds every shift",
+            "Titrate oxygen to prescribed saturation target",
+            "Encourage coughing, deep breathing and incentive spirometry every 2 hours awake",
+            "Position upright; pace activities with rest periods",
+        ),
+        monitoring=("Oxygen saturation every shift and with activity",),
+        education=("Breathing techniques and inhaler use", "When to report increased dyspnea"),
+    ),
+    ConditionTemplate(
+        keywords=("stroke", "cva", "cerebrovascular", "hemiplegia"),
+        nursing_diagnosis="Impaired physical mobility and risk for aspiration",
+        short_term_goal="Safe swallowing with prescribed diet texture; no aspiration",
+        long_term_goal="Maximal functional independence with therapy goals met",
+        interventions=(
+            "Neurological checks every shift; report new deficits immediately",
+            "Aspiration precautions: upright 90 degrees for meals and 30 minutes after",
+            "Support affected limbs; range of motion exercises twice daily",
+            "Coordinate with physical, occupational and speech therapy",
+        ),
+        monitoring=("Neurological checks every shift",),
+        education=("Stroke warning signs (BE FAST)", "Safe swallowing strategies"),
+    ),
+    ConditionTemplate(
+        keywords=("fracture", "arthroplasty", "joint replacement", "hip", "knee"),
+        nursing_diagnosis="Acute pain and impaired physical mobility",
+        short_term_goal="Pain at or below acceptable level with activity",
+        long_term_goal="Ambulates with assistive device per therapy plan",
+        interventions=(
+            "Follow weight-bearing and movement precautions as ordered",
+            "Premedicate for pain before therapy sessions",
+            "Neurovascular checks of the affected limb every shift",
+            "DVT prophylaxis as ordered; encourage ankle pumps",
+        ),
+        monitoring=("Neurovascular checks every shift",),
+        education=("Movement precautions", "Signs of DVT and infection"),
+    ),
+    ConditionTemplate(
+        keywords=("dementia", "alzheimer", "cognitive impairment", "delirium"),
+        nursing_diagnosis="Chronic confusion and risk for injury",
+        short_term_goal="Participates in care with cueing; no injuries",
+        long_term_goal="Maintains current cognitive and functional level",
+        interventions=(
+            "Consistent routine and caregivers; reorient with calm, simple cues",
+            "Screen for delirium (CAM) with any acute change",
+            "Use non-pharmacological approaches for distress before PRN medication",
+        ),
+        education=("Communication strategies for family",),
+    ),
+    ConditionTemplate(
+        keywords=("urinary tract infection", "uti", "sepsis", "cellulitis", "infection"),
+        nursing_diagnosis="Infection",
+        short_term_goal="Afebrile for 48 hours",
+        long_term_goal="Infection resolved without complications",
+        interventions=(
+            "Administer antibiotics on schedule; monitor for adverse effects",
+            "Encourage fluids unless restricted",
+            "Monitor temperature and signs of sepsis every shift",
+        ),
+        monitoring=("Temperature every shift",),
+        education=("Completing the antibiotic course", "Hand hygiene"),
+    ),
+    ConditionTemplate(
+        keywords=("hypertension", "htn"),
+        nursing_diagnosis="Risk for decreased cardiac tissue perfusion",
+        short_term_goal="Blood pressure within prescribed range",
+        long_term_goal="Blood pressure controlled on current regimen",
+        interventions=(
+            "Check blood pressure before administering antihypertensives",
+            "Assess for orthostatic hypotension before mobilizing",
+        ),
+        education=("Low-sodium diet", "Medication adherence"),
+    ),
+    ConditionTemplate(
+        keywords=("pressure injury", "pressure ulcer", "wound", "ulcer"),
+        nursing_diagnosis="Impaired skin integrity",
+        short_term_goal="Wound free of signs of infection",
+        long_term_goal="Measurable wound healing by discharge",
+        interventions=(
+            "Wound care per treatment order; measure and document weekly",
+            "Offload the wound; pressure-redistribution surface",
+            "Optimize protein and calorie intake; dietitian consult",
+        ),
+        monitoring=("Wound assessment with each dressing change",),
+        education=("Repositioning and skin protection",),
+    ),
+)
+
+GENERAL_TEMPLATE = ConditionTemplate(
+    keywords=(),
+    nursing_diagnosis="Risk for decline in health status related to primary diagnosis",
+    short_term_goal="Vital signs stable and symptoms controlled",
+    long_term_goal="Returns to baseline function and meets discharge criteria",
+    interventions=(
+        "Assess symptoms related to the primary diagnosis every shift",
+        "Administer medications as ordered; monitor for effects and side effects",
+    ),
+)
+
+# Medication class keywords (normalized medication names) and their nursing checks
+MEDICATION_CHECKS = (
+    (
+        ("warfarin", "apixaban", "rivaroxaban", "heparin", "enoxaparin", "dabigatran"),
+        "Anticoagulant: bleeding precautions, monitor for bruising and bleeding; INR if warfarin",
+    ),
+    (
+        ("furosemide", "lasix", "torsemide", "bumetanide", "hydrochlorothiazide", "spironolactone"),
+        "Diuretic: daily weight, intake and output, potassium and orthostatic blood pressure",
+    ),
+    (
+        ("insulin", "glipizide", "glyburide", "glimepiride"),
+        "Hypoglycemic agent: check blood glucose before administration",
+    ),
+    (
+        ("metformin",),
+        "Metformin: give with meals; monitor renal function",
+    ),
+    (
+        ("oxycodone", "morphine", "hydrocodone", "hydromorphone", "tramadol", "fentanyl"),
+        "Opioid: sedation and respiratory rate before administration; bowel regimen",
+    ),
+    (
+        ("lisinopril", "losartan", "metoprolol", "amlodipine", "carvedilol", "atenolol"),
+        "Antihypertensive: hold parameters for blood pressure and heart rate per order",
+    ),
+    (
+        ("digoxin",),
+        "Digoxin: apical pulse for one full minute before administration",
+    ),
+    (
+        ("lorazepam", "alprazolam", "zolpidem", "quetiapine", "haloperidol"),
+        "Sedative/psychotropic: fall precautions and monitoring for oversedation",
+    ),
+)
+
+# Vital sign check frequency by acuity
+VITALS_FREQUENCY = {
+    ACUITY_HIGH: "Every 1-2 hours until stable; notify provider of critical values now",
+    ACUITY_ELEVATED: "Every 4 hours",
+}
+ROUTINE_VITALS_FREQUENCY = "Every shift"
+PAIN_REASSESS_THRESHOLD = 4
+
+FALLBACK_NOTICE = (
+    '<div class="fallback-notice" style="border: 2px solid #d97706; background: #fffbeb; '
+    'padding: 12px; margin-bottom: 16px;"><strong>Standard template plan.</strong> '
+    "Generated locally from patient data because AI generation was unavailable "
+    "({reason}). Individualize and review before use.</div>"
+)
+
+
+def _escape(value: object) -> str:
+    """HTML-escape a patient value."""
+    return html.escape(str(value))
+
+
+def _items(values: list[str] | tuple[str, ...]) -> str:
+    """Render an HTML list, escaping each item."""
+    return "<ul>" + "".join(f"<li>{_escape(value)}</li>" for value in values) + "</ul>"
+
+
+def _matches(text: str, keywords: tuple[str, ...]) -> bool:
+    """Whether any keyword appears as whole words in normalized text."""
+    padded = f" {text} "
+    return any(f" {keyword} " in padded for keyword in keywords)
+
+
+def matching_templates(patient: PatientInput) -> list[ConditionTemplate]:
+    """
+    Condition templates for the patient's diagnoses, primary diagnosis first.
+
+    Returns:
+        Matching templates without duplicates, or GENERAL_TEMPLATE if none match
+    """
+    diagnoses = [patient.primary_diagnosis, *patient.comorbidities]
+    templates: list[ConditionTemplate] = []
+    for diagnosis in diagnoses:
+        text = normalize_term(vocabulary_index.canonicalize("diagnoses", diagnosis))
+        for template in CONDITION_LIBRARY:
+            if template not in templates and _matches(text, template.keywords):
+                templates.append(template)
+    return templates or [GENERAL_TEMPLATE]
+
+
+def medication_checks(patient: PatientInput) -> list[str]:
+    """Nursing checks for the patient's medications, one line per matched medication."""
+    checks = []
+    for med in patient.current_medications:
+        name = normalize_term(vocabulary_index.canonicalize("medications", med.name))
+        for keywords, check in MEDICATION_CHECKS:
+            if _matches(name, keywords):
+                checks.append(f"{med.name} {med.dosage} {med.frequency} - {check}")
+                break
+        else:
+            checks.append(f"{med.name} {med.dosage} {med.frequency} - Administer as ordered")
+    return checks
+
+
+def render_fallback_plan_html(
+    patient: PatientInput, assessment: RiskAssessment, reason: str
+) -> str:
+    """
+    Render a complete template care plan with every required section.
+
+    Args:
+        patient: Patient input data
+        assessment: Locally calculated risk assessment
+        reason: Why the fallback was used, shown in the notice
+
+    Returns:
+        Care plan HTML (without the styled container)
+    """
+    templates = matching_templates(patient)
+    acuity = acuity_level(patient)
+    fall_precautions = assessment.fall_risk.level != "Low"
+
+    summary = (
+        f"{_escape(patient.name)}, {patient.age}-year-old {_escape(patient.gender.lower())}, "
+        f"admitted {patient.admission_date:%Y-%m-%d} with "
+        f"{_escape(patient.primary_diagnosis)}"
+    )
+    if patient.comorbidities:
+        summary += f"; comorbidities: {_escape(', '.join(patient.comorbidities))}"
+    summary += (
+        f". Mobility: {_escape(patient.mobility_level)}. "
+        f"ADLs: {_escape(patient.adl_independence)}. "
+        f"Cognition: {_escape(patient.cognitive_status)}. "
+        f"Vitals: BP {_escape(patient.blood_pressure)}, HR {patient.heart_rate}, "
+        f"T {patient.temperature}°F, SpO2 {patient.oxygen_saturation}%, "
+        f"pain {patient.pain_level}/10."
+    )
+
+    diagnoses = [template.nursing_diagnosis for template in templates]
+    if fall_precautions:
+        diagnoses.append("Risk for falls")
+    if assessment.pressure_injury_risk.level != "No Risk":
+        diagnoses.append("Risk for pressure injury")
+    if patient.pain_level >= PAIN_REASSESS_THRESHOLD:
+        diagnoses.append("Acute or chronic pain")
+
+    interventions = [item for template in templates for item in template.interventions]
+    if fall_precautions:
+        interventions.append(
+            "Fall precautions: bed low and locked, call light in reach, hourly rounding"
+        )
+    interventions.append("Reposition at least every 2 hours if unable to do so independently")
+
+    vitals_frequency = VITALS_FREQUENCY.get(acuity, ROUTINE_VITALS_FREQUENCY)
+    monitoring = [f"Vital signs: {vitals_frequency}"]
+    monitoring += [
+        f"{flag.vital} ({flag.value}, {flag.message.lower()}): recheck at each vitals check "
+        "and report persistent abnormal values"
+        for flag in assessment.vital_sign_flags
+    ]
+    if patient.pain_level >= PAIN_REASSESS_THRESHOLD:
+        monitoring.append("Pain: reassess within 1 hour of each intervention")
+    monitoring += [item for template in templates for item in template.monitoring]
+
+    precautions = []
+    if patient.allergies:
+        precautions.append(f"Allergies: {', '.join(patient.allergies)}")
+    precautions += [
+        f"Medication {issue.kind} ({issue.severity}): {' + '.join(issue.medications)} - "
+        f"{issue.message}. {issue.action}"
+        for issue in medication_index.check(patient.current_medications, patient.allergies).issues
+    ]
+    if patient.isolation_precautions:
+        precautions.append(f"Isolation: {patient.isolation_precautions}")
+    if patient.diet_restrictions:
+        precautions.append(f"Diet: {patient.diet_restrictions}")
+    if patient.fall_risk_factors:
+        precautions.append(f"Fall risk factors: {', '.join(patient.fall_risk_factors)}")
+    precautions = precautions or ["Standard precautions"]
+
+    education = [item for template in templates for item in template.education]
+    education += ["Medication purposes and side effects", "Fall prevention at home"]
+
+    sections = [
+        FALLBACK_NOTICE.format(reason=_escape(reason)),
+        f"<h1>Care Plan: {_escape(patient.name)}</h1>",
+        f"<h2>Patient Summary</h2><p>{summary}</p>",
+        f"<h2>Nursing Diagnoses</h2>{_items(diagnoses)}",
+        "<h2>Goals</h2><h3>Short-term (1 week)</h3>"
+        + _items([template.short_term_goal for template in templates])
+        + "<h3>Long-term (by discharge)</h3>"
+        + _items([template.long_term_goal for template in templates]),
+        "<h2>Interventions</h2><h3>Medication Administration</h3>"
+        + _items(medication_checks(patient) or ["No current medications documented"])
+        + f"<h3>Nursing Interventions</h3>{_items(interventions)}",
+        render_risk_assessment_html(assessment),
+        f"<h2>Monitoring Schedule</h2>{_items(monitoring)}",
+        "<h2>Discharge Planning</h2>"
+        + _items(
+            [
+                "Interdisciplinary review of discharge goals weekly",
+                f"Equipment and support needs for mobility: {patient.mobility_level}",
+                "Medication reconciliation before discharge",
+            ]
+        ),
+        f"<h2>Special Precautions</h2>{_items(precautions)}",
+        f"<h2>Family Education</h2>{_items(education)}",
+    ]
+    return "".join(sections)
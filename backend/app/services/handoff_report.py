@@ -0,0 +1,354 @@
+"""
+Shift handoff report - Unit-level priorities summarized from stored care plans.
+Key items are extracted from each plan locally, patients are grouped into
+content-defined chunks that are summarized in parallel and cached, and the
+chunk summaries are assembled into one report without a final model call.
+"""
+
+import asyncio
+import hashlib
+import html
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+
+from anthropic import APIError
+
+from app.config import settings
+from app.models import CarePlanOutput, HandoffReport, PatientInput
+from app.services.care_plan_service import GenerationAbortedError, wrap_care_plan_html
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.claude_client import CompletionResult, claude_client
+from app.services.generation_scheduler import generation_scheduler
+from app.services.html_sanitizer import plan_sections
+from app.services.plan_markup import MARKUP_SYNTAX, StreamingMarkupRenderer
+from app.services.plan_store import PlanStore, plan_store
+from app.services.risk_scoring import ACUITY_ELEVATED, ACUITY_HIGH, acuity_level, assess_patient
+from app.services.usage_ledger import QuotaExceededError
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+# A patient ends a chunk when its name hash is 0 mod this (average chunk size)
+CHUNK_TARGET_PATIENTS = 6
+CHUNK_MAX_PATIENTS = 12
+CHUNK_SUMMARY_MAX_TOKENS = 1500
+CHUNK_CACHE_SIZE = 512
+# Plan items carried per section into the chunk prompt
+MAX_ITEMS_PER_SECTION = 4
+ELEVATED_RISK_LEVELS = frozenset({"High", "Very High"})
+ACUITY_LABELS = {ACUITY_HIGH: "High", ACUITY_ELEVATED: "Elevated"}
+
+HANDOFF_SYSTEM_PROMPT = """You are a charge nurse in a skilled nursing facility writing a concise shift handoff.
+Summarize only the facts provided; do not invent findings, orders or values.
+Lead with what the next shift must act on or watch for."""
+
+CHUNK_PROMPT_TEMPLATE = """Write handoff notes for these patients, in the order given.
+
+{patients}
+
+For each patient write a "### " heading with the patient's name, then 2-4 short bullets: the top priorities for the next shift, the precautions that must not be missed, and what to escalate.
+
+{markup}"""
+
+_LIST_ITEM = re.compile(r"<li[^>]*>(.*?)</li>", re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r"<[^>]+>")
+_WHITESPACE = re.compile(r"\s+")
+
+CHUNK_FINGERPRINT = hashlib.sha256(
+    "\0".join((claude_client.model, HANDOFF_SYSTEM_PROMPT, CHUNK_PROMPT_TEMPLATE)).encode()
+).hexdigest()[:16]
+
+
+def _text(fragment: str) -> str:
+    """Plain text of an HTML fragment."""
+    return html.unescape(_WHITESPACE.sub(" ", _TAGS.sub(" ", fragment)).strip())
+
+
+def plan_section_items(care_plan_html: str) -> dict[str, list[str]]:
+    """
+    List items of each required section of a plan.
+
+    Args:
+        care_plan_html: Stored plan HTML
+
+    Returns:
+        Section name to the plain text of its <li> items, in order
+    """
+    items: dict[str, list[str]] = {}
+    for sections, section_html in plan_sections(care_plan_html):
+        texts = [text for text in map(_text, _LIST_ITEM.findall(section_html)) if text]
+        for section in sections:
+            items.setdefault(section, []).extend(texts)
+    return items
+
+
+@dataclass(frozen=True)
+class HandoffItems:
+    """Key facts for one patient, extracted locally from their input and plan."""
+
+    patient_name: str
+    primary_diagnosis: str
+    acuity: int
+    risks: tuple[str, ...]
+    diagnoses: tuple[str, ...]
+    precautions: tuple[str, ...]
+
+    @property
+    def digest(self) -> str:
+        """Hash of the items; a chunk is re-summarized only when one changes."""
+        return hashlib.sha256(repr(self).encode()).hexdigest()
+
+    @property
+    def name_hash(self) -> int:
+        """Stable position of the patient, independent of their clinical data."""
+        return int.from_bytes(hashlib.sha256(self.patient_name.encode()).digest()[:8], "big")
+
+    def prompt_block(self) -> str:
+        """The patient's items as plain text for the chunk prompt."""
+        acuity = ACUITY_LABELS.get(self.acuity, "Routine")
+        return "\n".join(
+            (
+                f"PATIENT: {self.patient_name} | {self.primary_diagnosis} | Acuity: {acuity}",
+                f"- Risks: {'; '.join(self.risks) or 'none flagged'}",
+                f"- Nursing diagnoses: {'; '.join(self.diagnoses) or 'not listed'}",
+                f"- Precautions: {'; '.join(self.precautions) or 'none listed'}",
+            )
+        )
+
+
+def extract_items(patient: PatientInput, plan: CarePlanOutput) -> HandoffItems:
+    """
+    Extract a patient's handoff items without a model call.
+
+    Risks come from the local risk scores; nursing diagnoses and special
+    precautions from the stored plan; isolation, allergies and diet from
+    the patient input.
+    """
+    assessment = assess_patient(patient)
+    risks = [
+        f"{risk.scale} {risk.score} ({risk.level})"
+        for risk in (assessment.fall_risk, assessment.pressure_injury_risk)
+        if risk.level in ELEVATED_RISK_LEVELS
+    ]
+    risks.extend(
+        f"{flag.vital} {flag.value}: {flag.message} [{flag.severity}]"
+        for flag in assessment.vital_sign_flags
+    )
+    sections = plan_section_items(plan.care_plan_html)
+    precautions = []
+    if patient.isolation_precautions:
+        precautions.append(f"Isolation: {patient.isolation_precautions}")
+    if patient.allergies:
+        precautions.append(f"Allergies: {', '.join(patient.allergies)}")
+    if patient.diet_restrictions:
+        precautions.append(f"Diet: {patient.diet_restrictions}")
+    precautions.extend(sections.get("Special Precautions", [])[:MAX_ITEMS_PER_SECTION])
+    return HandoffItems(
+        patient_name=patient.name,
+        primary_diagnosis=patient.primary_diagnosis,
+        acuity=acuity_level(patient),
+        risks=tuple(risks),
+        diagnoses=tuple(sections.get("Nursing Diagnoses", [])[:MAX_ITEMS_PER_SECTION]),
+        precautions=tuple(precautions),
+    )
+
+
+def chunk_patients(
+    items: list[HandoffItems],
+    target: int = CHUNK_TARGET_PATIENTS,
+    max_size: int = CHUNK_MAX_PATIENTS,
+) -> list[list[HandoffItems]]:
+    """
+    Group patients into content-defined chunks.
+
+    Patients are ordered by a hash of their name and a chunk ends after
+    each patient whose hash is 0 mod target, so boundaries depend only on
+    which patients are present: admitting, discharging or updating one
+    patient changes only the chunk it falls in (or splits it, or merges it
+    with its neighbour).
+
+    Args:
+        items: Extracted items, one per patient
+        target: Average chunk size
+        max_size: Hard cap on chunk size
+
+    Returns:
+        Chunks in name-hash order
+    """
+    chunks: list[list[HandoffItems]] = [[]]
+    for item in sorted(items, key=lambda item: (item.name_hash, item.patient_name)):
+        chunks[-1].append(item)
+        if item.name_hash % target == 0 or len(chunks[-1]) >= max_size:
+            chunks.append([])
+    return [chunk for chunk in chunks if chunk]
+
+
+def chunk_key(facility: str, chunk: list[HandoffItems]) -> str:
+    """Cache key of a chunk summary: the prompt version plus every patient's items."""
+    digests = "".join(item.digest for item in chunk)
+    return hashlib.sha256(f"{CHUNK_FINGERPRINT}\0{facility}\0{digests}".encode()).hexdigest()
+
+
+def render_chunk_locally(chunk: list[HandoffItems]) -> str:
+    """List a chunk's extracted items as HTML, for when no model summary is available."""
+    parts = []
+    for item in chunk:
+        lines = (
+            ("Risks", item.risks),
+            ("Nursing diagnoses", item.diagnoses),
+            ("Precautions", item.precautions),
+        )
+        entries = "".join(
+            f"<li><strong>{label}:</strong> {html.escape('; '.join(values))}</li>"
+            for label, values in lines
+            if values
+        )
+        parts.append(
+            f"<h3>{html.escape(item.patient_name)} &mdash; "
+            f"{html.escape(item.primary_diagnosis)}</h3><ul>{entries}</ul>"
+        )
+    return "".join(parts)
+
+
+def render_priorities(items: list[HandoffItems]) -> str:
+    """Table of elevated and high acuity patients, most acute first."""
+    urgent = sorted(
+        (item for item in items if item.acuity >= ACUITY_ELEVATED),
+        key=lambda item: (-item.acuity, item.patient_name),
+    )
+    if not urgent:
+        return "<h2>Highest Priority</h2><p>No patients with abnormal vitals or severe pain.</p>"
+    rows = "".join(
+        f"<tr><td>{html.escape(item.patient_name)}</td><td>{ACUITY_LABELS[item.acuity]}</td>"
+        f"<td>{html.escape(item.primary_diagnosis)}</td>"
+        f"<td>{html.escape('; '.join(item.risks))}</td></tr>"
+        for item in urgent
+    )
+    return (
+        "<h2>Highest Priority</h2><table><thead><tr><th>Patient</th><th>Acuity</th>"
+        f"<th>Diagnosis</th><th>Risks</th></tr></thead><tbody>{rows}</tbody></table>"
+    )
+
+
+class HandoffReportBuilder:
+    """Builds handoff reports, caching each chunk's summary by its content."""
+
+    def __init__(self, store: PlanStore, cache_size: int = CHUNK_CACHE_SIZE) -> None:
+        """
+        Initialize the builder.
+
+        Args:
+            store: Plan store the reports are built from
+            cache_size: Chunk summaries kept (least recently used are dropped)
+        """
+        self.store = store
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task[str]] = {}
+
+    async def build(self, facility: str, summarize: bool = True) -> HandoffReport | None:
+        """
+        Build the handoff report for a facility.
+
+        Args:
+            facility: Facility name
+            summarize: Summarize chunks with the model; False lists the extracted items
+
+        Returns:
+            HandoffReport, or None if the facility has no stored plans
+        """
+        plans = await asyncio.to_thread(self.store.latest_plans, facility)
+        if not plans:
+            return None
+        items = [extract_items(patient, plan) for patient, plan in plans]
+        chunks = chunk_patients(items)
+        keys = [chunk_key(facility, chunk) for chunk in chunks]
+        cached = sum(1 for key in keys if key in self._cache)
+        if summarize:
+            summaries = await asyncio.gather(
+                *(
+                    self._summary(facility, key, chunk)
+                    for key, chunk in zip(keys, chunks, strict=True)
+                )
+            )
+        else:
+            summaries = [None] * len(chunks)
+        bodies = [
+            summary if summary is not None else render_chunk_locally(chunk)
+            for summary, chunk in zip(summaries, chunks, strict=True)
+        ]
+        local = summaries.count(None)
+        logger.info(
+            f"Handoff report | Facility={facility} | Patients={len(items)} | "
+            f"Chunks={len(chunks)} | Cached={cached} | Local={local}"
+        )
+        generated_at = datetime.utcnow().isoformat() + "Z"
+        report_html = (
+            f"<h1>Shift Handoff &mdash; {html.escape(facility)}</h1>"
+            f"<p>{len(items)} patients &middot; {generated_at}</p>"
+            f"{render_priorities(items)}<h2>Patients</h2>{''.join(bodies)}"
+        )
+        return HandoffReport(
+            facility=facility,
+            generated_at=generated_at,
+            patient_count=len(items),
+            chunk_count=len(chunks),
+            cached_chunks=cached,
+            local_chunks=local,
+            report_html=wrap_care_plan_html(report_html),
+        )
+
+    async def _summary(self, facility: str, key: str, chunk: list[HandoffItems]) -> str | None:
+        """Cached or newly generated summary of a chunk; None if generation failed."""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                generation_scheduler.run(
+                    partial(self._summarize_chunk, facility, chunk), facility=facility
+                )
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        try:
+            summary = await asyncio.shield(task)
+        except (APIError, CircuitOpenError, GenerationAbortedError, QuotaExceededError) as e:
+            logger.warning(f"Handoff chunk summary failed, listing items | Reason={e}")
+            return None
+        self._cache[key] = summary
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return summary
+
+    async def _summarize_chunk(self, facility: str, chunk: list[HandoffItems]) -> str:
+        """Summarize one chunk with the model, rendering its markup to HTML."""
+        renderer = StreamingMarkupRenderer()
+        parts: list[str] = []
+        stream = claude_client.stream_completion(
+            system_prompt=HANDOFF_SYSTEM_PROMPT,
+            user_prompt=CHUNK_PROMPT_TEMPLATE.format(
+                patients="\n\n".join(item.prompt_block() for item in chunk), markup=MARKUP_SYNTAX
+            ),
+            max_tokens=CHUNK_SUMMARY_MAX_TOKENS,
+            facility=facility,
+        )
+        try:
+            async for item in stream:
+                if isinstance(item, CompletionResult):
+                    continue
+                parts.append(renderer.feed(item))
+                if renderer.abort_reason:
+                    raise GenerationAbortedError(renderer.abort_reason)
+        finally:
+            await stream.aclose()
+        parts.append(renderer.close())
+        return "".join(parts)
+
+
+# Global handoff report builder instance
+handoff_report_builder = HandoffReportBuilder(plan_store)
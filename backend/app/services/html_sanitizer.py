@@ -0,0 +1,250 @@
+"""
+Streaming HTML sanitizer and structure validator for model output.
+Runs once over the token stream: strips anything outside the allow-list,
+tracks required care plan sections and flags broken or truncated output.
+"""
+
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+
+from app.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+ALLOWED_TAGS = frozenset(
+    {
+        "h1", "h2", "h3", "h4", "p", "br", "hr", "div", "span", "section",
+        "ul", "ol", "li", "strong", "em", "b", "i", "u", "small", "sub", "sup",
+        "blockquote", "table", "caption", "thead", "tbody", "tfoot", "tr", "th", "td",
+    }
+)  # fmt: skip
+VOID_TAGS = frozenset({"br", "hr"})
+# Elements whose content is dropped together with the tag
+DROP_CONTENT_TAGS = frozenset({"script", "style", "iframe", "object", "embed", "head", "title"})
+ALLOWED_ATTRIBUTES = frozenset({"class", "style", "colspan", "rowspan", "scope"})
+UNSAFE_STYLE = re.compile(r"url\s*\(|expression\s*\(|javascript:|@import", re.IGNORECASE)
+HEADING_TAGS = frozenset({"h1", "h2", "h3"})
+# Markdown code fences some generations wrap the HTML in
+CODE_FENCE = re.compile(r"^[ \t]*```[\w-]*[ \t]*$\n?", re.MULTILINE)
+SECTION_HEADING = re.compile(r"(<h2[^>]*>.*?</h2>)", re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r"<[^>]+>")
+
+REQUIRED_SECTIONS = (
+    "Patient Summary",
+    "Nursing Diagnoses",
+    "Goals",
+    "Interventions",
+    "Risk Assessments",
+    "Monitoring Schedule",
+    "Discharge Planning",
+    "Special Precautions",
+    "Family Education",
+)
+
+# Output this long without a single allowed tag is not an HTML care plan
+EARLY_ABORT_CHARS = 2000
+
+
+def match_sections(heading: str) -> set[str]:
+    """Required sections named by a heading's text."""
+    heading = " ".join(heading.split()).lower()
+    return {name for name in REQUIRED_SECTIONS if name.lower() in heading}
+
+
+def plan_sections(care_plan_html: str) -> list[tuple[set[str], str]]:
+    """
+    Split plan HTML at its <h2> headings.
+
+    Args:
+        care_plan_html: Plan HTML (a wrapper's <style> block is skipped)
+
+    Returns:
+        (required sections named by the heading, HTML from the heading up
+        to the next one) pairs; content before the first heading is dropped
+    """
+    parts = SECTION_HEADING.split(care_plan_html.split("</style>")[-1])
+    return [
+        (match_sections(unescape(TAG.sub(" ", heading))), heading + body)
+        for heading, body in zip(parts[1::2], parts[2::2], strict=True)
+    ]
+
+
+def structure_warnings(
+    sections_found: set[str], stop_reason: str | None, removed_markup: set[str] | None = None
+) -> list[str]:
+    """
+    Describe structural problems in a rendered plan.
+
+    Args:
+        sections_found: Required sections whose headings were seen
+        stop_reason: Stop reason reported by the model
+        removed_markup: Disallowed tags or attributes that were stripped
+
+    Returns:
+        Human-readable warnings (empty for a complete, well-formed plan)
+    """
+    warnings = []
+    if stop_reason == "max_tokens":
+        warnings.append("Care plan was truncated at the output token limit")
+    missing = [name for name in REQUIRED_SECTIONS if name not in sections_found]
+    if missing:
+        warnings.append(f"Missing sections: {', '.join(missing)}")
+    if removed_markup:
+        warnings.append(f"Removed disallowed markup: {', '.join(sorted(removed_markup))}")
+    return warnings
+
+
+class StreamingHtmlSanitizer(HTMLParser):
+    """
+    Incremental sanitizer that accepts model output chunk by chunk.
+
+    Each call to feed() returns the sanitized HTML that is complete so far,
+    so the whole pass is linear in the size of the output. Structural
+    problems are collected as warnings; output that is clearly not a care
+    plan sets abort_reason so the caller can stop the generation early.
+    """
+
+    def __init__(self, preserved_comments: frozenset[str] = frozenset()) -> None:
+        """
+        Initialize the sanitizer.
+
+        Args:
+            preserved_comments: Exact comments (e.g. insertion markers) to keep
+        """
+        super().__init__(convert_charrefs=True)
+        self.preserved_comments = preserved_comments
+        self.abort_reason: str | None = None
+        self.sections_found: set[str] = set()
+        self.removed_tags: set[str] = set()
+        self._out: list[str] = []
+        self._text: list[str] = []
+        self._open: list[str] = []
+        self._drop_depth = 0
+        self._heading_text: list[str] | None = None
+        self._chars_seen = 0
+        self._tags_seen = 0
+
+    def feed(self, data: str) -> str:  # type: ignore[override]
+        """
+        Feed the next chunk of model output.
+
+        Returns:
+            Sanitized HTML completed by this chunk (may be empty)
+        """
+        self._chars_seen += len(data)
+        super().feed(data)
+        if not self._tags_seen and self._chars_seen > EARLY_ABORT_CHARS:
+            self.abort_reason = f"No HTML markup in the first {EARLY_ABORT_CHARS} characters"
+        return self._take()
+
+    def close(self) -> str:  # type: ignore[override]
+        """
+        Flush buffered input and close any elements left open.
+
+        Returns:
+            The remaining sanitized HTML
+        """
+        super().close()
+        self._flush_text()
+        self._close_open_tags(None)
+        return self._take()
+
+    def warnings(self, stop_reason: str | None = None) -> list[str]:
+        """
+        Describe structural problems found in the output.
+
+        Args:
+            stop_reason: Stop reason reported by the model
+
+        Returns:
+            Human-readable warnings (empty for a complete, well-formed plan)
+        """
+        return structure_warnings(self.sections_found, stop_reason, self.removed_tags)
+
+    def _take(self) -> str:
+        """Return and clear the sanitized output collected so far."""
+        output = "".join(self._out)
+        self._out.clear()
+        return output
+
+    def _flush_text(self) -> None:
+        """Emit buffered text, escaped and with code fences removed."""
+        if not self._text:
+            return
+        text = CODE_FENCE.sub("", "".join(self._text))
+        self._text.clear()
+        if self._heading_text is not None:
+            self._heading_text.append(text)
+        self._out.append(escape(text, quote=False))
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Emit allowed start tags with filtered attributes."""
+        if tag in DROP_CONTENT_TAGS:
+            self.removed_tags.add(tag)
+            self._drop_depth += 1
+            return
+        if self._drop_depth:
+            return
+        self._flush_text()
+        if tag not in ALLOWED_TAGS:
+            self.removed_tags.add(tag)
+            return
+        self._tags_seen += 1
+        kept = []
+        for name, value in attrs:
+            unsafe_style = name == "style" and UNSAFE_STYLE.search(value or "")
+            if name not in ALLOWED_ATTRIBUTES or unsafe_style:
+                self.removed_tags.add(f"{tag}[{name}]")
+                continue
+            kept.append(f' {name}="{escape(value or "", quote=True)}"')
+        self._out.append(f"<{tag}{''.join(kept)}>")
+        if tag in VOID_TAGS:
+            return
+        self._open.append(tag)
+        if tag in HEADING_TAGS:
+            self._heading_text = []
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Treat self-closing tags as void elements."""
+        self.handle_starttag(tag, attrs)
+        if tag in ALLOWED_TAGS and tag not in VOID_TAGS and not self._drop_depth:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        """Emit end tags, closing any unclosed children first."""
+        if tag in DROP_CONTENT_TAGS:
+            self._drop_depth = max(0, self._drop_depth - 1)
+            return
+        if self._drop_depth or tag not in self._open:
+            return
+        self._flush_text()
+        self._close_open_tags(tag)
+
+    def _close_open_tags(self, tag: str | None) -> None:
+        """Close open elements down to the innermost `tag` (all of them for None)."""
+        while self._open:
+            open_tag = self._open.pop()
+            self._out.append(f"</{open_tag}>")
+            if open_tag in HEADING_TAGS:
+                self._record_heading()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        """Buffer text until the next tag so fences split across chunks are caught."""
+        if not self._drop_depth:
+            self._text.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        """Keep only the preserved marker comments."""
+        comment = f"<!--{data}-->"
+        if comment in self.preserved_comments and not self._drop_depth:
+            self._flush_text()
+            self._out.append(comment)
+
+    def _record_heading(self) -> None:
+        """Match a completed heading against the required sections."""
+        self.sections_found |= match_sections("".join(self._heading_text or []))
+        self._heading_text = None
@@ -0,0 +1,98 @@
+"""
+Load monitoring for readiness checks.
+Combines the generation scheduler's in-flight and queued counts with a
+rolling window of upstream call outcomes so /ready can tell the load
+balancer to route around a saturated worker.
+"""
+
+import time
+from collections import deque
+
+from app.config import settings
+from app.models import ReadinessResponse
+from app.services.generation_scheduler import GenerationScheduler, generation_scheduler
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+P50 = 0.5
+P95 = 0.95
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index], 1)
+
+
+class LoadMonitor:
+    """Scheduler load plus a rolling window of upstream outcomes."""
+
+    def __init__(self, scheduler: GenerationScheduler, window_seconds: float = 60.0) -> None:
+        """
+        Initialize the monitor.
+
+        Args:
+            scheduler: Scheduler whose in-flight and queued generations are reported
+            window_seconds: How far back upstream outcomes are considered
+        """
+        self.scheduler = scheduler
+        self.window_seconds = window_seconds
+        # (monotonic time, succeeded, latency in ms)
+        self._upstream: deque[tuple[float, bool, float]] = deque()
+
+    def record_upstream(self, succeeded: bool, latency_ms: float) -> None:
+        """Record the outcome of one upstream model call."""
+        now = time.monotonic()
+        self._upstream.append((now, succeeded, latency_ms))
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        """Drop outcomes older than the window."""
+        cutoff = now - self.window_seconds
+        while self._upstream and self._upstream[0][0] < cutoff:
+            self._upstream.popleft()
+
+    def readiness(self) -> ReadinessResponse:
+        """
+        Evaluate the current load against the configured thresholds.
+
+        Returns:
+            ReadinessResponse; `ready` is False with reasons when a threshold is crossed
+        """
+        self._expire(time.monotonic())
+        calls = len(self._upstream)
+        failures = sum(1 for _, succeeded, _ in self._upstream if not succeeded)
+        error_rate = failures / calls if calls else 0.0
+        latencies = sorted(latency for _, succeeded, latency in self._upstream if succeeded)
+        p95 = _percentile(latencies, P95)
+
+        in_flight = self.scheduler.in_flight
+        queue_depth = self.scheduler.queued
+        reasons = []
+        if in_flight >= settings.ready_max_in_flight:
+            reasons.append(f"{in_flight} generations in flight")
+        if queue_depth >= settings.ready_max_queue_depth:
+            reasons.append(f"{queue_depth} requests queued")
+        if calls >= settings.ready_min_upstream_samples:
+            if error_rate >= settings.ready_max_upstream_error_rate:
+                reasons.append(f"Upstream error rate {error_rate:.0%}")
+            if p95 is not None and p95 >= settings.ready_max_upstream_p95_ms:
+                reasons.append(f"Upstream p95 latency {p95:.0f} ms")
+
+        return ReadinessResponse(
+            ready=not reasons,
+            in_flight=in_flight,
+            queue_depth=queue_depth,
+            upstream_calls=calls,
+            upstream_error_rate=round(error_rate, 3),
+            upstream_p50_latency_ms=_percentile(latencies, P50),
+            upstream_p95_latency_ms=p95,
+            reasons=reasons,
+        )
+
+
+# Global load monitor instance
+load_monitor = LoadMonitor(generation_scheduler, window_seconds=settings.ready_window_seconds)
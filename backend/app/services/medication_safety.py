@@ -0,0 +1,208 @@
+"""
+Local medication interaction and allergy cross-check index.
+Loads the bundled interaction table once and checks a medication list against
+itself and the patient's allergies without calling the AI model.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.config import settings
+from app.models import Medication, MedicationCheck, MedicationIssue
+from app.services.vocabulary import normalize_term, vocabulary_index
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+INTERACTIONS_PATH = Path(__file__).resolve().parent.parent / "data" / "medication_interactions.json"
+
+KIND_INTERACTION = "interaction"
+KIND_ALLERGY = "allergy"
+SEVERITY_MAJOR = "major"
+SEVERITY_MODERATE = "moderate"
+SEVERITY_ORDER = {SEVERITY_MAJOR: 0, SEVERITY_MODERATE: 1}
+
+
+@dataclass(frozen=True)
+class InteractionRule:
+    """A pairwise interaction between two drugs or drug classes."""
+
+    severity: str
+    effect: str
+    action: str
+
+
+def _class_key(name: str) -> str:
+    """Index key of a drug class."""
+    return f"class:{normalize_term(name)}"
+
+
+def _drug_key(name: str) -> str:
+    """Index key of a single drug."""
+    return f"drug:{normalize_term(name)}"
+
+
+class MedicationIndex:
+    """Drug classes, interaction pairs and allergy cross-reactions keyed for O(1) lookup."""
+
+    def __init__(self, data: dict, version: str) -> None:
+        """Build the lookup tables from parsed interaction data."""
+        self.version = version
+        # Normalized drug name -> its own key plus the keys of its classes
+        self._drug_keys: dict[str, frozenset[str]] = {}
+        classes: dict[str, set[str]] = {}
+        for class_name, members in data["classes"].items():
+            for member in members:
+                classes.setdefault(normalize_term(member), set()).add(_class_key(class_name))
+        for drug, class_keys in classes.items():
+            self._drug_keys[drug] = frozenset({f"drug:{drug}", *class_keys})
+        class_names = {normalize_term(name) for name in data["classes"]}
+
+        def key(name: str) -> str:
+            return _class_key(name) if normalize_term(name) in class_names else _drug_key(name)
+
+        # Key -> (other key, rule id), in both directions; rule ids follow file order
+        self.rules: list[InteractionRule] = []
+        self._pairs: dict[str, list[tuple[str, int]]] = {}
+        for entry in data["interactions"]:
+            first, second = (key(name) for name in entry["between"])
+            rule_id = len(self.rules)
+            self.rules.append(InteractionRule(entry["severity"], entry["effect"], entry["action"]))
+            self._pairs.setdefault(first, []).append((second, rule_id))
+            if second != first:
+                self._pairs.setdefault(second, []).append((first, rule_id))
+
+        # Normalized allergy -> (keys to avoid, keys with possible cross-sensitivity)
+        self._allergies: dict[str, tuple[frozenset[str], frozenset[str]]] = {
+            normalize_term(allergy): (
+                frozenset(key(name) for name in entry.get("avoid", [])),
+                frozenset(key(name) for name in entry.get("caution", [])),
+            )
+            for allergy, entry in data["allergies"].items()
+        }
+        logger.info(
+            f"Medication index loaded | Version={version} | Drugs={len(self._drug_keys)} | "
+            f"Interactions={len(self.rules)} | Allergies={len(self._allergies)}"
+        )
+
+    @classmethod
+    def from_file(cls, path: Path = INTERACTIONS_PATH) -> "MedicationIndex":
+        """Load and index an interaction table JSON file."""
+        raw = path.read_bytes()
+        data = json.loads(raw)
+        version = f"{data.get('version', 'unversioned')}-{hashlib.sha256(raw).hexdigest()[:8]}"
+        return cls(data, version)
+
+    def drug_keys(self, name: str) -> frozenset[str]:
+        """
+        Index keys of a medication as entered.
+
+        The name is mapped onto its canonical vocabulary term first, so brand
+        names and synonyms resolve; names with trailing strengths or forms
+        ("Metoprolol Tartrate 25mg tab") fall back to their longest known
+        leading words. Unknown names get a key per leading-word prefix, so an
+        allergy written as "Metoprolol" still matches them.
+        """
+        words = normalize_term(vocabulary_index.canonicalize("medications", name)).split(" ")
+        for end in range(len(words), 0, -1):
+            keys = self._drug_keys.get(" ".join(words[:end]))
+            if keys is not None:
+                return keys
+        return frozenset(f"drug:{' '.join(words[:end])}" for end in range(1, len(words) + 1))
+
+    def check(self, medications: list[Medication], allergies: list[str]) -> MedicationCheck:
+        """
+        Cross-check medications against each other and against allergies.
+
+        Each medication is looked up once and paired only with the earlier
+        medications that share an interaction key, so the check is linear in
+        the number of medications for realistic lists.
+
+        Args:
+            medications: Current medications
+            allergies: Documented allergies
+
+        Returns:
+            MedicationCheck with one issue per conflicting medication pair or
+            medication-allergy pair, most severe first
+        """
+        med_keys = [self.drug_keys(med.name) for med in medications]
+
+        # (earlier index, later index) -> first matching rule id
+        pair_rules: dict[tuple[int, int], int] = {}
+        seen: dict[str, list[int]] = {}
+        for position, keys in enumerate(med_keys):
+            for key in keys:
+                for other_key, rule_id in self._pairs.get(key, ()):
+                    for earlier in seen.get(other_key, ()):
+                        pair = (earlier, position)
+                        pair_rules[pair] = min(rule_id, pair_rules.get(pair, rule_id))
+            for key in keys:
+                seen.setdefault(key, []).append(position)
+
+        issues = [
+            MedicationIssue(
+                kind=KIND_INTERACTION,
+                severity=self.rules[rule_id].severity,
+                medications=[medications[first].name, medications[second].name],
+                message=self.rules[rule_id].effect,
+                action=self.rules[rule_id].action,
+            )
+            for (first, second), rule_id in sorted(pair_rules.items(), key=lambda item: item[1])
+        ]
+        issues += self._allergy_issues(medications, med_keys, allergies)
+        issues.sort(key=lambda issue: SEVERITY_ORDER.get(issue.severity, len(SEVERITY_ORDER)))
+        return MedicationCheck(medications_checked=len(medications), issues=issues)
+
+    def _allergy_issues(
+        self, medications: list[Medication], med_keys: list[frozenset[str]], allergies: list[str]
+    ) -> list[MedicationIssue]:
+        """Medications that match an allergy directly or by drug class."""
+        issues = []
+        for allergy in allergies:
+            normalized = normalize_term(vocabulary_index.canonicalize("allergies", allergy))
+            avoid, caution = self._allergies.get(normalized, (frozenset(), frozenset()))
+            # Any allergy written as a drug name conflicts with that drug
+            avoid = avoid | {f"drug:{normalized}"}
+            for med, keys in zip(medications, med_keys, strict=True):
+                if keys & avoid:
+                    issues.append(
+                        MedicationIssue(
+                            kind=KIND_ALLERGY,
+                            severity=SEVERITY_MAJOR,
+                            medications=[med.name],
+                            allergy=allergy,
+                            message=f"{med.name} conflicts with documented allergy to {allergy}",
+                            action="Hold and clarify the order with the prescriber before administration",
+                        )
+                    )
+                elif keys & caution:
+                    issues.append(
+                        MedicationIssue(
+                            kind=KIND_ALLERGY,
+                            severity=SEVERITY_MODERATE,
+                            medications=[med.name],
+                            allergy=allergy,
+                            message=f"Possible cross-sensitivity between {med.name} and {allergy}",
+                            action="Confirm the allergy reaction type; monitor closely after the first dose",
+                        )
+                    )
+        return issues
+
+
+def format_medication_facts(check: MedicationCheck) -> str:
+    """Format a medication check as plain-text facts for the prompt."""
+    if not check.issues:
+        return "- No interactions or allergy conflicts found in the local index"
+    return "\n".join(
+        f"- {issue.severity.capitalize()} {issue.kind}: {' + '.join(issue.medications)}"
+        f"{f' (allergy: {issue.allergy})' if issue.allergy else ''} - {issue.message}. "
+        f"Action: {issue.action}"
+        for issue in check.issues
+    )
+
+
+# Global medication index, built once at import time
+medication_index = MedicationIndex.from_file()
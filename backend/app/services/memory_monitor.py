@@ -0,0 +1,144 @@
+"""
+Memory diagnostics - RSS gauges and tracemalloc snapshot diffs.
+Backs /admin/memory, per-request allocation peaks in memory debug mode and the
+soak test (app/services/soak_test.py).
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from pathlib import Path
+
+from app.config import settings
+from app.models import MemoryReport, MemoryStat
+from app.utils.logger import setup_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+logger = setup_logger(__name__, settings.log_level)
+
+STATM_PATH = Path("/proc/self/statm")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# ru_maxrss is reported in bytes on macOS and KiB elsewhere
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+DEFAULT_TOP_STATS = 15
+# Allocations made by tracemalloc itself are not interesting
+IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        return int(STATM_PATH.read_text().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of the process, or None where unsupported."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT
+
+
+class MemoryMonitor:
+    """tracemalloc control with growth diffs between successive reports."""
+
+    def __init__(self, frames: int = 1) -> None:
+        """
+        Initialize the monitor (tracing is not started).
+
+        Args:
+            frames: Traceback depth recorded per allocation
+        """
+        self.frames = frames
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        """Whether allocations are being traced."""
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        """Start tracing allocations; the next report becomes the baseline."""
+        if not self.tracing:
+            tracemalloc.start(self.frames)
+            self._baseline = None
+            logger.info(f"Memory tracing started | Frames={self.frames}")
+
+    def stop(self) -> None:
+        """Stop tracing and drop the baseline."""
+        if self.tracing:
+            tracemalloc.stop()
+            logger.info("Memory tracing stopped")
+        self._baseline = None
+
+    def report(self, limit: int = DEFAULT_TOP_STATS) -> MemoryReport:
+        """
+        RSS gauges plus, while tracing, the source lines that grew most.
+
+        Each report's snapshot becomes the baseline of the next, so calling
+        this periodically shows what was allocated and kept in between.
+
+        Args:
+            limit: Maximum source lines listed
+
+        Returns:
+            MemoryReport (top_growth is empty for the first snapshot)
+        """
+        report = MemoryReport(
+            rss_bytes=rss_bytes(), peak_rss_bytes=peak_rss_bytes(), tracing=self.tracing
+        )
+        if not report.tracing:
+            return report
+        snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+        report.traced_bytes, report.traced_peak_bytes = tracemalloc.get_traced_memory()
+        with self._lock:
+            baseline, self._baseline = self._baseline, snapshot
+        if baseline is None:
+            return report
+        growth = [stat for stat in snapshot.compare_to(baseline, "lineno") if stat.size_diff > 0]
+        growth.sort(key=lambda stat: stat.size_diff, reverse=True)
+        report.top_growth = [
+            MemoryStat(
+                location=f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                size_bytes=stat.size,
+                size_diff_bytes=stat.size_diff,
+                count=stat.count,
+                count_diff=stat.count_diff,
+            )
+            for stat in growth[:limit]
+        ]
+        return report
+
+    def begin_request(self) -> int | None:
+        """
+        Start measuring a request's peak allocation.
+
+        The traced peak is process-wide, so concurrent requests are counted
+        together; use with serial traffic (memory debug mode).
+
+        Returns:
+            Traced bytes at the start, to pass to request_peak(), or None if not tracing
+        """
+        if not self.tracing:
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def request_peak(self, started_bytes: int) -> int:
+        """Peak bytes allocated above the start of the request."""
+        return max(0, tracemalloc.get_traced_memory()[1] - started_bytes)
+
+
+# Global memory monitor instance
+memory_monitor = MemoryMonitor(frames=settings.memory_trace_frames)
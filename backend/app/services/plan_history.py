@@ -0,0 +1,331 @@
+"""
+Plan history - Every stored plan version per resident, delta-compressed.
+Each version is kept as a compressed delta against the previous one, with a
+full snapshot every few versions, so storage grows with what changed rather
+than with plan size. Any version is rebuilt from the nearest snapshot.
+"""
+
+import difflib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Iterable
+
+from app.config import settings
+from app.models import CarePlanOutput, PlanDiff, PlanHistoryReport, PlanVersionInfo
+from app.services.plan_markup import html_to_markup
+from app.utils.hashing import plan_content_hash
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_history (
+    facility TEXT NOT NULL,
+    patient_name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    snapshot INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    plan_bytes INTEGER NOT NULL,
+    meta_json TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (facility, patient_name, version)
+);
+"""
+# Tokens end after each tag or newline, so deltas work on whole elements even
+# when the model writes a plan on one line
+TOKEN_BOUNDARY = re.compile(r"(?<=[>\n])")
+# Unchanged lines shown around each change in a diff
+DIFF_CONTEXT_LINES = 1
+
+# Delta operations: copy or skip n tokens of the previous version, or insert tokens
+OP_COPY = "c"
+OP_SKIP = "s"
+OP_INSERT = "i"
+
+
+def tokenize(text: str) -> list[str]:
+    """Split plan HTML into tokens that join back to the exact text."""
+    return [token for token in TOKEN_BOUNDARY.split(text) if token]
+
+
+def encode_delta(old: str, new: str) -> list[list]:
+    """
+    Describe `new` as edits of `old`.
+
+    Returns:
+        Operations [OP_COPY, n], [OP_SKIP, n] or [OP_INSERT, tokens], in order
+    """
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    ops: list[list] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([OP_COPY, i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append([OP_SKIP, i2 - i1])
+        if j2 > j1:
+            ops.append([OP_INSERT, new_tokens[j1:j2]])
+    return ops
+
+
+def apply_delta(old: str, ops: Iterable[list]) -> str:
+    """Rebuild a version from the previous one and its delta."""
+    old_tokens = tokenize(old)
+    position = 0
+    parts: list[str] = []
+    for op, value in ops:
+        if op == OP_COPY:
+            parts.extend(old_tokens[position : position + value])
+            position += value
+        elif op == OP_SKIP:
+            position += value
+        else:
+            parts.extend(value)
+    return "".join(parts)
+
+
+def _compress(text: str) -> bytes:
+    """zlib-compress text."""
+    return zlib.compress(text.encode(), 9)
+
+
+def _decompress(payload: bytes) -> str:
+    """Inverse of _compress."""
+    return zlib.decompress(payload).decode()
+
+
+def markup_sections(markup: str) -> dict[str, str]:
+    """Markup body of each "## " section, keyed by heading (text before the first is dropped)."""
+    sections: dict[str, str] = {}
+    heading: str | None = None
+    for line in markup.splitlines():
+        if line.startswith("## "):
+            heading = line[3:].strip()
+            sections[heading] = ""
+        elif heading is not None:
+            sections[heading] += line + "\n"
+    return sections
+
+
+class PlanHistoryStore:
+    """Versioned, delta-compressed plan history in the plan store's database."""
+
+    def __init__(
+        self, db: sqlite3.Connection, lock: threading.Lock, snapshot_interval: int = 10
+    ) -> None:
+        """
+        Create the history table if needed.
+
+        Args:
+            db: Open SQLite connection shared with the plan store
+            lock: Lock guarding the connection
+            snapshot_interval: Versions per full snapshot (1 = no deltas)
+        """
+        self._db = db
+        self._lock = lock
+        self.snapshot_interval = max(snapshot_interval, 1)
+        self._db.executescript(HISTORY_SCHEMA)
+
+    def record(self, facility: str, patient_name: str, plan: CarePlanOutput) -> int:
+        """
+        Append a plan as the resident's next version.
+
+        A plan identical to the latest version is not stored again.
+
+        Args:
+            facility: Facility of the resident
+            patient_name: Resident name
+            plan: Plan to record
+
+        Returns:
+            The version number of the plan
+        """
+        content_hash = plan.content_hash or plan_content_hash(plan)
+        html = plan.care_plan_html
+        with self._lock:
+            latest = self._db.execute(
+                "SELECT version, content_hash FROM plan_history WHERE facility = ? AND "
+                "patient_name = ? ORDER BY version DESC LIMIT 1",
+                (facility, patient_name),
+            ).fetchone()
+            if latest is not None and latest[1] == content_hash:
+                return int(latest[0])
+            version = 1 if latest is None else latest[0] + 1
+
+            snapshot = _compress(html)
+            payload, is_snapshot = snapshot, True
+            if latest is not None and (version - 1) % self.snapshot_interval:
+                previous = self._rebuild(facility, patient_name, {latest[0]})[latest[0]]
+                delta = _compress(json.dumps(encode_delta(previous, html), separators=(",", ":")))
+                # A rewrite can cost more as a delta than as a fresh snapshot
+                if len(delta) < len(snapshot):
+                    payload, is_snapshot = delta, False
+
+            meta = plan.model_copy(update={"care_plan_html": "", "content_hash": content_hash})
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO plan_history (facility, patient_name, version, snapshot, "
+                    "payload, plan_bytes, meta_json, content_hash, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        facility,
+                        patient_name,
+                        version,
+                        int(is_snapshot),
+                        payload,
+                        len(html.encode()),
+                        meta.model_dump_json(),
+                        content_hash,
+                        time.time(),
+                    ),
+                )
+        logger.debug(
+            f"Plan version recorded | Version={version} | Snapshot={is_snapshot} | "
+            f"Bytes={len(payload)}"
+        )
+        return version
+
+    def _rebuild(self, facility: str, patient_name: str, versions: set[int]) -> dict[int, str]:
+        """
+        Rebuild the HTML of several versions in one pass (lock held by caller).
+
+        Starts at the newest snapshot at or before the lowest requested
+        version and applies deltas forward up to the highest one.
+
+        Returns:
+            HTML by version, for the requested versions that exist
+        """
+        low, high = min(versions), max(versions)
+        start = self._db.execute(
+            "SELECT MAX(version) FROM plan_history WHERE facility = ? AND patient_name = ? "
+            "AND snapshot = 1 AND version <= ?",
+            (facility, patient_name, low),
+        ).fetchone()[0]
+        if start is None:
+            return {}
+        rows = self._db.execute(
+            "SELECT version, snapshot, payload FROM plan_history WHERE facility = ? AND "
+            "patient_name = ? AND version BETWEEN ? AND ? ORDER BY version",
+            (facility, patient_name, start, high),
+        )
+        rebuilt: dict[int, str] = {}
+        html = ""
+        for version, is_snapshot, payload in rows:
+            text = _decompress(payload)
+            html = text if is_snapshot else apply_delta(html, json.loads(text))
+            if version in versions:
+                rebuilt[version] = html
+        return rebuilt
+
+    def _meta(self, facility: str, patient_name: str, version: int) -> str | None:
+        """Plan metadata JSON of a version (lock held by caller)."""
+        row = self._db.execute(
+            "SELECT meta_json FROM plan_history WHERE facility = ? AND patient_name = ? "
+            "AND version = ?",
+            (facility, patient_name, version),
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def latest_version(self, facility: str, patient_name: str) -> int | None:
+        """The resident's newest version number, or None without history."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(version) FROM plan_history WHERE facility = ? AND patient_name = ?",
+                (facility, patient_name),
+            ).fetchone()
+        return None if row[0] is None else int(row[0])
+
+    def get(self, facility: str, patient_name: str, version: int) -> CarePlanOutput | None:
+        """
+        Rebuild one version of a resident's plan.
+
+        Returns:
+            The plan as it was stored, or None if the version does not exist
+        """
+        with self._lock:
+            html = self._rebuild(facility, patient_name, {version}).get(version)
+            meta = self._meta(facility, patient_name, version)
+        if html is None or meta is None:
+            return None
+        return CarePlanOutput.model_validate_json(meta).model_copy(update={"care_plan_html": html})
+
+    def report(self, facility: str, patient_name: str) -> PlanHistoryReport | None:
+        """
+        List a resident's versions and their storage cost.
+
+        Returns:
+            PlanHistoryReport, or None without history
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT version, snapshot, length(payload), plan_bytes, meta_json, content_hash "
+                "FROM plan_history WHERE facility = ? AND patient_name = ? ORDER BY version",
+                (facility, patient_name),
+            ).fetchall()
+        if not rows:
+            return None
+        versions = [
+            PlanVersionInfo(
+                version=version,
+                generated_at=CarePlanOutput.model_validate_json(meta_json).generated_at,
+                content_hash=content_hash,
+                snapshot=bool(is_snapshot),
+                stored_bytes=stored_bytes,
+                plan_bytes=plan_bytes,
+            )
+            for version, is_snapshot, stored_bytes, plan_bytes, meta_json, content_hash in rows
+        ]
+        return PlanHistoryReport(
+            facility=facility,
+            patient_name=patient_name,
+            versions=versions,
+            stored_bytes=sum(info.stored_bytes for info in versions),
+            plan_bytes=sum(info.plan_bytes for info in versions),
+        )
+
+    def diff(
+        self, facility: str, patient_name: str, from_version: int, to_version: int
+    ) -> PlanDiff | None:
+        """
+        Compare two versions of a resident's plan as readable markup.
+
+        Both versions are rebuilt in one pass over the delta chain.
+
+        Returns:
+            PlanDiff with the changed section headings and a unified diff,
+            or None if either version does not exist
+        """
+        with self._lock:
+            rebuilt = self._rebuild(facility, patient_name, {from_version, to_version})
+        if from_version not in rebuilt or to_version not in rebuilt:
+            return None
+        before = html_to_markup(rebuilt[from_version])
+        after = html_to_markup(rebuilt[to_version])
+        before_sections, after_sections = markup_sections(before), markup_sections(after)
+        changed = [
+            heading
+            for heading in [*after_sections, *before_sections.keys() - after_sections.keys()]
+            if before_sections.get(heading) != after_sections.get(heading)
+        ]
+        diff = difflib.unified_diff(
+            before.splitlines(),
+            after.splitlines(),
+            f"version {from_version}",
+            f"version {to_version}",
+            n=DIFF_CONTEXT_LINES,
+            lineterm="",
+        )
+        return PlanDiff(
+            facility=facility,
+            patient_name=patient_name,
+            from_version=from_version,
+            to_version=to_version,
+            changed_sections=changed,
+            diff=list(diff),
+        )
@@ -0,0 +1,417 @@
+"""
+Compact plan markup - token-efficient generation format rendered to HTML locally.
+The model writes constrained markdown (headings, lists, tables, bold/italic);
+this module renders it to the same HTML the sanitizer produces, line by line.
+"""
+
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from app.config import settings
+from app.services.html_sanitizer import (
+    CODE_FENCE,
+    EARLY_ABORT_CHARS,
+    StreamingHtmlSanitizer,
+    match_sections,
+    structure_warnings,
+)
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+# Syntax taught to the model; everything else is rendered as paragraph text
+MARKUP_SYNTAX = """Write the plan in this compact markup, not HTML (it is converted to formatted HTML automatically, so do not add tags or styling):
+## Section heading
+### Subsection heading
+- bullet item (indent two spaces per level to nest)
+1. numbered item
+| Column | Column |
+|---|---|
+| cell | cell |
+**bold** and *italic* inline; a blank line separates paragraphs."""
+
+HEADING = re.compile(r"^(#{1,4})\s+(.*?)\s*#*\s*$")
+LIST_ITEM = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+TABLE_ROW = re.compile(r"^\s*\|(.*)\|\s*$")
+TABLE_RULE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+THEMATIC_BREAK = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+STRONG = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+EMPHASIS = re.compile(r"(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])")
+ORDERED_MARKER = re.compile(r"\d")
+WHITESPACE = re.compile(r"\s+")
+BLANK_LINES = re.compile(r"\n{3,}")
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4}
+BLOCK_TAGS = frozenset({"p", "div", "section", "blockquote", "table", "ul", "ol"})
+INLINE_MARKERS = {"strong": "**", "b": "**", "em": "*", "i": "*"}
+SKIPPED_TAGS = frozenset({"style", "script"})
+
+
+def render_inline(text: str) -> str:
+    """Escape text and render **bold** and *italic* spans."""
+    html = escape(text.strip(), quote=False)
+    html = STRONG.sub(r"<strong>\1</strong>", html)
+    return EMPHASIS.sub(r"<em>\1</em>", html)
+
+
+def split_cells(row: str) -> list[str]:
+    """Cells of a |-delimited table row (the outer pipes already removed)."""
+    return [render_inline(cell) for cell in row.split("|")]
+
+
+class _MarkupWriter(HTMLParser):
+    """Converts sanitized plan HTML back to compact markup (see html_to_markup)."""
+
+    def __init__(self) -> None:
+        """Initialize an empty writer."""
+        super().__init__(convert_charrefs=True)
+        self.lines: list[str] = []
+        self._line: list[str] = []
+        self._lists: list[list[int]] = []  # [counter] per open list; -1 for bullets
+        self._row: list[str] | None = None
+        self._header_row = False
+        self._rows_written = 0
+        self._skip = 0
+
+    def _break(self, blank: bool = False) -> None:
+        """End the current line (and leave a blank line after it)."""
+        line = "".join(self._line).rstrip()
+        self._line.clear()
+        if line.strip():
+            self.lines.append(line)
+        if blank and self.lines and self.lines[-1]:
+            self.lines.append("")
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:  # noqa: ARG002
+        """Open block structure and inline markers."""
+        if tag in SKIPPED_TAGS:
+            self._skip += 1
+        elif tag in HEADING_LEVELS:
+            self._break(blank=True)
+            self._line.append("#" * HEADING_LEVELS[tag] + " ")
+        elif tag in {"ul", "ol"}:
+            self._break(blank=not self._lists)
+            self._lists.append([0 if tag == "ol" else -1])
+        elif tag == "li":
+            self._break()
+            depth = max(len(self._lists) - 1, 0)
+            counter = self._lists[-1] if self._lists else [-1]
+            if counter[0] >= 0:
+                counter[0] += 1
+            marker = f"{counter[0]}." if counter[0] >= 0 else "-"
+            self._line.append("  " * depth + marker + " ")
+        elif tag == "tr":
+            self._row = []
+            self._header_row = False
+        elif tag in {"td", "th"}:
+            self._header_row = self._header_row or tag == "th"
+            self._line = []
+        elif tag == "br":
+            self._line.append(" ")
+        elif tag in INLINE_MARKERS:
+            self._line.append(INLINE_MARKERS[tag])
+        elif tag in BLOCK_TAGS:
+            self._break(blank=not self._lists)
+        if tag == "table":
+            self._rows_written = 0
+
+    def handle_endtag(self, tag: str) -> None:
+        """Close block structure and inline markers."""
+        if tag in SKIPPED_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in {"td", "th"} and self._row is not None:
+            self._row.append("".join(self._line).strip().replace("|", "/"))
+            self._line = []
+        elif tag == "tr" and self._row is not None:
+            self.lines.append("| " + " | ".join(self._row) + " |")
+            if self._header_row and not self._rows_written:
+                self.lines.append("|" + "---|" * len(self._row))
+            self._rows_written += 1
+            self._row = None
+        elif tag in {"ul", "ol"}:
+            self._break(blank=len(self._lists) == 1)
+            if self._lists:
+                self._lists.pop()
+        elif tag in INLINE_MARKERS:
+            self._line.append(INLINE_MARKERS[tag])
+        elif tag in HEADING_LEVELS or tag in BLOCK_TAGS:
+            self._break(blank=not self._lists)
+
+    def handle_data(self, data: str) -> None:
+        """Append text with whitespace collapsed."""
+        if self._skip:
+            return
+        text = WHITESPACE.sub(" ", data)
+        if not self._line or self._line[-1].endswith(" "):
+            text = text.lstrip()
+        self._line.append(text)
+
+    def handle_comment(self, data: str) -> None:
+        """Drop comments."""
+
+    def close(self) -> None:
+        """Flush buffered input and the last line."""
+        super().close()
+        self._break()
+
+
+def html_to_markup(care_plan_html: str) -> str:
+    """
+    Convert plan HTML to compact markup.
+
+    Used to send an existing plan back to the model in few tokens (for
+    translations and handouts); the model's markup answer is rendered
+    with StreamingMarkupRenderer.
+
+    Args:
+        care_plan_html: Plan HTML, with or without the styled wrapper
+
+    Returns:
+        Markup with headings, nested lists, tables and bold/italic
+    """
+    writer = _MarkupWriter()
+    writer.feed(care_plan_html)
+    writer.close()
+    return BLANK_LINES.sub("\n\n", "\n".join(writer.lines)).strip()
+
+
+class StreamingMarkupRenderer:
+    """
+    Incremental renderer for compact plan markup.
+
+    Has the same feed()/close()/warnings() interface as
+    StreamingHtmlSanitizer. Complete lines are rendered as they arrive;
+    elements are opened eagerly and closed when the next block starts, so
+    the output so far is always a prefix of the final HTML. Text is always
+    escaped, so no model-supplied markup reaches the page. If the model
+    answers in HTML anyway, the rest of the stream is handed to the HTML
+    sanitizer.
+    """
+
+    def __init__(self, preserved_lines: frozenset[str] = frozenset()) -> None:
+        """
+        Initialize the renderer.
+
+        Args:
+            preserved_lines: Exact lines (e.g. insertion markers) copied to the output
+        """
+        self.preserved_lines = preserved_lines
+        self._abort_reason: str | None = None
+        self._sections_found: set[str] = set()
+        self._html: StreamingHtmlSanitizer | None = None
+        self._format_known = False
+        self._pending = ""
+        self._out: list[str] = []
+        self._paragraph: list[str] = []
+        # Open lists as (indent, tag), innermost last; each has an open <li>
+        self._lists: list[tuple[int, str]] = []
+        self._table_head: list[str] | None = None
+        self._in_table = False
+        self._chars_seen = 0
+        self._blocks_seen = 0
+
+    @property
+    def abort_reason(self) -> str | None:
+        """Why the output should be abandoned, if it clearly is not a care plan."""
+        return self._html.abort_reason if self._html else self._abort_reason
+
+    @property
+    def sections_found(self) -> set[str]:
+        """Required sections whose headings have been rendered."""
+        return self._html.sections_found if self._html else self._sections_found
+
+    def feed(self, data: str) -> str:
+        """
+        Feed the next chunk of model output.
+
+        Returns:
+            HTML completed by this chunk (may be empty)
+        """
+        if self._html:
+            return self._html.feed(data)
+        self._chars_seen += len(data)
+        self._pending += data
+        if not self._format_known and self._detect_html():
+            return self._switch_to_html()
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._render_line(line)
+        if not self._blocks_seen and self._chars_seen > EARLY_ABORT_CHARS:
+            self._abort_reason = f"No plan markup in the first {EARLY_ABORT_CHARS} characters"
+        return self._take()
+
+    def close(self) -> str:
+        """
+        Render the final line and close any elements left open.
+
+        Returns:
+            The remaining HTML
+        """
+        if self._html:
+            return self._html.close()
+        if self._pending:
+            self._render_line(self._pending)
+            self._pending = ""
+        self._close_blocks()
+        return self._take()
+
+    def warnings(self, stop_reason: str | None = None) -> list[str]:
+        """
+        Describe structural problems found in the output.
+
+        Args:
+            stop_reason: Stop reason reported by the model
+
+        Returns:
+            Human-readable warnings (empty for a complete, well-formed plan)
+        """
+        if self._html:
+            return self._html.warnings(stop_reason)
+        return structure_warnings(self._sections_found, stop_reason)
+
+    def _detect_html(self) -> bool:
+        """Decide from the first visible characters whether the model ignored the markup."""
+        head = CODE_FENCE.sub("", self._pending).lstrip()
+        if not head:
+            return False
+        if head.startswith("<"):
+            for line in self.preserved_lines:
+                if line.startswith(head[: len(line)]):
+                    # A marker (or the start of one) is markup, not HTML
+                    self._format_known = len(head) >= len(line)
+                    return False
+            return True
+        self._format_known = True
+        return False
+
+    def _switch_to_html(self) -> str:
+        """Hand the stream to the HTML sanitizer."""
+        logger.info("Model answered in HTML instead of plan markup, sanitizing as HTML")
+        self._html = StreamingHtmlSanitizer(preserved_comments=self.preserved_lines)
+        pending, self._pending = self._pending, ""
+        return self._html.feed(pending)
+
+    def _take(self) -> str:
+        """Return and clear the HTML collected so far."""
+        output = "".join(self._out)
+        self._out.clear()
+        return output
+
+    def _render_line(self, line: str) -> None:
+        """Render one complete line of markup."""
+        stripped = line.strip()
+        if not stripped:
+            self._close_paragraph()
+            self._close_table()
+        elif CODE_FENCE.fullmatch(line):
+            return
+        elif stripped in self.preserved_lines:
+            self._close_blocks()
+            self._out.append(stripped)
+        elif not self._render_block(line, stripped):
+            self._render_text(line, stripped)
+
+    def _render_block(self, line: str, stripped: str) -> bool:
+        """Render a heading, rule, table row or list item; False for plain text."""
+        heading = HEADING.match(stripped)
+        if heading:
+            self._close_blocks()
+            level = len(heading.group(1))
+            self._out.append(f"<h{level}>{render_inline(heading.group(2))}</h{level}>")
+            self._sections_found |= match_sections(heading.group(2))
+            self._blocks_seen += 1
+            return True
+        if THEMATIC_BREAK.match(line):
+            self._close_blocks()
+            self._out.append("<hr>")
+            return True
+        row = TABLE_ROW.match(line)
+        if row:
+            self._close_paragraph()
+            self._close_lists()
+            self._render_table_row(line, row.group(1))
+            return True
+        item = LIST_ITEM.match(line)
+        if item:
+            self._close_paragraph()
+            self._close_table()
+            indent, marker, text = item.groups()
+            tag = "ol" if ORDERED_MARKER.match(marker) else "ul"
+            self._render_list_item(len(indent.expandtabs(2)), tag, text)
+            return True
+        return False
+
+    def _render_text(self, line: str, stripped: str) -> None:
+        """Continue the current list item or paragraph with a line of text."""
+        if self._lists and line[:1].isspace():
+            # Indented continuation of the current list item
+            self._out.append(" " + render_inline(stripped))
+            return
+        self._close_lists()
+        self._close_table()
+        self._paragraph.append(render_inline(stripped))
+
+    def _render_list_item(self, indent: int, tag: str, text: str) -> None:
+        """Open, continue or close lists so the item lands at its indent level."""
+        while self._lists and self._lists[-1][0] > indent:
+            self._out.append(f"</li></{self._lists.pop()[1]}>")
+        if self._lists and self._lists[-1][0] == indent:
+            if self._lists[-1][1] == tag:
+                self._out.append("</li>")
+            else:
+                self._out.append(f"</li></{self._lists.pop()[1]}><{tag}>")
+                self._lists.append((indent, tag))
+        else:
+            self._out.append(f"<{tag}>")
+            self._lists.append((indent, tag))
+        self._out.append(f"<li>{render_inline(text)}")
+        self._blocks_seen += 1
+
+    def _render_table_row(self, line: str, cells: str) -> None:
+        """Buffer the first row until the next line shows whether it is a header."""
+        if self._table_head is not None:
+            head, self._table_head = self._table_head, None
+            self._in_table = True
+            if TABLE_RULE.match(line):
+                header = "".join(f"<th>{cell}</th>" for cell in head)
+                self._out.append(f"<table><thead><tr>{header}</tr></thead><tbody>")
+                return
+            self._out.append("<table><tbody>")
+            self._out.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in head) + "</tr>")
+        elif not self._in_table:
+            self._table_head = split_cells(cells)
+            self._blocks_seen += 1
+            return
+        if TABLE_RULE.match(line):
+            return
+        self._out.append(
+            "<tr>" + "".join(f"<td>{cell}</td>" for cell in split_cells(cells)) + "</tr>"
+        )
+
+    def _close_paragraph(self) -> None:
+        """Emit the buffered paragraph lines as one <p>."""
+        if self._paragraph:
+            self._out.append(f"<p>{' '.join(self._paragraph)}</p>")
+            self._paragraph.clear()
+
+    def _close_lists(self) -> None:
+        """Close every open list."""
+        while self._lists:
+            self._out.append(f"</li></{self._lists.pop()[1]}>")
+
+    def _close_table(self) -> None:
+        """Close the open table, emitting a lone buffered row as a one-row table."""
+        if self._table_head is not None:
+            row = "".join(f"<td>{cell}</td>" for cell in self._table_head)
+            self._out.append(f"<table><tbody><tr>{row}</tr>")
+            self._table_head = None
+            self._in_table = True
+        if self._in_table:
+            self._out.append("</tbody></table>")
+            self._in_table = False
+
+    def _close_blocks(self) -> None:
+        """Close whatever block is open."""
+        self._close_paragraph()
+        self._close_lists()
+        self._close_table()
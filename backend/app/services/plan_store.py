@@ -0,0 +1,287 @@
+"""
+Care plan store - Keeps generated plans keyed by canonical input hash.
+Backed by SQLite (in memory by default) so pre-generated plans can be served
+instantly when the same patient input arrives. Variants derived from a plan
+are kept alongside, keyed by the plan's content hash, and every plan stored
+for a resident is added to their version history.
+"""
+
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+from app.config import settings
+from app.models import CarePlanOutput, CarePlanVariant, PatientInput
+from app.services.plan_history import PlanHistoryStore
+from app.utils.hashing import plan_content_hash
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS care_plans (
+    input_hash TEXT PRIMARY KEY,
+    facility TEXT NOT NULL,
+    patient_name TEXT NOT NULL,
+    plan_json TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    patient_json TEXT,
+    content_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS plan_variants (
+    content_hash TEXT NOT NULL,
+    variant_key TEXT NOT NULL,
+    variant_json TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (content_hash, variant_key)
+);
+"""
+# Columns added after the first release, created on older stores at startup
+ADDED_COLUMNS = ("patient_json", "content_hash")
+
+
+class PlanStore:
+    """SQLite-backed store of generated care plans."""
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        ttl_seconds: float = 24 * 3600,
+        history_snapshot_interval: int = 10,
+    ) -> None:
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite database path, or ":memory:"
+            ttl_seconds: Age after which a stored plan is no longer served
+            history_snapshot_interval: Plan versions per full snapshot in the history
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[str, PatientInput], None]] = []
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(care_plans)")}
+        for column in ADDED_COLUMNS:
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE care_plans ADD COLUMN {column} TEXT")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS care_plans_content_hash ON care_plans (content_hash)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS care_plans_created_at ON care_plans (created_at, input_hash)"
+        )
+        # Version history is kept regardless of the TTL
+        self.history = PlanHistoryStore(self._db, self._lock, history_snapshot_interval)
+
+    def subscribe(self, listener: Callable[[str, PatientInput], None]) -> None:
+        """Call listener(input_hash, patient) whenever a plan is stored."""
+        self._listeners.append(listener)
+
+    def get(self, input_hash: str) -> CarePlanOutput | None:
+        """
+        Look up a fresh plan for an input hash.
+
+        Returns:
+            The stored plan, or None if missing or older than the TTL
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT plan_json, created_at FROM care_plans WHERE input_hash = ?",
+                (input_hash,),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return CarePlanOutput.model_validate_json(row[0])
+
+    def put(
+        self, input_hash: str, patient: PatientInput, plan: CarePlanOutput, source: str
+    ) -> None:
+        """
+        Store (or replace) the plan for an input hash.
+
+        Args:
+            input_hash: Canonical patient input hash
+            patient: Patient the plan was generated for
+            plan: Generated care plan (stored with its content_hash filled in)
+            source: How the plan was produced (interactive, pregenerated)
+        """
+        content_hash = plan.content_hash or plan_content_hash(plan)
+        plan = plan.model_copy(update={"content_hash": content_hash})
+        plan_json = plan.model_dump_json()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO care_plans (input_hash, facility, patient_name, "
+                "plan_json, source, created_at, patient_json, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    input_hash,
+                    patient.facility,
+                    patient.name,
+                    plan_json,
+                    source,
+                    time.time(),
+                    patient.model_dump_json(),
+                    content_hash,
+                ),
+            )
+        self.history.record(patient.facility, patient.name, plan)
+        logger.debug(f"Plan stored | Hash={input_hash[:12]} | Source={source}")
+        for listener in self._listeners:
+            listener(input_hash, patient)
+
+    def get_by_content_hash(self, content_hash: str) -> CarePlanOutput | None:
+        """
+        Look up a fresh plan by its content hash.
+
+        Returns:
+            The stored plan, or None if missing or older than the TTL
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT plan_json, created_at FROM care_plans WHERE content_hash = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (content_hash,),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return CarePlanOutput.model_validate_json(row[0])
+
+    def get_variant(self, content_hash: str, variant_key: str) -> CarePlanVariant | None:
+        """
+        Look up a fresh derived variant of a plan.
+
+        Args:
+            content_hash: Content hash of the source plan
+            variant_key: Variant, language and prompt version
+
+        Returns:
+            The stored variant, or None if missing or older than the TTL
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT variant_json, created_at FROM plan_variants "
+                "WHERE content_hash = ? AND variant_key = ?",
+                (content_hash, variant_key),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return CarePlanVariant.model_validate_json(row[0])
+
+    def put_variant(self, content_hash: str, variant_key: str, variant: CarePlanVariant) -> None:
+        """Store (or replace) a derived variant of a plan."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO plan_variants (content_hash, variant_key, variant_json, "
+                "created_at) VALUES (?, ?, ?, ?)",
+                (content_hash, variant_key, variant.model_dump_json(), time.time()),
+            )
+
+    def iter_patients(self) -> Iterator[tuple[str, PatientInput]]:
+        """
+        Iterate over the patient inputs of fresh stored plans.
+
+        Yields:
+            (input hash, patient) pairs, oldest first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT input_hash, patient_json FROM care_plans "
+                "WHERE patient_json IS NOT NULL AND created_at >= ? ORDER BY created_at",
+                (time.time() - self.ttl_seconds,),
+            ).fetchall()
+        for input_hash, patient_json in rows:
+            yield input_hash, PatientInput.model_validate_json(patient_json)
+
+    def latest_plans(self, facility: str) -> list[tuple[PatientInput, CarePlanOutput]]:
+        """
+        The newest fresh plan of each patient at a facility.
+
+        Args:
+            facility: Facility name
+
+        Returns:
+            (patient, plan) pairs, one per patient name
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT patient_name, patient_json, plan_json FROM care_plans "
+                "WHERE facility = ? AND patient_json IS NOT NULL AND created_at >= ? "
+                "ORDER BY created_at",
+                (facility, time.time() - self.ttl_seconds),
+            ).fetchall()
+        latest = {name: (patient_json, plan_json) for name, patient_json, plan_json in rows}
+        return [
+            (
+                PatientInput.model_validate_json(patient_json),
+                CarePlanOutput.model_validate_json(plan_json),
+            )
+            for patient_json, plan_json in latest.values()
+        ]
+
+    def iter_plan_records(
+        self,
+        facility: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        chunk_size: int = 500,
+    ) -> Iterator[list[tuple[str, str, str, float, CarePlanOutput]]]:
+        """
+        Page through stored plans regardless of the TTL, oldest first.
+
+        Each page is a separate short query (keyset pagination on the
+        creation time), so memory stays bounded by one page and the lock is
+        never held while the caller processes a page.
+
+        Args:
+            facility: Only plans for this facility
+            since: Only plans stored at or after this Unix time
+            until: Only plans stored before this Unix time
+            chunk_size: Plans per page
+
+        Yields:
+            Pages of (input hash, facility, source, stored at, plan) tuples
+        """
+        # Rows after the cursor (created_at, input_hash) of the previous page
+        conditions = ["(created_at > ? OR (created_at = ? AND input_hash > ?))"]
+        filters: list[str | float] = []
+        if facility is not None:
+            conditions.append("facility = ?")
+            filters.append(facility)
+        if until is not None:
+            conditions.append("created_at < ?")
+            filters.append(until)
+        query = (
+            "SELECT input_hash, facility, source, created_at, plan_json FROM care_plans "
+            f"WHERE {' AND '.join(conditions)} ORDER BY created_at, input_hash LIMIT ?"
+        )
+        cursor: tuple[float, str] = (since if since is not None else float("-inf"), "")
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    query, (cursor[0], cursor[0], cursor[1], *filters, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [
+                (
+                    input_hash,
+                    row_facility,
+                    source,
+                    created_at,
+                    CarePlanOutput.model_validate_json(plan_json),
+                )
+                for input_hash, row_facility, source, created_at, plan_json in rows
+            ]
+            cursor = (rows[-1][3], rows[-1][0])
+
+
+# Global plan store instance
+plan_store = PlanStore(
+    settings.plan_store_path,
+    settings.plan_cache_ttl_seconds,
+    settings.plan_history_snapshot_interval,
+)
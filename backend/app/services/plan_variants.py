@@ -0,0 +1,251 @@
+"""
+Plan variants - Family handouts, translations and print versions of stored plans.
+Variants are derived from an existing plan with short prompts over only the
+sections they need (or locally, for print) and cached per plan content hash.
+"""
+
+import asyncio
+import hashlib
+import html
+from datetime import datetime
+from functools import partial
+
+from app.config import settings
+from app.models import CarePlanOutput, CarePlanVariant
+from app.services.care_plan_service import (
+    GenerationAbortedError,
+    unwrap_care_plan_html,
+    wrap_care_plan_html,
+)
+from app.services.claude_client import CompletionResult, claude_client
+from app.services.generation_scheduler import generation_scheduler
+from app.services.html_sanitizer import plan_sections
+from app.services.plan_markup import MARKUP_SYNTAX, StreamingMarkupRenderer, html_to_markup
+from app.services.plan_store import PlanStore, plan_store
+from app.utils.hashing import plan_content_hash
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+VARIANT_FAMILY_HANDOUT = "family-handout"
+VARIANT_TRANSLATION = "translation"
+VARIANT_PRINT = "print"
+VARIANTS = (VARIANT_FAMILY_HANDOUT, VARIANT_TRANSLATION, VARIANT_PRINT)
+
+# Languages offered for translations and handouts, by ISO 639-1 code
+LANGUAGES = {
+    "es": "Spanish",
+    "zh": "Simplified Chinese",
+    "vi": "Vietnamese",
+    "tl": "Tagalog",
+    "ko": "Korean",
+    "ru": "Russian",
+    "ht": "Haitian Creole",
+    "fr": "French",
+}
+
+# Plan sections a family handout is written from
+HANDOUT_SECTIONS = frozenset(
+    {"Patient Summary", "Special Precautions", "Discharge Planning", "Family Education"}
+)
+HANDOUT_MAX_TOKENS = 1500
+
+VARIANT_SYSTEM_PROMPT = """You adapt nursing care plans from a skilled nursing facility for other readers.
+Never add clinical facts, orders, doses or values that are not in the plan you are given."""
+
+HANDOUT_PROMPT_TEMPLATE = """Rewrite these care plan sections as a one-page handout for the family of {name}, in {language}.
+Use plain language at about a 6th-grade reading level and explain any medical terms. Keep every safety instruction and warning sign. Leave out scores, codes and staff-only details.
+Use these sections: ## About the Care Plan, ## How You Can Help, ## Warning Signs to Report to the Nurse, ## Questions to Ask.
+
+CARE PLAN SECTIONS:
+{sections}
+
+{markup}"""
+
+TRANSLATION_PROMPT_TEMPLATE = """Translate this nursing care plan into {language}.
+Keep the markup and structure. Keep medication names, doses, numbers and units exactly as written. Translate every heading and sentence; do not add, remove or summarize content.
+
+{plan}"""
+
+PRINT_STYLES = """
+@page { margin: 15mm; }
+body { font: 11pt/1.45 Georgia, 'Times New Roman', serif; color: #000; margin: 0; }
+.print-header { border-bottom: 2px solid #000; padding-bottom: 6px; margin-bottom: 12px; font-size: 9pt; }
+h1 { font-size: 16pt; margin: 0 0 8px; }
+h2 { font-size: 13pt; border-bottom: 1px solid #555; margin: 16px 0 6px; break-after: avoid; }
+h3 { font-size: 11pt; margin: 10px 0 4px; break-after: avoid; }
+ul, ol { margin: 4px 0 4px 20px; padding: 0; }
+li, tr { break-inside: avoid; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #777; padding: 2px 6px; text-align: left; }
+"""
+
+VARIANT_FINGERPRINT = hashlib.sha256(
+    "\0".join(
+        (
+            claude_client.model,
+            VARIANT_SYSTEM_PROMPT,
+            HANDOUT_PROMPT_TEMPLATE,
+            TRANSLATION_PROMPT_TEMPLATE,
+            MARKUP_SYNTAX,
+        )
+    ).encode()
+).hexdigest()[:16]
+
+
+def variant_key(variant: str, language: str | None) -> str:
+    """Cache key of a variant within its plan: type, language and prompt version."""
+    return f"{variant}:{language or ''}:{VARIANT_FINGERPRINT}"
+
+
+def handout_sections_markup(care_plan_html: str) -> str:
+    """The plan sections a family handout draws on, as compact markup."""
+    selected = [
+        section_html
+        for sections, section_html in plan_sections(care_plan_html)
+        if sections & HANDOUT_SECTIONS
+    ]
+    return html_to_markup("".join(selected))
+
+
+def render_print_html(plan: CarePlanOutput) -> str:
+    """
+    Standalone print document for a plan, rendered locally.
+
+    Args:
+        plan: Stored care plan
+
+    Returns:
+        Complete HTML document with print styles and a header line
+    """
+    name = html.escape(plan.patient_name)
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Care Plan - {name}</title>'
+        f"<style>{PRINT_STYLES}</style></head><body>"
+        f'<div class="print-header"><strong>{name}</strong> &middot; Care plan generated '
+        f"{html.escape(plan.generated_at)} &middot; Printed copy; verify against the current "
+        f"electronic record</div>{unwrap_care_plan_html(plan.care_plan_html)}</body></html>"
+    )
+
+
+class PlanVariantBuilder:
+    """Derives plan variants, reusing stored ones for unchanged plans."""
+
+    def __init__(self, store: PlanStore) -> None:
+        """
+        Initialize the builder.
+
+        Args:
+            store: Plan store where derived variants are cached
+        """
+        self.store = store
+        self._in_flight: dict[tuple[str, str], asyncio.Task[CarePlanVariant]] = {}
+
+    async def get(
+        self, plan: CarePlanOutput, facility: str, variant: str, language: str | None = None
+    ) -> tuple[CarePlanVariant, bool]:
+        """
+        Get a variant of a plan, deriving it on first request.
+
+        Concurrent requests for the same variant share one derivation.
+
+        Args:
+            plan: Source care plan
+            facility: Facility the model call is billed to
+            variant: One of VARIANTS
+            language: Key of LANGUAGES; required for translations
+
+        Returns:
+            Tuple of the variant and whether it came from the cache
+
+        Raises:
+            ValueError: If the variant or language is not supported
+        """
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown variant '{variant}'; choose from {', '.join(VARIANTS)}")
+        if language is not None and language not in LANGUAGES:
+            raise ValueError(
+                f"Unsupported language '{language}'; choose from {', '.join(LANGUAGES)}"
+            )
+        if variant == VARIANT_TRANSLATION and language is None:
+            raise ValueError("Translations need a language")
+        if variant == VARIANT_PRINT:
+            # Rendered locally in microseconds; nothing worth caching
+            return self._variant(plan, variant, None, render_print_html(plan)), False
+
+        content_hash = plan_content_hash(plan)
+        key = variant_key(variant, language)
+        stored = await asyncio.to_thread(self.store.get_variant, content_hash, key)
+        if stored is not None:
+            return stored, True
+        task = self._in_flight.get((content_hash, key))
+        if task is None:
+            task = asyncio.ensure_future(
+                generation_scheduler.run(
+                    partial(self._derive, plan, variant, language, facility), facility=facility
+                )
+            )
+            self._in_flight[(content_hash, key)] = task
+            task.add_done_callback(lambda _: self._in_flight.pop((content_hash, key), None))
+        derived = await asyncio.shield(task)
+        await asyncio.to_thread(self.store.put_variant, content_hash, key, derived)
+        return derived, False
+
+    async def _derive(
+        self, plan: CarePlanOutput, variant: str, language: str | None, facility: str
+    ) -> CarePlanVariant:
+        """Derive a handout or translation with the model."""
+        language_name = LANGUAGES.get(language or "", "English")
+        if variant == VARIANT_FAMILY_HANDOUT:
+            user_prompt = HANDOUT_PROMPT_TEMPLATE.format(
+                name=plan.patient_name,
+                language=language_name,
+                sections=handout_sections_markup(plan.care_plan_html),
+                markup=MARKUP_SYNTAX,
+            )
+            max_tokens = HANDOUT_MAX_TOKENS
+        else:
+            user_prompt = TRANSLATION_PROMPT_TEMPLATE.format(
+                language=language_name, plan=html_to_markup(plan.care_plan_html)
+            )
+            max_tokens = settings.generation_max_tokens
+        logger.info(
+            f"Deriving plan variant | Variant={variant} | Language={language} | "
+            f"Patient={plan.patient_name}"
+        )
+        renderer = StreamingMarkupRenderer()
+        parts: list[str] = []
+        stream = claude_client.stream_completion(
+            system_prompt=VARIANT_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            max_tokens=max_tokens,
+            facility=facility,
+        )
+        try:
+            async for item in stream:
+                if isinstance(item, CompletionResult):
+                    continue
+                parts.append(renderer.feed(item))
+                if renderer.abort_reason:
+                    raise GenerationAbortedError(renderer.abort_reason)
+        finally:
+            await stream.aclose()
+        parts.append(renderer.close())
+        return self._variant(plan, variant, language, wrap_care_plan_html("".join(parts)))
+
+    def _variant(
+        self, plan: CarePlanOutput, variant: str, language: str | None, content_html: str
+    ) -> CarePlanVariant:
+        """Build the response model for derived content."""
+        return CarePlanVariant(
+            variant=variant,
+            language=language,
+            plan_hash=plan_content_hash(plan),
+            patient_name=plan.patient_name,
+            content_html=content_html,
+            generated_at=datetime.utcnow().isoformat() + "Z",
+        )
+
+
+# Global plan variant builder instance
+plan_variant_builder = PlanVariantBuilder(plan_store)
@@ -0,0 +1,175 @@
+"""
+Speculative pre-generation of care plans for upcoming admissions.
+A single background worker generates queued plans only while there is no
+interactive traffic and spare rate-limit budget, and is preempted as soon
+as a nurse requests a plan.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.config import settings
+from app.models import CarePlanOutput, PatientInput, PregenerationStatus
+from app.services.care_plan_service import generate_care_plan, plan_cache_key
+from app.services.circuit_breaker import STATE_OPEN, upstream_circuit
+from app.services.claude_client import claude_client
+from app.services.plan_store import PlanStore, plan_store
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+SOURCE_INTERACTIVE = "interactive"
+SOURCE_PREGENERATED = "pregenerated"
+
+# How often to re-check when the rate-limit budget is too low for background work
+BUDGET_RECHECK_SECONDS = 1.0
+
+
+class PregenerationScheduler:
+    """Background queue that fills the plan store during idle capacity."""
+
+    def __init__(
+        self,
+        store: PlanStore,
+        idle_seconds: float = 5.0,
+        min_rate_limit_tokens: int = 8000,
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            store: Plan store to fill
+            idle_seconds: Quiet period required after the last interactive request
+            min_rate_limit_tokens: Rate-limit budget reserved for interactive calls
+        """
+        self.store = store
+        self.idle_seconds = idle_seconds
+        self.min_rate_limit_tokens = min_rate_limit_tokens
+        self._queue: deque[tuple[str, PatientInput]] = deque()
+        self._queued: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._interactive = 0
+        self._last_interactive = 0.0
+        self._current: asyncio.Task[CarePlanOutput] | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self.completed = 0
+        self.preempted = 0
+        self.failed = 0
+
+    def enqueue(self, patient: PatientInput) -> str:
+        """
+        Queue a patient for pre-generation.
+
+        Returns:
+            "queued", "cached" if a fresh plan is already stored, or
+            "duplicate" if the same input is already queued
+        """
+        key = plan_cache_key(patient)
+        if key in self._queued:
+            return "duplicate"
+        if self.store.get(key) is not None:
+            return "cached"
+        self._queue.append((key, patient))
+        self._queued.add(key)
+        self._wakeup.set()
+        return "queued"
+
+    @asynccontextmanager
+    async def interactive(self) -> AsyncIterator[None]:
+        """Mark an interactive generation, preempting any background generation."""
+        self._interactive += 1
+        self._last_interactive = time.monotonic()
+        if self._current is not None and not self._current.done():
+            self._current.cancel()
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+            self._last_interactive = time.monotonic()
+            self._wakeup.set()
+
+    def status(self) -> PregenerationStatus:
+        """Snapshot of queue depth and outcome counters."""
+        return PregenerationStatus(
+            queue_depth=len(self._queue),
+            running=self._current is not None,
+            completed=self.completed,
+            preempted=self.preempted,
+            failed=self.failed,
+        )
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker, abandoning any background generation."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def _idle_delay(self) -> float:
+        """Seconds to wait before background work may start (0 when idle)."""
+        headroom = claude_client.rate_limit_headroom()
+        throttled = headroom is not None and headroom < self.min_rate_limit_tokens
+        if throttled or upstream_circuit.state == STATE_OPEN:
+            return max(self.idle_seconds, BUDGET_RECHECK_SECONDS)
+        return max(0.0, self._last_interactive + self.idle_seconds - time.monotonic())
+
+    async def _run(self) -> None:
+        """Worker loop: generate one queued plan at a time while idle."""
+        while True:
+            if not self._queue or self._interactive:
+                # Woken by enqueue() or when interactive traffic finishes
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._idle_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            await self._generate_next()
+
+    async def _generate_next(self) -> None:
+        """Generate the plan at the head of the queue, requeueing it if preempted."""
+        key, patient = self._queue.popleft()
+        self._current = asyncio.create_task(generate_care_plan(patient))
+        try:
+            plan = await asyncio.shield(self._current)
+        except asyncio.CancelledError:
+            if not self._current.cancelled():
+                # The worker itself is being stopped
+                self._current.cancel()
+                raise
+            self.preempted += 1
+            self._queue.appendleft((key, patient))
+            logger.info(f"Pre-generation preempted by interactive request | Hash={key[:12]}")
+            return
+        except Exception as e:
+            self.failed += 1
+            self._queued.discard(key)
+            logger.error(f"Pre-generation failed | Hash={key[:12]} | Error={e!s}")
+            return
+        finally:
+            self._current = None
+
+        if not plan.validation_warnings and not plan.is_fallback:
+            self.store.put(key, patient, plan, source=SOURCE_PREGENERATED)
+        self._queued.discard(key)
+        self.completed += 1
+        logger.info(
+            f"Plan pre-generated | Facility={patient.facility} | Queue={len(self._queue)}"
+        )
+
+
+# Global scheduler instance
+pregeneration_scheduler = PregenerationScheduler(
+    plan_store,
+    idle_seconds=settings.pregeneration_idle_seconds,
+    min_rate_limit_tokens=settings.pregeneration_min_rate_limit_tokens,
+)
@@ -0,0 +1,252 @@
+"""
+Request profiling - On-demand and slow-request stack sampling.
+A single background thread samples the event loop thread's stack and probes
+event-loop lag, only while a profiled or slow request is in progress.
+"""
+
+import asyncio
+import hmac
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+
+from app.config import settings
+from app.models import RequestProfile
+from app.utils.logger import log_error, setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+TRIGGER_REQUESTED = "requested"
+TRIGGER_SLOW = "slow"
+
+MAX_STACK_DEPTH = 64
+MILLISECONDS_PER_SECOND = 1000
+
+
+def _fold(frame: FrameType | None) -> str:
+    """Collapse a stack into 'outer;...;inner' frames (flame graph folded format)."""
+    names: list[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+@dataclass(eq=False)
+class ProfileCapture:
+    """Samples collected for one in-progress request."""
+
+    method: str
+    path: str
+    requested: bool
+    started: float
+    slow_at: float | None
+    sampling: bool
+    stacks: Counter[str] = field(default_factory=Counter)
+    samples: int = 0
+    loop_lags: list[float] = field(default_factory=list)
+
+
+class RequestProfiler:
+    """Sampling profiler for individual requests."""
+
+    def __init__(
+        self,
+        token: str | None = None,
+        slow_threshold_ms: float = 0.0,
+        interval_ms: float = 5.0,
+        history_size: int = 20,
+        profile_dir: str | None = None,
+    ) -> None:
+        """
+        Initialize the profiler; the sampling thread starts on first use.
+
+        Args:
+            token: Admin token that enables on-demand profiling (None disables it)
+            slow_threshold_ms: Start sampling requests running longer than this (0 disables)
+            interval_ms: Time between stack samples
+            history_size: Number of recent profiles kept for /admin/profiles
+            profile_dir: Directory to also write profiles to as JSON, if any
+        """
+        self.token = token
+        self.slow_threshold_ms = slow_threshold_ms
+        self.interval = interval_ms / MILLISECONDS_PER_SECOND
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.history: deque[RequestProfile] = deque(maxlen=history_size)
+        self._active: list[ProfileCapture] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._last_sample = 0.0
+        # Send time of the lag probe waiting to run on the event loop, if any
+        self._probe_sent: float | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any request can be profiled."""
+        return bool(self.token or self.slow_threshold_ms)
+
+    def authorized(self, token: str | None) -> bool:
+        """Check an admin token against the configured one."""
+        return bool(self.token and token) and hmac.compare_digest(
+            str(token).encode(), str(self.token).encode()
+        )
+
+    def begin(self, method: str, path: str, token: str | None) -> ProfileCapture | None:
+        """
+        Start watching a request; call on the event loop thread.
+
+        Args:
+            method: HTTP method
+            path: Request path
+            token: X-Profile-Token header value, if sent
+
+        Returns:
+            Capture to pass to finish(), or None when the request is not watched
+        """
+        if not self.enabled:
+            return None
+        requested = token is not None and self.authorized(token)
+        if not requested and not self.slow_threshold_ms:
+            return None
+        now = time.perf_counter()
+        capture = ProfileCapture(
+            method=method,
+            path=path,
+            requested=requested,
+            started=now,
+            slow_at=now + self.slow_threshold_ms / MILLISECONDS_PER_SECOND
+            if self.slow_threshold_ms
+            else None,
+            sampling=requested,
+        )
+        with self._cond:
+            loop = asyncio.get_running_loop()
+            if loop is not self._loop:
+                self._loop, self._probe_sent = loop, None
+            self._loop_thread_id = threading.get_ident()
+            self._active.append(capture)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return capture
+
+    async def finish(self, capture: ProfileCapture, status_code: int) -> RequestProfile | None:
+        """
+        Stop watching a request.
+
+        Args:
+            capture: Capture returned by begin()
+            status_code: Response status
+
+        Returns:
+            The profile if the request was profiled on demand or was slow, else None
+        """
+        duration_ms = (time.perf_counter() - capture.started) * MILLISECONDS_PER_SECOND
+        with self._cond:
+            self._active.remove(capture)
+            if capture.sampling and self._probe_sent is not None:
+                # The loop was still busy when the request finished
+                capture.loop_lags.append(time.perf_counter() - self._probe_sent)
+        if not capture.sampling:
+            return None
+
+        lags_ms = [lag * MILLISECONDS_PER_SECOND for lag in capture.loop_lags]
+        profile = RequestProfile(
+            profile_id=uuid.uuid4().hex[:12],
+            method=capture.method,
+            path=capture.path,
+            trigger=TRIGGER_REQUESTED if capture.requested else TRIGGER_SLOW,
+            status_code=status_code,
+            duration_ms=round(duration_ms, 1),
+            samples=capture.samples,
+            loop_lag_max_ms=round(max(lags_ms), 1) if lags_ms else None,
+            loop_lag_mean_ms=round(sum(lags_ms) / len(lags_ms), 1) if lags_ms else None,
+            stacks=[f"{stack} {count}" for stack, count in capture.stacks.most_common()],
+        )
+        self.history.append(profile)
+        if self.profile_dir is not None:
+            try:
+                await asyncio.to_thread(self._write, profile)
+            except OSError as e:
+                log_error(logger, e, context=f"Profile write | ProfileId={profile.profile_id}")
+        return profile
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        """Look up a recent profile by id."""
+        return next((p for p in self.history if p.profile_id == profile_id), None)
+
+    def _write(self, profile: RequestProfile) -> None:
+        """Write a profile to the profile directory (runs in a worker thread)."""
+        assert self.profile_dir is not None
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"{int(time.time())}-{profile.profile_id}.json"
+        path.write_text(json.dumps(profile.model_dump()), encoding="utf-8")
+
+    def _run(self) -> None:
+        """Sampling thread: idle until a capture is sampling or becomes slow."""
+        with self._cond:
+            while True:
+                now = time.perf_counter()
+                for capture in self._active:
+                    if not capture.sampling and capture.slow_at is not None and now >= capture.slow_at:
+                        capture.sampling = True
+                sampling = [capture for capture in self._active if capture.sampling]
+                if sampling:
+                    if now - self._last_sample >= self.interval:
+                        self._sample(sampling, now)
+                    timeout: float | None = self.interval
+                else:
+                    pending = [c.slow_at for c in self._active if c.slow_at is not None]
+                    timeout = max(min(pending) - now, 0.0) if pending else None
+                self._cond.wait(timeout)
+
+    def _sample(self, captures: list[ProfileCapture], now: float) -> None:
+        """Record the event loop thread's stack and send a lag probe (lock held)."""
+        self._last_sample = now
+        # sys._current_frames is the documented way to sample another thread's stack
+        frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+        if frame is not None:
+            stack = _fold(frame)
+            for capture in captures:
+                capture.stacks[stack] += 1
+                capture.samples += 1
+        if self._probe_sent is None and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._probe_returned)
+            except RuntimeError:
+                return  # Loop closed
+            self._probe_sent = now
+
+    def _probe_returned(self) -> None:
+        """Lag probe callback, run on the event loop once it gets a turn."""
+        with self._cond:
+            if self._probe_sent is None:
+                return
+            lag = time.perf_counter() - self._probe_sent
+            self._probe_sent = None
+            for capture in self._active:
+                if capture.sampling:
+                    capture.loop_lags.append(lag)
+
+
+# Global profiler instance
+request_profiler = RequestProfiler(
+    token=settings.profiling_token,
+    slow_threshold_ms=settings.slow_request_threshold_ms,
+    interval_ms=settings.profile_sample_interval_ms,
+    history_size=settings.profile_history_size,
+    profile_dir=settings.profile_dir,
+)
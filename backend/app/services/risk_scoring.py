@@ -0,0 +1,472 @@
+"""
+Local clinical risk scoring engine.
+Computes Morse-style fall risk, Braden-style pressure injury risk and vital sign
+flags directly from PatientInput, without calling the AI model.
+"""
+
+import html
+import re
+
+from app.models import PatientInput, RiskAssessment, RiskScore, VitalSignFlag
+
+# Keyword groups matched against lowercased free-text fields
+FALL_HISTORY_TERMS = ("history of falls", "recent fall", "previous fall", "fall within")
+AMBULATORY_AID_TERMS = ("walker", "cane", "crutch")
+FURNITURE_TERMS = ("furniture",)
+# Morse "IV/heparin lock" means IV access (a line or saline/heparin lock), not the
+# drug heparin, so only explicit route or line terms count, on word boundaries
+IV_ACCESS_PATTERN = re.compile(
+    r"\b(iv|ivpb|iv push|intravenous|infusion|picc|central line|saline lock|heparin lock|hep lock)\b"
+)
+IMPAIRED_GAIT_TERMS = (
+    "unsteady gait",
+    "impaired mobility",
+    "balance",
+    "shuffling",
+    "impaired gait",
+)
+WEAK_GAIT_TERMS = ("weakness", "deconditioning", "weak")
+COGNITIVE_IMPAIRMENT_TERMS = (
+    "confus",
+    "dementia",
+    "alzheimer",
+    "disorient",
+    "cognitive impairment",
+    "forget",
+    "impulsive",
+    "delirium",
+)
+UNRESPONSIVE_TERMS = ("unresponsive", "comatose", "obtunded")
+SEVERE_COGNITIVE_TERMS = ("nonverbal", "non-verbal", "severe dementia", "severely impaired")
+INCONTINENCE_TERMS = ("incontinen",)
+DIAPHORESIS_TERMS = ("diaphoresis", "sweating", "diaphoretic")
+PARALYSIS_TERMS = ("paralysis", "hemiplegia", "paraplegia", "quadriplegia", "contracture")
+NPO_TERMS = ("npo", "nothing by mouth")
+LIMITED_NUTRITION_TERMS = (
+    "loss of appetite",
+    "weight loss",
+    "difficulty swallowing",
+    "dysphagia",
+    "poor intake",
+    "tube feed",
+    "thickened",
+    "puree",
+)
+EXTENSIVE_ASSIST_TERMS = ("all adl", "extensive", "total assist", "total care", "fully dependent")
+
+BLOOD_PRESSURE_PATTERN = re.compile(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})")
+
+# Morse Fall Scale risk level cut-offs
+MORSE_HIGH_RISK = 45
+MORSE_MODERATE_RISK = 25
+
+# Braden Scale risk level upper bounds, checked in order
+BRADEN_LEVELS = ((9, "Very High"), (12, "High"), (14, "Moderate"), (18, "Mild"))
+
+# Vital sign thresholds
+SYSTOLIC_CRISIS = 180
+DIASTOLIC_CRISIS = 120
+SYSTOLIC_HIGH = 140
+DIASTOLIC_HIGH = 90
+SYSTOLIC_LOW = 90
+SYSTOLIC_CRITICAL_LOW = 80
+HEART_RATE_LOW = 60
+HEART_RATE_HIGH = 100
+HEART_RATE_CRITICAL_LOW = 50
+HEART_RATE_CRITICAL_HIGH = 120
+OXYGEN_SATURATION_LOW = 92
+OXYGEN_SATURATION_CRITICAL = 88
+FEVER_F = 100.4
+FEVER_CRITICAL_F = 103.0
+HYPOTHERMIA_F = 96.8
+HYPOTHERMIA_CRITICAL_F = 95.0
+
+# Acuity levels used to prioritize generation, and the pain levels that raise them
+ACUITY_ROUTINE = 0
+ACUITY_ELEVATED = 1
+ACUITY_HIGH = 2
+PAIN_ELEVATED = 7
+PAIN_SEVERE = 9
+
+# Braden activity and mobility subscores by validated mobility level
+BRADEN_ACTIVITY = {"bedbound": 1, "wheelchair": 2, "walker": 3, "ambulatory": 4}
+BRADEN_MOBILITY = {"bedbound": 2, "wheelchair": 3, "walker": 3, "ambulatory": 4}
+BRADEN_ACTIVITY_LABELS = {
+    1: "bedfast",
+    2: "chairfast",
+    3: "walks occasionally",
+    4: "walks frequently",
+}
+
+
+def _contains_any(text: str, terms: tuple[str, ...]) -> bool:
+    """Check whether any of the terms appears in the text."""
+    return any(term in text for term in terms)
+
+
+def _morse_level(score: int) -> str:
+    """Map a Morse Fall Scale score to a risk level."""
+    if score >= MORSE_HIGH_RISK:
+        return "High"
+    if score >= MORSE_MODERATE_RISK:
+        return "Moderate"
+    return "Low"
+
+
+def _braden_level(score: int) -> str:
+    """Map a Braden Scale score to a risk level."""
+    for upper_bound, level in BRADEN_LEVELS:
+        if score <= upper_bound:
+            return level
+    return "No Risk"
+
+
+def score_fall_risk(patient: PatientInput) -> RiskScore:
+    """
+    Calculate a Morse-style fall risk score.
+
+    Args:
+        patient: Patient input data
+
+    Returns:
+        RiskScore on the Morse Fall Scale (0-125)
+    """
+    factors_text = " | ".join(patient.fall_risk_factors).lower()
+    symptoms_text = " | ".join(patient.symptoms).lower()
+    cognitive_text = patient.cognitive_status.lower()
+    medications_text = " | ".join(
+        f"{med.name} {med.dosage} {med.frequency} " for med in patient.current_medications
+    ).lower()
+
+    score = 0
+    contributing: list[str] = []
+
+    if _contains_any(factors_text, FALL_HISTORY_TERMS):
+        score += 25
+        contributing.append("History of falling (+25)")
+
+    if patient.comorbidities:
+        score += 15
+        contributing.append("Secondary diagnosis (+15)")
+
+    if _contains_any(factors_text, FURNITURE_TERMS):
+        score += 30
+        contributing.append("Ambulatory aid: furniture (+30)")
+    elif patient.mobility_level == "walker" or _contains_any(factors_text, AMBULATORY_AID_TERMS):
+        score += 15
+        contributing.append("Ambulatory aid: crutches/cane/walker (+15)")
+
+    if IV_ACCESS_PATTERN.search(medications_text) or IV_ACCESS_PATTERN.search(factors_text):
+        score += 20
+        contributing.append("IV access/saline or heparin lock (+20)")
+
+    # Bedbound and wheelchair patients score 0 for gait on the Morse scale
+    if patient.mobility_level in ("ambulatory", "walker"):
+        if _contains_any(factors_text, IMPAIRED_GAIT_TERMS):
+            score += 20
+            contributing.append("Gait: impaired (+20)")
+        elif _contains_any(factors_text, WEAK_GAIT_TERMS) or _contains_any(
+            symptoms_text, WEAK_GAIT_TERMS
+        ):
+            score += 10
+            contributing.append("Gait: weak (+10)")
+
+    if _contains_any(cognitive_text, COGNITIVE_IMPAIRMENT_TERMS) or _contains_any(
+        factors_text, COGNITIVE_IMPAIRMENT_TERMS
+    ):
+        score += 15
+        contributing.append("Mental status: forgets limitations (+15)")
+
+    return RiskScore(
+        scale="Morse Fall Scale",
+        score=score,
+        level=_morse_level(score),
+        contributing_factors=contributing,
+    )
+
+
+def _braden_sensory(cognitive_text: str) -> int:
+    """Braden sensory perception subscore (1-4)."""
+    if _contains_any(cognitive_text, UNRESPONSIVE_TERMS):
+        return 1
+    if _contains_any(cognitive_text, SEVERE_COGNITIVE_TERMS):
+        return 2
+    if _contains_any(cognitive_text, COGNITIVE_IMPAIRMENT_TERMS):
+        return 3
+    return 4
+
+
+def _braden_moisture(symptoms_text: str) -> int:
+    """Braden moisture subscore (1-4)."""
+    if _contains_any(symptoms_text, INCONTINENCE_TERMS):
+        return 2
+    if _contains_any(symptoms_text, DIAPHORESIS_TERMS):
+        return 3
+    return 4
+
+
+def _braden_nutrition(diet_text: str, symptoms_text: str) -> int:
+    """Braden nutrition subscore (1-4), defaulting to adequate since intake is rarely documented."""
+    if _contains_any(diet_text, NPO_TERMS):
+        return 1
+    if _contains_any(diet_text, LIMITED_NUTRITION_TERMS) or _contains_any(
+        symptoms_text, LIMITED_NUTRITION_TERMS
+    ):
+        return 2
+    return 3
+
+
+def score_pressure_risk(patient: PatientInput) -> RiskScore:
+    """
+    Calculate a Braden-style pressure injury risk score.
+
+    Args:
+        patient: Patient input data
+
+    Returns:
+        RiskScore on the Braden Scale (6-23, lower is higher risk)
+    """
+    symptoms_text = " | ".join(patient.symptoms + patient.fall_risk_factors).lower()
+    diagnoses_text = " | ".join([patient.primary_diagnosis, *patient.comorbidities]).lower()
+    mobility_level = patient.mobility_level
+
+    sensory = _braden_sensory(patient.cognitive_status.lower())
+    moisture = _braden_moisture(symptoms_text)
+
+    activity = BRADEN_ACTIVITY.get(mobility_level, 4)
+    mobility = BRADEN_MOBILITY.get(mobility_level, 4)
+    if _contains_any(diagnoses_text, PARALYSIS_TERMS) or _contains_any(
+        symptoms_text, PARALYSIS_TERMS
+    ):
+        mobility = max(1, mobility - 1)
+
+    nutrition = _braden_nutrition((patient.diet_restrictions or "").lower(), symptoms_text)
+
+    # Friction and shear
+    if mobility_level == "bedbound":
+        friction = 1
+    elif mobility_level == "wheelchair" or _contains_any(
+        patient.adl_independence.lower(), EXTENSIVE_ASSIST_TERMS
+    ):
+        friction = 2
+    else:
+        friction = 3
+
+    score = sensory + moisture + activity + mobility + nutrition + friction
+    contributing = [
+        f"{label} ({value})"
+        for label, value, maximum in (
+            ("Sensory perception: impaired", sensory, 4),
+            ("Moisture: frequently moist", moisture, 4),
+            (f"Activity: {BRADEN_ACTIVITY_LABELS[activity]}", activity, 4),
+            ("Mobility: limited", mobility, 4),
+            ("Nutrition: probably inadequate", nutrition, 3),
+            ("Friction/shear: problem", friction, 3),
+        )
+        if value < maximum
+    ]
+
+    return RiskScore(
+        scale="Braden Scale",
+        score=score,
+        level=_braden_level(score),
+        contributing_factors=contributing,
+    )
+
+
+def flag_vital_signs(patient: PatientInput) -> list[VitalSignFlag]:
+    """
+    Flag abnormal vital signs.
+
+    Args:
+        patient: Patient input data
+
+    Returns:
+        List of VitalSignFlag for every out-of-range vital sign
+    """
+    flags: list[VitalSignFlag] = []
+
+    match = BLOOD_PRESSURE_PATTERN.match(patient.blood_pressure)
+    if match is None:
+        flags.append(
+            VitalSignFlag(
+                vital="Blood Pressure",
+                value=patient.blood_pressure,
+                severity="warning",
+                message="Unable to parse blood pressure reading",
+            )
+        )
+    else:
+        systolic, diastolic = int(match.group(1)), int(match.group(2))
+        if systolic >= SYSTOLIC_CRISIS or diastolic >= DIASTOLIC_CRISIS:
+            flags.append(
+                VitalSignFlag(
+                    vital="Blood Pressure",
+                    value=patient.blood_pressure,
+                    severity="critical",
+                    message="Blood pressure in hypertensive crisis range",
+                )
+            )
+        elif systolic >= SYSTOLIC_HIGH or diastolic >= DIASTOLIC_HIGH:
+            flags.append(
+                VitalSignFlag(
+                    vital="Blood Pressure",
+                    value=patient.blood_pressure,
+                    severity="warning",
+                    message="Elevated blood pressure",
+                )
+            )
+        elif systolic < SYSTOLIC_LOW:
+            flags.append(
+                VitalSignFlag(
+                    vital="Blood Pressure",
+                    value=patient.blood_pressure,
+                    severity="critical" if systolic < SYSTOLIC_CRITICAL_LOW else "warning",
+                    message="Hypotension",
+                )
+            )
+
+    heart_rate = patient.heart_rate
+    if heart_rate < HEART_RATE_LOW or heart_rate > HEART_RATE_HIGH:
+        flags.append(
+            VitalSignFlag(
+                vital="Heart Rate",
+                value=f"{heart_rate} bpm",
+                severity=(
+                    "critical"
+                    if heart_rate < HEART_RATE_CRITICAL_LOW or heart_rate > HEART_RATE_CRITICAL_HIGH
+                    else "warning"
+                ),
+                message="Bradycardia" if heart_rate < HEART_RATE_LOW else "Tachycardia",
+            )
+        )
+
+    oxygen_saturation = patient.oxygen_saturation
+    if oxygen_saturation < OXYGEN_SATURATION_LOW:
+        flags.append(
+            VitalSignFlag(
+                vital="Oxygen Saturation",
+                value=f"{oxygen_saturation}%",
+                severity="critical"
+                if oxygen_saturation < OXYGEN_SATURATION_CRITICAL
+                else "warning",
+                message="Low oxygen saturation",
+            )
+        )
+
+    temperature = patient.temperature
+    if temperature >= FEVER_F:
+        flags.append(
+            VitalSignFlag(
+                vital="Temperature",
+                value=f"{temperature}°F",
+                severity="critical" if temperature >= FEVER_CRITICAL_F else "warning",
+                message="Fever",
+            )
+        )
+    elif temperature < HYPOTHERMIA_F:
+        flags.append(
+            VitalSignFlag(
+                vital="Temperature",
+                value=f"{temperature}°F",
+                severity="critical" if temperature < HYPOTHERMIA_CRITICAL_F else "warning",
+                message="Hypothermia",
+            )
+        )
+
+    return flags
+
+
+def acuity_level(patient: PatientInput) -> int:
+    """
+    Classify how urgently a patient's plan is needed.
+
+    Args:
+        patient: Patient input data
+
+    Returns:
+        ACUITY_HIGH for any critical vital sign or severe pain, ACUITY_ELEVATED
+        for any other abnormal vital sign or high pain, else ACUITY_ROUTINE
+    """
+    severities = {flag.severity for flag in flag_vital_signs(patient)}
+    if "critical" in severities or patient.pain_level >= PAIN_SEVERE:
+        return ACUITY_HIGH
+    if severities or patient.pain_level >= PAIN_ELEVATED:
+        return ACUITY_ELEVATED
+    return ACUITY_ROUTINE
+
+
+def assess_patient(patient: PatientInput) -> RiskAssessment:
+    """
+    Run all local risk scores for a patient.
+
+    Args:
+        patient: Patient input data
+
+    Returns:
+        RiskAssessment with fall risk, pressure injury risk and vital sign flags
+    """
+    return RiskAssessment(
+        patient_name=patient.name,
+        fall_risk=score_fall_risk(patient),
+        pressure_injury_risk=score_pressure_risk(patient),
+        vital_sign_flags=flag_vital_signs(patient),
+    )
+
+
+def format_risk_facts(assessment: RiskAssessment) -> str:
+    """Format a risk assessment as plain-text facts for the prompt."""
+    lines = []
+    for risk in (assessment.fall_risk, assessment.pressure_injury_risk):
+        factors = ", ".join(risk.contributing_factors) or "none"
+        lines.append(f"- {risk.scale}: {risk.score} ({risk.level} risk) | Factors: {factors}")
+    if assessment.vital_sign_flags:
+        lines.extend(
+            f"- Vital sign flag ({flag.severity}): {flag.vital} {flag.value} - {flag.message}"
+            for flag in assessment.vital_sign_flags
+        )
+    else:
+        lines.append("- Vital signs within normal limits")
+    return "\n".join(lines)
+
+
+def render_risk_assessment_html(assessment: RiskAssessment, include_heading: bool = True) -> str:
+    """
+    Render the calculated risk scores as HTML.
+
+    Args:
+        assessment: Risk assessment to render
+        include_heading: Emit the "Risk Assessments" <h2>; disable when the
+            scores are inserted into a section the model already headed
+
+    Returns:
+        HTML fragment wrapped in a <section class="risk-assessments">
+    """
+    parts = ['<section class="risk-assessments">']
+    if include_heading:
+        parts.append("<h2>Risk Assessments</h2>")
+    for title, risk in (
+        ("Fall Risk", assessment.fall_risk),
+        ("Pressure Injury Risk", assessment.pressure_injury_risk),
+    ):
+        parts.append(
+            f"<h3>{title}</h3><p><strong>{html.escape(risk.scale)} score: {risk.score}</strong>"
+            f" &mdash; {html.escape(risk.level)} risk</p>"
+        )
+        if risk.contributing_factors:
+            items = "".join(f"<li>{html.escape(item)}</li>" for item in risk.contributing_factors)
+            parts.append(f"<ul>{items}</ul>")
+
+    parts.append("<h3>Vital Sign Flags</h3>")
+    if assessment.vital_sign_flags:
+        items = "".join(
+            f"<li><strong>{html.escape(flag.vital)} ({html.escape(flag.value)})</strong>: "
+            f"{html.escape(flag.message)} [{flag.severity}]</li>"
+            for flag in assessment.vital_sign_flags
+        )
+        parts.append(f"<ul>{items}</ul>")
+    else:
+        parts.append("<p>All recorded vital signs within normal limits.</p>")
+
+    parts.append("</section>")
+    return "".join(parts)
@@ -0,0 +1,328 @@
+"""
+Streaming roster import - Parses CSV or NDJSON census exports row by row.
+Validates each row against PatientInput and optionally generates care plans
+for the valid rows, without holding the whole roster in memory.
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import json
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from functools import partial
+from typing import IO, Any
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.models import CarePlanOutput, PatientInput, RosterImportSummary, RosterRowResult
+from app.services.care_plan_service import generate_care_plan
+from app.services.generation_scheduler import generation_scheduler, priority_for
+from app.services.risk_scoring import acuity_level
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# CSV columns holding lists; items are separated by semicolons
+LIST_COLUMNS = ("comorbidities", "allergies", "symptoms", "fall_risk_factors")
+LIST_SEPARATOR = ";"
+# Medications are "name|dosage|frequency" items separated by semicolons
+MEDICATION_COLUMN = "current_medications"
+MEDICATION_FIELD_SEPARATOR = "|"
+MEDICATION_FIELD_COUNT = 3
+
+
+class RosterFormatError(ValueError):
+    """Raised when a row cannot be parsed at all (as opposed to failing validation)."""
+
+
+def _split_list(value: str) -> list[str]:
+    """Split a semicolon-separated CSV cell into a list of non-empty items."""
+    return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+
+
+def _parse_medications(value: str) -> list[dict[str, str]]:
+    """Parse a CSV medications cell ("Metformin|500mg|BID; Lisinopril|10mg|QD")."""
+    medications = []
+    for item in _split_list(value):
+        parts = [part.strip() for part in item.split(MEDICATION_FIELD_SEPARATOR)]
+        if len(parts) != MEDICATION_FIELD_COUNT:
+            raise RosterFormatError(
+                f"Medication '{item}' must be formatted as name|dosage|frequency"
+            )
+        medications.append({"name": parts[0], "dosage": parts[1], "frequency": parts[2]})
+    return medications
+
+
+def csv_row_to_patient_data(row: dict[str, str]) -> dict[str, Any]:
+    """
+    Convert a flat CSV row into PatientInput-shaped data.
+
+    Empty cells are dropped so that optional fields fall back to their
+    defaults and missing required fields are reported by validation.
+    """
+    data: dict[str, Any] = {}
+    for column, raw_value in row.items():
+        if column is None:
+            raise RosterFormatError("Row has more cells than the header")
+        key = column.strip()
+        value = (raw_value or "").strip()
+        if not value:
+            continue
+        if key in LIST_COLUMNS:
+            data[key] = _split_list(value)
+        elif key == MEDICATION_COLUMN:
+            data[key] = _parse_medications(value)
+        else:
+            data[key] = value
+    return data
+
+
+class CsvRosterParser:
+    """Incremental CSV parser that accepts one line at a time."""
+
+    def __init__(self) -> None:
+        """Initialize parser state."""
+        self._header: list[str] | None = None
+        self._pending = ""
+
+    def feed(self, line: str) -> dict[str, Any] | None:
+        """
+        Feed a single line of input.
+
+        Returns:
+            Patient data for a completed record, or None when the line was a
+            header, blank, or part of a quoted multi-line cell
+
+        Raises:
+            RosterFormatError: If the record cannot be converted
+        """
+        self._pending += line
+        # An odd number of quotes means a quoted cell continues on the next line
+        if self._pending.count('"') % 2:
+            return None
+        record, self._pending = self._pending, ""
+        if not record.strip():
+            return None
+
+        cells = next(csv.reader([record]))
+        if self._header is None:
+            self._header = [cell.strip() for cell in cells]
+            return None
+        return csv_row_to_patient_data(dict(zip(self._header, cells, strict=False)))
+
+    def finish(self) -> None:
+        """
+        Signal end of input.
+
+        Raises:
+            RosterFormatError: If a quoted cell was never closed
+        """
+        if self._pending.strip():
+            raise RosterFormatError("Unterminated quoted field at end of input")
+
+
+class NdjsonRosterParser:
+    """Incremental NDJSON parser (one PatientInput object per line)."""
+
+    def feed(self, line: str) -> dict[str, Any] | None:
+        """
+        Feed a single line of input.
+
+        Raises:
+            RosterFormatError: If the line is not a JSON object
+        """
+        if not line.strip():
+            return None
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise RosterFormatError(f"Invalid JSON: {e.msg}") from e
+        if not isinstance(data, dict):
+            raise RosterFormatError("Each line must be a JSON object")
+        return data
+
+    def finish(self) -> None:
+        """Signal end of input (NDJSON has no multi-line state)."""
+
+
+def make_parser(fmt: str) -> CsvRosterParser | NdjsonRosterParser:
+    """Create the incremental parser for a roster format."""
+    if fmt == "csv":
+        return CsvRosterParser()
+    if fmt == "ndjson":
+        return NdjsonRosterParser()
+    raise ValueError(
+        f"Unsupported roster format '{fmt}'. Use one of: {', '.join(SUPPORTED_FORMATS)}"
+    )
+
+
+def _format_validation_errors(error: ValidationError) -> list[str]:
+    """Flatten Pydantic validation errors into 'field: message' strings."""
+    return [
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+
+def validate_row(row: int, data: dict[str, Any]) -> tuple[RosterRowResult, PatientInput | None]:
+    """
+    Validate one roster row against PatientInput.
+
+    Args:
+        row: 1-based data row number
+        data: Parsed row data
+
+    Returns:
+        Tuple of the row result and the validated patient (None if invalid)
+    """
+    name = data.get("name") if isinstance(data.get("name"), str) else None
+    try:
+        patient = PatientInput.model_validate(data)
+    except ValidationError as e:
+        return (
+            RosterRowResult(
+                row=row, valid=False, patient_name=name, errors=_format_validation_errors(e)
+            ),
+            None,
+        )
+    return RosterRowResult(row=row, valid=True, patient_name=patient.name), patient
+
+
+async def aiter_file_lines(roster_file: IO[bytes]) -> AsyncIterator[str]:
+    """
+    Yield UTF-8 text lines from a binary file one at a time.
+
+    Only the current line is held in memory, so large rosters can be parsed
+    from a file on disk.
+    """
+    with io.TextIOWrapper(roster_file, encoding="utf-8-sig", newline="") as text:
+        for line in text:
+            yield line
+
+
+async def aiter_stream_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Yield UTF-8 text lines from a byte stream as soon as each line is complete.
+
+    Only the undecoded tail of the current line is buffered, so rows of an
+    upload are parsed while the rest is still arriving.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+def to_ndjson_line(item: RosterRowResult | RosterImportSummary) -> str:
+    """Serialize a row result or the final summary as one NDJSON line."""
+    if isinstance(item, RosterImportSummary):
+        return json.dumps({"summary": item.model_dump()}) + "\n"
+    return item.model_dump_json(exclude_none=True) + "\n"
+
+
+async def _generate(result: RosterRowResult, patient: PatientInput) -> RosterRowResult:
+    """Generate a care plan for a validated row, recording any failure on the result."""
+    acuity = acuity_level(patient)
+    try:
+        care_plan: CarePlanOutput = await generation_scheduler.run(
+            partial(generate_care_plan, patient),
+            facility=patient.facility,
+            priority=priority_for(acuity, batch=True),
+            acuity=acuity,
+        )
+    except Exception as e:
+        logger.error(f"Roster row {result.row} generation failed: {e!s}")
+        return result.model_copy(update={"generation_error": str(e)})
+    return result.model_copy(update={"care_plan": care_plan})
+
+
+async def import_roster(
+    lines: AsyncIterable[str],
+    fmt: str,
+    generate: bool = False,
+    concurrency: int = 2,
+    on_valid: Callable[[PatientInput], object] | None = None,
+) -> AsyncIterator[RosterRowResult | RosterImportSummary]:
+    """
+    Stream-validate a roster and optionally generate plans for valid rows.
+
+    Results are yielded in row order. When generating, at most `concurrency`
+    generations run at once and only that many rows are held in memory.
+
+    Args:
+        lines: Async iterable of input lines
+        fmt: Roster format (csv or ndjson)
+        generate: Generate a care plan for each valid row
+        concurrency: Maximum concurrent generations
+        on_valid: Called with each valid patient (e.g. to queue pre-generation)
+
+    Yields:
+        RosterRowResult per row, followed by a final RosterImportSummary
+    """
+    parser = make_parser(fmt)
+    summary = RosterImportSummary()
+    pending: deque[asyncio.Task[RosterRowResult] | RosterRowResult] = deque()
+
+    async def drain(limit: int) -> AsyncIterator[RosterRowResult]:
+        while len(pending) > limit:
+            item = pending.popleft()
+            result = await item if isinstance(item, asyncio.Task) else item
+            if result.generation_error is None and result.care_plan is not None:
+                summary.generated_rows += 1
+            yield result
+
+    def accept(result: RosterRowResult, patient: PatientInput | None) -> None:
+        summary.total_rows += 1
+        if patient is None:
+            summary.invalid_rows += 1
+            pending.append(result)
+        else:
+            summary.valid_rows += 1
+            if on_valid is not None:
+                on_valid(patient)
+            pending.append(asyncio.create_task(_generate(result, patient)) if generate else result)
+
+    row = 0
+    try:
+        async for line in lines:
+            try:
+                data = parser.feed(line)
+            except RosterFormatError as e:
+                row += 1
+                accept(RosterRowResult(row=row, valid=False, errors=[str(e)]), None)
+            else:
+                if data is None:
+                    continue
+                row += 1
+                accept(*validate_row(row, data))
+            async for result in drain(concurrency if generate else 0):
+                yield result
+
+        try:
+            parser.finish()
+        except RosterFormatError as e:
+            accept(RosterRowResult(row=row + 1, valid=False, errors=[str(e)]), None)
+        async for result in drain(0):
+            yield result
+    finally:
+        for item in pending:
+            if isinstance(item, asyncio.Task):
+                item.cancel()
+
+    logger.info(
+        f"Roster import complete | Rows={summary.total_rows} | "
+        f"Valid={summary.valid_rows} | Invalid={summary.invalid_rows} | "
+        f"Generated={summary.generated_rows}"
+    )
+    yield summary
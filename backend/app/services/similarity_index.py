@@ -0,0 +1,350 @@
+"""
+Similar-patient index - MinHash/LSH over stored patients' clinical features.
+Finds the closest previously planned patient in milliseconds so their plan
+can be shown as a labelled draft while a new generation runs.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from array import array
+
+from app.config import settings
+from app.models import CarePlanDraft, PatientInput
+from app.services.plan_store import PlanStore, plan_store
+from app.services.traffic_recorder import scrub_names
+from app.services.vocabulary import normalize_term, vocabulary_index
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+# 32 hash functions in 8 bands of 4 rows: pairs above ~0.6 Jaccard similarity
+# almost always share a bucket, pairs below ~0.3 rarely do
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8
+# Mersenne prime for the universal hash family; values are truncated to 32 bits
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+HASH_SEED = 1234
+# Bound on candidates scored per query, newest first, for very common profiles
+MAX_CANDIDATES = 500
+AGE_BAND_YEARS = 10
+# Characters of a draft's plan included when it is used as a prompt reference
+MAX_REFERENCE_CHARS = 4000
+# Removed entries are compacted away once they outnumber live ones (and this many)
+MIN_COMPACT_ENTRIES = 64
+
+DRAFT_NAME_PLACEHOLDER = "[previous patient]"
+DRAFT_NOTICE = (
+    "DRAFT from the plan of a similar previous patient (similarity {similarity:.0%}). "
+    "Vitals, history and details are not this patient's. Review before use; "
+    "the generated plan replaces it."
+)
+
+_TAGS = re.compile(r"<[^>]+>")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def patient_features(patient: PatientInput) -> set[str]:
+    """
+    Clinical feature set of a patient, the basis of similarity.
+
+    Diagnoses, medications and allergies are canonicalized against the
+    vocabulary so differently written values match. The primary diagnosis
+    contributes two features so it outweighs any single comorbidity.
+
+    Returns:
+        Prefixed, normalized features such as "dx:heart failure" or "mob:walker"
+    """
+    patient = vocabulary_index.canonicalize_patient(patient)
+    primary = normalize_term(patient.primary_diagnosis)
+    features = {
+        f"primary:{primary}",
+        f"dx:{primary}",
+        f"mob:{patient.mobility_level}",
+        f"adl:{normalize_term(patient.adl_independence)}",
+        f"cog:{normalize_term(patient.cognitive_status)}",
+        f"age:{patient.age // AGE_BAND_YEARS}",
+    }
+    features.update(f"dx:{normalize_term(item)}" for item in patient.comorbidities)
+    features.update(f"med:{normalize_term(med.name)}" for med in patient.current_medications)
+    features.update(f"allergy:{normalize_term(item)}" for item in patient.allergies)
+    features.update(f"fall:{normalize_term(item)}" for item in patient.fall_risk_factors)
+    return features
+
+
+def plan_text(care_plan_html: str, limit: int = MAX_REFERENCE_CHARS) -> str:
+    """Plain text of a plan's HTML (styles and tags removed), truncated to limit."""
+    body = care_plan_html.split("</style>")[-1]
+    return _WHITESPACE.sub(" ", _TAGS.sub(" ", body)).strip()[:limit]
+
+
+class SimilarPatientIndex:
+    """
+    In-memory MinHash signatures with LSH buckets, supporting incremental inserts.
+
+    Only the latest plan of each resident is kept, and entries older than the
+    TTL are dropped as new ones arrive, so the index stays the size of the
+    fresh part of the plan store. Removed entries are tombstoned and
+    compacted away in bulk.
+    """
+
+    def __init__(
+        self,
+        num_permutations: int = NUM_PERMUTATIONS,
+        bands: int = LSH_BANDS,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        """
+        Initialize an empty index.
+
+        Args:
+            num_permutations: MinHash signature length
+            bands: LSH bands (num_permutations must divide evenly)
+            ttl_seconds: Age after which entries are dropped (None keeps them)
+        """
+        if num_permutations % bands:
+            raise ValueError("num_permutations must be a multiple of bands")
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.ttl_seconds = ttl_seconds
+        rng = random.Random(HASH_SEED)
+        self._coefficients = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+            for _ in range(num_permutations)
+        ]
+        # Entry id -> input hash (None once removed), resident and time added;
+        # signatures packed end to end
+        self._hashes: list[str | None] = []
+        self._residents: list[tuple[str, str]] = []
+        self._added_at = array("d")
+        self._signatures = array("I")
+        self._ids: dict[str, int] = {}
+        # (facility, name) -> input hash of the resident's latest entry
+        self._latest: dict[tuple[str, str], str] = {}
+        # Entries are added in time order, so expired ones precede this entry
+        self._expiry_cursor = 0
+        # Buckets are per facility so one facility's volume cannot crowd out another's
+        self._buckets: dict[tuple[str, int, int], array] = {}
+        self._facilities: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of indexed patients."""
+        return len(self._ids)
+
+    def signature(self, features: set[str]) -> array:
+        """MinHash signature of a feature set."""
+        hashed = [
+            int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big")
+            for f in features
+        ]
+        return array(
+            "I",
+            (
+                min(((a * x + b) % MERSENNE_PRIME) & MAX_HASH for x in hashed)
+                if hashed
+                else MAX_HASH
+                for a, b in self._coefficients
+            ),
+        )
+
+    def _band_keys(self, facility: str, signature: array) -> list[tuple[str, int, int]]:
+        """Bucket key of each band of a signature."""
+        return [
+            (facility, band, hash(tuple(signature[band * self.rows : (band + 1) * self.rows])))
+            for band in range(self.bands)
+        ]
+
+    def add(self, input_hash: str, patient: PatientInput) -> None:
+        """
+        Index a patient whose plan is stored under input_hash.
+
+        Re-adding an input hash is a no-op, since the same hash always has
+        the same features. The resident's previous entry, if any, is
+        replaced, and expired entries are dropped.
+        """
+        if input_hash in self._ids:
+            return
+        signature = self.signature(patient_features(patient))
+        keys = self._band_keys(patient.facility, signature)
+        resident = (patient.facility, patient.name)
+        with self._lock:
+            if input_hash in self._ids:
+                return
+            self._expire(time.time())
+            previous = self._latest.get(resident)
+            if previous is not None:
+                self._remove(previous)
+            entry = len(self._hashes)
+            self._ids[input_hash] = entry
+            self._latest[resident] = input_hash
+            self._hashes.append(input_hash)
+            self._residents.append(resident)
+            self._added_at.append(time.time())
+            self._facilities.add(patient.facility)
+            self._signatures.extend(signature)
+            for key in keys:
+                self._buckets.setdefault(key, array("I")).append(entry)
+            if len(self._hashes) - len(self._ids) > max(len(self._ids), MIN_COMPACT_ENTRIES):
+                self._compact()
+
+    def _remove(self, input_hash: str) -> None:
+        """Tombstone an entry (lock held); buckets are cleaned up by _compact()."""
+        entry = self._ids.pop(input_hash, None)
+        if entry is None:
+            return
+        self._hashes[entry] = None
+        resident = self._residents[entry]
+        if self._latest.get(resident) == input_hash:
+            del self._latest[resident]
+
+    def _expire(self, now: float) -> None:
+        """Remove entries older than the TTL (lock held)."""
+        if self.ttl_seconds is None:
+            return
+        cutoff = now - self.ttl_seconds
+        while (
+            self._expiry_cursor < len(self._hashes)
+            and self._added_at[self._expiry_cursor] < cutoff
+        ):
+            input_hash = self._hashes[self._expiry_cursor]
+            if input_hash is not None:
+                self._remove(input_hash)
+            self._expiry_cursor += 1
+
+    def _compact(self) -> None:
+        """Rebuild entries, signatures and buckets without removed entries (lock held)."""
+        live = [entry for entry, input_hash in enumerate(self._hashes) if input_hash is not None]
+        hashes = [self._hashes[entry] for entry in live]
+        residents = [self._residents[entry] for entry in live]
+        added_at = array("d", (self._added_at[entry] for entry in live))
+        signatures = array("I")
+        buckets: dict[tuple[str, int, int], array] = {}
+        for new_entry, entry in enumerate(live):
+            offset = entry * self.num_permutations
+            signature = self._signatures[offset : offset + self.num_permutations]
+            signatures.extend(signature)
+            for key in self._band_keys(residents[new_entry][0], signature):
+                buckets.setdefault(key, array("I")).append(new_entry)
+        self._hashes = hashes
+        self._residents = residents
+        self._added_at = added_at
+        self._signatures = signatures
+        self._buckets = buckets
+        self._ids = {input_hash: entry for entry, input_hash in enumerate(hashes) if input_hash}
+        self._facilities = {facility for facility, _ in residents}
+        self._expiry_cursor = 0
+        logger.debug(f"Similar-patient index compacted | Entries={len(hashes)}")
+
+    def similar(
+        self,
+        patient: PatientInput,
+        facility: str | None = None,
+        min_similarity: float = 0.0,
+        limit: int = 5,
+    ) -> list[tuple[str, float]]:
+        """
+        Find indexed patients most similar to a patient.
+
+        Args:
+            patient: Patient to match
+            facility: Only match patients of this facility, if given
+            min_similarity: Minimum estimated Jaccard similarity of features
+            limit: Maximum matches returned
+
+        Returns:
+            (input hash, estimated similarity) pairs, most similar first
+        """
+        signature = self.signature(patient_features(patient))
+        candidates: set[int] = set()
+        with self._lock:
+            facilities = [facility] if facility is not None else list(self._facilities)
+            for name in facilities:
+                for key in self._band_keys(name, signature):
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        candidates.update(bucket[-MAX_CANDIDATES:])
+            scored = []
+            for entry in sorted(candidates, reverse=True)[:MAX_CANDIDATES]:
+                input_hash = self._hashes[entry]
+                if input_hash is None:
+                    continue
+                offset = entry * self.num_permutations
+                stored = self._signatures[offset : offset + self.num_permutations]
+                agreement = sum(1 for a, b in zip(signature, stored, strict=True) if a == b)
+                similarity = agreement / self.num_permutations
+                if similarity >= min_similarity:
+                    scored.append((input_hash, similarity))
+        scored.sort(key=lambda match: match[1], reverse=True)
+        return scored[:limit]
+
+    def load(self, store: PlanStore) -> int:
+        """
+        Index every fresh plan in a store.
+
+        Returns:
+            Number of patients indexed
+        """
+        before = len(self)
+        for input_hash, patient in store.iter_patients():
+            self.add(input_hash, patient)
+        logger.info(
+            f"Similar-patient index loaded | Added={len(self) - before} | Total={len(self)}"
+        )
+        return len(self) - before
+
+
+def closest_plan_draft(patient: PatientInput, exclude: str | None = None) -> CarePlanDraft | None:
+    """
+    Build a draft from the stored plan of the most similar previous patient.
+
+    The source patient's names are replaced in the draft, which is clearly
+    labelled as such; it is never stored or served as the patient's plan.
+
+    Args:
+        patient: Patient the draft is for
+        exclude: Input hash to skip (the patient's own stored plan)
+
+    Returns:
+        CarePlanDraft, or None if no stored plan is similar enough
+    """
+    matches = similar_patient_index.similar(
+        patient,
+        facility=patient.facility if settings.similar_plan_same_facility else None,
+        min_similarity=settings.similar_plan_min_similarity,
+    )
+    for input_hash, similarity in matches:
+        if input_hash == exclude:
+            continue
+        # Plans can expire or be replaced before the index catches up; skip them
+        source_plan = plan_store.get(input_hash)
+        if source_plan is None:
+            continue
+        names = {source_plan.patient_name: DRAFT_NAME_PLACEHOLDER}
+        draft_plan = source_plan.model_copy(
+            update={
+                "patient_name": patient.name,
+                "care_plan_html": scrub_names(source_plan.care_plan_html, names),
+                # The source's URL and usage belong to the other resident's plan
+                "content_hash": None,
+                "model": None,
+                "input_tokens": None,
+                "output_tokens": None,
+            }
+        )
+        return CarePlanDraft(
+            similarity=similarity,
+            source_plan_hash=input_hash,
+            notice=DRAFT_NOTICE.format(similarity=similarity),
+            care_plan=draft_plan,
+        )
+    return None
+
+
+# Global index instance, kept current as plans are stored
+similar_patient_index = SimilarPatientIndex(ttl_seconds=settings.plan_cache_ttl_seconds)
+plan_store.subscribe(similar_patient_index.add)
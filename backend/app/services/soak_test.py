@@ -0,0 +1,232 @@
+"""
+Soak test - Long-running generation against a stubbed upstream.
+Drives /generate-care-plan in-process with canned model output, samples RSS
+after garbage collection and reports memory growth over the run.
+"""
+
+import asyncio
+import gc
+import itertools
+import json
+import time
+from collections.abc import AsyncGenerator
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from app.services.care_plan_service import RISK_SCORES_PLACEHOLDER
+from app.services.claude_client import CompletionResult, claude_client
+from app.services.html_sanitizer import REQUIRED_SECTIONS
+from app.services.memory_monitor import memory_monitor, rss_bytes
+from app.services.plan_store import plan_store
+from app.services.traffic_recorder import traffic_recorder
+
+SECONDS_PER_HOUR = 3600
+SERVER_ERROR = 500
+STUB_CHUNK_CHARS = 64
+# Samples before this fraction of the run are warm-up (imports, caches filling)
+WARMUP_FRACTION = 0.1
+MIN_SAMPLES_FOR_RATE = 2
+
+
+def _stub_section(name: str) -> str:
+    """One section of the canned plan, roughly the size of a real one."""
+    if name == "Risk Assessments":
+        return f"<h2>{name}</h2>\n{RISK_SCORES_PLACEHOLDER}\n<h3>Infection Risk</h3><p>Low.</p>"
+    items = "".join(f"<li>{name} item {i}: routine nursing action.</li>" for i in range(12))
+    return f"<h2>{name}</h2><ul>{items}</ul>"
+
+
+STUB_PLAN_HTML = "<h1>Care Plan</h1>" + "".join(_stub_section(name) for name in REQUIRED_SECTIONS)
+
+
+class StubUpstream:
+    """Stand-in for ClaudeClient.stream_completion that streams a canned plan."""
+
+    def __init__(self, latency_s: float = 0.05) -> None:
+        """
+        Initialize the stub.
+
+        Args:
+            latency_s: Total streaming time per call, spread over the chunks
+        """
+        self.latency_s = latency_s
+        self.calls = 0
+
+    # Same signature as ClaudeClient.stream_completion; the prompts are not needed
+    async def stream_completion(
+        self,
+        system_prompt: str,  # noqa: ARG002
+        user_prompt: str,
+        max_tokens: int = 4000,  # noqa: ARG002
+        facility: str | None = None,  # noqa: ARG002
+    ) -> AsyncGenerator[str | CompletionResult, None]:
+        """Yield the canned plan in chunks, then a CompletionResult."""
+        self.calls += 1
+        chunks = range(0, len(STUB_PLAN_HTML), STUB_CHUNK_CHARS)
+        delay = self.latency_s / len(chunks)
+        for start in chunks:
+            await asyncio.sleep(delay)
+            yield STUB_PLAN_HTML[start : start + STUB_CHUNK_CHARS]
+        yield CompletionResult(
+            model="stub-model",
+            stop_reason="end_turn",
+            input_tokens=len(user_prompt) // 4,
+            output_tokens=len(STUB_PLAN_HTML) // 4,
+        )
+
+
+@dataclass
+class SoakOptions:
+    """How a soak run drives the app."""
+
+    duration_s: float = 3600.0
+    concurrency: int = 4
+    # Seconds between RSS samples (each taken after a full gc)
+    sample_interval_s: float = 60.0
+    # Stubbed streaming time per generation
+    upstream_latency_s: float = 0.05
+    # Also trace allocations and report the top growing source lines
+    trace: bool = False
+    # Store generated plans as in production (the in-memory store grows by design)
+    keep_plans: bool = False
+
+
+@dataclass
+class SoakReport:
+    """Outcome of a soak run."""
+
+    requests: int
+    errors: int
+    duration_s: float
+    rss_start_bytes: int | None
+    rss_end_bytes: int | None
+    rss_max_bytes: int | None
+    growth_bytes_per_hour: float | None
+    samples: list[tuple[float, int]] = field(default_factory=list)
+    top_growth: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _discard_plan(*args: Any, **kwargs: Any) -> None:
+    """PlanStore.put stand-in that keeps nothing (a Mock would keep every call)."""
+
+
+def load_patients(path: Path) -> list[dict[str, Any]]:
+    """
+    Read soak patients from a JSON list of PatientInput objects or a
+    {"mock_patients": [{"data": ...}]} file such as test_data.json.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        return [entry["data"] for entry in data["mock_patients"]]
+    return list(data)
+
+
+def growth_rate(samples: list[tuple[float, int]]) -> float | None:
+    """
+    Least-squares RSS slope in bytes per hour.
+
+    Args:
+        samples: (seconds since start, RSS bytes) pairs
+
+    Returns:
+        Slope, or None with fewer than two samples
+    """
+    if len(samples) < MIN_SAMPLES_FOR_RATE:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_rss = sum(rss for _, rss in samples) / n
+    variance = sum((t - mean_t) ** 2 for t, _ in samples)
+    if not variance:
+        return None
+    covariance = sum((t - mean_t) * (rss - mean_rss) for t, rss in samples)
+    return covariance / variance * SECONDS_PER_HOUR
+
+
+async def soak(app: FastAPI, patients: list[dict[str, Any]], options: SoakOptions) -> SoakReport:
+    """
+    Generate care plans continuously and track memory.
+
+    Every request uses a distinct patient name so each one is a full
+    generation. Generated plans are not kept in the plan store unless
+    options.keep_plans is set.
+
+    Args:
+        app: Application to drive
+        patients: PatientInput bodies, used round-robin
+        options: Duration, concurrency, sampling and tracing options
+
+    Returns:
+        SoakReport with request counts and RSS growth after warm-up
+    """
+    upstream = StubUpstream(latency_s=options.upstream_latency_s)
+    trace = options.trace
+    sequence = itertools.count()
+    counts = {"requests": 0, "errors": 0}
+    samples: list[tuple[float, int]] = []
+
+    async def client_loop(client: httpx.AsyncClient, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            number = next(sequence)
+            body = dict(patients[number % len(patients)])
+            body["name"] = f"{body['name']} {number}"
+            response = await client.post("/generate-care-plan", json=body)
+            counts["requests"] += 1
+            if response.status_code >= SERVER_ERROR:
+                counts["errors"] += 1
+
+    async def sampler(started: float, deadline: float) -> None:
+        while True:
+            gc.collect()
+            rss = rss_bytes()
+            if rss is not None:
+                samples.append((round(time.perf_counter() - started, 1), rss))
+            if time.perf_counter() >= deadline:
+                return
+            remaining = max(0.0, deadline - time.perf_counter())
+            await asyncio.sleep(min(options.sample_interval_s, remaining))
+
+    with (
+        patch.object(claude_client, "stream_completion", upstream.stream_completion),
+        patch.object(traffic_recorder, "path", None),
+        nullcontext() if options.keep_plans else patch.object(plan_store, "put", _discard_plan),
+    ):
+        # Leave tracing on afterwards if it was already on (memory debug mode)
+        started_tracing = trace and not memory_monitor.tracing
+        if trace:
+            memory_monitor.start()
+            memory_monitor.report()
+        # httpx types ASGI scopes as dict where Starlette uses MutableMapping
+        transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+        async with httpx.AsyncClient(transport=transport, base_url="http://soak") as client:
+            started = time.perf_counter()
+            deadline = started + options.duration_s
+            await asyncio.gather(
+                sampler(started, deadline),
+                *(client_loop(client, deadline) for _ in range(options.concurrency)),
+            )
+            duration = time.perf_counter() - started
+        top_growth = (
+            [stat.model_dump() for stat in memory_monitor.report().top_growth] if trace else []
+        )
+        if started_tracing:
+            memory_monitor.stop()
+
+    steady = [sample for sample in samples if sample[0] >= duration * WARMUP_FRACTION]
+    return SoakReport(
+        requests=counts["requests"],
+        errors=counts["errors"],
+        duration_s=round(duration, 1),
+        rss_start_bytes=samples[0][1] if samples else None,
+        rss_end_bytes=samples[-1][1] if samples else None,
+        rss_max_bytes=max(rss for _, rss in samples) if samples else None,
+        growth_bytes_per_hour=growth_rate(steady),
+        samples=samples,
+        top_growth=top_growth,
+    )
@@ -0,0 +1,345 @@
+"""
+Traffic capture - Opt-in recording of anonymized requests and upstream responses.
+Each sampled request is appended to a JSONL capture with its arrival time,
+pseudonymized body and the model output it triggered (as cassettes), so real
+traffic can be replayed with app/services/traffic_replay.py.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from starlette.requests import Request
+
+from app.config import settings
+from app.utils.deadline import DEADLINE_HEADER
+from app.utils.logger import log_error, setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+# Request headers that affect how a request is served, kept for replay
+RECORDED_HEADERS = ("content-type", DEADLINE_HEADER.lower())
+MILLISECONDS_PER_SECOND = 1000
+# Name parts shorter than this ("Jo", initials) are left alone when scrubbing outputs
+MIN_NAME_PART_LENGTH = 3
+# Free-text patient fields, recorded as placeholders of the same length
+FREE_TEXT_FIELDS = frozenset(
+    {
+        "symptoms",
+        "cognitive_status",
+        "adl_independence",
+        "fall_risk_factors",
+        "isolation_precautions",
+        "diet_restrictions",
+    }
+)
+# Ages are recorded rounded down to this many years
+AGE_BUCKET_YEARS = 5
+# Recorded dates are shifted back by a per-process number of days in this range
+DATE_SHIFT_DAYS = (30, 365)
+
+
+def scrub_names(text: str, names: dict[str, str]) -> str:
+    """
+    Replace patient names in free text with their pseudonyms.
+
+    Full names are replaced first, then individual name parts, since model
+    output often refers to "Mr. Smith" or just the first name.
+
+    Args:
+        text: Text to scrub
+        names: Real name -> pseudonym
+
+    Returns:
+        Scrubbed text
+    """
+    for name, pseudonym in names.items():
+        text = _replace_word(text, name, pseudonym)
+    for name, pseudonym in names.items():
+        for part in name.split():
+            if len(part) >= MIN_NAME_PART_LENGTH:
+                text = _replace_word(text, part, pseudonym)
+    return text
+
+
+def _replace_word(text: str, word: str, replacement: str) -> str:
+    """Replace whole-word occurrences only ("Ann" but not "Annual")."""
+    return re.sub(rf"\b{re.escape(word)}\b", replacement.replace("\\", r"\\"), text)
+
+
+def _placeholder(value: Any) -> Any:
+    """Same-length placeholder for free text (strings, or lists of strings)."""
+    if isinstance(value, str):
+        return "x" * len(value)
+    if isinstance(value, list):
+        return [_placeholder(item) for item in value]
+    return value
+
+
+def _scrub_strings(value: Any, names: dict[str, str]) -> Any:
+    """Apply scrub_names to every string in a JSON value."""
+    if isinstance(value, str):
+        return scrub_names(value, names)
+    if isinstance(value, list):
+        return [_scrub_strings(item, names) for item in value]
+    if isinstance(value, dict):
+        return {key: _scrub_strings(item, names) for key, item in value.items()}
+    return value
+
+
+@dataclass(eq=False)
+class UpstreamRecording:
+    """One model call made while serving a recorded request."""
+
+    started: float
+    chunks: list[str] = field(default_factory=list)
+    chunk_offsets_ms: list[float] = field(default_factory=list)
+    result: dict[str, Any] = field(default_factory=dict)
+
+    def add(self, text: str) -> None:
+        """Record a streamed text delta and when it arrived."""
+        self.chunks.append(text)
+        self.chunk_offsets_ms.append(
+            round((time.perf_counter() - self.started) * MILLISECONDS_PER_SECOND, 1)
+        )
+
+    def finish(
+        self, model: str, stop_reason: str | None, input_tokens: int, output_tokens: int
+    ) -> None:
+        """Record how the call ended (stop_reason None if the stream was closed early)."""
+        self.result = {
+            "model": model,
+            "stop_reason": stop_reason,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "duration_ms": round((time.perf_counter() - self.started) * MILLISECONDS_PER_SECOND, 1),
+        }
+
+
+@dataclass(eq=False)
+class RequestRecording:
+    """A request being recorded."""
+
+    request_id: int
+    arrival_ms: float
+    started: float
+    method: str
+    path: str
+    query: str
+    headers: dict[str, str]
+    body: Any
+    body_bytes: int
+    # Real patient name -> pseudonym, used to scrub upstream outputs
+    names: dict[str, str] = field(default_factory=dict)
+    # Real facility name -> pseudonym
+    facilities: dict[str, str] = field(default_factory=dict)
+    upstream: list[UpstreamRecording] = field(default_factory=list)
+
+
+# Recording of the request being served in the current context, if any
+_current_recording: ContextVar[RequestRecording | None] = ContextVar(
+    "traffic_recording", default=None
+)
+
+
+class TrafficRecorder:
+    """Samples requests into an anonymized JSONL capture."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        sample_rate: float = 1.0,
+        max_body_bytes: int = 256 * 1024,
+    ) -> None:
+        """
+        Initialize the recorder.
+
+        Args:
+            path: JSONL capture file, or None to disable recording
+            sample_rate: Fraction of requests recorded
+            max_body_bytes: Larger bodies (e.g. roster uploads) are recorded by size only
+        """
+        self.path = Path(path) if path else None
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        # Per-process salt, so pseudonyms cannot be reversed by hashing known names
+        self._salt = os.urandom(16)
+        # Per-process date shift, so recorded intervals hold but real dates do not
+        self._date_shift = timedelta(days=random.randint(*DATE_SHIFT_DAYS))
+        self._ids = itertools.count(1)
+        self._epoch: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requests are being recorded."""
+        return self.path is not None
+
+    async def begin(self, request: Request) -> RequestRecording | None:
+        """
+        Start recording a request, if sampled.
+
+        Reads JSON bodies up to max_body_bytes; Starlette replays the cached
+        body to the endpoint.
+
+        Returns:
+            Recording to pass to finish(), or None if not recorded
+        """
+        if self.path is None or random.random() >= self.sample_rate:
+            return None
+        now = time.perf_counter()
+        if self._epoch is None:
+            self._epoch = now
+        body_bytes = int(request.headers.get("content-length") or 0)
+        recording = RequestRecording(
+            request_id=next(self._ids),
+            arrival_ms=round((now - self._epoch) * MILLISECONDS_PER_SECOND, 1),
+            started=now,
+            method=request.method,
+            path=request.url.path,
+            query=request.url.query,
+            headers={
+                name: request.headers[name] for name in RECORDED_HEADERS if name in request.headers
+            },
+            body=None,
+            body_bytes=body_bytes,
+        )
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("application/json") and body_bytes <= self.max_body_bytes:
+            try:
+                recording.body = self._anonymize(json.loads(await request.body()), recording)
+            except ValueError:
+                recording.body = None
+        _current_recording.set(recording)
+        return recording
+
+    def upstream_capture(self) -> UpstreamRecording | None:
+        """
+        Start capturing a model call for the request in the current context.
+
+        Returns:
+            Capture to feed with text deltas, or None if the request is not recorded
+        """
+        recording = _current_recording.get()
+        if recording is None:
+            return None
+        upstream = UpstreamRecording(started=time.perf_counter())
+        recording.upstream.append(upstream)
+        return upstream
+
+    async def finish(self, recording: RequestRecording, status_code: int) -> None:
+        """
+        Append a finished request and its cassettes to the capture file.
+
+        Args:
+            recording: Recording returned by begin()
+            status_code: Response status
+        """
+        _current_recording.set(None)
+        line = json.dumps(
+            {
+                "request_id": recording.request_id,
+                "arrival_ms": recording.arrival_ms,
+                "method": recording.method,
+                "path": recording.path,
+                "query": recording.query,
+                "headers": recording.headers,
+                "body": recording.body,
+                "body_bytes": recording.body_bytes,
+                "status": status_code,
+                "duration_ms": round(
+                    (time.perf_counter() - recording.started) * MILLISECONDS_PER_SECOND, 1
+                ),
+                "upstream": [
+                    self._cassette(upstream, recording)
+                    for upstream in recording.upstream
+                    if upstream.result
+                ],
+            }
+        )
+        try:
+            await asyncio.to_thread(self._append, line)
+        except OSError as e:
+            log_error(logger, e, context=f"Traffic capture | RequestId={recording.request_id}")
+
+    def _pseudonym(self, name: str, kind: str = "Patient") -> str:
+        """Stable (per process) pseudonym for a patient or facility name."""
+        digest = hashlib.sha256(self._salt + name.encode("utf-8")).hexdigest()
+        return f"{kind} {digest[:8]}"
+
+    def _shift_date(self, value: str) -> str:
+        """Shift an ISO date back by the per-process offset (invalid dates are kept)."""
+        try:
+            return (date.fromisoformat(value) - self._date_shift).isoformat()
+        except ValueError:
+            return value
+
+    def _anonymize(self, body: Any, recording: RequestRecording) -> Any:
+        """
+        De-identify a PatientInput body or list of bodies.
+
+        The name and facility are pseudonymized, the age is bucketed, the
+        admission date shifted, free-text fields replaced by placeholders of
+        the same length and every other string scrubbed of the patient's
+        name, so bodies keep their shape and size for replay.
+        """
+        if isinstance(body, list):
+            return [self._anonymize(item, recording) for item in body]
+        if not (isinstance(body, dict) and isinstance(body.get("name"), str)):
+            return body
+        names = recording.names
+        names.setdefault(body["name"], self._pseudonym(body["name"]))
+        anonymized: dict[str, Any] = {}
+        for key, value in body.items():
+            if key == "name":
+                anonymized[key] = names[value]
+            elif key == "facility" and isinstance(value, str):
+                anonymized[key] = recording.facilities.setdefault(
+                    value, self._pseudonym(value, kind="Facility")
+                )
+            elif key == "age" and isinstance(value, int):
+                anonymized[key] = value - value % AGE_BUCKET_YEARS
+            elif key == "admission_date" and isinstance(value, str):
+                anonymized[key] = self._shift_date(value)
+            elif key in FREE_TEXT_FIELDS:
+                anonymized[key] = _placeholder(value)
+            else:
+                anonymized[key] = _scrub_strings(value, names)
+        return anonymized
+
+    def _cassette(self, upstream: UpstreamRecording, recording: RequestRecording) -> dict[str, Any]:
+        """Serialize a model call with patient and facility names scrubbed from its output."""
+        text = scrub_names("".join(upstream.chunks), recording.names)
+        for facility, pseudonym in recording.facilities.items():
+            text = text.replace(facility, pseudonym)
+        return {
+            **upstream.result,
+            "text": text,
+            "chunk_sizes": [len(chunk) for chunk in upstream.chunks],
+            "chunk_offsets_ms": upstream.chunk_offsets_ms,
+        }
+
+    def _append(self, line: str) -> None:
+        """Append one record to the capture file (runs in a worker thread)."""
+        assert self.path is not None
+        with self._lock, self.path.open("a", encoding="utf-8") as capture_file:
+            capture_file.write(line + "\n")
+
+
+# Global recorder instance
+traffic_recorder = TrafficRecorder(
+    settings.traffic_capture_path,
+    sample_rate=settings.traffic_capture_sample_rate,
+    max_body_bytes=settings.traffic_capture_max_body_bytes,
+)
@@ -0,0 +1,241 @@
+"""
+Traffic replay - Re-drive the app with captured traffic.
+Requests from a capture (app/services/traffic_recorder.py) are sent in-process
+at their original or scaled arrival times, and model calls are answered from
+the recorded cassettes instead of the upstream API.
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from app.services.claude_client import CompletionResult, claude_client
+from app.services.traffic_recorder import traffic_recorder
+
+MILLISECONDS_PER_SECOND = 1000
+SERVER_ERROR = 500
+PERCENTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+# Captured request id of the request being replayed in the current context
+_replay_request_id: ContextVar[int | None] = ContextVar("replay_request_id", default=None)
+
+
+class MissingCassetteError(RuntimeError):
+    """Raised when a replayed request makes a model call that was not recorded."""
+
+
+def load_capture(path: Path) -> list[dict[str, Any]]:
+    """
+    Read a traffic capture.
+
+    Args:
+        path: JSONL capture written by the traffic recorder
+
+    Returns:
+        Recorded requests ordered by arrival time
+    """
+    with path.open(encoding="utf-8") as capture_file:
+        records = [json.loads(line) for line in capture_file if line.strip()]
+    return sorted(records, key=lambda record: record["arrival_ms"])
+
+
+class CassettePlayer:
+    """Stand-in for ClaudeClient.stream_completion that replays recorded outputs."""
+
+    def __init__(self, records: list[dict[str, Any]], speed: float = 1.0) -> None:
+        """
+        Index cassettes by captured request.
+
+        Args:
+            records: Captured requests
+            speed: Upstream time scale (2 = twice as fast, 0 = no delays)
+        """
+        self.speed = speed
+        self.cassettes = {record["request_id"]: record["upstream"] for record in records}
+        self._served: Counter[int | None] = Counter()
+
+    # Same signature as ClaudeClient.stream_completion; the prompts are not needed
+    async def stream_completion(
+        self,
+        system_prompt: str,  # noqa: ARG002
+        user_prompt: str,  # noqa: ARG002
+        max_tokens: int = 4000,  # noqa: ARG002
+        facility: str | None = None,  # noqa: ARG002
+    ) -> AsyncGenerator[str | CompletionResult, None]:
+        """
+        Replay the next recorded model call of the current request.
+
+        Text deltas are yielded with their recorded sizes and timing, then
+        the recorded CompletionResult. Quotas and usage are not applied.
+
+        Raises:
+            MissingCassetteError: If the call was not recorded
+        """
+        request_id = _replay_request_id.get()
+        index = self._served[request_id]
+        self._served[request_id] += 1
+        cassettes = self.cassettes.get(request_id, []) if request_id is not None else []
+        if index >= len(cassettes):
+            raise MissingCassetteError(f"No recorded model call {index + 1} for request {request_id}")
+        cassette = cassettes[index]
+
+        text = cassette["text"]
+        sizes = cassette["chunk_sizes"]
+        started = time.perf_counter()
+        position = 0
+        for number, (size, offset_ms) in enumerate(
+            zip(sizes, cassette["chunk_offsets_ms"], strict=True), start=1
+        ):
+            if self.speed:
+                due = offset_ms / MILLISECONDS_PER_SECOND / self.speed
+                await asyncio.sleep(max(0.0, due - (time.perf_counter() - started)))
+            # Scrubbed names change the text length, so the last chunk takes the rest
+            end = position + size if number < len(sizes) else len(text)
+            yield text[position:end]
+            position = end
+        yield CompletionResult(
+            model=cassette["model"],
+            stop_reason=cassette["stop_reason"],
+            input_tokens=cassette["input_tokens"],
+            output_tokens=cassette["output_tokens"],
+        )
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of one replayed request."""
+
+    request_id: int
+    path: str
+    status: int
+    recorded_status: int
+    latency_ms: float
+
+
+@dataclass
+class ReplayReport:
+    """Summary of a replay run."""
+
+    requests: int
+    duration_s: float
+    throughput_rps: float
+    server_errors: int
+    status_mismatches: int
+    latency_ms: dict[str, float]
+    paths: dict[str, dict[str, float]] = field(default_factory=dict)
+
+
+def _latency_summary(latencies: list[float]) -> dict[str, float]:
+    """Nearest-rank percentiles and max of a list of latencies."""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    summary = {
+        name: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+        for name, fraction in PERCENTILES
+    }
+    summary["max"] = ordered[-1]
+    return summary
+
+
+def summarize(results: list[ReplayResult], duration_s: float) -> ReplayReport:
+    """
+    Aggregate replayed requests into a report.
+
+    Args:
+        results: Replayed requests
+        duration_s: Wall-clock duration of the replay
+
+    Returns:
+        ReplayReport with overall and per-path latency percentiles
+    """
+    by_path: dict[str, list[float]] = {}
+    for result in results:
+        by_path.setdefault(result.path, []).append(result.latency_ms)
+    return ReplayReport(
+        requests=len(results),
+        duration_s=round(duration_s, 3),
+        throughput_rps=round(len(results) / duration_s, 2) if duration_s else 0.0,
+        server_errors=sum(1 for result in results if result.status >= SERVER_ERROR),
+        status_mismatches=sum(1 for result in results if result.status != result.recorded_status),
+        latency_ms=_latency_summary([result.latency_ms for result in results]),
+        paths={
+            path: {"requests": len(latencies), **_latency_summary(latencies)}
+            for path, latencies in sorted(by_path.items())
+        },
+    )
+
+
+async def _send(client: httpx.AsyncClient, record: dict[str, Any]) -> ReplayResult:
+    """Send one recorded request, answering its model calls from its cassettes."""
+    _replay_request_id.set(record["request_id"])
+    body = record.get("body")
+    started = time.perf_counter()
+    response = await client.request(
+        record["method"],
+        record["path"] + (f"?{record['query']}" if record.get("query") else ""),
+        headers=record.get("headers", {}),
+        content=json.dumps(body).encode("utf-8") if body is not None else None,
+    )
+    return ReplayResult(
+        request_id=record["request_id"],
+        path=record["path"],
+        status=response.status_code,
+        recorded_status=record["status"],
+        latency_ms=round((time.perf_counter() - started) * MILLISECONDS_PER_SECOND, 1),
+    )
+
+
+async def replay(
+    app: FastAPI,
+    records: list[dict[str, Any]],
+    speed: float = 1.0,
+    upstream_speed: float = 1.0,
+) -> ReplayReport:
+    """
+    Replay captured requests against the app in-process.
+
+    Requests whose body was too large to record (e.g. roster uploads) are
+    skipped. Recording is paused for the duration of the replay.
+
+    Args:
+        app: Application to drive
+        records: Captured requests, ordered by arrival time
+        speed: Arrival time scale (2 = twice as fast, 0 = all at once)
+        upstream_speed: Model output time scale (2 = twice as fast, 0 = instant)
+
+    Returns:
+        ReplayReport for the run
+    """
+    replayable = [
+        record for record in records if record.get("body") is not None or not record["body_bytes"]
+    ]
+    player = CassettePlayer(replayable, speed=upstream_speed)
+    first_arrival = replayable[0]["arrival_ms"] if replayable else 0.0
+    tasks = []
+    with (
+        patch.object(claude_client, "stream_completion", player.stream_completion),
+        patch.object(traffic_recorder, "path", None),
+    ):
+        # httpx types ASGI scopes as dict where Starlette uses MutableMapping
+        transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            started = time.perf_counter()
+            for record in replayable:
+                if speed:
+                    due = (record["arrival_ms"] - first_arrival) / MILLISECONDS_PER_SECOND / speed
+                    await asyncio.sleep(max(0.0, due - (time.perf_counter() - started)))
+                tasks.append(asyncio.create_task(_send(client, record)))
+            results = await asyncio.gather(*tasks)
+            duration = time.perf_counter() - started
+    return summarize(list(results), duration)
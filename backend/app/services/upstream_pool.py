@@ -0,0 +1,274 @@
+"""
+Upstream pool - Several API keys/endpoints behind one model client.
+Requests go to the member with the fewest outstanding requests; members with
+repeated outage errors or rate limiting are ejected for a while and reinstated
+on probation, so throughput scales across separate quota pools.
+"""
+
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+
+import httpx
+from anthropic import AsyncAnthropic
+
+from app.config import settings
+from app.models import UpstreamMemberStatus, UpstreamPoolReport
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+# Rate limit headers, most specific first; budgets refill within about a minute
+RATE_LIMIT_HEADERS = (
+    "anthropic-ratelimit-output-tokens-remaining",
+    "anthropic-ratelimit-tokens-remaining",
+)
+RATE_LIMIT_WINDOW_SECONDS = 60.0
+# Weight of the newest call in the per-member latency average
+LATENCY_SMOOTHING = 0.2
+# Ejection time doubles on each failed probe, up to this multiple
+MAX_EJECTION_MULTIPLIER = 8
+
+STATE_HEALTHY = "healthy"
+STATE_PROBATION = "probation"
+STATE_EJECTED = "ejected"
+
+
+# Compared by identity: two members may share a key or endpoint
+@dataclass(eq=False)
+class UpstreamMember:
+    """One API key/endpoint and its health and load counters."""
+
+    name: str
+    client: AsyncAnthropic
+    base_url: str
+    outstanding: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejection_multiplier: int = 1
+    ejected_until: float | None = None
+    # Reinstated after an ejection; one probe at a time until a call succeeds
+    probation: bool = False
+    latency_ms: float | None = None
+    # (remaining tokens, monotonic time observed) from the last response
+    rate_limit: tuple[int, float] | None = field(default=None, repr=False)
+
+    def state(self, now: float) -> str:
+        """STATE_EJECTED, STATE_PROBATION or STATE_HEALTHY."""
+        if self.ejected_until is not None and now < self.ejected_until:
+            return STATE_EJECTED
+        return STATE_PROBATION if self.probation else STATE_HEALTHY
+
+    def available(self, now: float) -> bool:
+        """Whether the member can take a request now."""
+        state = self.state(now)
+        return state == STATE_HEALTHY or (state == STATE_PROBATION and self.outstanding == 0)
+
+    def headroom(self, now: float) -> int | None:
+        """Remaining token budget, or None if unknown or older than the rate limit window."""
+        if self.rate_limit is None:
+            return None
+        remaining, observed_at = self.rate_limit
+        if now - observed_at > RATE_LIMIT_WINDOW_SECONDS:
+            return None
+        return remaining
+
+    def record_rate_limit(self, headers: Mapping[str, str]) -> None:
+        """Remember the remaining token budget reported by the API."""
+        for header in RATE_LIMIT_HEADERS:
+            value = headers.get(header)
+            if value is not None and value.isdigit():
+                self.rate_limit = (int(value), time.monotonic())
+                return
+
+
+class UpstreamPool:
+    """Least-outstanding-requests balancing with outlier ejection."""
+
+    def __init__(
+        self,
+        members: Sequence[UpstreamMember],
+        eject_failures: int = 3,
+        eject_seconds: float = 30.0,
+    ) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            members: Pool members; the first is the primary
+            eject_failures: Consecutive outage errors that eject a member (0 = never)
+            eject_seconds: First ejection time, doubled on each failed probe
+        """
+        if not members:
+            raise ValueError("An upstream pool needs at least one member")
+        self.members = list(members)
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self._next = 0
+
+    @classmethod
+    def from_settings(cls) -> "UpstreamPool":
+        """Build the pool from UPSTREAM_POOL, or one member from ANTHROPIC_API_KEY."""
+        entries = settings.upstream_pool or [{"name": "primary"}]
+        members = []
+        for number, entry in enumerate(entries):
+            base_url = entry.get("base_url")
+            # Custom httpx client with SSL verification disabled for local dev
+            # This fixes SSL certificate errors with corporate firewalls/antivirus
+            client = AsyncAnthropic(
+                api_key=entry.get("api_key") or settings.anthropic_api_key,
+                base_url=base_url,
+                http_client=httpx.AsyncClient(verify=False),
+            )
+            members.append(
+                UpstreamMember(
+                    name=entry.get("name") or f"member-{number + 1}",
+                    client=client,
+                    base_url=str(client.base_url),
+                )
+            )
+        logger.info(f"Upstream pool initialized | Members={', '.join(m.name for m in members)}")
+        return cls(
+            members,
+            eject_failures=settings.upstream_eject_failures,
+            eject_seconds=settings.upstream_eject_seconds,
+        )
+
+    def _candidates(self, exclude: Sequence[UpstreamMember], now: float) -> list[UpstreamMember]:
+        """Available members not yet tried, in round-robin order for tie-breaking."""
+        start = self._next % len(self.members)
+        rotated = self.members[start:] + self.members[:start]
+        return [m for m in rotated if m not in exclude and m.available(now)]
+
+    def can_fail_over(self, exclude: Sequence[UpstreamMember]) -> bool:
+        """Whether another available member remains after the ones already tried."""
+        return bool(self._candidates(exclude, time.monotonic()))
+
+    def acquire(self, exclude: Sequence[UpstreamMember] = ()) -> UpstreamMember:
+        """
+        Pick the available member with the fewest outstanding requests.
+
+        Ties go round-robin. If every untried member is ejected or busy
+        probing, the least-loaded untried one is used anyway; ejection only
+        steers traffic and never refuses it (the circuit breaker does that).
+
+        Args:
+            exclude: Members already tried for this request
+
+        Returns:
+            The chosen member, counted as outstanding until release()
+        """
+        now = time.monotonic()
+        candidates = (
+            self._candidates(exclude, now)
+            or [m for m in self.members if m not in exclude]
+            or self.members
+        )
+        member = min(candidates, key=lambda m: m.outstanding)
+        self._next += 1
+        member.outstanding += 1
+        member.requests += 1
+        return member
+
+    def release(self, member: UpstreamMember) -> None:
+        """Finish a request started with acquire()."""
+        member.outstanding -= 1
+
+    def record_success(self, member: UpstreamMember, latency_ms: float) -> None:
+        """Mark a member healthy after a completed call."""
+        if member.probation:
+            logger.info(f"Upstream member reinstated | Member={member.name}")
+        member.consecutive_failures = 0
+        member.probation = False
+        member.ejection_multiplier = 1
+        member.latency_ms = (
+            latency_ms
+            if member.latency_ms is None
+            else member.latency_ms + LATENCY_SMOOTHING * (latency_ms - member.latency_ms)
+        )
+
+    def record_failure(self, member: UpstreamMember, retry_after: float | None = None) -> None:
+        """
+        Count an outage error against a member, ejecting it when warranted.
+
+        A member is ejected after `eject_failures` consecutive errors, on any
+        error while on probation, or at once when rate limited (for the
+        retry-after period if given). The last member that is not ejected is
+        never ejected, so traffic always has somewhere to go.
+
+        Args:
+            member: Member whose call failed
+            retry_after: Seconds the upstream asked us to wait, for rate limits
+        """
+        member.failures += 1
+        member.consecutive_failures += 1
+        if not self.eject_failures:
+            return
+        due = (
+            retry_after is not None
+            or member.probation
+            or member.consecutive_failures >= self.eject_failures
+        )
+        now = time.monotonic()
+        others = [m for m in self.members if m is not member and m.state(now) != STATE_EJECTED]
+        if not due or not others:
+            return
+        if member.probation:
+            member.ejection_multiplier = min(
+                member.ejection_multiplier * 2, MAX_EJECTION_MULTIPLIER
+            )
+        seconds = retry_after or self.eject_seconds * member.ejection_multiplier
+        member.ejected_until = now + seconds
+        member.ejections += 1
+        member.consecutive_failures = 0
+        member.probation = True
+        logger.warning(
+            f"Upstream member ejected | Member={member.name} | Seconds={seconds:.0f} | "
+            f"Failures={member.failures}"
+        )
+
+    def headroom(self) -> int | None:
+        """
+        Combined token budget of the members that can take requests.
+
+        Returns:
+            Sum of known budgets, or None if no member has a recent one
+        """
+        now = time.monotonic()
+        budgets = [
+            budget
+            for member in self.members
+            if member.state(now) != STATE_EJECTED and (budget := member.headroom(now)) is not None
+        ]
+        return sum(budgets) if budgets else None
+
+    def report(self) -> UpstreamPoolReport:
+        """Per-member health, load and latency."""
+        now = time.monotonic()
+        members = [
+            UpstreamMemberStatus(
+                name=member.name,
+                base_url=member.base_url,
+                state=member.state(now),
+                outstanding=member.outstanding,
+                requests=member.requests,
+                failures=member.failures,
+                ejections=member.ejections,
+                ejected_for_seconds=(
+                    round(member.ejected_until - now, 1)
+                    if member.state(now) == STATE_EJECTED and member.ejected_until is not None
+                    else None
+                ),
+                average_latency_ms=(
+                    round(member.latency_ms, 1) if member.latency_ms is not None else None
+                ),
+                rate_limit_remaining=member.headroom(now),
+            )
+            for member in self.members
+        ]
+        return UpstreamPoolReport(
+            available=sum(1 for member in self.members if member.state(now) != STATE_EJECTED),
+            members=members,
+        )
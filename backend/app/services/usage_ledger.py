@@ -0,0 +1,295 @@
+"""
+Per-facility token accounting with daily quotas.
+Usage is aggregated in memory on the event loop (no locks on the request
+path) and periodically appended to a local JSONL ledger in batches.
+"""
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.models import FacilityUsage, UsageReport
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+UNKNOWN_FACILITY = "unattributed"
+
+
+class QuotaExceededError(Exception):
+    """Raised before an upstream call when a facility has used its daily quota."""
+
+    def __init__(self, facility: str, used_tokens: int, quota_tokens: int) -> None:
+        """Record which facility hit which quota."""
+        super().__init__(
+            f"Daily token quota exceeded for facility '{facility}' "
+            f"({used_tokens}/{quota_tokens} tokens)"
+        )
+        self.facility = facility
+        self.used_tokens = used_tokens
+        self.quota_tokens = quota_tokens
+
+
+@dataclass
+class UsageCounters:
+    """Aggregated usage for one facility on one day."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        """Input plus output tokens."""
+        return self.input_tokens + self.output_tokens
+
+    def add(self, other: "UsageCounters") -> None:
+        """Accumulate another set of counters into this one."""
+        self.calls += other.calls
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.latency_ms += other.latency_ms
+
+
+def _today() -> str:
+    """Current UTC date, the quota period."""
+    return datetime.now(UTC).date().isoformat()
+
+
+def _record_counters(record: dict[str, Any]) -> UsageCounters:
+    """Counters of one ledger file record."""
+    return UsageCounters(
+        record["calls"], record["input_tokens"], record["output_tokens"], record["latency_ms"]
+    )
+
+
+def seconds_until_quota_reset() -> int:
+    """Seconds until the next UTC midnight, when daily quotas reset."""
+    now = datetime.now(UTC)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int((tomorrow - now).total_seconds()) + 1
+
+
+class UsageLedger:
+    """In-memory usage aggregation with batched persistence and quota checks."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        default_quota: int = 0,
+        quotas: dict[str, int] | None = None,
+    ) -> None:
+        """
+        Initialize the ledger, loading today's persisted usage if any.
+
+        Args:
+            path: JSONL ledger file, or None to keep usage in memory only
+            default_quota: Daily token quota per facility (0 for unlimited)
+            quotas: Per-facility overrides of the default quota
+        """
+        self.path = Path(path) if path else None
+        self.default_quota = default_quota
+        self.quotas = quotas or {}
+        # (date, facility) -> totals, and the deltas not yet flushed
+        self._totals: dict[tuple[str, str], UsageCounters] = {}
+        self._pending: dict[tuple[str, str], UsageCounters] = {}
+        self._flusher: asyncio.Task[None] | None = None
+        self._load()
+
+    def quota_for(self, facility: str) -> int:
+        """Daily token quota for a facility (0 for unlimited)."""
+        return self.quotas.get(facility, self.default_quota)
+
+    def usage(self, facility: str, day: str | None = None) -> UsageCounters:
+        """Usage for a facility on a day (today by default)."""
+        return self._totals.get((day or _today(), facility), UsageCounters())
+
+    def check_quota(self, facility: str | None) -> None:
+        """
+        Ensure a facility may make another upstream call.
+
+        Raises:
+            QuotaExceededError: If the facility has used its daily quota
+        """
+        facility = facility or UNKNOWN_FACILITY
+        quota = self.quota_for(facility)
+        if not quota:
+            return
+        used = self.usage(facility).total_tokens
+        if used >= quota:
+            raise QuotaExceededError(facility, used, quota)
+
+    def record(
+        self,
+        facility: str | None,
+        input_tokens: int,
+        output_tokens: int,
+        latency_ms: float,
+    ) -> None:
+        """
+        Record one upstream call.
+
+        Plain dictionary updates on the event loop thread, so this never
+        blocks the request path.
+        """
+        key = (_today(), facility or UNKNOWN_FACILITY)
+        delta = UsageCounters(1, input_tokens, output_tokens, latency_ms)
+        self._totals.setdefault(key, UsageCounters()).add(delta)
+        self._pending.setdefault(key, UsageCounters()).add(delta)
+
+    def report(self, day: str | None = None) -> UsageReport:
+        """
+        Usage per facility for a day.
+
+        Args:
+            day: ISO date (today by default)
+
+        Returns:
+            UsageReport with facilities ordered by total tokens, highest first
+        """
+        day = day or _today()
+        facilities = []
+        for (date, facility), counters in self._totals.items():
+            if date != day:
+                continue
+            quota = self.quota_for(facility) or None
+            facilities.append(
+                FacilityUsage(
+                    facility=facility,
+                    calls=counters.calls,
+                    input_tokens=counters.input_tokens,
+                    output_tokens=counters.output_tokens,
+                    total_tokens=counters.total_tokens,
+                    average_latency_ms=round(counters.latency_ms / max(counters.calls, 1), 1),
+                    quota_tokens=quota,
+                    remaining_tokens=max(quota - counters.total_tokens, 0) if quota else None,
+                )
+            )
+        facilities.sort(key=lambda usage: usage.total_tokens, reverse=True)
+        return UsageReport(date=day, facilities=facilities)
+
+    def daily_usage(
+        self, facility: str | None = None, since: str | None = None, until: str | None = None
+    ) -> list[tuple[str, str, UsageCounters]]:
+        """
+        Per-day, per-facility usage for export.
+
+        With a ledger file, the file is streamed line by line into daily
+        totals (flush first so it is complete), so memory grows with the
+        number of days and facilities rather than the ledger size. Without
+        one, the in-memory totals since startup are used.
+
+        Args:
+            facility: Only this facility
+            since: First ISO date included
+            until: Last ISO date included
+
+        Returns:
+            (date, facility, counters) rows ordered by date, then facility
+        """
+
+        def wanted(day: str, name: str) -> bool:
+            return (
+                (facility is None or name == facility)
+                and (since is None or day >= since)
+                and (until is None or day <= until)
+            )
+
+        totals: dict[tuple[str, str], UsageCounters] = {}
+        if self.path is None:
+            for key, counters in list(self._totals.items()):
+                if wanted(*key):
+                    totals.setdefault(key, UsageCounters()).add(counters)
+        elif self.path.exists():
+            with self.path.open(encoding="utf-8") as ledger_file:
+                for line in ledger_file:
+                    record = json.loads(line)
+                    key = (record["date"], record["facility"])
+                    if wanted(*key):
+                        totals.setdefault(key, UsageCounters()).add(_record_counters(record))
+        return [(day, name, counters) for (day, name), counters in sorted(totals.items())]
+
+    async def flush(self) -> int:
+        """
+        Append pending usage to the ledger file.
+
+        Returns:
+            Number of records written
+        """
+        if self.path is None:
+            self._pending.clear()
+            return 0
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        flushed_at = datetime.now(UTC).isoformat()
+        lines = [
+            json.dumps(
+                {"date": day, "facility": facility, **asdict(counters), "flushed_at": flushed_at}
+            )
+            for (day, facility), counters in pending.items()
+        ]
+        try:
+            await asyncio.to_thread(self._append, lines)
+        except OSError:
+            # Keep the batch so the next flush retries it
+            for key, counters in pending.items():
+                self._pending.setdefault(key, UsageCounters()).add(counters)
+            raise
+        logger.debug(f"Usage ledger flushed | Records={len(lines)}")
+        return len(lines)
+
+    def start(self, interval_seconds: float) -> None:
+        """Start periodic flushing on the running event loop."""
+        if self._flusher is None and self.path is not None:
+            self._flusher = asyncio.create_task(self._flush_periodically(interval_seconds))
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write anything still pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_periodically(self, interval_seconds: float) -> None:
+        """Flush loop run by start()."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Usage ledger flush failed: {e!s}")
+
+    def _append(self, lines: list[str]) -> None:
+        """Append lines to the ledger file (runs in a worker thread)."""
+        assert self.path is not None
+        with self.path.open("a", encoding="utf-8") as ledger_file:
+            ledger_file.write("\n".join(lines) + "\n")
+
+    def _load(self) -> None:
+        """Seed today's totals from the ledger file so quotas survive restarts."""
+        if self.path is None or not self.path.exists():
+            return
+        today = _today()
+        with self.path.open(encoding="utf-8") as ledger_file:
+            for line in ledger_file:
+                record = json.loads(line)
+                if record["date"] != today:
+                    continue
+                self._totals.setdefault((today, record["facility"]), UsageCounters()).add(
+                    _record_counters(record)
+                )
+
+
+# Global ledger instance
+usage_ledger = UsageLedger(
+    settings.usage_ledger_path,
+    default_quota=settings.facility_daily_token_quota,
+    quotas=settings.facility_token_quotas,
+)
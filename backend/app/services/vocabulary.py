@@ -0,0 +1,241 @@
+"""
+Clinical vocabulary index for server-side autocomplete.
+Loads the bundled vocabulary once and answers prefix/trigram queries from
+precomputed in-memory indexes.
+"""
+
+import hashlib
+import json
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.config import settings
+from app.models import Medication, PatientInput
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__, settings.log_level)
+
+VOCABULARY_PATH = Path(__file__).resolve().parent.parent / "data" / "vocabulary.json"
+
+# Ranking tiers; trigram matches score below every prefix tier (0 to 1, the
+# fraction of query trigrams found in the term or one of its synonyms)
+SCORE_EXACT = 4.0
+SCORE_TERM_PREFIX = 3.0
+SCORE_SYNONYM_PREFIX = 2.5
+SCORE_WORD_PREFIX = 2.0
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_term(value: str) -> str:
+    """Lowercase a term and collapse punctuation and whitespace to single spaces."""
+    return _NON_ALPHANUMERIC.sub(" ", value.lower()).strip()
+
+
+def _trigrams(normalized: str) -> set[str]:
+    """Character trigrams of a normalized term, padded at word boundaries."""
+    padded = f"  {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class VocabularyMatch:
+    """A ranked autocomplete match."""
+
+    term: str
+    matched: str
+    score: float
+
+
+class CategoryIndex:
+    """Prefix and trigram indexes over the terms of one vocabulary category."""
+
+    def __init__(self, entries: list[dict | str]) -> None:
+        """Build the indexes for a list of vocabulary entries."""
+        self.terms: list[str] = []
+        # Sorted (key, term_id, alias, tier) tuples for bisect prefix lookup
+        prefix_keys: list[tuple[str, int, str, float]] = []
+        self._canonical: dict[str, int] = {}
+        self._trigram_index: dict[str, list[int]] = {}
+
+        for entry in entries:
+            term = entry if isinstance(entry, str) else entry["term"]
+            synonyms = [] if isinstance(entry, str) else entry.get("synonyms", [])
+            # Related terms are broader, narrower or ambiguous: searchable, never canonical
+            related = [] if isinstance(entry, str) else entry.get("related", [])
+            term_id = len(self.terms)
+            self.terms.append(term)
+
+            term_trigrams: set[str] = set()
+            for alias, tier in (
+                (term, SCORE_TERM_PREFIX),
+                *((s, SCORE_SYNONYM_PREFIX) for s in synonyms),
+                *((r, SCORE_SYNONYM_PREFIX) for r in related),
+            ):
+                normalized = normalize_term(alias)
+                if alias is term or alias in synonyms:
+                    self._canonical.setdefault(normalized, term_id)
+                prefix_keys.append((normalized, term_id, alias, tier))
+                # Word-start keys let "diab" match "Type 2 Diabetes Mellitus"
+                words = normalized.split(" ")
+                prefix_keys.extend(
+                    (" ".join(words[i:]), term_id, alias, SCORE_WORD_PREFIX)
+                    for i in range(1, len(words))
+                )
+                term_trigrams |= _trigrams(normalized)
+
+            for trigram in term_trigrams:
+                self._trigram_index.setdefault(trigram, []).append(term_id)
+
+        prefix_keys.sort()
+        self._prefix_keys = prefix_keys
+        self._prefix_strings = [key for key, _, _, _ in prefix_keys]
+
+    def search(self, query: str, limit: int) -> list[VocabularyMatch]:
+        """
+        Find the best matching terms for a query.
+
+        Args:
+            query: Raw user input
+            limit: Maximum number of matches to return
+
+        Returns:
+            Matches ordered by score, then by term length and alphabetically
+        """
+        normalized = normalize_term(query)
+        if not normalized:
+            return []
+
+        best: dict[int, VocabularyMatch] = {}
+        start = bisect_left(self._prefix_strings, normalized)
+        for key, term_id, alias, tier in self._prefix_keys[start:]:
+            if not key.startswith(normalized):
+                break
+            score = SCORE_EXACT if key == normalized and tier != SCORE_WORD_PREFIX else tier
+            current = best.get(term_id)
+            if current is None or score > current.score:
+                best[term_id] = VocabularyMatch(self.terms[term_id], alias, score)
+
+        # Fall back to fuzzy trigram matching for typos and mid-word fragments
+        if len(best) < limit:
+            query_trigrams = _trigrams(normalized)
+            shared: dict[int, int] = {}
+            for trigram in query_trigrams:
+                for term_id in self._trigram_index.get(trigram, ()):
+                    shared[term_id] = shared.get(term_id, 0) + 1
+            for term_id, count in shared.items():
+                if term_id in best:
+                    continue
+                similarity = count / len(query_trigrams)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    best[term_id] = VocabularyMatch(
+                        self.terms[term_id], self.terms[term_id], round(similarity, 3)
+                    )
+
+        ranked = sorted(best.values(), key=lambda m: (-m.score, len(m.term), m.term))
+        return ranked[:limit]
+
+    def canonicalize(self, value: str) -> str:
+        """
+        Map a free-text value onto its canonical vocabulary term.
+
+        Only whole-value matches (ignoring case and punctuation) on a term or
+        an equivalent synonym are mapped. Qualified values such as
+        "Diabetes (uncontrolled)" and related terms that are broader or
+        narrower than the canonical term are returned unchanged apart from
+        surrounding whitespace.
+        """
+        term_id = self._canonical.get(normalize_term(value))
+        if term_id is not None:
+            return self.terms[term_id]
+        return value.strip()
+
+
+class VocabularyIndex:
+    """All vocabulary categories, loaded once from the bundled vocabulary file."""
+
+    def __init__(self, data: dict, etag_seed: str) -> None:
+        """Build category indexes from parsed vocabulary data."""
+        self.version: str = data.get("version", "unversioned")
+        self.categories: dict[str, CategoryIndex] = {
+            name: CategoryIndex(entries) for name, entries in data["categories"].items()
+        }
+        self._etag_seed = etag_seed
+
+    @classmethod
+    def from_file(cls, path: Path = VOCABULARY_PATH) -> "VocabularyIndex":
+        """Load and index a vocabulary JSON file."""
+        raw = path.read_bytes()
+        index = cls(json.loads(raw), hashlib.sha256(raw).hexdigest()[:16])
+        counts = " | ".join(f"{name}={len(cat.terms)}" for name, cat in index.categories.items())
+        logger.info(f"Vocabulary index loaded | Version={index.version} | {counts}")
+        return index
+
+    def etag(self, category: str, query: str, limit: int) -> str:
+        """Strong ETag for an autocomplete response, stable for a given vocabulary file."""
+        # The raw query is echoed in the body, so it must be part of the key
+        key = f"{self._etag_seed}:{category}:{limit}:{query}"
+        return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+    def search(self, category: str, query: str, limit: int = 10) -> list[VocabularyMatch]:
+        """
+        Search one category.
+
+        Raises:
+            KeyError: If the category does not exist
+        """
+        return self.categories[category].search(query, limit)
+
+    def canonicalize(self, category: str, value: str) -> str:
+        """Map a value onto the canonical term of a category."""
+        return self.categories[category].canonicalize(value)
+
+    def standardized_terms(self, patient: PatientInput) -> list[tuple[str, str]]:
+        """
+        List (original, canonical) pairs for patient values that map onto a
+        differently written canonical term.
+
+        The original text is left untouched; callers present the canonical
+        term alongside it.
+        """
+        pairs: list[tuple[str, str]] = []
+        values = [
+            *(("diagnoses", item) for item in [patient.primary_diagnosis, *patient.comorbidities]),
+            *(("medications", med.name) for med in patient.current_medications),
+            *(("allergies", item) for item in patient.allergies),
+        ]
+        for category, value in values:
+            canonical = self.canonicalize(category, value)
+            if canonical != value.strip() and (value.strip(), canonical) not in pairs:
+                pairs.append((value.strip(), canonical))
+        return pairs
+
+    def canonicalize_patient(self, patient: PatientInput) -> PatientInput:
+        """
+        Return a copy of a patient with diagnoses, medications and allergies
+        mapped onto canonical vocabulary terms.
+        """
+        return patient.model_copy(
+            update={
+                "primary_diagnosis": self.canonicalize("diagnoses", patient.primary_diagnosis),
+                "comorbidities": [
+                    self.canonicalize("diagnoses", item) for item in patient.comorbidities
+                ],
+                "current_medications": [
+                    Medication(
+                        name=self.canonicalize("medications", med.name),
+                        dosage=med.dosage.strip(),
+                        frequency=med.frequency.strip(),
+                    )
+                    for med in patient.current_medications
+                ],
+                "allergies": [self.canonicalize("allergies", item) for item in patient.allergies],
+            }
+        )
+
+
+# Global vocabulary index, built once at import time
+vocabulary_index = VocabularyIndex.from_file()
@@ -0,0 +1,152 @@
+"""
+Request deadlines and client-disconnect cancellation.
+The deadline is held in a context variable so it flows from the endpoint
+into the upstream model call without being threaded through every function.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable
+from contextvars import ContextVar, Token
+from typing import Any, TypeVar
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+T = TypeVar("T")
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+MILLISECONDS_PER_SECOND = 1000
+
+# Absolute time.monotonic() deadline of the current request, if any
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the request deadline passes before the work completes."""
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client goes away before the work completes."""
+
+
+def deadline_seconds(header_value: str | None, default: float, maximum: float) -> float:
+    """
+    Resolve the time budget for a request.
+
+    Args:
+        header_value: Raw X-Request-Deadline-Ms header, if sent
+        default: Per-route default budget in seconds
+        maximum: Upper bound on client-requested budgets in seconds
+
+    Returns:
+        Budget in seconds (the default if the header is missing or invalid)
+    """
+    if header_value is None or not header_value.strip().isdigit():
+        return default
+    return min(int(header_value) / MILLISECONDS_PER_SECOND, maximum)
+
+
+def set_deadline(seconds: float) -> Token[float | None]:
+    """Start a deadline for the current context; pass the token to reset_deadline()."""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token: Token[float | None]) -> None:
+    """Restore the deadline that was active before set_deadline()."""
+    _deadline.reset(token)
+
+
+def remaining_seconds() -> float | None:
+    """
+    Time left before the current deadline.
+
+    Returns:
+        Seconds remaining (may be negative), or None when no deadline is set
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Return once the client disconnects (the body must already be consumed)."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_disconnect(request: Request, work: Awaitable[T], timeout: float) -> T:
+    """
+    Await work, cancelling it if the client disconnects or the timeout passes.
+
+    Cancelling the work propagates into the upstream stream, which closes
+    the connection so no further tokens are generated.
+
+    Args:
+        request: Request whose client is watched (body already read)
+        work: Awaitable to run
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        The result of work
+
+    Raises:
+        ClientDisconnectedError: If the client disconnected first
+        DeadlineExceededError: If the timeout passed first
+    """
+    work_task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {work_task, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        if work_task in done:
+            return work_task.result()
+        if watcher in done:
+            raise ClientDisconnectedError("Client disconnected before the response was ready")
+        raise DeadlineExceededError(f"Request deadline of {timeout:.1f}s exceeded")
+    finally:
+        for task in (work_task, watcher):
+            task.cancel()
+        await asyncio.gather(work_task, watcher, return_exceptions=True)
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose content is still reading the request body.
+
+    Starlette's StreamingResponse watches for disconnects by calling
+    receive() from the start, which would take body chunks away from the
+    content. Here a disconnect during the upload surfaces from
+    request.stream() as ClientDisconnect, and the watch starts only once
+    body_read is set.
+    """
+
+    def __init__(self, content: Any, body_read: asyncio.Event, **kwargs: Any) -> None:
+        """Wrap streamed content; set body_read when the request body is consumed."""
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def __call__(
+        self,
+        scope: Scope,  # noqa: ARG002
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Stream the content, cancelling it if the client disconnects after the upload."""
+        async with anyio.create_task_group() as task_group:
+
+            async def stream() -> None:
+                await self.stream_response(send)
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(stream)
+            await self.body_read.wait()
+            await self.listen_for_disconnect(receive)
+            task_group.cancel_scope.cancel()
+
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,78 @@
+"""
+Canonical hashing of patient input and generated plans.
+Equivalent PatientInput payloads (differing only in whitespace or in the
+order of unordered lists) hash to the same key.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from app.models import CarePlanOutput, PatientInput
+
+# List fields whose order carries no meaning
+UNORDERED_LIST_FIELDS = ("comorbidities", "allergies", "symptoms", "fall_risk_factors")
+
+
+def _normalize(value: Any) -> Any:
+    """Collapse whitespace in strings, recursively."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def canonical_patient_json(patient: PatientInput) -> str:
+    """
+    Serialize a patient to canonical JSON.
+
+    Args:
+        patient: Validated patient input
+
+    Returns:
+        Compact JSON with sorted keys, normalized whitespace and sorted
+        unordered lists (medications are sorted by name, dosage, frequency)
+    """
+    data = _normalize(patient.model_dump(mode="json"))
+    for field in UNORDERED_LIST_FIELDS:
+        data[field] = sorted(data[field])
+    data["current_medications"] = sorted(
+        data["current_medications"],
+        key=lambda med: (med["name"].lower(), med["dosage"], med["frequency"]),
+    )
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def patient_input_hash(patient: PatientInput, salt: str = "") -> str:
+    """
+    Hash a patient's canonical JSON.
+
+    Args:
+        patient: Validated patient input
+        salt: Extra context mixed into the hash (e.g. a prompt fingerprint)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(salt.encode() + b"\0")
+    digest.update(canonical_patient_json(patient).encode())
+    return digest.hexdigest()
+
+
+def plan_content_hash(plan: CarePlanOutput) -> str:
+    """
+    Hash a generated plan's content.
+
+    Derived outputs (handouts, translations) are keyed by this, so they are
+    reused exactly as long as the plan they came from is unchanged.
+
+    Args:
+        plan: Generated care plan
+
+    Returns:
+        Hex SHA-256 digest of the plan HTML
+    """
+    return hashlib.sha256(plan.care_plan_html.encode()).hexdigest()
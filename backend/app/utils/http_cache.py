@@ -0,0 +1,112 @@
+"""
+HTTP caching helpers for immutable, content-addressed responses.
+Strong ETags, If-None-Match revalidation and single byte-range requests
+(with If-Range), so browsers and proxies can reuse and resume responses.
+"""
+
+import hashlib
+import re
+
+from fastapi import Request, Response
+
+# One year, the conventional lifetime of immutable URLs
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+RANGE_PATTERN = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Raised when a byte range starts beyond the end of the body."""
+
+
+def strong_etag(body: bytes) -> str:
+    """Strong entity tag of exact response bytes."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag (weak comparison, per RFC 9110).
+
+    Args:
+        if_none_match: Header value, possibly a comma-separated list or "*"
+        etag: Current strong ETag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def byte_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single "bytes=" range.
+
+    Args:
+        range_header: Range header value
+        size: Length of the full body
+
+    Returns:
+        Inclusive (start, end) offsets, or None if the header should be
+        ignored (malformed or several ranges) and the full body served
+
+    Raises:
+        RangeNotSatisfiableError: If the range lies entirely past the end
+    """
+    match = RANGE_PATTERN.match(range_header)
+    if match is None or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the final `last` bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiableError(range_header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(range_header)
+    return start, end
+
+
+def immutable_response(
+    request: Request, body: bytes, media_type: str, cache_control: str
+) -> Response:
+    """
+    Serve bytes that never change at their URL.
+
+    Answers If-None-Match with 304 and a single byte range with 206 (or
+    416), and otherwise returns the full body, always with a strong ETag.
+
+    Args:
+        request: Incoming request (conditional and range headers are read)
+        body: Full response body
+        media_type: Content type of the body
+        cache_control: Cache-Control header value
+
+    Returns:
+        200, 206, 304 or 416 response
+    """
+    etag = strong_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            span = byte_range(range_header, len(body))
+        except RangeNotSatisfiableError:
+            headers["Content-Range"] = f"bytes */{len(body)}"
+            return Response(status_code=416, headers=headers)
+        if span is not None:
+            start, end = span
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return Response(
+                body[start : end + 1], status_code=206, media_type=media_type, headers=headers
+            )
+    return Response(body, media_type=media_type, headers=headers)
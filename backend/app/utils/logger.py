@@ -82,6 +82,23 @@ def log_api_response(
     logger.info(f"API Response: {method} {path} | Status={status_code} | {context}")
 
 
+def log_slow_request(
+    logger: logging.Logger, method: str, path: str, duration_ms: float, **kwargs: Any
+) -> None:
+    """
+    Log a request that exceeded the slow-request threshold.
+
+    Args:
+        logger: Logger instance
+        method: HTTP method
+        path: Request path
+        duration_ms: Request duration in milliseconds
+        **kwargs: Additional context to log
+    """
+    context = " | ".join(f"{k}={v}" for k, v in kwargs.items())
+    logger.warning(f"Slow Request: {method} {path} | DurationMs={duration_ms:.0f} | {context}")
+
+
 def log_error(logger: logging.Logger, error: Exception, context: str = "") -> None:
     """
     Log error with consistent format and context.
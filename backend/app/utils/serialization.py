@@ -0,0 +1,53 @@
+"""
+Fast JSON serialization helpers for API responses.
+Models we construct ourselves are serialized once by pydantic-core instead of
+being re-validated against response_model and re-encoded by FastAPI.
+"""
+
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.models import RequestProfile, RiskAssessment
+
+# Adapters are expensive to build, so build each one once at import time
+RISK_ASSESSMENT_LIST_ADAPTER: TypeAdapter[list[RiskAssessment]] = TypeAdapter(
+    list[RiskAssessment]
+)
+REQUEST_PROFILE_LIST_ADAPTER: TypeAdapter[list[RequestProfile]] = TypeAdapter(
+    list[RequestProfile]
+)
+
+
+class ModelResponse(ORJSONResponse):
+    """
+    JSON response that serializes Pydantic data directly to bytes.
+
+    Returning this from an endpoint skips FastAPI's response_model
+    validation, so only use it for values that are already validated.
+    Models use their compiled serializer, other types need a pre-built
+    TypeAdapter, and plain Python data falls back to orjson.
+    """
+
+    def __init__(
+        self, content: Any, adapter: TypeAdapter[Any] | None = None, **kwargs: Any
+    ) -> None:
+        """
+        Initialize the response.
+
+        Args:
+            content: Model, adapter-typed value, or plain JSON-compatible data
+            adapter: Pre-built TypeAdapter for non-model values (e.g. lists of models)
+            **kwargs: Extra Response arguments (status_code, headers)
+        """
+        self.adapter = adapter
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content to JSON bytes in a single pass."""
+        if self.adapter is not None:
+            return self.adapter.dump_json(content)
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
@@ -0,0 +1,53 @@
+"""
+Compare the default FastAPI response path with the single-pass serializer.
+
+Usage:
+    python -m benchmarks.serialization_benchmark [--html-kb 40] [--number 2000]
+"""
+
+import argparse
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models import CarePlanOutput
+from app.utils.serialization import ModelResponse
+
+
+def _sample_plan(html_kb: int) -> CarePlanOutput:
+    """Build a care plan with roughly html_kb kilobytes of HTML."""
+    section = "<h2>Nursing Interventions</h2><ul><li>Reposition every 2 hours</li></ul>"
+    html = section * (html_kb * 1024 // len(section))
+    return CarePlanOutput(
+        patient_name="John Doe", care_plan_html=html, generated_at="2026-01-15T10:30:00Z"
+    )
+
+
+def main() -> None:
+    """Run the benchmark and print per-call timings."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--html-kb", type=int, default=40, help="Care plan HTML size in KB")
+    parser.add_argument("--number", type=int, default=2000, help="Iterations per path")
+    args = parser.parse_args()
+
+    plan = _sample_plan(args.html_kb)
+    adapter = TypeAdapter(CarePlanOutput)
+
+    def default_path() -> bytes:
+        # What FastAPI does with response_model: validate, dump, encode, json.dumps
+        validated = adapter.validate_python(plan, from_attributes=True)
+        return JSONResponse(jsonable_encoder(validated.model_dump(mode="json"))).body
+
+    def fast_path() -> bytes:
+        return ModelResponse(plan).body
+
+    assert len(default_path()) >= len(fast_path())
+    for label, func in (("default", default_path), ("single-pass", fast_path)):
+        seconds = timeit.timeit(func, number=args.number)
+        print(f"{label:>12}: {seconds / args.number * 1e6:8.1f} us/response")
+
+
+if __name__ == "__main__":
+    main()
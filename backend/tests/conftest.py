@@ -3,12 +3,91 @@ Pytest configuration file.
 Contains fixtures and configuration for all tests.
 """
 
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from types import SimpleNamespace
 
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.services.claude_client import CompletionResult, claude_client
+
+# Size of the text deltas replayed by FakeClaude
+FAKE_CHUNK_SIZE = 16
+
+
+class FakeClaude:
+    """Stand-in for ClaudeClient.stream_completion that replays canned outputs."""
+
+    def __init__(self) -> None:
+        """Initialize with no queued responses."""
+        self.responses: list[tuple[str, str]] = []
+        self.calls: list[dict[str, str | int | None]] = []
+
+    def respond(self, text: str, stop_reason: str = "end_turn") -> None:
+        """Queue a response; the last queued response is reused once the queue is drained."""
+        self.responses.append((text, stop_reason))
+
+    async def stream_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 4000,
+        facility: str | None = None,
+    ) -> AsyncGenerator[str | CompletionResult, None]:
+        """Replay the next response in small chunks, then its CompletionResult."""
+        self.calls.append(
+            {
+                "system_prompt": system_prompt,
+                "user_prompt": user_prompt,
+                "max_tokens": max_tokens,
+                "facility": facility,
+            }
+        )
+        text, stop_reason = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        for start in range(0, len(text), FAKE_CHUNK_SIZE):
+            yield text[start : start + FAKE_CHUNK_SIZE]
+        yield CompletionResult(
+            model="fake-model",
+            stop_reason=stop_reason,
+            input_tokens=len(user_prompt) // 4,
+            output_tokens=len(text) // 4,
+        )
+
+
+class FakeEventStream:
+    """Minimal stand-in for the SDK's AsyncStream of message events."""
+
+    def __init__(self, text_chunks: list[str], headers: dict[str, str]) -> None:
+        """Build message_start, text delta and message_delta events."""
+        self.response = SimpleNamespace(headers=headers)
+        self.closed = False
+        self.events = [
+            SimpleNamespace(
+                type="message_start",
+                message=SimpleNamespace(model="fake-model", usage=SimpleNamespace(input_tokens=50)),
+            ),
+            *(
+                SimpleNamespace(
+                    type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=text)
+                )
+                for text in text_chunks
+            ),
+            SimpleNamespace(
+                type="message_delta",
+                delta=SimpleNamespace(stop_reason="end_turn"),
+                usage=SimpleNamespace(output_tokens=30),
+            ),
+        ]
+
+    async def __aiter__(self):
+        """Yield the prepared events."""
+        for event in self.events:
+            yield event
+
+    async def close(self) -> None:
+        """Record that the stream was closed."""
+        self.closed = True
 
 
 @pytest.fixture(scope="session")
@@ -23,6 +102,14 @@ def test_client() -> Generator[TestClient, None, None]:
         yield client
 
 
+@pytest.fixture
+def fake_claude(monkeypatch: pytest.MonkeyPatch) -> FakeClaude:
+    """Fixture replacing the Claude streaming call with canned responses."""
+    fake = FakeClaude()
+    monkeypatch.setattr(claude_client, "stream_completion", fake.stream_completion)
+    return fake
+
+
 @pytest.fixture
 def sample_patient_minimal():
     """Fixture providing minimal valid patient data."""
@@ -42,7 +129,7 @@ def sample_patient_minimal():
         "current_medications": [],
         "allergies": [],
         "symptoms": [],
-        "mobility_level": "Independent",
+        "mobility_level": "ambulatory",
         "adl_independence": "Independent",
         "fall_risk_factors": [],
         "cognitive_status": "Alert",
@@ -80,7 +167,7 @@ def sample_patient_comprehensive():
         ],
         "allergies": ["Sulfa drugs"],
         "symptoms": ["Shortness of breath", "Bilateral leg edema", "Fatigue"],
-        "mobility_level": "Wheelchair dependent",
+        "mobility_level": "wheelchair",
         "adl_independence": "Requires extensive assistance with ADLs",
         "fall_risk_factors": ["Weakness", "Diuretic use", "Age > 80"],
         "cognitive_status": "Alert and oriented x3, mild forgetfulness",
@@ -0,0 +1,148 @@
+"""
+Tests for the streaming analytics export of plans and usage.
+"""
+
+import csv
+import io
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from app.models import CarePlanOutput, PatientInput
+from app.services import analytics_export
+from app.services.analytics_export import (
+    PLAN_COLUMNS,
+    USAGE_COLUMNS,
+    ExportFilter,
+    csv_chunks,
+    plan_rows,
+    usage_rows,
+)
+from app.services.care_plan_service import generate_care_plan
+from app.services.plan_store import PlanStore, plan_store
+from app.services.request_profiler import request_profiler
+from app.services.usage_ledger import UsageLedger
+
+TOKEN = "export-admin-token"
+FACILITY = "Export Test Facility"
+TODAY = datetime.now(UTC).date()
+
+
+@pytest.fixture
+def patient_data(sample_patient_comprehensive) -> dict:
+    """Comprehensive patient data at the export test facility."""
+    sample_patient_comprehensive["facility"] = FACILITY
+    return sample_patient_comprehensive
+
+
+def store_plans(store: PlanStore, patient_data: dict, count: int, facility: str) -> None:
+    """Store `count` plans with token counts at a facility."""
+    for number in range(count):
+        patient = PatientInput(
+            **{**patient_data, "name": f"Resident {number}", "facility": facility}
+        )
+        plan = CarePlanOutput(
+            patient_name=patient.name,
+            care_plan_html=f"<h2>Goals</h2><p>{number}</p>",
+            generated_at="now",
+            model="fake-model",
+            input_tokens=100,
+            output_tokens=number,
+        )
+        store.put(f"{facility}-{number}", patient, plan, source="test")
+
+
+def read_csv(columns, pages) -> list[dict[str, str]]:
+    """Decode a CSV export."""
+    return list(csv.DictReader(io.StringIO(b"".join(csv_chunks(columns, pages)).decode())))
+
+
+class TestPlanExport:
+    """Tests for exporting stored plan metadata."""
+
+    def test_pages_and_filters(self, patient_data):
+        """Plans are read in pages, filtered by facility and stored date."""
+        store = PlanStore()
+        store_plans(store, patient_data, 5, FACILITY)
+        store_plans(store, patient_data, 2, "Other Facility")
+
+        pages = list(plan_rows(store, ExportFilter(facility=FACILITY), chunk_size=2))
+        assert [len(page) for page in pages] == [2, 2, 1]
+        rows = read_csv(PLAN_COLUMNS, pages)
+        assert {row["facility"] for row in rows} == {FACILITY}
+        assert sorted(int(row["total_tokens"]) for row in rows) == [100, 101, 102, 103, 104]
+        assert rows[0]["model"] == "fake-model"
+        assert rows[0]["content_hash"]
+
+        tomorrow = (TODAY + timedelta(days=1)).isoformat()
+        assert list(plan_rows(store, ExportFilter(since=tomorrow))) == []
+        until_today = plan_rows(store, ExportFilter(until=TODAY.isoformat()))
+        assert len(read_csv(PLAN_COLUMNS, until_today)) == 7
+
+    async def test_generated_plans_carry_token_counts(self, fake_claude, patient_data):
+        """The model and token counts of the generation are kept on the plan."""
+        fake_claude.respond("<h2>Goals</h2><p>Walk daily.</p>")
+        plan = await generate_care_plan(PatientInput(**patient_data))
+        assert plan.model == "fake-model"
+        assert plan.input_tokens > 0
+        assert plan.output_tokens > 0
+
+
+class TestUsageExport:
+    """Tests for exporting daily usage."""
+
+    async def test_ledger_file_aggregated_per_day(self, tmp_path):
+        """Flushed batches are summed per facility and day."""
+        ledger = UsageLedger(str(tmp_path / "usage.jsonl"))
+        ledger.record("A", 100, 50, 200.0)
+        await ledger.flush()
+        ledger.record("A", 10, 5, 100.0)
+        ledger.record("B", 1, 1, 10.0)
+        await ledger.flush()
+
+        rows = read_csv(USAGE_COLUMNS, usage_rows(ledger, ExportFilter()))
+        assert [(row["facility"], row["calls"], row["total_tokens"]) for row in rows] == [
+            ("A", "2", "165"),
+            ("B", "1", "2"),
+        ]
+        assert rows[0]["average_latency_ms"] == "150.0"
+        only_b = read_csv(USAGE_COLUMNS, usage_rows(ledger, ExportFilter(facility="B")))
+        assert [row["facility"] for row in only_b] == ["B"]
+        yesterday = (TODAY - timedelta(days=1)).isoformat()
+        assert list(usage_rows(ledger, ExportFilter(until=yesterday))) == []
+
+
+class TestExportEndpoint:
+    """Tests for GET /admin/export/{dataset}."""
+
+    def test_csv_export(self, monkeypatch, test_client, patient_data):
+        """Exports are admin-only and stream CSV."""
+        store_plans(plan_store, patient_data, 3, FACILITY)
+        assert test_client.get("/admin/export/plans").status_code == 403
+
+        monkeypatch.setattr(request_profiler, "token", TOKEN)
+        headers = {"X-Profile-Token": TOKEN}
+        response = test_client.get(
+            "/admin/export/plans", params={"facility": FACILITY}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="plans.csv"' in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) >= 3
+
+        assert test_client.get("/admin/export/usage", headers=headers).status_code == 200
+        assert test_client.get("/admin/export/billing", headers=headers).status_code == 404
+        bad_date = test_client.get(
+            "/admin/export/usage", params={"since": "2024-13-40"}, headers=headers
+        )
+        assert bad_date.status_code == 400
+
+    def test_parquet_needs_pyarrow(self, monkeypatch, test_client):
+        """Without pyarrow, Parquet is reported as unavailable."""
+        monkeypatch.setattr(analytics_export, "pa", None)
+        monkeypatch.setattr(request_profiler, "token", TOKEN)
+        response = test_client.get(
+            "/admin/export/usage", params={"format": "parquet"}, headers={"X-Profile-Token": TOKEN}
+        )
+        assert response.status_code == 501
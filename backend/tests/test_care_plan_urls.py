@@ -0,0 +1,108 @@
+"""
+Tests for content-addressed care plan URLs and HTTP caching helpers.
+"""
+
+import pytest
+
+from app.config import settings
+from app.models import CarePlanOutput, PatientInput
+from app.services.care_plan_service import RISK_SCORES_PLACEHOLDER
+from app.services.html_sanitizer import REQUIRED_SECTIONS
+from app.services.plan_store import plan_store
+from app.utils.hashing import plan_content_hash
+from app.utils.http_cache import RangeNotSatisfiableError, byte_range, etag_matches
+
+COMPLETE_PLAN = "".join(f"<h2>{name}</h2><p>Details.</p>" for name in REQUIRED_SECTIONS).replace(
+    "</h2>", f"</h2>{RISK_SCORES_PLACEHOLDER}", 1
+)
+
+
+@pytest.fixture
+def stored_plan(sample_patient_comprehensive) -> CarePlanOutput:
+    """A plan in the store, as returned with its content hash."""
+    patient = PatientInput(**sample_patient_comprehensive)
+    plan = CarePlanOutput(
+        patient_name=patient.name, care_plan_html="<h2>Goals</h2>" * 50, generated_at="now"
+    )
+    plan_store.put("url-test-plan", patient, plan, source="test")
+    return plan.model_copy(update={"content_hash": plan_content_hash(plan)})
+
+
+class TestHttpCache:
+    """Tests for range parsing and ETag matching."""
+
+    def test_byte_ranges(self):
+        """Explicit, open-ended and suffix ranges are clamped to the body."""
+        assert byte_range("bytes=0-9", 100) == (0, 9)
+        assert byte_range("bytes=90-200", 100) == (90, 99)
+        assert byte_range("bytes=50-", 100) == (50, 99)
+        assert byte_range("bytes=-10", 100) == (90, 99)
+        assert byte_range("bytes=0-1,5-6", 100) is None
+        assert byte_range("bytes=9-2", 100) is None
+        with pytest.raises(RangeNotSatisfiableError):
+            byte_range("bytes=100-", 100)
+
+    def test_etag_matching(self):
+        """Lists, weak tags and * match; other tags do not."""
+        assert etag_matches('"a", W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
+
+
+class TestCarePlanUrls:
+    """Tests for GET /care-plans/{content_hash}."""
+
+    def test_generated_plan_is_addressable(
+        self, fake_claude, test_client, sample_patient_comprehensive
+    ):
+        """Stored generations return a content hash that resolves to the same plan."""
+        sample_patient_comprehensive["name"] = "Addressable Patient"
+        fake_claude.respond(COMPLETE_PLAN)
+        plan = test_client.post("/generate-care-plan", json=sample_patient_comprehensive).json()
+        assert plan["content_hash"]
+        fetched = test_client.get(f"/care-plans/{plan['content_hash']}").json()
+        assert fetched == plan
+
+    def test_immutable_caching_headers(self, test_client, stored_plan):
+        """Plans are private, immutable and revalidate with their strong ETag."""
+        url = f"/care-plans/{stored_plan.content_hash}"
+        response = test_client.get(url)
+        assert response.status_code == 200
+        assert response.json()["care_plan_html"] == stored_plan.care_plan_html
+        assert response.headers["Cache-Control"].startswith("private, max-age=")
+        assert "immutable" in response.headers["Cache-Control"]
+        etag = response.headers["ETag"]
+        assert not etag.startswith("W/")
+
+        revalidated = test_client.get(url, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+
+    def test_public_cache_setting(self, monkeypatch, test_client, stored_plan):
+        """Shared caching is opt-in."""
+        monkeypatch.setattr(settings, "plan_url_public_cache", True)
+        response = test_client.get(f"/care-plans/{stored_plan.content_hash}")
+        assert response.headers["Cache-Control"].startswith("public")
+
+    def test_range_requests(self, test_client, stored_plan):
+        """Single ranges return 206, stale If-Range the full body, past-end ranges 416."""
+        url = f"/care-plans/{stored_plan.content_hash}"
+        full = test_client.get(url)
+        partial = test_client.get(url, headers={"Range": "bytes=0-9"})
+        assert partial.status_code == 206
+        assert partial.content == full.content[:10]
+        assert partial.headers["Content-Range"] == f"bytes 0-9/{len(full.content)}"
+
+        stale = test_client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+        assert stale.status_code == 200
+        past_end = test_client.get(url, headers={"Range": f"bytes={len(full.content)}-"})
+        assert past_end.status_code == 416
+
+    def test_print_format_and_unknown_hash(self, test_client, stored_plan):
+        """format=html serves the print document; unknown hashes are 404."""
+        response = test_client.get(f"/care-plans/{stored_plan.content_hash}?format=html")
+        assert response.headers["content-type"].startswith("text/html")
+        assert response.text.startswith("<!DOCTYPE html>")
+        assert test_client.get("/care-plans/unknown").status_code == 404
+
@@ -0,0 +1,128 @@
+"""
+Tests for request deadlines and cancellation on client disconnect.
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.claude_client import claude_client
+from app.utils.deadline import (
+    ClientDisconnectedError,
+    DeadlineExceededError,
+    deadline_seconds,
+    remaining_seconds,
+    reset_deadline,
+    run_until_disconnect,
+    set_deadline,
+)
+
+
+class FakeRequest:
+    """Request stand-in whose client disconnects when told to."""
+
+    def __init__(self) -> None:
+        """Start connected."""
+        self.disconnected = asyncio.Event()
+
+    async def receive(self) -> dict:
+        """Block until the client disconnects."""
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+
+class TestDeadlineResolution:
+    """Tests for deadline header parsing and the context variable."""
+
+    def test_header_parsing(self):
+        """Valid headers are used, capped at the maximum; invalid ones fall back."""
+        assert deadline_seconds(None, default=90, maximum=300) == 90
+        assert deadline_seconds("5000", default=90, maximum=300) == 5
+        assert deadline_seconds("9999999", default=90, maximum=300) == 300
+        assert deadline_seconds("soon", default=90, maximum=300) == 90
+
+    def test_deadline_scoped_to_context(self):
+        """The deadline is visible until reset."""
+        token = set_deadline(10)
+        assert 9 < remaining_seconds() <= 10
+        reset_deadline(token)
+        assert remaining_seconds() is None
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_skips_upstream_call(self):
+        """No model request is made once the deadline has passed."""
+        token = set_deadline(-1)
+        try:
+            with pytest.raises(DeadlineExceededError):
+                await claude_client.generate_completion("system", "user")
+        finally:
+            reset_deadline(token)
+
+
+class TestRunUntilDisconnect:
+    """Tests for cancelling work when the client leaves or time runs out."""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_work(self):
+        """A client disconnect cancels the in-flight work promptly."""
+        request = FakeRequest()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        asyncio.get_running_loop().call_later(0.05, request.disconnected.set)
+        with pytest.raises(ClientDisconnectedError):
+            await run_until_disconnect(request, work(), timeout=5)
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_timeout_cancels_work(self):
+        """Work still running at the deadline is cancelled."""
+        with pytest.raises(DeadlineExceededError):
+            await run_until_disconnect(FakeRequest(), asyncio.sleep(10), timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_result_returned(self):
+        """Completed work returns its result."""
+        assert (
+            await run_until_disconnect(FakeRequest(), asyncio.sleep(0, "plan"), timeout=1) == "plan"
+        )
+
+
+class TestCarePlanDeadline:
+    """Tests for the deadline on /generate-care-plan."""
+
+    def test_deadline_header_returns_504(
+        self, monkeypatch, test_client, sample_patient_comprehensive
+    ):
+        """Without the template fallback, an overrun generation is cancelled with 504."""
+
+        async def slow_stream(system_prompt, user_prompt, max_tokens=4000, facility=None):
+            await asyncio.sleep(10)
+            yield "<h2>Patient Summary</h2>"
+
+        monkeypatch.setattr(claude_client, "stream_completion", slow_stream)
+        monkeypatch.setattr(settings, "fallback_enabled", False)
+        sample_patient_comprehensive.update(name="Deadline Patient")
+        response = test_client.post(
+            "/generate-care-plan",
+            json=sample_patient_comprehensive,
+            headers={"X-Request-Deadline-Ms": "50"},
+        )
+        assert response.status_code == 504
+
+    def test_completed_generation_unaffected(
+        self, fake_claude, test_client, sample_patient_comprehensive
+    ):
+        """Generations that finish in time are returned normally."""
+        fake_claude.respond("<h2>Patient Summary</h2><!-- RISK_SCORES -->")
+        sample_patient_comprehensive.update(name="On Time Patient")
+        response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+        assert response.status_code == 200
+        assert response.json()["patient_name"] == "On Time Patient"
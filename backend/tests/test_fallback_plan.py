@@ -0,0 +1,141 @@
+"""
+Tests for the upstream circuit breaker and the template fallback plan.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from anthropic import APIConnectionError
+
+from app.config import settings
+from app.models import PatientInput
+from app.services import claude_client as claude_client_module
+from app.services.care_plan_service import fallback_care_plan
+from app.services.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from app.services.claude_client import claude_client
+from app.services.html_sanitizer import REQUIRED_SECTIONS
+
+
+@pytest.fixture
+def circuit(monkeypatch) -> CircuitBreaker:
+    """Fresh upstream circuit that opens after two failures."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    monkeypatch.setattr(claude_client_module, "upstream_circuit", breaker)
+    return breaker
+
+
+class TestCircuitBreaker:
+    """Tests for opening, fail-fast and half-open probing."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Failures up to the threshold open the circuit; a success resets the count."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+        breaker.check()
+
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    def test_single_probe_after_reset(self):
+        """After the reset time one probe is allowed; its success closes the circuit."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        assert breaker.state == STATE_HALF_OPEN
+        breaker.reset_seconds = 60
+        breaker.check()
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
+
+
+class TestFallbackPlan:
+    """Tests for the locally rendered template plan."""
+
+    def test_plan_covers_required_sections(self, sample_patient_comprehensive):
+        """The template plan has every required section and is marked as a fallback."""
+        plan = fallback_care_plan(PatientInput(**sample_patient_comprehensive), reason="test")
+        assert plan.is_fallback is True
+        for section in REQUIRED_SECTIONS:
+            assert f"<h2>{section}</h2>" in plan.care_plan_html
+        assert "Standard template plan" in plan.care_plan_html
+
+    def test_content_driven_by_patient(self, sample_patient_comprehensive):
+        """Diagnoses, medications and abnormal vitals select the plan content."""
+        sample_patient_comprehensive.update(oxygen_saturation=85, name="<b>Ann</b>")
+        html = fallback_care_plan(
+            PatientInput(**sample_patient_comprehensive), reason="test"
+        ).care_plan_html
+        assert "Daily weight" in html
+        assert "Blood glucose checks before meals" in html
+        assert "Diuretic: daily weight" in html
+        assert "Every 1-2 hours" in html
+        assert "Sulfa drugs" in html
+        assert "<b>Ann</b>" not in html
+
+
+class TestCarePlanFallback:
+    """Tests for serving the fallback from /generate-care-plan."""
+
+    def test_outage_opens_circuit_and_serves_fallback(
+        self, monkeypatch, circuit, test_client, sample_patient_comprehensive
+    ):
+        """Upstream outages return template plans, and stop calling upstream once open."""
+        calls = []
+
+        async def failing_create(**kwargs):
+            calls.append(kwargs)
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.invalid"))
+
+        monkeypatch.setattr(claude_client.client.messages, "create", failing_create)
+        for attempt in range(3):
+            sample_patient_comprehensive["name"] = f"Outage Patient {attempt}"
+            response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+            assert response.status_code == 200
+            assert response.json()["is_fallback"] is True
+        assert circuit.state == STATE_OPEN
+        assert len(calls) == circuit.failure_threshold
+
+    def test_deadline_exhaustion_serves_fallback(
+        self, monkeypatch, test_client, sample_patient_comprehensive
+    ):
+        """A generation that outlives its deadline is replaced by a template plan."""
+
+        async def slow_stream(system_prompt, user_prompt, max_tokens=4000, facility=None):
+            await asyncio.sleep(10)
+            yield "<h2>Patient Summary</h2>"
+
+        monkeypatch.setattr(claude_client, "stream_completion", slow_stream)
+        sample_patient_comprehensive["name"] = "Slow Upstream Patient"
+        response = test_client.post(
+            "/generate-care-plan",
+            json=sample_patient_comprehensive,
+            headers={"X-Request-Deadline-Ms": "50"},
+        )
+        assert response.status_code == 200
+        assert response.json()["is_fallback"] is True
+        assert "generation timed out" in response.json()["care_plan_html"]
+
+    def test_fallback_only_mode(
+        self, monkeypatch, fake_claude, test_client, sample_patient_comprehensive
+    ):
+        """With model calls disabled, plans are rendered locally and not stored."""
+        monkeypatch.setattr(settings, "fallback_only", True)
+        sample_patient_comprehensive["name"] = "Load Test Patient"
+        for _ in range(2):
+            response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+            assert response.json()["is_fallback"] is True
+            assert response.headers["X-Plan-Cache"] == "miss"
+        assert fake_claude.calls == []
@@ -0,0 +1,199 @@
+"""
+Tests for weighted fair generation scheduling with acuity priority.
+"""
+
+import asyncio
+
+import pytest
+
+from app.models import PatientInput
+from app.services.generation_scheduler import (
+    PRIORITY_ACUTE,
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    GenerationScheduler,
+    priority_for,
+)
+from app.services.risk_scoring import (
+    ACUITY_ELEVATED,
+    ACUITY_HIGH,
+    ACUITY_ROUTINE,
+    acuity_level,
+)
+
+
+class Workload:
+    """Records the order generations run in, behind a slot held by a blocker."""
+
+    def __init__(self, scheduler: GenerationScheduler) -> None:
+        """Start with the blocker not yet released."""
+        self.scheduler = scheduler
+        self.order: list[str] = []
+        self.release = asyncio.Event()
+
+    async def blocker(self) -> None:
+        """Hold a slot until released."""
+        await self.release.wait()
+
+    def job(self, name: str):
+        """Work factory that records its name when it runs."""
+
+        async def work() -> str:
+            self.order.append(name)
+            return name
+
+        return work
+
+    async def run_all(self, submissions: list[tuple[str, str, int, int]]) -> list[str]:
+        """Queue (name, facility, priority, acuity) jobs behind the blocker and run them."""
+        held = asyncio.create_task(self.scheduler.run(self.blocker, facility="Blocker"))
+        await asyncio.sleep(0)
+        tasks = []
+        for name, facility, priority, acuity in submissions:
+            tasks.append(
+                asyncio.create_task(
+                    self.scheduler.run(
+                        self.job(name), facility=facility, priority=priority, acuity=acuity
+                    )
+                )
+            )
+            await asyncio.sleep(0)
+        self.release.set()
+        await asyncio.gather(held, *tasks)
+        return self.order
+
+
+class TestGenerationScheduler:
+    """Tests for slot limits, fairness, priority and preemption."""
+
+    async def test_slots_limit_concurrency(self):
+        """Generations beyond the limit wait and are reported as queued."""
+        scheduler = GenerationScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        tasks = [asyncio.create_task(scheduler.run(work, facility="North")) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.in_flight == 1
+        assert scheduler.queued == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert (scheduler.in_flight, scheduler.queued) == (0, 0)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        """A request cancelled while waiting for a slot is no longer counted."""
+        scheduler = GenerationScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        running = asyncio.create_task(scheduler.run(work, facility="North"))
+        waiting = asyncio.create_task(scheduler.run(work, facility="North"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.queued == 0
+
+        release.set()
+        await running
+        assert scheduler.in_flight == 0
+
+    async def test_large_facility_does_not_starve_others(self):
+        """A facility's backlog is interleaved with other facilities' requests."""
+        workload = Workload(GenerationScheduler(max_concurrent=1))
+        backlog = [(f"north-{i}", "North", PRIORITY_INTERACTIVE, 0) for i in range(4)]
+        order = await workload.run_all([*backlog, ("south-0", "South", PRIORITY_INTERACTIVE, 0)])
+        assert order.index("south-0") <= 1
+
+    async def test_weights_share_slots(self):
+        """A facility with twice the weight gets about twice the slots."""
+        workload = Workload(GenerationScheduler(max_concurrent=1, weights={"North": 2.0}))
+        submissions = [(f"north-{i}", "North", PRIORITY_INTERACTIVE, 0) for i in range(4)]
+        submissions += [(f"south-{i}", "South", PRIORITY_INTERACTIVE, 0) for i in range(4)]
+        order = await workload.run_all(submissions)
+        first_six = order[:6]
+        assert sum(name.startswith("north") for name in first_six) == 4
+
+    async def test_acute_patient_jumps_queue(self):
+        """An acute patient is served before queued routine requests."""
+        workload = Workload(GenerationScheduler(max_concurrent=1))
+        submissions = [(f"routine-{i}", "North", PRIORITY_INTERACTIVE, 0) for i in range(3)]
+        submissions.append(("acute", "South", PRIORITY_ACUTE, ACUITY_HIGH))
+        order = await workload.run_all(submissions)
+        assert order[0] == "acute"
+
+    async def test_elevated_acuity_boosted_within_class(self):
+        """Higher acuity is served sooner among equal-priority requests."""
+        workload = Workload(GenerationScheduler(max_concurrent=1))
+        order = await workload.run_all(
+            [
+                ("routine", "North", PRIORITY_INTERACTIVE, ACUITY_ROUTINE),
+                ("elevated", "South", PRIORITY_INTERACTIVE, ACUITY_ELEVATED),
+            ]
+        )
+        assert order == ["elevated", "routine"]
+
+    async def test_batch_work_preempted_and_rerun(self):
+        """Running batch work is cancelled for an interactive request, then rerun."""
+        scheduler = GenerationScheduler(max_concurrent=1)
+        batch_started = asyncio.Event()
+        finish_batch = asyncio.Event()
+        attempts = []
+        order = []
+
+        async def batch():
+            attempts.append("batch")
+            batch_started.set()
+            await finish_batch.wait()
+            order.append("batch")
+            return "batch"
+
+        async def interactive():
+            order.append("interactive")
+            finish_batch.set()
+            return "interactive"
+
+        batch_task = asyncio.create_task(
+            scheduler.run(batch, facility="North", priority=PRIORITY_BATCH)
+        )
+        await batch_started.wait()
+        result = await scheduler.run(interactive, facility="South")
+
+        assert result == "interactive"
+        assert await batch_task == "batch"
+        assert order == ["interactive", "batch"]
+        assert len(attempts) == 2
+        assert scheduler.preempted == 1
+
+    async def test_failures_release_slot(self):
+        """A failing generation frees its slot and propagates the error."""
+        scheduler = GenerationScheduler(max_concurrent=1)
+
+        async def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await scheduler.run(failing, facility="North")
+        assert scheduler.in_flight == 0
+
+
+class TestAcuity:
+    """Tests for acuity classification and priority classes."""
+
+    def test_acuity_from_vitals_and_pain(self, sample_patient_minimal):
+        """Critical vitals or severe pain are high acuity; abnormal ones elevated."""
+        routine = PatientInput(**sample_patient_minimal)
+        assert acuity_level(routine) == ACUITY_ROUTINE
+        assert acuity_level(routine.model_copy(update={"heart_rate": 110})) == ACUITY_ELEVATED
+        assert acuity_level(routine.model_copy(update={"oxygen_saturation": 85})) == ACUITY_HIGH
+        assert acuity_level(routine.model_copy(update={"pain_level": 9})) == ACUITY_HIGH
+
+    def test_priority_classes(self):
+        """Batch work is always lowest priority; acute interactive work highest."""
+        assert priority_for(ACUITY_HIGH) == PRIORITY_ACUTE
+        assert priority_for(ACUITY_ELEVATED) == PRIORITY_INTERACTIVE
+        assert priority_for(ACUITY_HIGH, batch=True) == PRIORITY_BATCH
@@ -0,0 +1,140 @@
+"""
+Tests for the unit-level shift handoff report.
+"""
+
+import pytest
+
+from app.models import CarePlanOutput, PatientInput
+from app.services import handoff_report as handoff_module
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.handoff_report import (
+    HandoffReportBuilder,
+    chunk_key,
+    chunk_patients,
+    extract_items,
+    plan_section_items,
+)
+from app.services.plan_store import PlanStore, plan_store
+
+FACILITY = "Handoff Test Facility"
+PLAN_HTML = (
+    "<style>h2 {}</style><h2>Nursing Diagnoses</h2><ul><li>Risk for <b>Falls</b></li>"
+    "<li>Impaired Gas Exchange</li></ul><h2>8. Special Precautions</h2><ul><li>Bed alarm</li></ul>"
+)
+SUMMARY_MARKUP = "### Patient\n- Watch oxygen saturation"
+
+
+@pytest.fixture
+def patient_data(sample_patient_comprehensive) -> dict:
+    """Comprehensive patient data at the handoff test facility."""
+    sample_patient_comprehensive["facility"] = FACILITY
+    return sample_patient_comprehensive
+
+
+def make_patient(patient_data: dict, name: str, **changes) -> PatientInput:
+    """A patient at the test facility with the given name."""
+    return PatientInput(**{**patient_data, "name": name, **changes})
+
+
+def store_plan(store: PlanStore, patient: PatientInput) -> None:
+    """Store the canned plan for a patient."""
+    plan = CarePlanOutput(patient_name=patient.name, care_plan_html=PLAN_HTML, generated_at="now")
+    store.put(f"hash-{patient.name}-{patient.pain_level}", patient, plan, source="test")
+
+
+@pytest.fixture
+def unit(patient_data) -> tuple[PlanStore, list[PatientInput]]:
+    """A store holding plans for a 30-patient unit."""
+    store = PlanStore()
+    patients = [make_patient(patient_data, f"Resident {number}") for number in range(30)]
+    for patient in patients:
+        store_plan(store, patient)
+    return store, patients
+
+
+class TestHandoffItems:
+    """Tests for local extraction and content-defined chunking."""
+
+    def test_extracts_plan_sections_and_risks(self, patient_data):
+        """Plan list items, allergies and local risk scores become handoff items."""
+        assert plan_section_items(PLAN_HTML)["Nursing Diagnoses"] == [
+            "Risk for Falls",
+            "Impaired Gas Exchange",
+        ]
+        patient = make_patient(patient_data, "Ann", oxygen_saturation=85)
+        plan = CarePlanOutput(patient_name="Ann", care_plan_html=PLAN_HTML, generated_at="now")
+        items = extract_items(patient, plan)
+        assert items.diagnoses == ("Risk for Falls", "Impaired Gas Exchange")
+        assert "Bed alarm" in items.precautions
+        assert any(risk.startswith("Oxygen") for risk in items.risks)
+
+    def test_new_patient_changes_one_chunk(self, patient_data, unit):
+        """Admitting a patient leaves every chunk it does not fall in unchanged."""
+        store, _ = unit
+        plans = store.latest_plans(FACILITY)
+        items = [extract_items(patient, plan) for patient, plan in plans]
+        before = {chunk_key(FACILITY, chunk) for chunk in chunk_patients(items)}
+        new = make_patient(patient_data, "New Admission")
+        items.append(extract_items(new, plans[0][1]))
+        after = {chunk_key(FACILITY, chunk) for chunk in chunk_patients(items)}
+        assert len(after - before) <= 2
+        assert len(before - after) == 1
+
+
+class TestHandoffReport:
+    """Tests for building reports from cached chunk summaries."""
+
+    async def test_unchanged_chunks_reused(self, fake_claude, patient_data, unit):
+        """A second report reuses every summary; an update redoes only its chunk."""
+        store, patients = unit
+        fake_claude.respond(SUMMARY_MARKUP)
+        builder = HandoffReportBuilder(store)
+
+        report = await builder.build(FACILITY)
+        assert report.patient_count == len(patients)
+        assert len(fake_claude.calls) == report.chunk_count > 1
+        assert "<li>Watch oxygen saturation</li>" in report.report_html
+        assert "Highest Priority" in report.report_html
+
+        again = await builder.build(FACILITY)
+        assert again.cached_chunks == again.chunk_count
+        assert len(fake_claude.calls) == report.chunk_count
+
+        store_plan(store, make_patient(patient_data, "Resident 7", pain_level=9))
+        updated = await builder.build(FACILITY)
+        assert len(fake_claude.calls) == report.chunk_count + 1
+        assert updated.cached_chunks == updated.chunk_count - 1
+        assert "Resident 7" in updated.report_html.split("Highest Priority")[1].split("<h2>")[0]
+
+    async def test_unavailable_model_lists_items(self, monkeypatch, unit):
+        """Chunks whose summary fails are listed from the extracted items and not cached."""
+        store, _ = unit
+
+        def open_circuit(**kwargs):
+            raise CircuitOpenError("open")
+
+        monkeypatch.setattr(handoff_module.claude_client, "stream_completion", open_circuit)
+        builder = HandoffReportBuilder(store)
+        report = await builder.build(FACILITY)
+        assert report.local_chunks == report.chunk_count
+        assert "Impaired Gas Exchange" in report.report_html
+        assert (await builder.build(FACILITY)).cached_chunks == 0
+
+
+class TestHandoffEndpoint:
+    """Tests for GET /handoff-report."""
+
+    def test_unknown_facility(self, test_client):
+        """Facilities without stored plans have no report."""
+        response = test_client.get("/handoff-report", params={"facility": "Nowhere"})
+        assert response.status_code == 404
+
+    def test_local_report(self, test_client, patient_data):
+        """summarize=false builds the report from extracted items only."""
+        store_plan(plan_store, make_patient(patient_data, "Endpoint Resident"))
+        response = test_client.get(
+            "/handoff-report", params={"facility": FACILITY, "summarize": "false"}
+        )
+        assert response.status_code == 200
+        assert response.json()["patient_count"] >= 1
+        assert "Endpoint Resident" in response.json()["report_html"]
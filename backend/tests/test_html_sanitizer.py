@@ -0,0 +1,110 @@
+"""
+Tests for the streaming HTML sanitizer and generation retries.
+"""
+
+import pytest
+
+from app.models import PatientInput
+from app.services.care_plan_service import (
+    RISK_SCORES_PLACEHOLDER,
+    GenerationAbortedError,
+    generate_care_plan,
+)
+from app.services.html_sanitizer import (
+    EARLY_ABORT_CHARS,
+    REQUIRED_SECTIONS,
+    StreamingHtmlSanitizer,
+)
+
+COMPLETE_PLAN = "".join(f"<h2>{name}</h2><p>Details.</p>" for name in REQUIRED_SECTIONS)
+
+
+def sanitize(html: str, chunk_size: int = 7) -> tuple[str, StreamingHtmlSanitizer]:
+    """Run html through a sanitizer in small chunks."""
+    sanitizer = StreamingHtmlSanitizer(preserved_comments=frozenset({RISK_SCORES_PLACEHOLDER}))
+    parts = [
+        sanitizer.feed(html[start : start + chunk_size]) for start in range(0, len(html), chunk_size)
+    ]
+    parts.append(sanitizer.close())
+    return "".join(parts), sanitizer
+
+
+class TestStreamingHtmlSanitizer:
+    """Tests for allow-listing and structure checks."""
+
+    def test_allowed_markup_passes_through(self):
+        """Allowed tags, attributes and escaped text are preserved across chunk boundaries."""
+        html = '<h2 class="title">Goals</h2><ul><li>BP &lt; 140/90</li></ul>'
+        output, sanitizer = sanitize(html)
+        assert output == html
+        assert "Goals" in sanitizer.sections_found
+
+    def test_scripts_handlers_and_unsafe_styles_removed(self):
+        """Script content, event handlers and url() styles are stripped."""
+        html = (
+            '<p onclick="steal()" style="background:url(x)">Text</p>'
+            "<script>alert(1)</script><a href='javascript:x'>link</a>"
+        )
+        output, sanitizer = sanitize(html)
+        assert output == "<p>Text</p>link"
+        assert "script" in sanitizer.removed_tags
+
+    def test_placeholder_comment_kept_other_comments_dropped(self):
+        """Only the risk score marker survives."""
+        output, _ = sanitize(f"<!-- note -->{RISK_SCORES_PLACEHOLDER}")
+        assert output == RISK_SCORES_PLACEHOLDER
+
+    def test_code_fences_and_unclosed_tags(self):
+        """Markdown fences are removed and open elements closed at the end."""
+        output, _ = sanitize("```html\n<div><ul><li>Item\n```")
+        assert output == "<div><ul><li>Item\n</li></ul></div>"
+
+    def test_missing_sections_and_truncation_reported(self):
+        """Missing sections and max_tokens stops become warnings."""
+        _, sanitizer = sanitize("<h2>1. Patient Summary</h2><h2>Goals</h2>")
+        warnings = sanitizer.warnings(stop_reason="max_tokens")
+        assert warnings[0].startswith("Care plan was truncated")
+        assert "Nursing Diagnoses" in warnings[1]
+        assert "Patient Summary" not in warnings[1]
+
+    def test_complete_plan_has_no_warnings(self):
+        """A complete, well-formed plan produces no warnings."""
+        _, sanitizer = sanitize(COMPLETE_PLAN)
+        assert sanitizer.warnings(stop_reason="end_turn") == []
+
+    def test_plain_text_output_aborts_early(self):
+        """Output with no markup at all is abandoned once past the threshold."""
+        sanitizer = StreamingHtmlSanitizer()
+        sanitizer.feed("I'm unable to produce that plan. " * (EARLY_ABORT_CHARS // 20))
+        assert sanitizer.abort_reason is not None
+
+
+class TestSanitizedGeneration:
+    """Tests for sanitizing and retrying streamed generations."""
+
+    @pytest.mark.asyncio
+    async def test_broken_generation_retried(self, fake_claude, sample_patient_comprehensive):
+        """A generation without markup is aborted and retried once."""
+        fake_claude.respond("Plain text " * EARLY_ABORT_CHARS)
+        fake_claude.respond(COMPLETE_PLAN.replace("</h2>", f"</h2>{RISK_SCORES_PLACEHOLDER}", 1))
+
+        output = await generate_care_plan(PatientInput(**sample_patient_comprehensive))
+        assert len(fake_claude.calls) == 2
+        assert output.validation_warnings == []
+
+    @pytest.mark.asyncio
+    async def test_persistent_failure_raises(self, fake_claude, sample_patient_comprehensive):
+        """Generation gives up after the retry budget is spent."""
+        fake_claude.respond("Plain text " * EARLY_ABORT_CHARS)
+
+        with pytest.raises(GenerationAbortedError):
+            await generate_care_plan(PatientInput(**sample_patient_comprehensive))
+
+    @pytest.mark.asyncio
+    async def test_truncated_generation_flagged(self, fake_claude, sample_patient_comprehensive):
+        """Truncated output is closed off and reported to the caller."""
+        fake_claude.respond("<h2>Patient Summary</h2><ul><li>Unfinished", stop_reason="max_tokens")
+
+        output = await generate_care_plan(PatientInput(**sample_patient_comprehensive))
+        assert "Unfinished</li></ul>" in output.care_plan_html
+        assert output.validation_warnings[0].startswith("Care plan was truncated")
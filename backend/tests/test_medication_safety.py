@@ -0,0 +1,103 @@
+"""
+Tests for the local medication interaction and allergy cross-check index.
+"""
+
+import pytest
+
+from app.models import Medication, PatientInput
+from app.services.care_plan_service import fallback_care_plan, generate_care_plan
+from app.services.medication_safety import medication_index
+
+
+def meds(*names: str) -> list[Medication]:
+    """Medications with placeholder dosage and frequency."""
+    return [Medication(name=name, dosage="1 tab", frequency="daily") for name in names]
+
+
+class TestMedicationIndex:
+    """Tests for interaction and allergy lookups."""
+
+    def test_class_interaction_with_brand_name(self):
+        """Brand names resolve to their drug and class (Coumadin is warfarin, an anticoagulant)."""
+        check = medication_index.check(meds("Coumadin", "Aspirin 81mg", "Metformin"), [])
+        assert check.medications_checked == 3
+        assert [issue.medications for issue in check.issues] == [["Coumadin", "Aspirin 81mg"]]
+        assert check.issues[0].severity == "major"
+        assert "bleeding" in check.issues[0].message
+
+    def test_one_issue_per_pair_most_severe_first(self):
+        """A pair matching several rules is reported once; major issues come first."""
+        check = medication_index.check(
+            meds("Lisinopril", "Spironolactone", "Oxycodone", "Lorazepam"), []
+        )
+        assert [issue.medications for issue in check.issues] == [
+            ["Oxycodone", "Lorazepam"],
+            ["Lisinopril", "Spironolactone"],
+        ]
+        assert [issue.severity for issue in check.issues] == ["major", "moderate"]
+
+    def test_allergy_conflicts(self):
+        """Direct matches are major; cross-sensitive classes are moderate."""
+        check = medication_index.check(
+            meds("Augmentin", "Keflex", "Metoprolol Tartrate 25mg"), ["PCN", "Metoprolol"]
+        )
+        conflicts = {(issue.medications[0], issue.severity) for issue in check.issues}
+        assert conflicts == {
+            ("Augmentin", "major"),
+            ("Keflex", "moderate"),
+            ("Metoprolol Tartrate 25mg", "major"),
+        }
+        assert all(issue.kind == "allergy" for issue in check.issues)
+
+    def test_no_issues(self, sample_patient_comprehensive):
+        """Unrelated medications and food allergies raise nothing."""
+        patient = PatientInput(**sample_patient_comprehensive)
+        check = medication_index.check(patient.current_medications, ["Shellfish"])
+        assert check.issues == []
+
+
+class TestMedicationFacts:
+    """Tests that issues reach the prompt, the fallback plan and the endpoint."""
+
+    @pytest.fixture
+    def patient(self, sample_patient_comprehensive) -> PatientInput:
+        """Patient on warfarin and aspirin."""
+        return PatientInput(
+            **{
+                **sample_patient_comprehensive,
+                "current_medications": [
+                    {"name": "Warfarin", "dosage": "5mg", "frequency": "QD"},
+                    {"name": "Aspirin", "dosage": "81mg", "frequency": "QD"},
+                ],
+            }
+        )
+
+    async def test_issues_in_prompt(self, fake_claude, patient):
+        """The model is told about the interaction instead of having to infer it."""
+        fake_claude.respond("<h2>Patient Summary</h2>")
+        await generate_care_plan(patient)
+        assert "Major interaction: Warfarin + Aspirin" in fake_claude.calls[0]["user_prompt"]
+
+    def test_issues_in_fallback_plan(self, patient):
+        """Template plans list the interaction under special precautions."""
+        html = fallback_care_plan(patient, reason="test").care_plan_html
+        precautions = html.split("<h2>Special Precautions</h2>")[1]
+        assert "Medication interaction (major): Warfarin + Aspirin" in precautions
+
+    def test_check_endpoint(self, test_client):
+        """The form can check a partial entry without any model call."""
+        response = test_client.post(
+            "/medication-check",
+            json={
+                "current_medications": [
+                    {"name": "Warfarin", "dosage": "5mg", "frequency": "QD"},
+                    {"name": "Ibuprofen", "dosage": "400mg", "frequency": "PRN"},
+                ],
+                "allergies": ["ASA"],
+            },
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["medications_checked"] == 2
+        assert body["issues"][0]["medications"] == ["Warfarin", "Ibuprofen"]
+        assert body["issues"][1]["allergy"] == "ASA"
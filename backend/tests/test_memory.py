@@ -0,0 +1,103 @@
+"""
+Tests for memory diagnostics and the soak test.
+"""
+
+import pytest
+
+from app.config import settings
+from app.main import ALLOC_PEAK_HEADER, app
+from app.services.memory_monitor import MemoryMonitor, memory_monitor, rss_bytes
+from app.services.request_profiler import request_profiler
+from app.services.soak_test import SoakOptions, growth_rate, soak
+
+TOKEN = "admin-secret"
+# Bytes kept alive between snapshots by the growth test
+RETAINED_BYTES = 2_000_000
+
+
+@pytest.fixture
+def monitor():
+    """Memory monitor that stops tracing afterwards."""
+    monitor = MemoryMonitor()
+    yield monitor
+    monitor.stop()
+
+
+class TestMemoryMonitor:
+    """Tests for RSS gauges and snapshot diffs."""
+
+    def test_rss_gauge(self):
+        """RSS is reported where /proc is available."""
+        rss = rss_bytes()
+        if rss is None:
+            pytest.skip("No /proc/self/statm on this platform")
+        assert rss > 0
+
+    def test_report_shows_retained_allocations(self, monitor):
+        """Memory allocated and kept between reports is attributed to its source line."""
+        monitor.start()
+        assert monitor.report().top_growth == []
+        retained = [bytearray(RETAINED_BYTES)]
+        report = monitor.report()
+        top = report.top_growth[0]
+        assert top.location.startswith(__file__)
+        assert top.size_diff_bytes >= RETAINED_BYTES
+        assert report.traced_bytes is not None
+        del retained
+
+    def test_untraced_report_has_gauges_only(self):
+        """Without tracing only the RSS gauges are reported."""
+        report = MemoryMonitor().report()
+        assert report.tracing is False
+        assert report.traced_bytes is None
+
+
+class TestMemoryEndpoints:
+    """Tests for /admin/memory and per-request allocation peaks."""
+
+    def test_admin_memory_requires_token(self, test_client):
+        """The memory report is an admin endpoint."""
+        assert test_client.get("/admin/memory").status_code == 403
+
+    def test_admin_memory_starts_tracing(self, monkeypatch, test_client):
+        """trace=true starts tracing; later calls diff against the previous one."""
+        monkeypatch.setattr(request_profiler, "token", TOKEN)
+        try:
+            headers = {"X-Profile-Token": TOKEN}
+            response = test_client.get("/admin/memory?trace=true", headers=headers)
+            assert response.status_code == 200
+            assert response.json()["tracing"] is True
+            assert test_client.get("/admin/memory", headers=headers).status_code == 200
+        finally:
+            memory_monitor.stop()
+
+    def test_debug_mode_reports_request_peak(self, monkeypatch, test_client):
+        """In memory debug mode each response carries its peak traced allocation."""
+        monkeypatch.setattr(settings, "memory_debug", True)
+        memory_monitor.start()
+        try:
+            response = test_client.get("/health")
+        finally:
+            memory_monitor.stop()
+        assert int(response.headers[ALLOC_PEAK_HEADER]) > 0
+
+
+class TestSoak:
+    """Tests for the soak test harness."""
+
+    async def test_short_soak(self, sample_patient_comprehensive):
+        """A short soak generates plans against the stub and samples RSS."""
+        options = SoakOptions(
+            duration_s=0.3, concurrency=2, sample_interval_s=0.1, upstream_latency_s=0
+        )
+        report = await soak(app, [sample_patient_comprehensive], options)
+        assert report.requests > 0
+        assert report.errors == 0
+        if rss_bytes() is not None:
+            assert len(report.samples) >= 2
+
+    def test_growth_rate(self):
+        """Growth is the least-squares RSS slope per hour."""
+        samples = [(0.0, 100), (1800.0, 150), (3600.0, 200)]
+        assert growth_rate(samples) == pytest.approx(100)
+        assert growth_rate(samples[:1]) is None
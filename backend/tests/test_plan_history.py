@@ -0,0 +1,120 @@
+"""
+Tests for the delta-compressed plan version history.
+"""
+
+import pytest
+
+from app.models import CarePlanOutput, PatientInput
+from app.services.plan_history import apply_delta, encode_delta, tokenize
+from app.services.plan_store import PlanStore, plan_store
+
+FACILITY = "History Test Facility"
+SECTIONS = ["Nursing Diagnoses", "Goals", "Interventions", "Monitoring", "Special Precautions"]
+
+
+def plan_html(revision: int, changed: str = "Monitoring") -> str:
+    """A plan whose `changed` section mentions the revision number."""
+    parts = []
+    for section in SECTIONS:
+        items = [f"<li>{section} item {number} for this resident</li>" for number in range(8)]
+        if section == changed:
+            items.append(f"<li>Check vitals every {revision + 1} hours</li>")
+        parts.append(f"<h2>{section}</h2>\n<ul>{''.join(items)}</ul>\n")
+    return "".join(parts)
+
+
+@pytest.fixture
+def patient(sample_patient_comprehensive) -> PatientInput:
+    """Comprehensive patient at the test facility."""
+    sample_patient_comprehensive["facility"] = FACILITY
+    return PatientInput(**sample_patient_comprehensive)
+
+
+def store_version(store: PlanStore, patient: PatientInput, html: str) -> None:
+    """Store a plan for the patient."""
+    plan = CarePlanOutput(patient_name=patient.name, care_plan_html=html, generated_at="now")
+    store.put(f"hash-{patient.name}", patient, plan, source="test")
+
+
+class TestDeltas:
+    """Tests for token deltas."""
+
+    def test_round_trip(self):
+        """Applying a delta to the old text gives exactly the new text."""
+        old, new = plan_html(1), plan_html(2, changed="Goals")
+        assert "".join(tokenize(old)) == old
+        ops = encode_delta(old, new)
+        assert apply_delta(old, ops) == new
+        assert sum(len(op[1]) for op in ops if op[0] == "i") < len(tokenize(new)) / 4
+
+
+class TestPlanHistoryStore:
+    """Tests for recording and rebuilding versions."""
+
+    def test_every_version_rebuilt(self, patient):
+        """Versions are deltas between snapshots and each one rebuilds exactly."""
+        store = PlanStore(history_snapshot_interval=4)
+        htmls = [plan_html(revision) for revision in range(10)]
+        for html in htmls:
+            store_version(store, patient, html)
+
+        report = store.history.report(FACILITY, patient.name)
+        assert [info.snapshot for info in report.versions] == [
+            number % 4 == 0 for number in range(10)
+        ]
+        assert report.stored_bytes < report.plan_bytes / 5
+        for number, html in enumerate(htmls, start=1):
+            plan = store.history.get(FACILITY, patient.name, number)
+            assert plan.care_plan_html == html
+            assert plan.content_hash == report.versions[number - 1].content_hash
+        assert store.history.get(FACILITY, patient.name, 11) is None
+
+    def test_unchanged_plan_not_recorded(self, patient):
+        """Storing the same plan again does not add a version."""
+        store = PlanStore()
+        store_version(store, patient, plan_html(1))
+        store_version(store, patient, plan_html(1))
+        assert store.history.latest_version(FACILITY, patient.name) == 1
+
+    def test_rewrite_stored_as_snapshot(self, patient):
+        """A plan that shares nothing with the previous one is cheaper as a snapshot."""
+        store = PlanStore()
+        store_version(store, patient, plan_html(1))
+        store_version(store, patient, "<h2>Goals</h2><p>Entirely new plan</p>")
+        versions = store.history.report(FACILITY, patient.name).versions
+        assert [info.snapshot for info in versions] == [True, True]
+
+    def test_diff_names_changed_sections(self, patient):
+        """The diff lists the sections that changed and the changed lines."""
+        store = PlanStore(history_snapshot_interval=3)
+        for revision in range(5):
+            store_version(store, patient, plan_html(revision))
+        diff = store.history.diff(FACILITY, patient.name, 2, 5)
+        assert diff.changed_sections == ["Monitoring"]
+        changes = [line for line in diff.diff if line[0] in "+-" and line[:3] not in ("---", "+++")]
+        assert changes == ["-- Check vitals every 2 hours", "+- Check vitals every 5 hours"]
+
+
+class TestPlanHistoryEndpoints:
+    """Tests for the /plan-history endpoints."""
+
+    def test_history_version_and_diff(self, test_client, patient):
+        """The API lists versions, serves each one and diffs the latest two."""
+        store_version(plan_store, patient, plan_html(1))
+        store_version(plan_store, patient, plan_html(2, changed="Goals"))
+        params = {"facility": FACILITY, "patient_name": patient.name}
+
+        history = test_client.get("/plan-history", params=params).json()
+        latest = history["versions"][-1]["version"]
+        version = test_client.get(f"/plan-history/versions/{latest}", params=params).json()
+        assert version["care_plan_html"] == plan_html(2, changed="Goals")
+
+        diff = test_client.get("/plan-history/diff", params=params).json()
+        assert diff["to_version"] == latest
+        assert diff["changed_sections"] == ["Goals", "Monitoring"]
+
+    def test_unknown_patient(self, test_client):
+        """Residents without stored plans have no history."""
+        params = {"facility": FACILITY, "patient_name": "Nobody"}
+        assert test_client.get("/plan-history", params=params).status_code == 404
+        assert test_client.get("/plan-history/diff", params=params).status_code == 404
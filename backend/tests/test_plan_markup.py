@@ -0,0 +1,102 @@
+"""
+Tests for compact plan markup rendering and markup-mode generation.
+"""
+
+from app.config import settings
+from app.models import PatientInput
+from app.services.care_plan_service import RISK_SCORES_PLACEHOLDER, generate_care_plan
+from app.services.html_sanitizer import EARLY_ABORT_CHARS, REQUIRED_SECTIONS
+from app.services.plan_markup import MARKUP_SYNTAX, StreamingMarkupRenderer, html_to_markup
+
+COMPLETE_MARKUP = "\n\n".join(f"## {name}\n- Details." for name in REQUIRED_SECTIONS)
+
+
+def render(markup: str, chunk_size: int = 7) -> tuple[str, StreamingMarkupRenderer]:
+    """Run markup through a renderer in small chunks."""
+    renderer = StreamingMarkupRenderer(preserved_lines=frozenset({RISK_SCORES_PLACEHOLDER}))
+    parts = [
+        renderer.feed(markup[start : start + chunk_size])
+        for start in range(0, len(markup), chunk_size)
+    ]
+    parts.append(renderer.close())
+    return "".join(parts), renderer
+
+
+class TestStreamingMarkupRenderer:
+    """Tests for rendering markup to care plan HTML."""
+
+    def test_headings_lists_and_inline(self):
+        """Headings, nested and numbered lists and emphasis render to HTML."""
+        markup = (
+            "## Interventions\n### Safety\n- **Bed alarm** on\n  - check *hourly*\n"
+            "- Call light in reach\n1. First\n2. Second\nClosing note"
+        )
+        output, renderer = render(markup)
+        assert output == (
+            "<h2>Interventions</h2><h3>Safety</h3>"
+            "<ul><li><strong>Bed alarm</strong> on<ul><li>check <em>hourly</em></li></ul>"
+            "</li><li>Call light in reach</li></ul><ol><li>First</li><li>Second</li></ol>"
+            "<p>Closing note</p>"
+        )
+        assert renderer.sections_found == {"Interventions"}
+
+    def test_table_with_header(self):
+        """A row followed by a rule becomes the table header."""
+        output, _ = render("| Check | Frequency |\n|---|---|\n| Vitals | q4h |\n\nAfter")
+        assert output == (
+            "<table><thead><tr><th>Check</th><th>Frequency</th></tr></thead>"
+            "<tbody><tr><td>Vitals</td><td>q4h</td></tr></tbody></table><p>After</p>"
+        )
+
+    def test_text_escaped_and_placeholder_kept(self):
+        """Model text never becomes markup; the risk marker line passes through."""
+        output, _ = render(f"## Risk Assessments\n{RISK_SCORES_PLACEHOLDER}\n- BP < 140 <b>x</b>")
+        assert RISK_SCORES_PLACEHOLDER in output
+        assert "BP &lt; 140 &lt;b&gt;x&lt;/b&gt;" in output
+
+    def test_html_answer_is_sanitized(self):
+        """If the model writes HTML anyway, the stream is sanitized as HTML."""
+        output, renderer = render("```html\n<h2>Goals</h2><script>x</script><p>Walk</p>\n```")
+        assert output.strip() == "<h2>Goals</h2><p>Walk</p>"
+        assert "Goals" in renderer.sections_found
+
+    def test_html_to_markup_round_trip(self):
+        """Plan HTML converted to markup renders back to the same structure."""
+        html = (
+            "<h2>Goals</h2><p>Stay <strong>safe</strong>.</p><ul><li>A<ul><li>A1</li></ul></li>"
+            "<li>B &amp; C</li></ul><ol><li>One</li></ol><table><thead><tr><th>Check</th></tr>"
+            "</thead><tbody><tr><td>BP</td></tr></tbody></table>"
+        )
+        output, _ = render(html_to_markup(f"<style>h2 {{}}</style>{html}"))
+        assert output == html
+
+    def test_complete_plan_and_plain_text(self):
+        """A complete plan has no warnings; prose without markup is abandoned early."""
+        _, renderer = render(COMPLETE_MARKUP)
+        assert renderer.warnings(stop_reason="end_turn") == []
+
+        renderer = StreamingMarkupRenderer()
+        renderer.feed("I'm unable to produce that plan.\n" * (EARLY_ABORT_CHARS // 20))
+        assert renderer.abort_reason is not None
+
+
+class TestMarkupGeneration:
+    """Tests for generating plans in markup mode."""
+
+    async def test_markup_mode_renders_plan(
+        self, monkeypatch, fake_claude, sample_patient_comprehensive
+    ):
+        """The prompt asks for markup and the output is rendered HTML with risk scores."""
+        monkeypatch.setattr(settings, "generation_output_format", "markup")
+        fake_claude.respond(
+            COMPLETE_MARKUP.replace(
+                "## Risk Assessments\n", f"## Risk Assessments\n{RISK_SCORES_PLACEHOLDER}\n"
+            )
+        )
+
+        output = await generate_care_plan(PatientInput(**sample_patient_comprehensive))
+        assert MARKUP_SYNTAX in fake_claude.calls[0]["user_prompt"]
+        assert "HTML" not in fake_claude.calls[0]["system_prompt"]
+        assert "<h2>Goals</h2><ul><li>Details.</li></ul>" in output.care_plan_html
+        assert RISK_SCORES_PLACEHOLDER not in output.care_plan_html
+        assert output.validation_warnings == []
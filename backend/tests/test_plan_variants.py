@@ -0,0 +1,120 @@
+"""
+Tests for cached plan variants (family handouts, translations, print versions).
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.models import CarePlanOutput, PatientInput
+from app.services.care_plan_service import plan_cache_key, wrap_care_plan_html
+from app.services.claude_client import claude_client
+from app.services.generation_scheduler import generation_scheduler
+from app.services.html_sanitizer import EARLY_ABORT_CHARS
+from app.services.plan_store import plan_store
+from app.services.plan_variants import handout_sections_markup
+
+PLAN_HTML = wrap_care_plan_html(
+    "<h2>Patient Summary</h2><p>Recovering from <strong>CHF</strong>.</p>"
+    "<h2>Nursing Diagnoses</h2><ul><li>Staff-only diagnosis</li></ul>"
+    "<h2>Family Education</h2><ul><li>Weigh daily</li><li>Low salt diet</li></ul>"
+)
+HANDOUT_MARKUP = "## How You Can Help\n- Help with daily weights"
+
+
+@pytest.fixture
+def stored_patient(sample_patient_comprehensive) -> dict:
+    """Patient input whose plan is in the store."""
+    sample_patient_comprehensive["name"] = "Variant Patient"
+    patient = PatientInput(**sample_patient_comprehensive)
+    plan = CarePlanOutput(patient_name=patient.name, care_plan_html=PLAN_HTML, generated_at="now")
+    plan_store.put(plan_cache_key(patient), patient, plan, source="test")
+    return sample_patient_comprehensive
+
+
+class TestPlanVariants:
+    """Tests for deriving and caching variants."""
+
+    def test_handout_uses_only_family_sections(self):
+        """The handout prompt carries the family-facing sections as compact markup."""
+        markup = handout_sections_markup(PLAN_HTML)
+        assert "## Family Education\n\n- Weigh daily\n- Low salt diet" in markup
+        assert "Recovering from **CHF**." in markup
+        assert "Staff-only" not in markup
+
+    def test_handout_cached_per_plan(self, fake_claude, test_client, stored_patient):
+        """A handout is derived once and then served from the cache."""
+        fake_claude.respond(HANDOUT_MARKUP)
+        first = test_client.post("/care-plan-variants/family-handout", json=stored_patient)
+        assert first.status_code == 200
+        assert first.headers["X-Plan-Cache"] == "miss"
+        assert "<li>Help with daily weights</li>" in first.json()["content_html"]
+        assert "Staff-only" not in fake_claude.calls[0]["user_prompt"]
+
+        second = test_client.post("/care-plan-variants/family-handout", json=stored_patient)
+        assert second.headers["X-Plan-Cache"] == "hit"
+        assert second.json()["content_html"] == first.json()["content_html"]
+        assert len(fake_claude.calls) == 1
+
+    def test_translation_sends_plan_markup(self, fake_claude, test_client, stored_patient):
+        """Translations send the whole plan as markup and are cached per language."""
+        fake_claude.respond("## Resumen del paciente\n- Pesar a diario")
+        response = test_client.post(
+            "/care-plan-variants/translation", params={"language": "es"}, json=stored_patient
+        )
+        assert response.json()["language"] == "es"
+        assert "<h2>Resumen del paciente</h2>" in response.json()["content_html"]
+        prompt = fake_claude.calls[0]["user_prompt"]
+        assert "Spanish" in prompt
+        assert "- Staff-only diagnosis" in prompt
+        assert "<li>" not in prompt
+
+    def test_print_rendered_locally(self, fake_claude, test_client, stored_patient):
+        """Print versions need no model call."""
+        response = test_client.post("/care-plan-variants/print", json=stored_patient)
+        html = response.json()["content_html"]
+        assert html.startswith("<!DOCTYPE html>")
+        assert "@page" in html
+        assert "care-plan-container" not in html
+        assert "<h2>Family Education</h2>" in html
+        assert fake_claude.calls == []
+
+    def test_invalid_requests(self, test_client, stored_patient, sample_patient_minimal):
+        """Unknown variants, missing languages and unplanned patients are rejected."""
+        assert test_client.post("/care-plan-variants/poster", json=stored_patient).status_code == 404
+        response = test_client.post("/care-plan-variants/translation", json=stored_patient)
+        assert response.status_code == 422
+        response = test_client.post("/care-plan-variants/print", json=sample_patient_minimal)
+        assert response.status_code == 404
+
+    def test_unusable_output_is_bad_gateway(self, fake_claude, test_client, stored_patient):
+        """A derivation abandoned for broken output is reported as a 502, not a 500."""
+        fake_claude.respond("Plain text " * EARLY_ABORT_CHARS)
+        response = test_client.post(
+            "/care-plan-variants/translation", params={"language": "fr"}, json=stored_patient
+        )
+        assert response.status_code == 502
+        assert "unusable" in response.json()["detail"]
+
+    def test_deadline_bounds_derivation(self, monkeypatch, test_client, stored_patient):
+        """A derivation still running at the request deadline is answered with a 504."""
+
+        async def slow_stream(**kwargs):
+            await asyncio.sleep(0.3)
+            yield "## Late"
+
+        monkeypatch.setattr(claude_client, "stream_completion", slow_stream)
+        response = test_client.post(
+            "/care-plan-variants/translation",
+            params={"language": "ko"},
+            json=stored_patient,
+            headers={"X-Request-Deadline-Ms": "50"},
+        )
+        assert response.status_code == 504
+        # The shared derivation finishes in the background and releases its slot
+        for _ in range(100):
+            if generation_scheduler.in_flight == 0:
+                break
+            time.sleep(0.01)
+        assert generation_scheduler.in_flight == 0
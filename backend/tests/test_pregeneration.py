@@ -0,0 +1,123 @@
+"""
+Tests for canonical input hashing, the plan store and speculative pre-generation.
+"""
+
+import asyncio
+
+import pytest
+
+from app.models import CarePlanOutput, PatientInput
+from app.services.care_plan_service import plan_cache_key
+from app.services.claude_client import CompletionResult, claude_client
+from app.services.html_sanitizer import REQUIRED_SECTIONS
+from app.services.plan_store import PlanStore, plan_store
+from app.services.pregeneration import PregenerationScheduler
+from app.utils.hashing import patient_input_hash
+
+COMPLETE_PLAN = "".join(f"<h2>{name}</h2><p>Details.</p>" for name in REQUIRED_SECTIONS)
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    """Poll until condition() is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+class TestPatientInputHash:
+    """Tests for canonical patient hashing."""
+
+    def test_equivalent_inputs_hash_equal(self, sample_patient_comprehensive):
+        """List order and whitespace do not change the hash."""
+        reordered = dict(sample_patient_comprehensive)
+        reordered["comorbidities"] = list(reversed(sample_patient_comprehensive["comorbidities"]))
+        reordered["current_medications"] = list(
+            reversed(sample_patient_comprehensive["current_medications"])
+        )
+        reordered["cognitive_status"] = "  " + sample_patient_comprehensive[
+            "cognitive_status"
+        ].replace(" ", "  ")
+        assert patient_input_hash(
+            PatientInput(**sample_patient_comprehensive)
+        ) == patient_input_hash(PatientInput(**reordered))
+
+    def test_clinical_changes_change_hash(self, sample_patient_comprehensive):
+        """A changed vital sign produces a different key."""
+        changed = dict(
+            sample_patient_comprehensive, heart_rate=sample_patient_comprehensive["heart_rate"] + 1
+        )
+        assert plan_cache_key(PatientInput(**sample_patient_comprehensive)) != plan_cache_key(
+            PatientInput(**changed)
+        )
+
+
+class TestPregenerationScheduler:
+    """Tests for the background pre-generation worker."""
+
+    @pytest.mark.asyncio
+    async def test_queued_plan_is_stored(self, fake_claude, sample_patient_comprehensive):
+        """Queued patients are generated while idle and stored under their key."""
+        fake_claude.respond(COMPLETE_PLAN)
+        store = PlanStore()
+        scheduler = PregenerationScheduler(store, idle_seconds=0)
+        patient = PatientInput(**sample_patient_comprehensive)
+
+        assert scheduler.enqueue(patient) == "queued"
+        assert scheduler.enqueue(patient) == "duplicate"
+        scheduler.start()
+        try:
+            await wait_for(lambda: scheduler.completed == 1)
+        finally:
+            await scheduler.stop()
+        assert store.get(plan_cache_key(patient)) is not None
+        assert scheduler.enqueue(patient) == "cached"
+
+    @pytest.mark.asyncio
+    async def test_interactive_request_preempts(self, monkeypatch, sample_patient_comprehensive):
+        """Interactive traffic cancels background work, which is requeued afterwards."""
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def blocking_stream(system_prompt, user_prompt, max_tokens=4000, facility=None):
+            started.set()
+            await release.wait()
+            yield COMPLETE_PLAN
+            yield CompletionResult(model="fake-model", stop_reason="end_turn")
+
+        monkeypatch.setattr(claude_client, "stream_completion", blocking_stream)
+        store = PlanStore()
+        scheduler = PregenerationScheduler(store, idle_seconds=0)
+        scheduler.enqueue(PatientInput(**sample_patient_comprehensive))
+        scheduler.start()
+        try:
+            await asyncio.wait_for(started.wait(), 2.0)
+            async with scheduler.interactive():
+                await wait_for(lambda: scheduler.preempted == 1)
+                assert scheduler.status().queue_depth == 1
+            release.set()
+            await wait_for(lambda: scheduler.completed == 1)
+        finally:
+            await scheduler.stop()
+
+
+class TestStoredPlanEndpoints:
+    """Tests for serving stored plans and queueing pre-generation."""
+
+    def test_stored_plan_served_instantly(self, test_client, sample_patient_comprehensive):
+        """Identical input to /generate-care-plan is answered from the store."""
+        patient = PatientInput(**sample_patient_comprehensive)
+        plan = CarePlanOutput(
+            patient_name=patient.name,
+            care_plan_html="<p>stored</p>",
+            generated_at="2026-01-01T00:00:00Z",
+        )
+        plan_store.put(plan_cache_key(patient), patient, plan, source="pregenerated")
+
+        response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+        assert response.status_code == 200
+        assert response.headers["x-plan-cache"] == "hit"
+        assert response.json()["care_plan_html"] == "<p>stored</p>"
+
+        response = test_client.post("/pregenerate", json=[sample_patient_comprehensive])
+        assert response.status_code == 202
+        assert response.json()["cached"] == 1
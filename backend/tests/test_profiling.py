@@ -0,0 +1,128 @@
+"""
+Tests for on-demand request profiling and slow-request capture.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.request_profiler import RequestProfiler, request_profiler
+
+TOKEN = "admin-secret"
+
+
+def _blocking_work(seconds: float) -> None:
+    """Block the event loop thread, as a CPU-heavy or sync call would."""
+    time.sleep(seconds)
+
+
+class TestRequestProfiler:
+    """Tests for the sampling profiler itself."""
+
+    async def test_disabled_profiler_watches_nothing(self):
+        """Without a token or threshold no capture is started."""
+        profiler = RequestProfiler()
+        assert profiler.begin("GET", "/health", TOKEN) is None
+
+    async def test_wrong_token_not_profiled(self):
+        """Only the configured admin token triggers on-demand profiling."""
+        profiler = RequestProfiler(token=TOKEN)
+        assert profiler.begin("GET", "/health", "guess") is None
+        assert not profiler.authorized(None)
+
+    async def test_requested_profile_samples_blocking_code(self):
+        """Stacks show where the loop thread was, and blocking shows as loop lag."""
+        profiler = RequestProfiler(token=TOKEN, interval_ms=1)
+        capture = profiler.begin("POST", "/generate-care-plan", TOKEN)
+        assert capture is not None
+        await asyncio.sleep(0.01)
+        _blocking_work(0.1)
+        await asyncio.sleep(0.01)
+
+        profile = await profiler.finish(capture, status_code=200)
+        assert profile is not None
+        assert profile.trigger == "requested"
+        assert profile.samples > 0
+        assert any("_blocking_work" in stack for stack in profile.stacks)
+        assert profile.loop_lag_max_ms is not None
+        assert profile.loop_lag_max_ms >= 50
+        assert profiler.get(profile.profile_id) is profile
+
+    async def test_fast_request_not_captured(self):
+        """Requests under the slow threshold produce no profile."""
+        profiler = RequestProfiler(slow_threshold_ms=1000)
+        capture = profiler.begin("GET", "/health", None)
+        assert capture is not None
+        assert await profiler.finish(capture, status_code=200) is None
+        assert not profiler.history
+
+    async def test_slow_request_captured(self):
+        """Sampling starts once a request passes the threshold, even if the loop is blocked."""
+        profiler = RequestProfiler(slow_threshold_ms=20, interval_ms=1)
+        capture = profiler.begin("POST", "/generate-care-plan", None)
+        assert capture is not None
+        _blocking_work(0.1)
+
+        profile = await profiler.finish(capture, status_code=200)
+        assert profile is not None
+        assert profile.trigger == "slow"
+        assert any("_blocking_work" in stack for stack in profile.stacks)
+
+    async def test_profiles_written_to_directory(self, tmp_path):
+        """Profiles are also written as JSON when a directory is configured."""
+        profiler = RequestProfiler(token=TOKEN, profile_dir=str(tmp_path))
+        capture = profiler.begin("GET", "/health", TOKEN)
+        assert capture is not None
+        profile = await profiler.finish(capture, status_code=200)
+        assert profile is not None
+        (written,) = tmp_path.iterdir()
+        assert written.name.endswith(f"{profile.profile_id}.json")
+
+
+class TestProfilingEndpoints:
+    """Tests for the profiling middleware and /admin/profiles."""
+
+    @pytest.fixture
+    def admin_token(self, monkeypatch):
+        """Enable on-demand profiling with a known token."""
+        monkeypatch.setattr(request_profiler, "token", TOKEN)
+        return TOKEN
+
+    def test_profile_header_returns_profile_id(self, admin_token, test_client):
+        """A profiled request carries X-Profile-Id, retrievable with the token."""
+        response = test_client.get("/health", headers={"X-Profile-Token": admin_token})
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+
+        profile = test_client.get(
+            f"/admin/profiles/{profile_id}", headers={"X-Profile-Token": admin_token}
+        )
+        assert profile.status_code == 200
+        assert profile.json()["path"] == "/health"
+
+        listed = test_client.get("/admin/profiles", headers={"X-Profile-Token": admin_token})
+        assert profile_id in [p["profile_id"] for p in listed.json()]
+
+    def test_unprofiled_request_has_no_header(self, test_client):
+        """Requests without the admin header are not profiled."""
+        response = test_client.get("/health")
+        assert "X-Profile-Id" not in response.headers
+
+    def test_admin_endpoints_require_token(self, admin_token, test_client):
+        """Profiles are not served without the admin token."""
+        assert test_client.get("/admin/profiles").status_code == 403
+        assert (
+            test_client.get("/admin/profiles", headers={"X-Profile-Token": "nope"}).status_code
+            == 403
+        )
+        assert (
+            test_client.get(
+                "/admin/profiles/unknown", headers={"X-Profile-Token": admin_token}
+            ).status_code
+            == 404
+        )
+
+    def test_admin_endpoints_disabled_without_token(self, test_client):
+        """With no token configured the admin endpoints are closed."""
+        assert test_client.get("/admin/profiles", headers={"X-Profile-Token": ""}).status_code == 403
@@ -0,0 +1,95 @@
+"""
+Tests for load monitoring and the /ready endpoint.
+"""
+
+from app.services.generation_scheduler import GenerationScheduler, generation_scheduler
+from app.services.load_monitor import LoadMonitor
+
+
+class TestLoadMonitor:
+    """Tests for readiness thresholds."""
+
+    def test_idle_monitor_is_ready(self):
+        """With no load and no upstream calls the worker is ready."""
+        report = LoadMonitor(GenerationScheduler()).readiness()
+        assert report.ready
+        assert report.reasons == []
+        assert report.upstream_p95_latency_ms is None
+
+    def test_saturation_makes_worker_unready(self, monkeypatch):
+        """Crossing the in-flight or queue threshold reports not ready."""
+        monkeypatch.setattr("app.services.load_monitor.settings.ready_max_in_flight", 2)
+        monkeypatch.setattr("app.services.load_monitor.settings.ready_max_queue_depth", 1)
+        scheduler = GenerationScheduler()
+        scheduler.in_flight = 2
+        scheduler.queued = 1
+        monitor = LoadMonitor(scheduler)
+
+        report = monitor.readiness()
+        assert not report.ready
+        assert len(report.reasons) == 2
+
+    def test_upstream_errors_need_minimum_samples(self, monkeypatch):
+        """A single failure does not flip readiness; a sustained error rate does."""
+        monkeypatch.setattr("app.services.load_monitor.settings.ready_min_upstream_samples", 4)
+        monitor = LoadMonitor(GenerationScheduler())
+        monitor.record_upstream(False, 100.0)
+        assert monitor.readiness().ready
+
+        for _ in range(3):
+            monitor.record_upstream(False, 100.0)
+        report = monitor.readiness()
+        assert not report.ready
+        assert report.upstream_error_rate == 1.0
+
+    def test_slow_upstream_makes_worker_unready(self, monkeypatch):
+        """A p95 latency above the threshold reports not ready."""
+        monkeypatch.setattr("app.services.load_monitor.settings.ready_min_upstream_samples", 2)
+        monkeypatch.setattr("app.services.load_monitor.settings.ready_max_upstream_p95_ms", 1000.0)
+        monitor = LoadMonitor(GenerationScheduler())
+        monitor.record_upstream(True, 200.0)
+        monitor.record_upstream(True, 5000.0)
+
+        report = monitor.readiness()
+        assert not report.ready
+        assert report.upstream_p50_latency_ms == 5000.0
+        assert report.upstream_p95_latency_ms == 5000.0
+
+    def test_old_outcomes_expire(self):
+        """Upstream outcomes older than the window are dropped."""
+        monitor = LoadMonitor(GenerationScheduler(), window_seconds=0)
+        monitor.record_upstream(False, 100.0)
+        assert monitor.readiness().upstream_calls == 0
+
+
+class TestReadyEndpoint:
+    """Tests for GET /ready."""
+
+    def test_ready_returns_200(self, test_client):
+        """An idle worker is ready."""
+        response = test_client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+
+    def test_saturated_worker_returns_503(self, monkeypatch, test_client):
+        """A saturated worker returns 503 with the reasons."""
+        monkeypatch.setattr(generation_scheduler, "in_flight", 10**6)
+        response = test_client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["reasons"]
+
+    def test_health_ignores_load(self, monkeypatch, test_client):
+        """Liveness stays healthy while the worker is saturated."""
+        monkeypatch.setattr(generation_scheduler, "in_flight", 10**6)
+        assert test_client.get("/health").status_code == 200
+
+    def test_generation_releases_slot(
+        self, fake_claude, test_client, sample_patient_comprehensive
+    ):
+        """Interactive generations are released from their slot when done."""
+        fake_claude.respond("<h2>Patient Summary</h2><!-- RISK_SCORES -->")
+        sample_patient_comprehensive.update(name="Readiness Patient")
+        response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+        assert response.status_code == 200
+        assert generation_scheduler.in_flight == 0
+        assert generation_scheduler.queued == 0
@@ -0,0 +1,207 @@
+"""
+Tests for the local clinical risk scoring engine.
+"""
+
+import pytest
+
+from app.models import PatientInput
+from app.services.care_plan_service import RISK_SCORES_PLACEHOLDER, generate_care_plan
+from app.services.risk_scoring import (
+    assess_patient,
+    flag_vital_signs,
+    format_risk_facts,
+    render_risk_assessment_html,
+    score_fall_risk,
+    score_pressure_risk,
+)
+
+
+@pytest.fixture
+def high_risk_patient() -> dict:
+    """Fixture providing a patient with many fall and pressure risk factors."""
+    return {
+        "name": "High Risk Patient",
+        "age": 84,
+        "gender": "Female",
+        "admission_date": "2026-02-10",
+        "facility": "Test Facility",
+        "primary_diagnosis": "Stroke (CVA) with right-sided hemiplegia",
+        "comorbidities": ["Type 2 Diabetes", "Hypertension"],
+        "blood_pressure": "182/96",
+        "heart_rate": 118,
+        "temperature": 100.9,
+        "oxygen_saturation": 87,
+        "pain_level": 6,
+        "current_medications": [
+            {"name": "Heparin", "dosage": "5000 units", "frequency": "subcutaneous q8h"},
+            {"name": "Ceftriaxone", "dosage": "1g", "frequency": "IV daily"},
+        ],
+        "allergies": [],
+        "symptoms": ["Urinary incontinence", "Difficulty swallowing"],
+        "mobility_level": "bedbound",
+        "adl_independence": "Requires assistance with all ADLs",
+        "fall_risk_factors": ["History of falls", "Confusion"],
+        "cognitive_status": "Confused, disoriented to time",
+        "diet_restrictions": "Thickened liquids",
+    }
+
+
+@pytest.fixture
+def low_risk_patient() -> dict:
+    """Fixture providing an independent patient with normal vitals."""
+    return {
+        "name": "Low Risk Patient",
+        "age": 66,
+        "gender": "Male",
+        "admission_date": "2026-02-10",
+        "facility": "Test Facility",
+        "primary_diagnosis": "Elective knee replacement",
+        "blood_pressure": "118/76",
+        "heart_rate": 72,
+        "temperature": 98.6,
+        "oxygen_saturation": 98,
+        "pain_level": 2,
+        "mobility_level": "ambulatory",
+        "adl_independence": "Independent",
+        "cognitive_status": "Alert and oriented x3",
+    }
+
+
+class TestFallRisk:
+    """Tests for Morse-style fall scoring."""
+
+    def test_high_risk_score(self, high_risk_patient):
+        """History, secondary diagnosis, IV access and confusion add up."""
+        risk = score_fall_risk(PatientInput(**high_risk_patient))
+        assert risk.score == 25 + 15 + 20 + 15
+        assert risk.level == "High"
+
+    def test_low_risk_score(self, low_risk_patient):
+        """An independent patient without risk factors scores zero."""
+        risk = score_fall_risk(PatientInput(**low_risk_patient))
+        assert risk.score == 0
+        assert risk.level == "Low"
+        assert risk.contributing_factors == []
+
+    def test_subcutaneous_heparin_is_not_iv_access(self, low_risk_patient):
+        """The drug heparin alone does not score the Morse IV/heparin lock item."""
+        low_risk_patient["current_medications"] = [
+            {"name": "Heparin", "dosage": "5000 units", "frequency": "subcutaneous q8h"},
+            {"name": "Ivermectin", "dosage": "3mg", "frequency": "once"},
+        ]
+        risk = score_fall_risk(PatientInput(**low_risk_patient))
+        assert risk.score == 0
+
+    def test_saline_lock_counts_as_iv_access(self, low_risk_patient):
+        """Explicit line terms score the IV access item."""
+        low_risk_patient["fall_risk_factors"] = ["Saline lock in place"]
+        risk = score_fall_risk(PatientInput(**low_risk_patient))
+        assert risk.score == 20
+
+    def test_walker_counts_as_ambulatory_aid(self, low_risk_patient):
+        """Walker users receive the ambulatory aid points."""
+        low_risk_patient["mobility_level"] = "walker"
+        risk = score_fall_risk(PatientInput(**low_risk_patient))
+        assert risk.score == 15
+
+
+class TestPressureRisk:
+    """Tests for Braden-style pressure injury scoring."""
+
+    def test_bedbound_patient_is_high_risk(self, high_risk_patient):
+        """Bedbound, incontinent, confused patients score in the high-risk range."""
+        risk = score_pressure_risk(PatientInput(**high_risk_patient))
+        assert 6 <= risk.score <= 12
+        assert risk.level in ("High", "Very High")
+
+    def test_independent_patient_has_no_risk(self, low_risk_patient):
+        """Independent patients score at the top of the scale."""
+        risk = score_pressure_risk(PatientInput(**low_risk_patient))
+        assert risk.score == 22
+        assert risk.level == "No Risk"
+
+
+class TestVitalSignFlags:
+    """Tests for vital sign abnormality flags."""
+
+    def test_abnormal_vitals_flagged(self, high_risk_patient):
+        """Every abnormal vital sign is flagged with the right severity."""
+        flags = {flag.vital: flag for flag in flag_vital_signs(PatientInput(**high_risk_patient))}
+        assert flags["Blood Pressure"].severity == "critical"
+        assert flags["Heart Rate"].message == "Tachycardia"
+        assert flags["Oxygen Saturation"].severity == "critical"
+        assert flags["Temperature"].message == "Fever"
+
+    def test_normal_vitals_not_flagged(self, low_risk_patient):
+        """Normal vital signs produce no flags."""
+        assert flag_vital_signs(PatientInput(**low_risk_patient)) == []
+
+    def test_unparseable_blood_pressure(self, low_risk_patient):
+        """Free-text blood pressure readings are flagged rather than rejected."""
+        low_risk_patient["blood_pressure"] = "not taken"
+        flags = flag_vital_signs(PatientInput(**low_risk_patient))
+        assert flags[0].message == "Unable to parse blood pressure reading"
+
+
+class TestRiskEndpoints:
+    """Tests for the risk assessment endpoints."""
+
+    def test_single_assessment(self, test_client, high_risk_patient):
+        """The single-patient endpoint returns a full assessment."""
+        response = test_client.post("/risk-assessment", json=high_risk_patient)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["fall_risk"]["level"] == "High"
+        assert len(data["vital_sign_flags"]) == 4
+
+    def test_batch_assessment(self, test_client, high_risk_patient, low_risk_patient):
+        """The batch endpoint preserves roster order."""
+        response = test_client.post(
+            "/risk-assessments/batch", json=[high_risk_patient, low_risk_patient]
+        )
+        assert response.status_code == 200
+        names = [item["patient_name"] for item in response.json()]
+        assert names == ["High Risk Patient", "Low Risk Patient"]
+
+    def test_rendered_html_escapes_values(self, low_risk_patient):
+        """Rendered HTML contains the section heading and escapes free text."""
+        low_risk_patient["blood_pressure"] = "<b>120/80"
+        html = render_risk_assessment_html(assess_patient(PatientInput(**low_risk_patient)))
+        assert "<h2>Risk Assessments</h2>" in html
+        assert "&lt;b&gt;120/80" in html
+
+
+class TestCarePlanIntegration:
+    """Tests that local scores reach the prompt and the rendered plan."""
+
+    @pytest.mark.asyncio
+    async def test_scores_in_prompt_and_inserted_at_section_five(
+        self, fake_claude, high_risk_patient
+    ):
+        """Risk facts are sent to the model and rendered in place of the placeholder."""
+        fake_claude.respond(
+            "<h2>Interventions</h2><p>...</p>"
+            f"<h2>Risk Assessments</h2>{RISK_SCORES_PLACEHOLDER}"
+            "<h3>Infection Risk</h3><p>...</p>"
+            "<h2>Discharge Planning</h2><p>...</p>"
+        )
+        patient = PatientInput(**high_risk_patient)
+        output = await generate_care_plan(patient)
+
+        user_prompt = fake_claude.calls[0]["user_prompt"]
+        assert format_risk_facts(assess_patient(patient)) in user_prompt
+        assert RISK_SCORES_PLACEHOLDER in user_prompt
+
+        html = output.care_plan_html
+        assert RISK_SCORES_PLACEHOLDER not in html
+        assert "Morse Fall Scale score: 75" in html
+        assert html.index("Morse Fall Scale") < html.index("Infection Risk")
+        assert html.index("Morse Fall Scale") < html.index("Discharge Planning")
+        assert html.count("<h2>Risk Assessments</h2>") == 1
+
+    @pytest.mark.asyncio
+    async def test_scores_appended_when_placeholder_missing(self, fake_claude, low_risk_patient):
+        """The section is still rendered if the model drops the placeholder."""
+        fake_claude.respond("<h2>Patient Summary</h2>")
+        output = await generate_care_plan(PatientInput(**low_risk_patient))
+        assert "<h2>Risk Assessments</h2>" in output.care_plan_html
@@ -0,0 +1,170 @@
+"""
+Tests for streaming roster import.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.main import app
+from app.models import CarePlanOutput
+from app.services import roster_import
+
+CSV_HEADER = (
+    "name,age,gender,admission_date,facility,primary_diagnosis,comorbidities,"
+    "blood_pressure,heart_rate,temperature,oxygen_saturation,pain_level,"
+    "current_medications,allergies,mobility_level,adl_independence,cognitive_status\n"
+)
+
+VALID_CSV_ROW = (
+    "Jane Roe,81,Female,2026-02-10,Test Facility,CHF,Hypertension;Type 2 Diabetes,"
+    "150/90,88,98.4,93,2,Furosemide|40mg|BID;Lisinopril|10mg|QD,Penicillin,"
+    'wheelchair,Requires assistance,"Alert,\noriented x3"\n'
+)
+
+INVALID_CSV_ROW = (
+    "John Roe,200,Male,2026-02-10,Test Facility,Stroke,,120/80,72,98.6,98,0,,,"
+    "ambulatory,Independent,Alert\n"
+)
+
+
+def parse_lines(text: str) -> list[dict]:
+    """Parse an NDJSON response body."""
+    return [json.loads(line) for line in text.splitlines() if line]
+
+
+class TestRosterImportEndpoint:
+    """Tests for POST /import-roster."""
+
+    def test_csv_rows_validated_individually(self, test_client):
+        """One bad row does not fail the import; quoted multi-line cells are supported."""
+        body = CSV_HEADER + VALID_CSV_ROW + INVALID_CSV_ROW
+        response = test_client.post("/import-roster", content=body.encode())
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        first, second, summary = parse_lines(response.text)
+        assert first["valid"] is True
+        assert first["patient_name"] == "Jane Roe"
+        assert second["valid"] is False
+        assert any(error.startswith("age:") for error in second["errors"])
+        assert summary["summary"] == {
+            "total_rows": 2,
+            "valid_rows": 1,
+            "invalid_rows": 1,
+            "generated_rows": 0,
+        }
+
+    def test_ndjson_invalid_json_line(self, test_client, sample_patient_comprehensive):
+        """Malformed NDJSON lines are reported without stopping the import."""
+        body = json.dumps(sample_patient_comprehensive) + "\n{not json\n"
+        response = test_client.post("/import-roster?format=ndjson", content=body.encode())
+
+        first, second, summary = parse_lines(response.text)
+        assert first["valid"] is True
+        assert second["valid"] is False
+        assert second["errors"][0].startswith("Invalid JSON")
+        assert summary["summary"]["total_rows"] == 2
+
+    def test_bad_medication_cell(self, test_client):
+        """Medication cells must have name, dosage and frequency."""
+        row = VALID_CSV_ROW.replace("Lisinopril|10mg|QD", "Lisinopril 10mg")
+        response = test_client.post("/import-roster", content=(CSV_HEADER + row).encode())
+        first = parse_lines(response.text)[0]
+        assert first["valid"] is False
+        assert "name|dosage|frequency" in first["errors"][0]
+
+    async def test_rows_streamed_while_uploading(self):
+        """A row's result is sent before the rest of the upload has arrived."""
+        first_result_sent = asyncio.Event()
+        chunks = [(CSV_HEADER + VALID_CSV_ROW).encode(), INVALID_CSV_ROW.encode()]
+        messages = [
+            {"type": "http.request", "body": chunk, "more_body": more}
+            for chunk, more in zip(chunks, (True, False), strict=True)
+        ]
+        bodies: list[bytes] = []
+
+        async def receive():
+            if len(messages) == 1:
+                # The rest of the upload only arrives once the first row was answered
+                await first_result_sent.wait()
+            if not messages:
+                await asyncio.Event().wait()
+            return messages.pop(0)
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                bodies.append(message["body"])
+                first_result_sent.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/import-roster",
+            "raw_path": b"/import-roster",
+            "query_string": b"format=csv",
+            "headers": [(b"host", b"testserver"), (b"content-type", b"text/csv")],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+            "root_path": "",
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+        first, second, summary = parse_lines(b"".join(bodies).decode())
+        assert first["valid"] is True
+        assert second["valid"] is False
+        assert summary["summary"]["total_rows"] == 2
+
+
+class TestRosterGeneration:
+    """Tests for generating plans for valid roster rows."""
+
+    @pytest.mark.asyncio
+    async def test_generation_preserves_row_order(self, monkeypatch):
+        """Generated results are yielded in row order with bounded concurrency."""
+
+        async def fake_generate(patient):
+            return CarePlanOutput(
+                patient_name=patient.name,
+                care_plan_html="<p>plan</p>",
+                generated_at="2026-01-01T00:00:00Z",
+            )
+
+        monkeypatch.setattr(roster_import, "generate_care_plan", fake_generate)
+
+        async def lines():
+            yield CSV_HEADER
+            for line in (VALID_CSV_ROW + INVALID_CSV_ROW + VALID_CSV_ROW).splitlines(True):
+                yield line
+
+        results = [
+            item
+            async for item in roster_import.import_roster(
+                lines(), "csv", generate=True, concurrency=1
+            )
+        ]
+        rows, summary = results[:-1], results[-1]
+        assert [row.row for row in rows] == [1, 2, 3]
+        assert rows[0].care_plan is not None
+        assert rows[1].care_plan is None
+        assert summary.generated_rows == 2
+
+
+class TestStreamLines:
+    """Tests for splitting an upload stream into lines."""
+
+    async def test_lines_split_across_chunks(self):
+        """Lines and multi-byte characters split between chunks are rejoined."""
+        data = "\ufeffname\nJosé Roe\nlast".encode()
+        split = data.index("é".encode()) + 1
+
+        async def chunks():
+            for chunk in (data[:5], data[5:split], data[split:]):
+                yield chunk
+
+        lines = [line async for line in roster_import.aiter_stream_lines(chunks())]
+        assert lines == ["name\n", "José Roe\n", "last"]
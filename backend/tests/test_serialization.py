@@ -0,0 +1,45 @@
+"""
+Tests for the single-pass JSON response path.
+"""
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.models import CarePlanOutput, PatientInput
+from app.services.risk_scoring import assess_patient
+from app.utils.serialization import RISK_ASSESSMENT_LIST_ADAPTER, ModelResponse
+
+
+class TestModelResponse:
+    """Tests for ModelResponse rendering."""
+
+    def test_model_body_matches_pydantic_json(self):
+        """Models serialize exactly as model_dump_json, including non-ASCII text."""
+        plan = CarePlanOutput(
+            patient_name="José", care_plan_html="<p>Café</p>", generated_at="2026-01-01T00:00:00Z"
+        )
+        response = ModelResponse(plan)
+        assert response.body == plan.model_dump_json().encode()
+        assert response.headers["content-type"] == "application/json"
+
+    def test_adapter_serializes_lists(self, sample_patient_comprehensive):
+        """Lists of models are serialized with the pre-built adapter."""
+        assessments = [assess_patient(PatientInput(**sample_patient_comprehensive))]
+        response = ModelResponse(assessments, adapter=RISK_ASSESSMENT_LIST_ADAPTER)
+        assert json.loads(response.body) == [assessments[0].model_dump(mode="json")]
+
+    def test_plain_data_falls_back_to_orjson(self):
+        """Non-model content is encoded by orjson."""
+        assert json.loads(ModelResponse({"status": "ok"}).body) == {"status": "ok"}
+
+
+class TestValidatorConstants:
+    """Tests that the shared allowed-value sets behave like the old lists."""
+
+    def test_mobility_error_lists_levels_in_order(self, sample_patient_comprehensive):
+        """The mobility error message keeps its documented order."""
+        sample_patient_comprehensive["mobility_level"] = "crawling"
+        with pytest.raises(ValidationError, match="ambulatory, wheelchair, bedbound, walker"):
+            PatientInput(**sample_patient_comprehensive)
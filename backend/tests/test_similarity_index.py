@@ -0,0 +1,197 @@
+"""
+Tests for the similar-patient index and instant draft plans.
+"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import CarePlanOutput, PatientInput
+from app.services import similarity_index
+from app.services.care_plan_service import plan_cache_key
+from app.services.plan_store import PlanStore, plan_store
+from app.services.similarity_index import (
+    SimilarPatientIndex,
+    patient_features,
+    plan_text,
+)
+
+SOURCE_PLAN_HTML = (
+    "<style>h2 { color: blue; }</style><h2>Patient Summary</h2>"
+    "<p>Harriet Source has CHF. Harriet tolerates a 2g sodium diet.</p>"
+)
+
+
+@pytest.fixture
+def patient(sample_patient_comprehensive) -> PatientInput:
+    """Comprehensive patient input."""
+    return PatientInput(**sample_patient_comprehensive)
+
+
+def variant(patient: PatientInput, **update) -> PatientInput:
+    """Copy of a patient with some fields changed."""
+    return patient.model_copy(update=update)
+
+
+class TestSimilarPatientIndex:
+    """Tests for feature extraction and MinHash/LSH lookups."""
+
+    def test_features_canonicalized(self, patient):
+        """Differently written diagnoses and medications give the same features."""
+        rewritten = variant(
+            patient,
+            primary_diagnosis=patient.primary_diagnosis.upper(),
+            current_medications=list(reversed(patient.current_medications)),
+        )
+        assert patient_features(patient) == patient_features(rewritten)
+        assert "mob:wheelchair" in patient_features(patient)
+
+    def test_closest_patient_ranked_first(self, patient):
+        """A near-identical patient outranks one sharing only some features."""
+        index = SimilarPatientIndex()
+        index.add("near", variant(patient, name="Near", age=patient.age + 1))
+        index.add(
+            "far",
+            variant(
+                patient,
+                name="Far",
+                comorbidities=["Hypertension"],
+                current_medications=patient.current_medications[:1],
+                fall_risk_factors=[],
+            ),
+        )
+        index.add(
+            "unrelated",
+            variant(
+                patient,
+                primary_diagnosis="Hip fracture",
+                comorbidities=["Osteoporosis"],
+                current_medications=[],
+                allergies=[],
+                fall_risk_factors=[],
+                mobility_level="bedbound",
+                cognitive_status="Severe dementia",
+                age=60,
+            ),
+        )
+        matches = index.similar(patient)
+        assert matches[0][0] == "near"
+        assert matches[0][1] > 0.5
+        assert "unrelated" not in [input_hash for input_hash, _ in matches]
+
+    def test_facility_filter_and_incremental_add(self, patient):
+        """Lookups can be limited to a facility; re-adding a hash is a no-op."""
+        index = SimilarPatientIndex()
+        index.add("other", variant(patient, facility="Other Facility"))
+        assert index.similar(patient, facility=patient.facility) == []
+        index.add("same", patient)
+        index.add("same", patient)
+        assert len(index) == 2
+        assert [h for h, _ in index.similar(patient, facility=patient.facility)] == ["same"]
+
+    def test_replaced_plans_removed(self, patient):
+        """Only a resident's latest input hash stays in the index."""
+        index = SimilarPatientIndex()
+        index.add("before", patient)
+        index.add("after", variant(patient, heart_rate=patient.heart_rate + 1))
+        assert len(index) == 1
+        assert [h for h, _ in index.similar(patient)] == ["after"]
+
+    def test_expired_entries_dropped(self, monkeypatch, patient):
+        """Entries older than the TTL are dropped as new ones arrive, across compactions."""
+        clock = SimpleNamespace(now=1000.0)
+        monkeypatch.setattr(similarity_index, "time", SimpleNamespace(time=lambda: clock.now))
+        index = SimilarPatientIndex(ttl_seconds=60)
+        for number in range(200):
+            clock.now += 1
+            index.add(f"hash-{number}", variant(patient, name=f"Resident {number}"))
+        assert len(index) == 61
+        matches = index.similar(patient, limit=100)
+        assert {h for h, _ in matches} == {f"hash-{number}" for number in range(139, 200)}
+
+    def test_bands_must_divide_signature(self):
+        """A signature that does not split evenly into bands is rejected."""
+        with pytest.raises(ValueError, match="multiple of bands"):
+            SimilarPatientIndex(num_permutations=30, bands=8)
+
+    def test_plan_text_strips_markup(self):
+        """Reference text drops styles and tags and is truncated."""
+        text = plan_text(SOURCE_PLAN_HTML, limit=30)
+        assert text.startswith("Patient Summary Harriet")
+        assert len(text) == 30
+
+
+class TestPlanStorePatients:
+    """Tests for the patient inputs kept alongside stored plans."""
+
+    def test_listeners_and_reload(self, patient):
+        """Stored plans notify listeners and can be re-indexed from the store."""
+        store = PlanStore()
+        seen = []
+        store.subscribe(lambda input_hash, _patient: seen.append(input_hash))
+        plan = CarePlanOutput(
+            patient_name=patient.name, care_plan_html="<p>x</p>", generated_at="t"
+        )
+        store.put("abc", patient, plan, source="interactive")
+        assert seen == ["abc"]
+
+        index = SimilarPatientIndex()
+        assert index.load(store) == 1
+        assert index.similar(patient)[0][0] == "abc"
+
+    def test_old_store_migrated(self, tmp_path, patient):
+        """Stores created without the patient column gain it on open."""
+        path = str(tmp_path / "plans.db")
+        with sqlite3.connect(path) as db:
+            db.execute(
+                "CREATE TABLE care_plans (input_hash TEXT PRIMARY KEY, facility TEXT NOT NULL, "
+                "patient_name TEXT NOT NULL, plan_json TEXT NOT NULL, source TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+        store = PlanStore(path)
+        plan = CarePlanOutput(
+            patient_name=patient.name, care_plan_html="<p>x</p>", generated_at="t"
+        )
+        store.put("abc", patient, plan, source="interactive")
+        assert [input_hash for input_hash, _ in store.iter_patients()] == ["abc"]
+
+
+class TestDraftEndpoint:
+    """Tests for POST /care-plan-draft."""
+
+    def test_draft_from_similar_patient(self, test_client, patient):
+        """The closest stored plan is returned labelled as a draft, source name removed."""
+        source = variant(patient, name="Harriet Source", facility="Draft Test Facility", age=85)
+        plan_store.put(
+            plan_cache_key(source),
+            source,
+            CarePlanOutput(
+                patient_name=source.name,
+                care_plan_html=SOURCE_PLAN_HTML,
+                generated_at="t",
+                model="fake-model",
+                input_tokens=100,
+                output_tokens=50,
+            ),
+            source="interactive",
+        )
+
+        current = variant(patient, name="Current Patient", facility="Draft Test Facility")
+        response = test_client.post("/care-plan-draft", json=current.model_dump(mode="json"))
+        assert response.status_code == 200
+        draft = response.json()
+        assert draft["is_draft"] is True
+        assert draft["source_plan_hash"] == plan_cache_key(source)
+        assert "DRAFT" in draft["notice"]
+        assert draft["care_plan"]["patient_name"] == "Current Patient"
+        assert "Harriet" not in draft["care_plan"]["care_plan_html"]
+        assert plan_store.get(plan_cache_key(source)).content_hash
+        assert draft["care_plan"]["content_hash"] is None
+        assert draft["care_plan"]["input_tokens"] is None
+
+    def test_no_similar_plan(self, test_client, patient):
+        """A facility without similar stored plans gets a 404."""
+        lonely = variant(patient, facility="Facility Without Plans")
+        response = test_client.post("/care-plan-draft", json=lonely.model_dump(mode="json"))
+        assert response.status_code == 404
@@ -0,0 +1,192 @@
+"""
+Tests for anonymized traffic capture and replay.
+"""
+
+import json
+
+import pytest
+
+from app.main import app
+from app.services.claude_client import claude_client
+from app.services.traffic_recorder import TrafficRecorder, scrub_names, traffic_recorder
+from app.services.traffic_replay import (
+    CassettePlayer,
+    MissingCassetteError,
+    load_capture,
+    replay,
+)
+from tests.conftest import FakeEventStream
+
+PATIENT_NAME = "Rosalind Capture"
+
+
+@pytest.fixture
+def capture_path(tmp_path, monkeypatch):
+    """Record traffic to a temporary capture file."""
+    path = tmp_path / "capture.jsonl"
+    monkeypatch.setattr(traffic_recorder, "path", path)
+    return path
+
+
+@pytest.fixture
+def recorded_upstream(monkeypatch):
+    """Answer model calls with a plan mentioning the patient by name."""
+
+    async def fake_create(**kwargs):
+        return FakeEventStream(
+            ["<h2>Patient Summary</h2><p>", f"{PATIENT_NAME} is stable. ", "Rosalind ambulates.</p>"],
+            {},
+        )
+
+    monkeypatch.setattr(claude_client.client.messages, "create", fake_create)
+
+
+class TestTrafficRecorder:
+    """Tests for recording and anonymization."""
+
+    @pytest.mark.usefixtures("recorded_upstream")
+    def test_requests_recorded_with_names_scrubbed(
+        self, capture_path, test_client, sample_patient_comprehensive
+    ):
+        """Bodies and model outputs are recorded with the patient name pseudonymized."""
+        sample_patient_comprehensive.update(name=PATIENT_NAME)
+        response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+        assert response.status_code == 200
+        assert test_client.get("/health").status_code == 200
+
+        assert "Rosalind" not in capture_path.read_text()
+        generation, health = load_capture(capture_path)
+        assert generation["path"] == "/generate-care-plan"
+        assert generation["status"] == 200
+        pseudonym = generation["body"]["name"]
+        assert pseudonym.startswith("Patient ")
+        assert generation["body"]["current_medications"] == (
+            sample_patient_comprehensive["current_medications"]
+        )
+
+        (cassette,) = generation["upstream"]
+        assert pseudonym in cassette["text"]
+        assert len(cassette["chunk_sizes"]) == len(cassette["chunk_offsets_ms"]) == 3
+        assert cassette["stop_reason"] == "end_turn"
+        assert health["body"] is None
+        assert health["upstream"] == []
+        assert health["arrival_ms"] >= generation["arrival_ms"]
+
+    async def test_sample_rate_zero_records_nothing(self, tmp_path):
+        """Unsampled requests are not recorded."""
+        recorder = TrafficRecorder(str(tmp_path / "capture.jsonl"), sample_rate=0.0)
+        assert await recorder.begin(object()) is None
+
+    def test_name_parts_scrubbed(self):
+        """Surnames and first names used on their own are also replaced."""
+        names = {"Ada Lovelace": "Patient 1234abcd"}
+        text = scrub_names("Ada Lovelace, age 80. Ms. Lovelace and Ada agree.", names)
+        assert "Lovelace" not in text
+        assert "Ada" not in text
+
+    def test_only_whole_words_scrubbed(self):
+        """Words merely containing a name part are left alone."""
+        names = {"Ann Smith": "Patient 1234abcd"}
+        assert scrub_names("Annual review; Smithson", names) == "Annual review; Smithson"
+        assert scrub_names("Mrs. Smith.", names) == "Mrs. Patient 1234abcd."
+
+    @pytest.mark.usefixtures("recorded_upstream")
+    def test_free_text_and_identifiers_anonymized(
+        self, capture_path, test_client, sample_patient_comprehensive
+    ):
+        """Names in free text, the facility, exact age and admission date are not recorded."""
+        sample_patient_comprehensive.update(
+            name=PATIENT_NAME,
+            symptoms=[f"{PATIENT_NAME} reports dizziness"],
+            cognitive_status="Ms. Capture oriented x3",
+            comorbidities=["Rosalind had a stroke in 2019"],
+        )
+        response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+        assert response.status_code == 200
+
+        captured = capture_path.read_text()
+        for value in ("Rosalind", "Capture", sample_patient_comprehensive["facility"]):
+            assert value not in captured
+        (generation,) = load_capture(capture_path)
+        body = generation["body"]
+        assert body["symptoms"] == ["x" * len(sample_patient_comprehensive["symptoms"][0])]
+        assert body["facility"].startswith("Facility ")
+        assert body["age"] % 5 == 0
+        assert body["admission_date"] != sample_patient_comprehensive["admission_date"]
+        assert body["comorbidities"] == [f"{body['name']} had a stroke in 2019"]
+
+
+class TestTrafficReplay:
+    """Tests for replaying a capture against recorded model outputs."""
+
+    async def test_replay_reproduces_capture(self, tmp_path, sample_patient_comprehensive):
+        """A recorded generation replays with the same status and no upstream call."""
+        sample_patient_comprehensive.update(name="Patient 0000beef")
+        capture = tmp_path / "capture.jsonl"
+        records = [
+            {
+                "request_id": 1,
+                "arrival_ms": 0.0,
+                "method": "POST",
+                "path": "/generate-care-plan",
+                "query": "",
+                "headers": {"content-type": "application/json"},
+                "body": sample_patient_comprehensive,
+                "body_bytes": 1000,
+                "status": 200,
+                "duration_ms": 50.0,
+                "upstream": [
+                    {
+                        "model": "fake-model",
+                        "stop_reason": "end_turn",
+                        "input_tokens": 10,
+                        "output_tokens": 10,
+                        "duration_ms": 20.0,
+                        "text": "<h2>Patient Summary</h2><p>Patient 0000beef is stable.</p>",
+                        "chunk_sizes": [24, 40],
+                        "chunk_offsets_ms": [5.0, 20.0],
+                    }
+                ],
+            },
+            {
+                "request_id": 2,
+                "arrival_ms": 10.0,
+                "method": "GET",
+                "path": "/health",
+                "query": "",
+                "headers": {},
+                "body": None,
+                "body_bytes": 0,
+                "status": 200,
+                "duration_ms": 1.0,
+                "upstream": [],
+            },
+            {
+                "request_id": 3,
+                "arrival_ms": 20.0,
+                "method": "POST",
+                "path": "/import-roster",
+                "query": "format=csv",
+                "headers": {"content-type": "text/csv"},
+                "body": None,
+                "body_bytes": 10_000_000,
+                "status": 200,
+                "duration_ms": 1.0,
+                "upstream": [],
+            },
+        ]
+        capture.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+        report = await replay(app, load_capture(capture), speed=0, upstream_speed=0)
+        assert report.requests == 2
+        assert report.server_errors == 0
+        assert report.status_mismatches == 0
+        assert set(report.paths) == {"/generate-care-plan", "/health"}
+        assert report.latency_ms["max"] >= report.latency_ms["p50"]
+
+    async def test_unrecorded_model_call_fails(self):
+        """A model call without a cassette is an error, never a live upstream call."""
+        player = CassettePlayer([])
+        with pytest.raises(MissingCassetteError):
+            async for _ in player.stream_completion("system", "user"):
+                pass
@@ -0,0 +1,157 @@
+"""
+Tests for the multi-key/multi-endpoint upstream pool.
+"""
+
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from anthropic import APIConnectionError, RateLimitError
+
+from app.services import claude_client as claude_client_module
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.claude_client import claude_client
+from app.services.request_profiler import request_profiler
+from app.services.upstream_pool import (
+    STATE_EJECTED,
+    STATE_HEALTHY,
+    STATE_PROBATION,
+    UpstreamMember,
+    UpstreamPool,
+)
+from tests.conftest import FakeEventStream
+
+TOKEN = "upstream-admin-token"
+REQUEST = httpx.Request("POST", "https://api.invalid/v1/messages")
+
+
+def make_member(name: str, create=None) -> UpstreamMember:
+    """A pool member whose client calls `create`."""
+    client = SimpleNamespace(messages=SimpleNamespace(create=create), timeout=60.0)
+    return UpstreamMember(name=name, client=client, base_url=f"https://{name}.invalid")
+
+
+def make_pool(*names: str, eject_seconds: float = 30.0) -> UpstreamPool:
+    """A pool of idle members that ejects after two failures."""
+    return UpstreamPool(
+        [make_member(name) for name in names], eject_failures=2, eject_seconds=eject_seconds
+    )
+
+
+class TestBalancing:
+    """Tests for least-outstanding-requests selection."""
+
+    def test_least_outstanding_wins(self):
+        """Busy members are skipped until they finish; ties rotate."""
+        pool = make_pool("a", "b", "c")
+        first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+        assert {first.name, second.name, third.name} == {"a", "b", "c"}
+        pool.release(second)
+        assert pool.acquire() is second
+        assert [member.outstanding for member in pool.members] == [1, 1, 1]
+
+
+class TestEjection:
+    """Tests for ejection, probation and reinstatement."""
+
+    def test_consecutive_failures_eject_then_probe(self):
+        """A failing member is ejected, probed after the ejection time, then reinstated."""
+        pool = make_pool("a", "b", eject_seconds=0.05)
+        bad, good = pool.members
+        pool.record_failure(bad)
+        assert bad.state(time.monotonic()) == STATE_HEALTHY
+        pool.record_failure(bad)
+        assert bad.state(time.monotonic()) == STATE_EJECTED
+        assert all(pool.acquire() is good for _ in range(3))
+
+        time.sleep(0.06)
+        assert bad.state(time.monotonic()) == STATE_PROBATION
+        assert pool.acquire() is bad
+        # One probe at a time
+        assert pool.acquire() is good
+        pool.record_success(bad, 120.0)
+        assert bad.state(time.monotonic()) == STATE_HEALTHY
+        assert pool.report().members[0].average_latency_ms == 120.0
+
+    def test_failed_probe_doubles_ejection(self):
+        """A member that fails on probation is ejected again for longer."""
+        pool = make_pool("a", "b", eject_seconds=10)
+        bad = pool.members[0]
+        bad.probation = True
+        pool.record_failure(bad)
+        assert bad.ejection_multiplier == 2
+        assert pool.report().members[0].ejected_for_seconds == pytest.approx(20, abs=0.5)
+
+    def test_rate_limit_ejects_for_retry_after(self):
+        """A rate-limited member leaves the rotation for as long as it asked."""
+        pool = make_pool("a", "b")
+        pool.record_failure(pool.members[0], retry_after=5)
+        assert pool.report().members[0].ejected_for_seconds == pytest.approx(5, abs=0.5)
+        assert pool.report().available == 1
+
+    def test_last_member_never_ejected(self):
+        """With nowhere else to send traffic, the circuit breaker handles outages."""
+        pool = make_pool("only")
+        for _ in range(5):
+            pool.record_failure(pool.members[0])
+        assert pool.members[0].state(time.monotonic()) == STATE_HEALTHY
+        assert pool.report().members[0].failures == 5
+
+
+class TestClientFailover:
+    """Tests for ClaudeClient over a pool."""
+
+    @pytest.fixture
+    def circuit(self, monkeypatch) -> CircuitBreaker:
+        """Fresh upstream circuit."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        monkeypatch.setattr(claude_client_module, "upstream_circuit", breaker)
+        return breaker
+
+    async def test_outage_fails_over_before_output(self, monkeypatch, circuit):
+        """A throttled key is skipped for the next member, without tripping the circuit."""
+
+        async def throttled(**kwargs):
+            raise RateLimitError(
+                "rate limited",
+                response=httpx.Response(429, headers={"retry-after": "7"}, request=REQUEST),
+                body=None,
+            )
+
+        async def healthy(**kwargs):
+            return FakeEventStream(["<p>ok</p>"], {"anthropic-ratelimit-tokens-remaining": "500"})
+
+        pool = UpstreamPool([make_member("org-a", throttled), make_member("org-b", healthy)])
+        monkeypatch.setattr(claude_client, "pool", pool)
+
+        assert await claude_client.generate_completion("system", "user") == "<p>ok</p>"
+        report = pool.report()
+        assert [member.state for member in report.members] == ["ejected", "healthy"]
+        assert [member.outstanding for member in report.members] == [0, 0]
+        assert claude_client.rate_limit_headroom() == 500
+        assert circuit.failures == 0
+
+    async def test_every_member_down_raises(self, monkeypatch, circuit):
+        """The error surfaces once no member is left, and counts once for the circuit."""
+        calls = []
+
+        async def unreachable(**kwargs):
+            calls.append(kwargs)
+            raise APIConnectionError(request=REQUEST)
+
+        pool = UpstreamPool([make_member("a", unreachable), make_member("b", unreachable)])
+        monkeypatch.setattr(claude_client, "pool", pool)
+        with pytest.raises(APIConnectionError):
+            await claude_client.generate_completion("system", "user")
+        assert len(calls) == 2
+        assert circuit.failures == 1
+
+    def test_admin_report(self, monkeypatch, test_client):
+        """Per-member metrics are an admin endpoint and never show keys."""
+        assert test_client.get("/admin/upstreams").status_code == 403
+        monkeypatch.setattr(request_profiler, "token", TOKEN)
+        response = test_client.get("/admin/upstreams", headers={"X-Profile-Token": TOKEN})
+        assert response.status_code == 200
+        assert response.json()["members"][0]["name"] == "primary"
+        assert "api_key" not in response.text
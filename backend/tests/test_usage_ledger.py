@@ -0,0 +1,92 @@
+"""
+Tests for per-facility usage accounting and quotas.
+"""
+
+import json
+
+import pytest
+
+from app.services.claude_client import claude_client
+from app.services.usage_ledger import QuotaExceededError, UsageLedger, usage_ledger
+from tests.conftest import FakeEventStream
+
+
+class TestUsageLedger:
+    """Tests for aggregation, quotas and persistence."""
+
+    def test_usage_aggregated_per_facility(self):
+        """Calls are summed per facility and reported with quota headroom."""
+        ledger = UsageLedger(quotas={"North": 1000})
+        ledger.record("North", 100, 50, 200.0)
+        ledger.record("North", 100, 150, 400.0)
+        ledger.record("South", 10, 10, 100.0)
+
+        report = ledger.report()
+        north = report.facilities[0]
+        assert north.facility == "North"
+        assert (north.calls, north.total_tokens, north.average_latency_ms) == (2, 400, 300.0)
+        assert north.remaining_tokens == 600
+        assert report.facilities[1].quota_tokens is None
+
+    def test_quota_checked_before_call(self):
+        """A facility at its quota is rejected; others are not."""
+        ledger = UsageLedger(default_quota=100)
+        ledger.record("North", 60, 40, 10.0)
+        with pytest.raises(QuotaExceededError):
+            ledger.check_quota("North")
+        ledger.check_quota("South")
+
+    @pytest.mark.asyncio
+    async def test_flush_batches_and_reload(self, tmp_path):
+        """Pending usage is flushed as one record per facility and reloaded on startup."""
+        path = tmp_path / "usage.jsonl"
+        ledger = UsageLedger(str(path))
+        ledger.record("North", 100, 50, 200.0)
+        ledger.record("North", 100, 50, 200.0)
+
+        assert await ledger.flush() == 1
+        assert await ledger.flush() == 0
+        record = json.loads(path.read_text())
+        assert (record["facility"], record["calls"], record["input_tokens"]) == ("North", 2, 200)
+        assert UsageLedger(str(path)).usage("North").total_tokens == 300
+
+
+class TestClientAccounting:
+    """Tests that upstream calls are recorded and quotas enforced."""
+
+    @pytest.mark.asyncio
+    async def test_stream_records_usage_and_rate_limit(self, monkeypatch):
+        """Completed streams record reported usage and the remaining rate-limit budget."""
+        stream = FakeEventStream(
+            ["<p>", "plan</p>"], {"anthropic-ratelimit-tokens-remaining": "9000"}
+        )
+
+        async def fake_create(**kwargs):
+            return stream
+
+        monkeypatch.setattr(claude_client.client.messages, "create", fake_create)
+        text = await claude_client.generate_completion("system", "user")
+        items = [item async for item in claude_client.stream_completion("s", "u", facility="East")]
+
+        assert text == "<p>plan</p>"
+        assert items[-1].output_tokens == 30
+        assert stream.closed
+        assert usage_ledger.usage("East").total_tokens == 80
+        assert claude_client.rate_limit_headroom() == 9000
+
+    def test_over_quota_facility_gets_429(
+        self, monkeypatch, test_client, sample_patient_comprehensive
+    ):
+        """Generation is refused before any upstream call once the quota is used."""
+        facility = "Quota Test Facility"
+        sample_patient_comprehensive.update(facility=facility)
+        monkeypatch.setitem(usage_ledger.quotas, facility, 100)
+        usage_ledger.record(facility, 80, 40, 10.0)
+
+        response = test_client.post("/generate-care-plan", json=sample_patient_comprehensive)
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) > 0
+
+        report = test_client.get("/usage").json()
+        usage = next(item for item in report["facilities"] if item["facility"] == facility)
+        assert usage["remaining_tokens"] == 0
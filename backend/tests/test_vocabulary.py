@@ -0,0 +1,96 @@
+"""
+Tests for the clinical vocabulary index and autocomplete endpoint.
+"""
+
+from app.models import PatientInput
+from app.services.vocabulary import vocabulary_index
+
+
+class TestVocabularyIndex:
+    """Tests for prefix, synonym and fuzzy matching."""
+
+    def test_synonym_prefix_returns_canonical_term(self):
+        """Brand names resolve to the canonical generic name."""
+        matches = vocabulary_index.search("medications", "lasi")
+        assert matches[0].term == "Furosemide"
+        assert matches[0].matched == "Lasix"
+
+    def test_exact_abbreviation_ranks_first(self):
+        """An exact abbreviation match outranks other prefix matches."""
+        matches = vocabulary_index.search("diagnoses", "chf")
+        assert matches[0].term == "Congestive Heart Failure"
+
+    def test_word_prefix_matches_mid_term(self):
+        """Queries match the start of any word in a term."""
+        terms = [m.term for m in vocabulary_index.search("diagnoses", "heart", limit=20)]
+        assert "Congestive Heart Failure" in terms
+
+    def test_typo_falls_back_to_trigram_match(self):
+        """Misspellings still find the intended term."""
+        matches = vocabulary_index.search("medications", "metfromin")
+        assert matches[0].term == "Metformin"
+
+    def test_canonicalize_exact_synonym(self):
+        """Equivalent abbreviations and brand names map onto the canonical term."""
+        assert vocabulary_index.canonicalize("diagnoses", "chf") == "Congestive Heart Failure"
+        assert vocabulary_index.canonicalize("medications", "Lasix") == "Furosemide"
+        assert vocabulary_index.canonicalize("allergies", "sulfa") == "Sulfa drugs"
+
+    def test_canonicalize_keeps_qualified_values(self):
+        """Qualifiers such as type, control or laterality are never dropped."""
+        for value in ("Pneumonia (aspiration)", "Diabetes (uncontrolled)", "Hip fracture (left)"):
+            assert vocabulary_index.canonicalize("diagnoses", value) == value
+
+    def test_canonicalize_does_not_narrow_generic_terms(self):
+        """Generic terms are not mapped onto a more specific canonical term."""
+        assert vocabulary_index.canonicalize("diagnoses", "Diabetes") == "Diabetes"
+        assert vocabulary_index.canonicalize("diagnoses", "Pneumonia") == "Pneumonia"
+        assert vocabulary_index.canonicalize("allergies", "Keflex") == "Keflex"
+
+    def test_related_terms_are_still_searchable(self):
+        """Related terms help search even though they are not canonicalized."""
+        terms = [m.term for m in vocabulary_index.search("diagnoses", "pneumonia")]
+        assert "Community-acquired Pneumonia" in terms
+
+    def test_standardized_terms_keep_original_text(self, sample_patient_comprehensive):
+        """Standardized terms are reported alongside the original values."""
+        sample_patient_comprehensive["comorbidities"] = ["CHF", "Diabetes (uncontrolled)"]
+        sample_patient_comprehensive["allergies"] = ["sulfa"]
+        pairs = vocabulary_index.standardized_terms(PatientInput(**sample_patient_comprehensive))
+        assert ("CHF", "Congestive Heart Failure") in pairs
+        assert ("sulfa", "Sulfa drugs") in pairs
+        assert all(original != "Diabetes (uncontrolled)" for original, _ in pairs)
+
+
+class TestAutocompleteEndpoint:
+    """Tests for GET /autocomplete/{category}."""
+
+    def test_autocomplete_success(self, test_client):
+        """The endpoint returns ranked matches with caching headers."""
+        response = test_client.get("/autocomplete/allergies", params={"q": "pen"})
+        assert response.status_code == 200
+        assert response.json()["matches"][0]["term"] == "Penicillin"
+        assert response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+
+    def test_autocomplete_not_modified(self, test_client):
+        """A matching If-None-Match header returns 304."""
+        first = test_client.get("/autocomplete/diagnoses", params={"q": "copd"})
+        second = test_client.get(
+            "/autocomplete/diagnoses",
+            params={"q": "copd"},
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+        assert second.status_code == 304
+
+    def test_etag_differs_for_different_raw_queries(self, test_client):
+        """Queries that normalize alike but echo differently get different ETags."""
+        first = test_client.get("/autocomplete/medications", params={"q": "Lasix"})
+        second = test_client.get("/autocomplete/medications", params={"q": " lasix!"})
+        assert first.json()["query"] != second.json()["query"]
+        assert first.headers["etag"] != second.headers["etag"]
+
+    def test_autocomplete_unknown_category(self, test_client):
+        """Unknown categories return 404."""
+        response = test_client.get("/autocomplete/procedures", params={"q": "ab"})
+        assert response.status_code == 404
@@ -2,6 +2,7 @@
  * CarePlanDisplay component - Displays the AI-generated care plan.
  * Clean, printable format with professional styling.
  */
+import { carePlanUrl } from "../services/api";
 import type { CarePlanOutput } from "../types";
 
 interface CarePlanDisplayProps {
@@ -37,6 +38,16 @@ export function CarePlanDisplay({ carePlan }: CarePlanDisplayProps) {
           <p className="text-sm text-gray-500 mt-1">
             Generated: {formatDate(carePlan.generated_at)}
           </p>
+          {carePlan.content_hash && (
+            <a
+              href={carePlanUrl(carePlan.content_hash)}
+              target="_blank"
+              rel="noreferrer"
+              className="text-sm text-blue-600 hover:underline mt-1 inline-block"
+            >
+              Permanent link to this plan
+            </a>
+          )}
         </div>
         <button
           onClick={handlePrint}
@@ -60,6 +71,30 @@ export function CarePlanDisplay({ carePlan }: CarePlanDisplayProps) {
         </button>
       </div>
 
+      {/* Template Fallback Notice */}
+      {carePlan.is_fallback && (
+        <div className="p-5 bg-orange-50 border-2 border-orange-200 rounded-xl no-print">
+          <p className="font-semibold text-orange-800">
+            Standard template plan - AI generation was unavailable. Individualize
+            and review before use.
+          </p>
+        </div>
+      )}
+
+      {/* Validation Warnings */}
+      {carePlan.validation_warnings && carePlan.validation_warnings.length > 0 && (
+        <div className="p-5 bg-yellow-50 border-2 border-yellow-200 rounded-xl no-print">
+          <p className="font-semibold text-yellow-800">
+            Review before use - this plan may be incomplete:
+          </p>
+          <ul className="list-disc list-inside text-sm text-yellow-800 mt-1">
+            {carePlan.validation_warnings.map((warning) => (
+              <li key={warning}>{warning}</li>
+            ))}
+          </ul>
+        </div>
+      )}
+
       {/* Care Plan Content */}
       <div className="bg-white">
         <div
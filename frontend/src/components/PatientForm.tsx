@@ -2,8 +2,9 @@
  * PatientForm component - Improved UI with searchable selects and better formatting.
  * Clean, medical-professional interface with preset options.
  */
-import { useState, FormEvent } from "react";
-import type { PatientInput, Medication } from "../types";
+import { useState, useEffect, FormEvent } from "react";
+import type { PatientInput, Medication, MedicationIssue } from "../types";
+import { checkMedications } from "../services/api";
 import { mockPatients } from "../data/mockPatients";
 import { SearchableSelect } from "./SearchableSelect";
 import {
@@ -49,6 +50,26 @@ export function PatientForm({ onSubmit, isLoading }: PatientFormProps) {
     frequency: "",
   });
 
+  const [medicationIssues, setMedicationIssues] = useState<MedicationIssue[]>(
+    [],
+  );
+
+  // Re-check interactions and allergy conflicts whenever either list changes
+  useEffect(() => {
+    const { current_medications, allergies } = formData;
+    if (current_medications.length === 0) {
+      setMedicationIssues([]);
+      return;
+    }
+    const controller = new AbortController();
+    checkMedications(current_medications, allergies, controller.signal)
+      .then((check) => setMedicationIssues(check.issues))
+      .catch(() => {
+        // Advisory only; the care plan generation still runs its own check
+      });
+    return () => controller.abort();
+  }, [formData.current_medications, formData.allergies]);
+
   const handleInputChange = (
     field: keyof PatientInput,
     value: string | number | null,
@@ -426,6 +447,26 @@ export function PatientForm({ onSubmit, isLoading }: PatientFormProps) {
           placeholder="Type to search allergies or add custom..."
           disabled={isLoading}
         />
+        {medicationIssues.length > 0 && (
+          <ul className="mt-4 space-y-2">
+            {medicationIssues.map((issue, idx) => (
+              <li
+                key={idx}
+                className={`p-3 rounded border text-base ${
+                  issue.severity === "major"
+                    ? "bg-red-50 border-red-300 text-red-900"
+                    : "bg-amber-50 border-amber-300 text-amber-900"
+                }`}
+              >
+                <strong>
+                  {issue.medications.join(" + ")}
+                  {issue.allergy && ` (allergy: ${issue.allergy})`}
+                </strong>
+                : {issue.message}. {issue.action}
+              </li>
+            ))}
+          </ul>
+        )}
       </div>
 
       {/* Clinical Status */}
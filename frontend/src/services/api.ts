@@ -8,20 +8,32 @@ import type {
   CarePlanOutput,
   HealthCheckResponse,
   APIError,
+  Medication,
+  MedicationCheck,
 } from "../types";
 
 // Get API URL from environment variables
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
+// 60 second timeout for AI generation
+const REQUEST_TIMEOUT_MS = 60000;
+// Deadline sent to the backend: a few seconds short of the timeout, so the
+// server answers (with a fallback plan or a 504) before the browser gives up
+const DEADLINE_MARGIN_MS = 5000;
+const REQUEST_DEADLINE_MS = REQUEST_TIMEOUT_MS - DEADLINE_MARGIN_MS;
+
 // Create axios instance with default config
 const apiClient = axios.create({
   baseURL: API_URL,
   headers: {
     "Content-Type": "application/json",
   },
-  timeout: 60000, // 60 second timeout for AI generation
+  timeout: REQUEST_TIMEOUT_MS,
 });
 
+// In-flight generation, aborted when the form is resubmitted
+let pendingGeneration: AbortController | null = null;
+
 /**
  * Check backend health status
  */
@@ -36,18 +48,31 @@ export async function checkHealth(): Promise<HealthCheckResponse> {
 }
 
 /**
- * Generate a care plan for a patient
+ * Generate a care plan for a patient.
+ * A new call cancels the previous one, which stops its generation server-side.
  */
 export async function generateCarePlan(
   patientData: PatientInput,
 ): Promise<CarePlanOutput> {
+  pendingGeneration?.abort();
+  const controller = new AbortController();
+  pendingGeneration = controller;
+
   try {
     const response = await apiClient.post<CarePlanOutput>(
       "/generate-care-plan",
       patientData,
+      {
+        signal: controller.signal,
+        headers: { "X-Request-Deadline-Ms": String(REQUEST_DEADLINE_MS) },
+      },
     );
     return response.data;
   } catch (error) {
+    if (axios.isCancel(error)) {
+      throw new Error("Request was replaced by a newer submission");
+    }
+
     if (axios.isAxiosError(error)) {
       const axiosError = error as AxiosError<APIError>;
 
@@ -66,9 +91,41 @@ export async function generateCarePlan(
 
     // Generic error
     throw new Error("An unexpected error occurred. Please try again.");
+  } finally {
+    if (pendingGeneration === controller) {
+      pendingGeneration = null;
+    }
   }
 }
 
+/**
+ * Cross-check medications and allergies against the local interaction index.
+ * Answers in milliseconds without an AI call, so it can run as the form changes.
+ */
+export async function checkMedications(
+  currentMedications: Medication[],
+  allergies: string[],
+  signal?: AbortSignal,
+): Promise<MedicationCheck> {
+  const response = await apiClient.post<MedicationCheck>(
+    "/medication-check",
+    { current_medications: currentMedications, allergies },
+    { signal },
+  );
+  return response.data;
+}
+
+/**
+ * Permanent, cacheable URL of a stored care plan.
+ * The content never changes at this address, so browsers reuse it freely.
+ */
+export function carePlanUrl(
+  contentHash: string,
+  format: "json" | "html" = "html",
+): string {
+  return `${API_URL}/care-plans/${contentHash}?format=${format}`;
+}
+
 /**
  * Format error message for display to user
  */
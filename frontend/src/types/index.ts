@@ -48,6 +48,26 @@ export interface CarePlanOutput {
   patient_name: string;
   care_plan_html: string;
   generated_at: string;
+  validation_warnings?: string[];
+  is_fallback?: boolean;
+  content_hash?: string | null;
+  model?: string | null;
+  input_tokens?: number | null;
+  output_tokens?: number | null;
+}
+
+export interface MedicationIssue {
+  kind: "interaction" | "allergy";
+  severity: "major" | "moderate";
+  medications: string[];
+  allergy: string | null;
+  message: string;
+  action: string;
+}
+
+export interface MedicationCheck {
+  medications_checked: number;
+  issues: MedicationIssue[];
 }
 
 export interface HealthCheckResponse {